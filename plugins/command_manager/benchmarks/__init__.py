@@ -0,0 +1,4 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Simulated devices and benchmarks for the Command Manager plugin"""
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Command execution benchmark for the Command Manager plugin
+
+Runs commands on simulated devices (see device_simulator) through the
+same path as the command dialog: the CommandExecutor schedules the
+devices within its concurrency limit and CommandHandler runs every
+command over pooled SSH or Telnet sessions. Every round runs all commands
+on all devices; the first round includes the logins, later rounds reuse
+the pooled sessions.
+
+The report lists the per-command latency (percentiles), the throughput
+in commands and output per second, the session pool counters and the
+memory used (peak RSS, plus the peak of Python allocations with
+--trace-memory).
+
+The devices are served by a child process, so the measurements only
+cover the client side; --in-process serves them from threads of the
+benchmark instead.
+
+Run from the NetWORKS directory:
+
+    python -m plugins.command_manager.benchmarks.command_benchmark --devices 200 --protocol ssh --latency 0.05
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+import multiprocessing
+from loguru import logger
+
+from plugins.command_manager.core.command_handler import CommandHandler
+from plugins.command_manager.core.command_executor import CommandExecutor, DeviceJob
+from .device_simulator import (
+    DeviceSimulator, create_profiles, add_simulator_arguments, profile_settings, serve_process
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DEFAULT_COMMANDS = ["show version", "show interfaces status", "show running-config"]
+PERCENTILES = (50, 90, 99)
+
+
+class BenchmarkDevice:
+    """Device with the properties the command handler reads"""
+
+    def __init__(self, device_id, properties):
+        self.id = device_id
+        self.properties = properties
+
+    def get_property(self, name, default=None):
+        return self.properties.get(name, default)
+
+
+class BenchmarkHost:
+    """Stands in for the plugin, providing the settings of the command handler"""
+
+    def __init__(self, settings):
+        self.settings = {key: {"value": value} for key, value in settings.items()}
+
+    def get_device_credentials(self, device_id, device_ip=None, group_names=None):
+        # Credentials are always passed with the commands
+        return None
+
+
+def percentile(values, percent):
+    """Get a percentile of sorted values (nearest rank)"""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[min(len(values), rank) - 1]
+
+
+def summarize(latencies):
+    """Summarize latencies in seconds
+
+    Returns:
+        dict: count, min, mean, max and the PERCENTILES ("p50", ...)
+    """
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+    summary = {
+        "count": len(values),
+        "min": values[0],
+        "mean": sum(values) / len(values),
+        "max": values[-1]
+    }
+    for percent in PERCENTILES:
+        summary[f"p{percent}"] = percentile(values, percent)
+    return summary
+
+
+def peak_rss():
+    """Get the peak resident memory of the process in bytes, None where unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_round(handler, devices, commands, workers):
+    """Run every command on every device once
+
+    Returns:
+        dict: elapsed, commands, failed, output (characters), latency summary
+            and the first error
+    """
+    latencies = []
+    totals = {"failed": 0, "output": 0, "first_error": None}
+
+    def run_command(device, command, credentials):
+        # Device thread: time the command as the executor sees it
+        start = time.perf_counter()
+        result = handler.run_command(device, command, credentials)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    def on_complete(device, command, result):
+        if result["success"]:
+            totals["output"] += len(result["output"])
+            return
+        totals["failed"] += 1
+        if totals["first_error"] is None:
+            totals["first_error"] = f"{device.id}: {result['output'].strip().splitlines()[-1]}"
+
+    jobs = [
+        DeviceJob(device, [{"command": command} for command in commands], credentials)
+        for device, credentials in devices
+    ]
+    executor = CommandExecutor(run_command, max_workers=workers)
+
+    start = time.perf_counter()
+    summary = executor.execute(jobs, on_complete=on_complete)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed": elapsed,
+        "commands": summary["commands_run"],
+        "failed": totals["failed"],
+        "output": totals["output"],
+        "latency": summarize(latencies),
+        "first_error": totals["first_error"]
+    }
+
+
+def run_benchmark(targets, commands, rounds=2, workers=8, max_sessions=32, pooling=True, trace_memory=False):
+    """Run commands on devices in rounds and measure them
+
+    Args:
+        targets (list): (hostname, host, port, credentials) tuples of the devices
+        commands (list): Commands to run on every device
+        rounds (int): Number of times every command runs on every device
+        workers (int): Maximum number of devices running at the same time
+        max_sessions (int): Session pool size
+        pooling (bool): Keep sessions open between commands and rounds
+        trace_memory (bool): Measure the peak of Python allocations (slower)
+
+    Returns:
+        dict: rounds (list of round results), pool (session pool counters)
+            and memory (peak_rss, peak_traced in bytes or None)
+    """
+    handler = CommandHandler(BenchmarkHost({
+        "max_sessions": max_sessions,
+        "session_idle_timeout": 300,
+        "session_pooling": pooling
+    }))
+    devices = [
+        (BenchmarkDevice(f"{hostname}:{port}", {"ip_address": host, "hostname": hostname}), credentials)
+        for hostname, host, port, credentials in targets
+    ]
+
+    if trace_memory:
+        tracemalloc.start()
+    results = []
+    try:
+        for number in range(rounds):
+            result = _run_round(handler, devices, commands, workers)
+            logger.info(f"Round {number + 1}: {result['commands']} commands in {result['elapsed']:.2f}s")
+            results.append(result)
+        pool = handler.session_pool.stats()
+    finally:
+        handler.close_sessions()
+        peak_traced = None
+        if trace_memory:
+            peak_traced = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return {"rounds": results, "pool": pool, "memory": {"peak_rss": peak_rss(), "peak_traced": peak_traced}}
+
+
+def format_report(results, description, simulator_stats=None):
+    """Format benchmark results as text
+
+    Args:
+        results (dict): Results of run_benchmark
+        description (str): First line of the report
+        simulator_stats (dict, optional): Connections and commands served by the simulator
+
+    Returns:
+        str: The report
+    """
+    lines = [description]
+    for number, result in enumerate(results["rounds"], 1):
+        elapsed = result["elapsed"] or 1e-9
+        megabytes = result["output"] / 1048576
+        lines.append(
+            f"Round {number}: {result['commands']} commands in {result['elapsed']:.2f}s, "
+            f"{result['commands'] / elapsed:.1f} commands/s, {megabytes:.1f} MiB output "
+            f"({megabytes / elapsed:.2f} MiB/s), {result['failed']} failed"
+        )
+        latency = result["latency"]
+        if latency["count"]:
+            values = "  ".join(
+                f"{key} {latency[key] * 1000:.1f}"
+                for key in ["min", "mean"] + [f"p{percent}" for percent in PERCENTILES] + ["max"]
+            )
+            lines.append(f"  latency ms: {values}")
+        if result["first_error"]:
+            lines.append(f"  first error: {result['first_error']}")
+
+    pool = results["pool"]
+    lines.append(
+        f"Session pool: {pool['created']} created, {pool['reused']} reused, "
+        f"{pool['reconnected']} reconnected, {pool['evicted']} evicted"
+    )
+    if simulator_stats:
+        lines.append(f"Simulator: {simulator_stats['connections']} connections, {simulator_stats['commands']} commands")
+
+    memory = results["memory"]
+    parts = []
+    if memory["peak_rss"] is not None:
+        parts.append(f"peak RSS {memory['peak_rss'] / 1048576:.1f} MiB")
+    if memory["peak_traced"] is not None:
+        parts.append(f"peak Python allocations {memory['peak_traced'] / 1048576:.1f} MiB")
+    if parts:
+        lines.append(f"Memory: {', '.join(parts)}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Run the benchmark from the command line
+
+    Returns:
+        int: Exit status, 1 if any command failed
+    """
+    parser = argparse.ArgumentParser(description="Benchmark Command Manager command execution on simulated devices")
+    add_simulator_arguments(parser)
+    parser.add_argument("--command", action="append", dest="commands", metavar="COMMAND",
+                        help=f"command to run on every device (default: {', '.join(DEFAULT_COMMANDS)})")
+    parser.add_argument("--rounds", type=int, default=2, help="times every command runs on every device")
+    parser.add_argument("--workers", type=int, default=8, help="devices running at the same time")
+    parser.add_argument("--max-sessions", type=int, default=32, help="session pool size")
+    parser.add_argument("--no-pooling", action="store_true", help="log in for every command")
+    parser.add_argument("--trace-memory", action="store_true", help="measure the peak of Python allocations (slower)")
+    parser.add_argument("--in-process", action="store_true",
+                        help="serve the devices from threads of the benchmark process instead of a child process")
+    parser.add_argument("--log-level", default="WARNING", help="loguru level of the benchmark output")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level.upper())
+
+    commands = args.commands or DEFAULT_COMMANDS
+    settings = profile_settings(args)
+
+    simulator = None
+    process = None
+    if args.in_process:
+        simulator = DeviceSimulator(args.host)
+        for profile in create_profiles(args.devices, **settings):
+            simulator.add_device(profile, args.protocol)
+        simulator.start()
+        served = [(device.hostname, device.port, device.credentials()) for device in simulator.devices]
+    else:
+        connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=serve_process,
+            args=(args.host, args.protocol, args.devices, settings, child_connection),
+            daemon=True
+        )
+        process.start()
+        child_connection.close()
+        served = connection.recv()
+
+    try:
+        results = run_benchmark(
+            [(hostname, args.host, port, credentials) for hostname, port, credentials in served],
+            commands,
+            rounds=args.rounds,
+            workers=args.workers,
+            max_sessions=args.max_sessions,
+            pooling=not args.no_pooling,
+            trace_memory=args.trace_memory
+        )
+    finally:
+        if simulator:
+            simulator.stop()
+            simulator_stats = simulator.stats
+        else:
+            connection.send("stop")
+            simulator_stats = connection.recv()
+            process.join()
+
+    description = (
+        f"{args.devices} {args.protocol} devices, {len(commands)} commands, {args.workers} workers, "
+        f"session pooling {'off' if args.no_pooling else 'on'}, latency {args.latency * 1000:.0f} ms "
+        f"+/- {args.jitter * 1000:.0f} ms, {args.lines} lines per output"
+    )
+    print(format_report(results, description, simulator_stats))
+    return 1 if any(result["failed"] for result in results["rounds"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,864 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Simulated network devices for benchmarking the Command Manager plugin
+
+The simulator serves any number of Cisco style devices on localhost, one
+listening port per device, over SSH (paramiko server mode) or Telnet, so
+SSHClient, TelnetClient, the session pool and the command executor can be
+measured and regression tested without real switches.
+
+Each device emulates the parts of an IOS command line the plugin relies on:
+
+- Telnet login ("Username:", "Password:", "% Login invalid"), SSH password
+  authentication, and SSH exec requests for runs without enable mode
+- "hostname>" and "hostname#" prompts, ``enable`` with an enable secret,
+  ``disable``, ``exit``
+- ``terminal length N`` and ``--More--`` paging (space for the next page,
+  return for the next line, q to quit), erased with backspaces like IOS
+- configurable login latency, command latency and jitter, and output
+  sizes per command; ``show version``, ``show running-config`` and
+  ``show interfaces status`` look like the real thing, other ``show``
+  commands return generated lines and anything else is invalid input
+
+Outputs are generated once per command and size and cached, so the
+simulator spends its time on the protocol rather than on generating text.
+
+Run it standalone to point the application at simulated devices:
+
+    python -m plugins.command_manager.benchmarks.device_simulator --devices 20 --protocol telnet --port 2300
+"""
+
+import re
+import time
+import zlib
+import random
+import socket
+import logging
+import argparse
+import selectors
+import threading
+import paramiko
+from loguru import logger
+
+
+PROTOCOLS = ("ssh", "telnet")
+
+DEFAULT_PAGE_LENGTH = 24
+DEFAULT_OUTPUT_LINES = 40
+LISTEN_BACKLOG = 128
+
+MORE_PROMPT = " --More-- "
+# Sent after a pager prompt was answered, erasing it like IOS does
+MORE_ERASE = "\x08" * len(MORE_PROMPT) + " " * len(MORE_PROMPT) + "\x08" * len(MORE_PROMPT)
+
+INVALID_INPUT = "         ^\r\n% Invalid input detected at '^' marker.\r\n\r\n"
+
+# Telnet commands and options
+IAC = 255
+SB = 250
+SE = 240
+WILL = 251
+WONT = 252
+DO = 253
+DONT = 254
+OPTION_ECHO = 1
+OPTION_SGA = 3
+
+_END_OF_LINE = re.compile(rb"[\r\n]")
+
+# Log channel of the server transports; clients dropping connections are expected
+SSH_LOG_CHANNEL = "plugins.command_manager.benchmarks.ssh_server"
+logging.getLogger(SSH_LOG_CHANNEL).addHandler(logging.NullHandler())
+
+
+def _interface(index):
+    """Name of the switch port with the given index"""
+    return f"Gi{index // 48 + 1}/0/{index % 48 + 1}"
+
+
+def _pad(lines, count, filler):
+    """Extend generated lines with filler lines up to count lines"""
+    index = 0
+    while len(lines) < count:
+        lines.append(filler(index))
+        index += 1
+    return lines
+
+
+def _show_version(profile, count):
+    lines = [
+        f"Cisco IOS XE Software, Version {profile.version}",
+        f"Cisco IOS Software [Amsterdam], Catalyst L3 Switch Software (CAT9K_IOSXE), Version {profile.version}, RELEASE SOFTWARE (fc3)",
+        "Technical Support: http://www.cisco.com/techsupport",
+        "",
+        f"{profile.hostname} uptime is 12 weeks, 3 days, 4 hours, 5 minutes",
+        'System image file is "flash:packages.conf"',
+        "",
+        f"cisco {profile.model} (X86) processor with 1392780K/6147K bytes of memory.",
+        f"Processor board ID {profile.serial}",
+        "48 Gigabit Ethernet interfaces",
+        "",
+        f"Model number                       : {profile.model}",
+        f"System serial number               : {profile.serial}",
+        "",
+        "Switch Ports Model              SW Version        SW Image              Mode",
+        "------ ----- -----              ----------        ----------            ----",
+    ]
+    return _pad(lines, count, lambda index: (
+        f"{'*' if index == 0 else ' '}{index + 1:>5} {48:>5} {profile.model:<18} {profile.version:<17} CAT9K_IOSXE           INSTALL"
+    ))
+
+
+def _show_running_config(profile, count):
+    lines = [
+        "Building configuration...",
+        "",
+        "Current configuration : 28413 bytes",
+        "!",
+        f"version {profile.version.rsplit('.', 1)[0]}",
+        "service timestamps debug datetime msec",
+        "service timestamps log datetime msec",
+        "!",
+        f"hostname {profile.hostname}",
+        "!",
+    ]
+    block = (
+        lambda port: f"interface GigabitEthernet{port[2:]}",
+        lambda port: f" description simulated access port {port}",
+        lambda port: " switchport access vlan 10",
+        lambda port: " switchport mode access",
+        lambda port: "!",
+    )
+    lines = _pad(lines, max(0, count - 1), lambda index: block[index % len(block)](_interface(index // len(block))))
+    lines.append("end")
+    return lines[:count]
+
+
+def _show_interfaces_status(profile, count):
+    lines = ["", "Port         Name               Status       Vlan       Duplex  Speed Type"]
+    return _pad(lines, count, lambda index: (
+        f"{_interface(index):<13}{'uplink' if index % 48 == 47 else '':<19}"
+        f"{'connected' if index % 3 else 'notconnect':<13}{'trunk' if index % 48 == 47 else '10':<11}"
+        f"{'a-full' if index % 3 else 'auto':<8}{'a-1000' if index % 3 else 'auto':<6}10/100/1000BaseTX"
+    ))
+
+
+def _show_generic(profile, count, command):
+    return _pad([], count, lambda index: (
+        f"{command} line {index + 1:>6}: {profile.hostname} simulated output 0123456789 abcdefghij"
+    ))
+
+
+# Generators of the commands that look like the real thing
+COMMAND_OUTPUTS = {
+    "show version": _show_version,
+    "show ver": _show_version,
+    "show running-config": _show_running_config,
+    "show run": _show_running_config,
+    "show interfaces status": _show_interfaces_status,
+    "show interface status": _show_interfaces_status,
+    "show int status": _show_interfaces_status,
+}
+
+
+class DeviceProfile:
+    """Identity, credentials and behavior of a simulated device"""
+
+    def __init__(self, hostname="sim-switch", username="admin", password="admin", enable_password="enable",
+                 latency=0.0, jitter=0.0, login_latency=0.0, page_length=DEFAULT_PAGE_LENGTH,
+                 default_lines=DEFAULT_OUTPUT_LINES, output_lines=None, model="C9300-48P", version="17.03.04"):
+        """Initialize the profile
+
+        Args:
+            hostname (str): Hostname shown in the prompt
+            username (str): Login username
+            password (str): Login password
+            enable_password (str): Enable secret, empty to enter enable mode without one
+            latency (float): Seconds before a command's output is sent
+            jitter (float): Random deviation of the latency in seconds (+/-)
+            login_latency (float): Seconds an authentication takes
+            page_length (int): Lines per page before --More--, 0 to disable paging
+            default_lines (int): Output lines of commands without a configured size
+            output_lines (dict, optional): Output lines per command, as entered
+            model (str): Model shown by show version
+            version (str): Software version shown by show version
+        """
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.enable_password = enable_password
+        self.latency = max(0.0, float(latency))
+        self.jitter = max(0.0, float(jitter))
+        self.login_latency = max(0.0, float(login_latency))
+        self.page_length = max(0, int(page_length))
+        self.default_lines = max(0, int(default_lines))
+        self.output_lines = {_normalize(command): int(lines) for command, lines in (output_lines or {}).items()}
+        self.model = model
+        self.version = version
+        self.serial = f"FOC{zlib.crc32(hostname.encode()):08X}"
+
+        self._outputs = {}  # {command: (lines, data)}
+
+    def authenticate(self, username, password):
+        """Check login credentials"""
+        return username == self.username and password == self.password
+
+    def command_delay(self):
+        """Get the seconds to wait before sending a command's output"""
+        if not self.jitter:
+            return self.latency
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def output(self, command):
+        """Get the output of a command
+
+        Args:
+            command (str): Command as entered
+
+        Returns:
+            tuple: (encoded lines, whole output) or None for invalid input
+        """
+        command = _normalize(command)
+        cached = self._outputs.get(command)
+        if cached is not None:
+            return cached
+
+        count = self.output_lines.get(command, self.default_lines)
+        generator = COMMAND_OUTPUTS.get(command)
+        if generator:
+            lines = generator(self, count)
+        elif command.startswith("show "):
+            lines = _show_generic(self, count, command)
+        else:
+            return None
+
+        encoded = tuple(f"{line}\r\n".encode() for line in lines)
+        cached = self._outputs[command] = (encoded, b"".join(encoded))
+        return cached
+
+
+def _normalize(command):
+    """Normalize the whitespace and case of a command"""
+    return " ".join(command.split()).lower()
+
+
+def create_profiles(count, prefix="sim", **settings):
+    """Create profiles of numbered devices
+
+    Args:
+        count (int): Number of devices
+        prefix (str): Hostname prefix, hostnames are "<prefix>-001", ...
+        **settings: DeviceProfile arguments shared by all devices
+
+    Returns:
+        list: DeviceProfile objects
+    """
+    return [DeviceProfile(hostname=f"{prefix}-{index + 1:03d}", **settings) for index in range(count)]
+
+
+class CLISession:
+    """Cisco style command line of one connection"""
+
+    def __init__(self, profile, recv, send):
+        """Initialize the session
+
+        Args:
+            profile (DeviceProfile): Device served by the session
+            recv (callable): Returns received bytes, blocking, b"" when the connection closed
+            send (callable): Sends bytes
+        """
+        self.profile = profile
+        self._recv = recv
+        self._send = send
+        self.privileged = False
+        self.page_length = profile.page_length
+        self.commands = 0
+
+        self._input = b""
+        self._skip_lf = False
+
+    @property
+    def prompt(self):
+        return f"{self.profile.hostname}{'#' if self.privileged else '>'}"
+
+    def write(self, text):
+        """Send text to the client"""
+        self._send(text.encode())
+
+    def _fill(self):
+        """Wait for more input"""
+        data = self._recv()
+        if not data:
+            raise EOFError("Connection closed")
+        self._input += data
+
+    def _drop_line_feed(self):
+        """Drop the LF or NUL that follows a CR ending the previous line"""
+        if self._skip_lf and self._input:
+            if self._input[:1] in (b"\n", b"\x00"):
+                self._input = self._input[1:]
+            self._skip_lf = False
+
+    def read_line(self, echo=True):
+        """Read a line of input, echoing it back
+
+        Args:
+            echo (bool): Echo the line, False for passwords
+
+        Returns:
+            str: The line without its line ending
+        """
+        while True:
+            self._drop_line_feed()
+            match = _END_OF_LINE.search(self._input)
+            if match:
+                line = self._input[:match.start()].decode("utf-8", errors="replace")
+                self._skip_lf = match.group() == b"\r"
+                self._input = self._input[match.end():]
+                self.write(f"{line}\r\n" if echo else "\r\n")
+                return line
+            self._fill()
+
+    def read_key(self):
+        """Read a single key press (for the pager)"""
+        while True:
+            self._drop_line_feed()
+            if self._input:
+                key, self._input = self._input[:1], self._input[1:]
+                self._skip_lf = key == b"\r"
+                return key
+            self._fill()
+
+    def login(self):
+        """Ask for username and password (Telnet)
+
+        Returns:
+            bool: Whether the client logged in
+        """
+        self.write("\r\n\r\nUser Access Verification\r\n\r\n")
+        for _attempt in range(3):
+            self.write("Username: ")
+            username = self.read_line().strip()
+            self.write("Password: ")
+            password = self.read_line(echo=False)
+            if self.profile.authenticate(username, password):
+                if self.profile.login_latency:
+                    time.sleep(self.profile.login_latency)
+                return True
+            self.write("% Login invalid\r\n\r\n")
+        return False
+
+    def run(self):
+        """Serve commands until the client exits or disconnects"""
+        self.write(f"\r\n{self.prompt}")
+        while self.handle(self.read_line()):
+            self.write(self.prompt)
+
+    def handle(self, line):
+        """Handle an input line
+
+        Returns:
+            bool: False when the session should end
+        """
+        words = line.split()
+        if not words:
+            return True
+
+        keyword = words[0].lower()
+        if keyword in ("exit", "logout", "quit"):
+            return False
+        if keyword in ("en", "ena", "enable"):
+            self._enable()
+        elif keyword in ("disa", "disable"):
+            self.privileged = False
+        elif keyword in ("term", "terminal") and len(words) == 3 and words[1].lower() in ("len", "length"):
+            if words[2].isdigit():
+                self.page_length = int(words[2])
+            else:
+                self.write(INVALID_INPUT)
+        else:
+            self._command(line)
+        return True
+
+    def _enable(self):
+        """Enter privileged mode, asking for the enable secret"""
+        if self.privileged:
+            return
+        if self.profile.enable_password:
+            self.write("Password: ")
+            if self.read_line(echo=False) != self.profile.enable_password:
+                self.write("% Bad secrets\r\n\r\n")
+                return
+        self.privileged = True
+
+    def _command(self, command):
+        """Send the output of a command, page by page"""
+        self.commands += 1
+        delay = self.profile.command_delay()
+        if delay:
+            time.sleep(delay)
+
+        output = self.profile.output(command)
+        if output is None:
+            self.write(INVALID_INPUT)
+            return
+
+        lines, data = output
+        if not self.page_length or len(lines) < self.page_length:
+            self._send(data)
+            return
+
+        shown = 0
+        step = self.page_length - 1
+        while True:
+            self._send(b"".join(lines[shown:shown + step]))
+            shown += step
+            if shown >= len(lines):
+                return
+
+            self.write(MORE_PROMPT)
+            key = self.read_key()
+            self.write(MORE_ERASE)
+            if key in (b"q", b"Q"):
+                return
+            step = 1 if key in (b"\r", b"\n") else self.page_length - 1
+
+    def execute(self, command):
+        """Run a command without a terminal (SSH exec)
+
+        Returns:
+            bytes: The whole output
+        """
+        self.commands += 1
+        delay = self.profile.command_delay()
+        if delay:
+            time.sleep(delay)
+        output = self.profile.output(command)
+        return INVALID_INPUT.encode() if output is None else output[1]
+
+
+class _TelnetChannel:
+    """Telnet connection that strips option negotiation from the input"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._state = 0  # 0 data, 1 after IAC, 2 option byte, 3 subnegotiation, 4 IAC in subnegotiation
+
+    def negotiate(self):
+        """Announce that the server echoes and suppresses go-ahead, like IOS"""
+        self.sock.sendall(bytes([IAC, WILL, OPTION_ECHO, IAC, WILL, OPTION_SGA]))
+
+    def recv(self):
+        """Receive data without telnet commands, b"" when the connection closed"""
+        while True:
+            data = self.sock.recv(65536)
+            if not data:
+                return b""
+            if self._state or IAC in data:
+                data = self._strip(data)
+            if data:
+                return data
+
+    def _strip(self, data):
+        """Remove telnet commands, keeping escaped 0xFF bytes"""
+        output = bytearray()
+        for byte in data:
+            if self._state == 0:
+                if byte == IAC:
+                    self._state = 1
+                else:
+                    output.append(byte)
+            elif self._state == 1:
+                if byte == IAC:
+                    output.append(byte)
+                    self._state = 0
+                elif byte in (WILL, WONT, DO, DONT):
+                    self._state = 2
+                elif byte == SB:
+                    self._state = 3
+                else:
+                    self._state = 0
+            elif self._state == 2:
+                self._state = 0
+            elif self._state == 3:
+                if byte == IAC:
+                    self._state = 4
+            elif self._state == 4:
+                self._state = 0 if byte == SE else 3
+        return bytes(output)
+
+    def send(self, data):
+        """Send data, escaping 0xFF bytes"""
+        if b"\xff" in data:
+            data = data.replace(b"\xff", b"\xff\xff")
+        self.sock.sendall(data)
+
+
+class _SSHServer(paramiko.ServerInterface):
+    """Password authentication, shell and exec requests of one SSH connection"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self._requests = {}  # {channel ID: command, None for a shell}
+        self._condition = threading.Condition()
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if not self.profile.authenticate(username, password):
+            return paramiko.AUTH_FAILED
+        if self.profile.login_latency:
+            time.sleep(self.profile.login_latency)
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self._set_request(channel, None)
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        self._set_request(channel, command.decode("utf-8", errors="replace"))
+        return True
+
+    def _set_request(self, channel, command):
+        with self._condition:
+            self._requests[channel.get_id()] = command
+            self._condition.notify_all()
+
+    def wait_request(self, channel, timeout):
+        """Wait for the shell or exec request of a channel
+
+        Returns:
+            tuple: (True, command or None for a shell), or (False, None) on timeout
+        """
+        with self._condition:
+            found = self._condition.wait_for(lambda: channel.get_id() in self._requests, timeout)
+            if not found:
+                return False, None
+            return True, self._requests.pop(channel.get_id())
+
+
+class SimulatedDevice:
+    """A device served by the simulator"""
+
+    def __init__(self, profile, protocol, host, port):
+        self.profile = profile
+        self.protocol = protocol
+        self.host = host
+        self.port = port
+
+    @property
+    def hostname(self):
+        return self.profile.hostname
+
+    def credentials(self):
+        """Get Command Manager credentials for the device"""
+        return {
+            "username": self.profile.username,
+            "password": self.profile.password,
+            "enable_password": self.profile.enable_password,
+            "connection_type": self.protocol,
+            "port": self.port
+        }
+
+
+class DeviceSimulator:
+    """Serves simulated devices on local ports"""
+
+    def __init__(self, host="127.0.0.1", host_key=None):
+        """Initialize the simulator
+
+        Args:
+            host (str): Address the devices listen on
+            host_key (paramiko.PKey, optional): SSH host key, generated when needed
+        """
+        self.host = host
+        self.host_key = host_key
+        self.devices = []
+        self.stats = {"connections": 0, "commands": 0}
+
+        self._listeners = {}  # {socket: SimulatedDevice}
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._selector = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def add_device(self, profile, protocol="ssh", port=0):
+        """Add a device listening on its own port
+
+        Args:
+            profile (DeviceProfile): The device
+            protocol (str): "ssh" or "telnet"
+            port (int): Port to listen on, 0 for a free port
+
+        Returns:
+            SimulatedDevice: The device with its address and port
+        """
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unsupported protocol: {protocol}")
+
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            listener.bind((self.host, port))
+            listener.listen(LISTEN_BACKLOG)
+        except OSError:
+            listener.close()
+            raise
+        listener.setblocking(False)
+
+        device = SimulatedDevice(profile, protocol, self.host, listener.getsockname()[1])
+        with self._lock:
+            self._listeners[listener] = device
+            self.devices.append(device)
+            if self._selector:
+                self._selector.register(listener, selectors.EVENT_READ, device)
+        return device
+
+    def start(self):
+        """Start accepting connections"""
+        if self._thread:
+            return
+        if self.host_key is None and any(device.protocol == "ssh" for device in self.devices):
+            logger.debug("Generating SSH host key for simulated devices")
+            self.host_key = paramiko.RSAKey.generate(2048)
+
+        self._stopped.clear()
+        self._selector = selectors.DefaultSelector()
+        with self._lock:
+            for listener, device in self._listeners.items():
+                self._selector.register(listener, selectors.EVENT_READ, device)
+        self._thread = threading.Thread(target=self._accept_loop, name="device-simulator", daemon=True)
+        self._thread.start()
+        logger.info(f"Simulating {len(self.devices)} devices on {self.host}")
+
+    def stop(self):
+        """Stop accepting connections and close all connections"""
+        if not self._thread:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+        with self._lock:
+            for listener in self._listeners:
+                listener.close()
+            self._listeners.clear()
+            connections = list(self._connections)
+        self._selector.close()
+        self._selector = None
+
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        logger.info(f"Device simulator stopped: {self.stats}")
+
+    def _accept_loop(self):
+        """Accept connections and serve each on its own thread"""
+        while not self._stopped.is_set():
+            for key, _events in self._selector.select(timeout=0.5):
+                try:
+                    sock, _address = key.fileobj.accept()
+                except OSError:
+                    continue
+                sock.setblocking(True)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                device = key.data
+                threading.Thread(
+                    target=self._serve,
+                    args=(device, sock),
+                    name=f"simulated-{device.hostname}",
+                    daemon=True
+                ).start()
+
+    def _track(self, connection, add=True):
+        """Remember an open connection so stop can close it"""
+        with self._lock:
+            if add:
+                self._connections.add(connection)
+            else:
+                self._connections.discard(connection)
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def _serve(self, device, sock):
+        """Serve a connection (connection thread)"""
+        self._count("connections")
+        self._track(sock)
+        try:
+            if device.protocol == "ssh":
+                self._serve_ssh(device, sock)
+            else:
+                self._serve_telnet(device, sock)
+        except (EOFError, OSError, paramiko.SSHException):
+            pass
+        except Exception as e:
+            logger.debug(f"Simulated device {device.hostname}: {e}")
+        finally:
+            self._track(sock, add=False)
+            sock.close()
+
+    def _serve_telnet(self, device, sock):
+        channel = _TelnetChannel(sock)
+        channel.negotiate()
+        session = CLISession(device.profile, channel.recv, channel.send)
+        try:
+            if session.login():
+                session.run()
+        finally:
+            self._count("commands", session.commands)
+
+    def _serve_ssh(self, device, sock):
+        transport = paramiko.Transport(sock)
+        transport.set_log_channel(SSH_LOG_CHANNEL)
+        transport.add_server_key(self.host_key)
+        server = _SSHServer(device.profile)
+        self._track(transport)
+        try:
+            transport.start_server(server=server)
+            while transport.is_active() and not self._stopped.is_set():
+                channel = transport.accept(timeout=1)
+                if channel is None:
+                    continue
+                found, command = server.wait_request(channel, timeout=10)
+                if not found:
+                    channel.close()
+                    continue
+                threading.Thread(
+                    target=self._serve_channel,
+                    args=(device, channel, command),
+                    name=f"simulated-{device.hostname}-channel",
+                    daemon=True
+                ).start()
+        finally:
+            self._track(transport, add=False)
+            transport.close()
+
+    def _serve_channel(self, device, channel, command):
+        """Serve an SSH shell (command is None) or exec channel"""
+        session = CLISession(device.profile, lambda: channel.recv(65536), channel.sendall)
+        try:
+            if command is None:
+                session.run()
+            else:
+                channel.sendall(session.execute(command))
+                channel.send_exit_status(0)
+        except (EOFError, OSError, paramiko.SSHException):
+            pass
+        finally:
+            self._count("commands", session.commands)
+            try:
+                channel.close()
+            except (EOFError, OSError, paramiko.SSHException):
+                # The client closed the connection first
+                pass
+
+
+def add_simulator_arguments(parser):
+    """Add the device behavior options to a command line parser"""
+    parser.add_argument("--devices", type=int, default=10, help="number of simulated devices")
+    parser.add_argument("--protocol", choices=PROTOCOLS, default="ssh", help="protocol the devices speak")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before a command's output is sent")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random deviation of the latency in seconds")
+    parser.add_argument("--login-latency", type=float, default=0.0, help="seconds an authentication takes")
+    parser.add_argument("--lines", type=int, default=DEFAULT_OUTPUT_LINES, help="output lines per command")
+    parser.add_argument("--command-lines", action="append", default=[], metavar="COMMAND=LINES",
+                        help="output lines of one command, e.g. 'show running-config=5000'")
+    parser.add_argument("--page-length", type=int, default=DEFAULT_PAGE_LENGTH,
+                        help="lines per --More-- page, 0 to disable paging")
+    parser.add_argument("--no-enable", action="store_true",
+                        help="no enable secret (SSH commands then run as exec requests)")
+
+
+def profile_settings(args):
+    """Get DeviceProfile arguments from parsed simulator options"""
+    output_lines = {}
+    for option in args.command_lines:
+        command, _, lines = option.rpartition("=")
+        if not command or not lines.isdigit():
+            raise ValueError(f"Invalid --command-lines option: {option}")
+        output_lines[command] = int(lines)
+    return {
+        "enable_password": "" if args.no_enable else "enable",
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "login_latency": args.login_latency,
+        "page_length": args.page_length,
+        "default_lines": args.lines,
+        "output_lines": output_lines
+    }
+
+
+def serve_process(host, protocol, count, settings, connection):
+    """Serve simulated devices in a child process until told to stop
+
+    Sends the (hostname, port, credentials) of the devices over the
+    connection, waits for any message and replies with the simulator stats.
+
+    Args:
+        host (str): Address to listen on
+        protocol (str): "ssh" or "telnet"
+        count (int): Number of devices
+        settings (dict): DeviceProfile arguments
+        connection (multiprocessing.connection.Connection): Pipe to the parent
+    """
+    logger.remove()
+    simulator = DeviceSimulator(host)
+    for profile in create_profiles(count, **settings):
+        simulator.add_device(profile, protocol)
+    with simulator:
+        connection.send([(device.hostname, device.port, device.credentials()) for device in simulator.devices])
+        connection.recv()
+    connection.send(simulator.stats)
+
+
+def main(argv=None):
+    """Serve simulated devices until interrupted"""
+    parser = argparse.ArgumentParser(description="Serve simulated Cisco style devices for the Command Manager")
+    add_simulator_arguments(parser)
+    parser.add_argument("--port", type=int, default=0, help="port of the first device (consecutive ports), 0 for free ports")
+    args = parser.parse_args(argv)
+
+    simulator = DeviceSimulator(args.host)
+    for index, profile in enumerate(create_profiles(args.devices, **profile_settings(args))):
+        simulator.add_device(profile, args.protocol, args.port + index if args.port else 0)
+
+    with simulator:
+        credentials = simulator.devices[0].credentials() if simulator.devices else {}
+        print(f"Username {credentials.get('username')}, password {credentials.get('password')}, "
+              f"enable secret {credentials.get('enable_password') or '(none)'}")
+        for device in simulator.devices:
+            print(f"{device.hostname} {device.host}:{device.port} ({device.protocol})")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,15 @@ from .command_manager import CommandManagerPlugin
 from .plugin_setup import register_ui, register_context_menu
 from .command_handler import CommandHandler
 from .output_handler import OutputHandler
+from .command_executor import CommandExecutor
+from .history_compactor import HistoryCompactor
 
 __all__ = [
     'CommandManagerPlugin',
     'register_ui', 
     'register_context_menu',
     'CommandHandler',
-    'OutputHandler'
+    'OutputHandler',
+    'CommandExecutor',
+    'HistoryCompactor'
 ] 
\ No newline at end of file
@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Concurrent command execution engine for the Command Manager plugin
+
+Devices are run concurrently on a bounded thread pool while the commands
+of a single device always run in order on one thread. Besides the global
+concurrency limit, every device group and every subnet has a concurrency
+budget so that a large run does not open hundreds of logins against the
+same AAA server or management network at once.
+
+Scheduling and result handling happen in the thread that calls
+``execute``: device threads only report events through a queue, so all
+callbacks (and therefore all Qt signals emitted from them) come from a
+single aggregator thread.
+
+Commands that fail with a transient connection error (results with
+``"error": "connection"``) are retried on the device thread according to
+the executor's retry policy, with a growing delay between attempts.
+"""
+
+import queue
+import threading
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+
+DEFAULT_MAX_WORKERS = 8
+
+# Prefix lengths used to group devices into subnets for concurrency budgets
+IPV4_PREFIX = 24
+IPV6_PREFIX = 64
+
+# Event types reported to the aggregator
+EVENT_STARTED = "started"
+EVENT_COMPLETE = "complete"
+EVENT_DEVICE_DONE = "device_done"
+
+# Error kinds of failed command results ("error" key)
+ERROR_CONNECTION = "connection"  # no connection, the command was not sent (retried)
+ERROR_CREDENTIALS = "credentials"
+ERROR_INTERRUPTED = "interrupted"  # the connection dropped while the command ran
+ERROR_TIMEOUT = "timeout"  # the device did not answer in time
+
+
+def subnet_key(ip_address):
+    """Get the subnet a device belongs to for concurrency budgets
+
+    Args:
+        ip_address (str): Device IP address
+
+    Returns:
+        str: Subnet in CIDR notation, or None for missing or invalid addresses
+    """
+    try:
+        address = ipaddress.ip_address(str(ip_address).strip())
+    except ValueError:
+        return None
+    prefix = IPV4_PREFIX if address.version == 4 else IPV6_PREFIX
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+class RetryPolicy:
+    """Retries of commands that failed with a transient connection error"""
+
+    def __init__(self, retries=2, delay=5.0, backoff=2.0, max_delay=60.0):
+        """Initialize the policy
+
+        Args:
+            retries (int): Retries per command after the first attempt (0 to disable)
+            delay (float): Seconds before the first retry
+            backoff (float): Factor the delay grows by with every retry
+            max_delay (float): Longest delay between attempts in seconds
+        """
+        self.retries = max(0, int(retries))
+        self.delay = max(0.0, float(delay))
+        self.backoff = max(1.0, float(backoff))
+        self.max_delay = max(self.delay, float(max_delay))
+
+    @staticmethod
+    def is_transient(result):
+        """Check if a result failed with an error worth retrying"""
+        return not result.get("success") and result.get("error") == ERROR_CONNECTION
+
+    def should_retry(self, result, attempt):
+        """Check if a command should be retried
+
+        Args:
+            result (dict): Result of the attempt
+            attempt (int): Number of the attempt, starting at 1
+
+        Returns:
+            bool: Whether to run the command again
+        """
+        return attempt <= self.retries and self.is_transient(result)
+
+    def retry_delay(self, attempt):
+        """Get the seconds to wait after a failed attempt"""
+        return min(self.delay * self.backoff ** (attempt - 1), self.max_delay)
+
+
+class DeviceJob:
+    """Commands to run on a single device"""
+
+    def __init__(self, device, commands, credentials, groups=None, subnet=None):
+        """Initialize the job
+
+        Args:
+            device: Device to run the commands on
+            commands (list): Command dictionaries, run in order
+            credentials (dict): Credentials for the device
+            groups (list, optional): Names of the groups the device belongs to
+            subnet (str, optional): Subnet of the device in CIDR notation
+        """
+        self.device = device
+        self.commands = list(commands)
+        self.credentials = credentials
+        self.groups = list(groups or [])
+        self.subnet = subnet
+
+    def budget_keys(self):
+        """Get the concurrency budgets this job counts against"""
+        keys = [("group", name) for name in self.groups]
+        if self.subnet:
+            keys.append(("subnet", self.subnet))
+        return keys
+
+
+class CommandExecutor:
+    """Runs device jobs concurrently within global, group and subnet limits"""
+
+    def __init__(self, run_command, max_workers=DEFAULT_MAX_WORKERS, group_limit=0,
+                 subnet_limit=0, limits=None, retry_policy=None):
+        """Initialize the executor
+
+        Args:
+            run_command (callable): Function (device, command_text, credentials) -> result dict
+            max_workers (int): Maximum number of devices running at the same time
+            group_limit (int): Maximum concurrent devices per device group (0 for no limit)
+            subnet_limit (int): Maximum concurrent devices per subnet (0 for no limit)
+            limits (dict, optional): Per group name or subnet overrides of the limits
+            retry_policy (RetryPolicy, optional): Retries of transient connection errors
+        """
+        self.run_command = run_command
+        self.max_workers = max(1, int(max_workers))
+        self.group_limit = max(0, int(group_limit))
+        self.subnet_limit = max(0, int(subnet_limit))
+        self.limits = dict(limits or {})
+        self.retry_policy = retry_policy
+        self._stop_event = threading.Event()
+
+    @property
+    def stopped(self):
+        """Whether a stop was requested"""
+        return self._stop_event.is_set()
+
+    def stop(self):
+        """Request cancellation
+
+        Devices that have not started are skipped and running devices stop
+        after their current command.
+        """
+        self._stop_event.set()
+
+    def _limit(self, key):
+        """Get the concurrency limit of a budget key (0 for no limit)"""
+        kind, name = key
+        if name in self.limits:
+            return max(0, int(self.limits[name]))
+        return self.group_limit if kind == "group" else self.subnet_limit
+
+    def _can_start(self, job, active):
+        """Check if a job fits into the budgets of its groups and subnet"""
+        for key in job.budget_keys():
+            limit = self._limit(key)
+            if limit and active.get(key, 0) >= limit:
+                return False
+        return True
+
+    def _run_command(self, job, command):
+        """Run a command, retrying transient connection errors (device thread)
+
+        Returns:
+            dict: Result of the last attempt, with the number of attempts
+        """
+        attempt = 1
+        while True:
+            try:
+                result = self.run_command(job.device, command["command"], job.credentials)
+            except Exception as e:
+                logger.error(f"Error executing command: {command['command']}: {e}")
+                result = {
+                    "success": False,
+                    "output": f"Command: {command['command']}\n\nError: {str(e)}"
+                }
+            if not self.retry_policy or not self.retry_policy.should_retry(result, attempt):
+                break
+
+            delay = self.retry_policy.retry_delay(attempt)
+            logger.info(f"Connection error running '{command['command']}', retrying in {delay:.0f}s (attempt {attempt + 1})")
+            # A stop request ends the wait and keeps the failed result
+            if self._stop_event.wait(delay):
+                break
+            attempt += 1
+
+        result["attempts"] = attempt
+        return result
+
+    def _run_device(self, job, events):
+        """Run the commands of one device in order (device thread)"""
+        try:
+            for command in job.commands:
+                if self._stop_event.is_set():
+                    break
+
+                events.put((EVENT_STARTED, job, command, None))
+                result = self._run_command(job, command)
+                events.put((EVENT_COMPLETE, job, command, result))
+        finally:
+            events.put((EVENT_DEVICE_DONE, job, None, None))
+
+    def execute(self, jobs, on_started=None, on_complete=None):
+        """Run device jobs and report results from the calling thread
+
+        Args:
+            jobs (list): DeviceJob objects, started in list order as budgets allow
+            on_started (callable, optional): Called with (device, command) before a command runs
+            on_complete (callable, optional): Called with (device, command, result) after a command ran
+
+        Returns:
+            dict: Summary with devices, completed_devices, skipped_devices,
+                commands_run and cancelled
+        """
+        pending = list(jobs)
+        events = queue.Queue()
+        active = {}
+        running = 0
+        completed_devices = 0
+        commands_run = 0
+
+        logger.debug(f"Executing commands on {len(pending)} devices with up to {self.max_workers} workers")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="command-executor") as pool:
+            while pending or running:
+                # Start every pending job that fits into the budgets; blocked
+                # jobs keep their place so that order is preserved per budget
+                if not self._stop_event.is_set():
+                    index = 0
+                    while index < len(pending) and running < self.max_workers:
+                        job = pending[index]
+                        if not self._can_start(job, active):
+                            index += 1
+                            continue
+                        pending.pop(index)
+                        for key in job.budget_keys():
+                            active[key] = active.get(key, 0) + 1
+                        running += 1
+                        pool.submit(self._run_device, job, events)
+                elif pending:
+                    logger.debug(f"Stop requested - skipping {len(pending)} devices")
+                    pending = []
+
+                if not running:
+                    continue
+
+                event, job, command, result = events.get()
+                if event == EVENT_STARTED:
+                    if on_started:
+                        on_started(job.device, command)
+                elif event == EVENT_COMPLETE:
+                    commands_run += 1
+                    if on_complete:
+                        on_complete(job.device, command, result)
+                elif event == EVENT_DEVICE_DONE:
+                    running -= 1
+                    completed_devices += 1
+                    for key in job.budget_keys():
+                        active[key] -= 1
+
+        summary = {
+            "devices": len(jobs),
+            "completed_devices": completed_devices,
+            "skipped_devices": len(jobs) - completed_devices,
+            "commands_run": commands_run,
+            "cancelled": self._stop_event.is_set()
+        }
+        logger.debug(f"Command execution finished: {summary}")
+        return summary
@@ -10,9 +10,15 @@ import json
 from pathlib import Path
 from loguru import logger
 
-from plugins.command_manager.utils.command_set import CommandSet, Command
-from plugins.command_manager.utils.ssh_client import SSHClient
-from plugins.command_manager.utils.telnet_client import TelnetClient
+from plugins.command_manager.utils.command_set import CommandSet
+from plugins.command_manager.utils.command_catalog import CommandCatalog, CATALOG_FILE
+from plugins.command_manager.utils.session_pool import SessionPool
+from .command_executor import ERROR_CONNECTION, ERROR_CREDENTIALS, ERROR_INTERRUPTED, ERROR_TIMEOUT
+
+
+class CommandInterrupted(ConnectionError):
+    """The connection dropped while a command was running"""
+
 
 class CommandHandler:
     """Handler for command sets and command execution"""
@@ -24,7 +30,10 @@ class CommandHandler:
             plugin: The CommandManagerPlugin instance
         """
         self.plugin = plugin
-        self.command_sets = {}  # {device_type: {firmware: CommandSet}}
+        self.catalog = None
+        self._unsaved = {}  # {(device_type, firmware): CommandSet} not yet written
+        self.command_sets = {}  # {device_type: {firmware: CommandSet}}, loaded from the catalog
+        self.session_pool = SessionPool()
         
     def load_default_command_sets(self):
         """Load default command sets"""
@@ -60,7 +69,11 @@ class CommandHandler:
         self._load_command_sets()
         
     def _load_command_sets(self):
-        """Load command sets from disk"""
+        """Load the command set catalog from disk
+        
+        Only files that are new or changed since the catalog was cached are
+        read; set bodies are read when a set is first used.
+        """
         logger.debug("Loading command sets from disk")
         self.command_sets = {}
         
@@ -70,99 +83,22 @@ class CommandHandler:
             self.plugin.commands_dir.mkdir(parents=True, exist_ok=True)
             return
         
+        self.catalog = CommandCatalog(self.plugin.commands_dir, self.plugin.commands_dir.parent / CATALOG_FILE)
+        problems = self.catalog.refresh()
+        self.command_sets = self.catalog.sets
+        
         # Keep track of problematic files to potentially clean up
         problem_files = []
-        
-        # Iterate through command set files
-        command_files = list(self.plugin.commands_dir.glob("*.json"))
-        logger.debug(f"Found {len(command_files)} command set files: {[f.name for f in command_files]}")
-        
-        for file_path in command_files:
-            try:
-                # Skip empty files
-                if file_path.stat().st_size == 0:
-                    logger.warning(f"Skipping empty command set file: {file_path}")
-                    problem_files.append(file_path)
-                    continue
-                    
-                logger.info(f"Attempting to load command set from {file_path}")
-                with open(file_path, "r", encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Extract device type and firmware from filename if it's a list of commands
-                # This handles legacy files that are simply lists of commands
-                if isinstance(data, list):
-                    logger.debug(f"File {file_path.name} contains a list of commands. Extracting info from filename...")
-                    
-                    # Extract device type and firmware from filename
-                    filename = file_path.stem
-                    parts = filename.split('_')
-                    
-                    if len(parts) >= 2:
-                        # Reconstruct full device type and firmware
-                        device_parts = []
-                        firmware_parts = []
-                        
-                        # Check if filename follows the pattern cisco_ios_xe_16_x
-                        if "cisco" in parts[0].lower() and "ios" in filename.lower():
-                            device_type = "Cisco IOS XE"
-                            
-                            # Get firmware from the last parts
-                            if "16" in filename or "17" in filename:
-                                # Find version in filename
-                                for part in parts:
-                                    if part.isdigit() or part.startswith(("16", "17")):
-                                        firmware_parts.append(part)
-                                
-                                firmware = '.'.join(firmware_parts) if firmware_parts else "16.x"
-                            else:
-                                firmware = "16.x"  # Default if none found
-                        else:
-                            # Generic approach for other devices
-                            device_type = ' '.join(parts[:-1]).title()
-                            firmware = parts[-1].replace('_', '.')
-                        
-                        # Create a properly formatted command set
-                        logger.debug(f"Extracted device_type={device_type}, firmware={firmware}")
-                        commands = data
-                    else:
-                        # Can't determine device type and firmware from filename
-                        device_type = "Unknown"
-                        firmware = "Unknown"
-                        commands = data
-                        logger.warning(f"Could not determine device type and firmware from filename: {filename}")
-                
-                # Handle standard command set format
-                elif isinstance(data, dict) and "device_type" in data and "firmware_version" in data and "commands" in data:
-                    device_type = data["device_type"]
-                    firmware = data["firmware_version"]
-                    commands = data["commands"]
-                else:
-                    logger.warning(f"Invalid command set format in file: {file_path}")
-                    logger.debug(f"Data structure: {type(data)}, Fields: {list(data.keys()) if isinstance(data, dict) else 'not a dict'}")
-                    problem_files.append(file_path)
-                    continue
-                
-                logger.debug(f"Loading command set for {device_type} ({firmware}) with {len(commands)} commands")
-                
-                if device_type not in self.command_sets:
-                    self.command_sets[device_type] = {}
-                    
-                self.command_sets[device_type][firmware] = commands
-                
-                logger.info(f"Loaded command set: {device_type} ({firmware})")
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON in command set file {file_path}: {e}")
-                problem_files.append(file_path)
+        for file_path, error in problems:
+            problem_files.append(file_path)
+            if isinstance(error, json.JSONDecodeError):
+                logger.error(f"Error parsing JSON in command set file {file_path}: {error}")
                 # Try to fix the file if it's the Cisco IOS XE one
                 if "cisco" in file_path.name.lower():
                     logger.debug(f"Attempting to fix Cisco command set: {file_path}")
                     self._fix_cisco_command_set()
-            except Exception as e:
-                logger.error(f"Error loading command set from {file_path}: {e}")
-                logger.exception("Exception details:")
-                problem_files.append(file_path)
+            else:
+                logger.warning(f"Skipping command set file {file_path}: {error}")
         
         # Clean up problematic files if we have at least one good command set
         if self.command_sets and problem_files:
@@ -183,11 +119,13 @@ class CommandHandler:
             self._fix_cisco_command_set()
             # Try loading again after fixing
             self._load_command_sets()
+            return
             
         logger.debug(f"Final command sets: {list(self.command_sets.keys())}")
         
         # Update the plugin's command_sets reference
         self.plugin.command_sets = self.command_sets
+        self._invalidate_templates()
         
     def _fix_cisco_command_set(self):
         """Create a default Cisco IOS XE command set"""
@@ -195,7 +133,9 @@ class CommandHandler:
         
         # Default commands for Cisco IOS XE
         default_commands = [
-            {"command": "show version", "alias": "Show Version", "description": "Display the software version"},
+            {"command": "show version", "alias": "Show Version", "description": "Display the software version",
+             "properties": {"hostname": "HOSTNAME", "firmware_version": "VERSION", "hardware_model": "HARDWARE",
+                            "serial_number": "SERIAL", "uptime": "UPTIME"}},
             {"command": "show running-config", "alias": "Show Running Configuration", "description": "Display the current configuration"},
             {"command": "show interfaces", "alias": "Show Interfaces", "description": "Display interface status and configuration"},
             {"command": "show ip interface brief", "alias": "Show IP Interfaces Brief", "description": "Display brief IP interface status"},
@@ -208,6 +148,7 @@ class CommandHandler:
         cisco_iosxe_data = {
             "device_type": "Cisco IOS XE",
             "firmware_version": "16.x",
+            "platform": "cisco_iosxe",
             "commands": default_commands
         }
         
@@ -272,7 +213,7 @@ class CommandHandler:
             logger.warning(f"Command set for {device_type} ({firmware_version}) not found")
             return []
             
-        commands = self.command_sets[device_type][firmware_version]
+        commands = self.command_sets[device_type][firmware_version].commands
         logger.debug(f"Found {len(commands)} commands")
         return commands
 
@@ -289,68 +230,36 @@ class CommandHandler:
             CommandSet: CommandSet object with commands
         """
         logger.debug(f"Getting command set for {device_type} ({firmware_version})")
-        commands = self.get_commands(device_type, firmware_version)
-        
-        # Create a CommandSet object from the commands list
-        # Convert commands to Command objects if needed
-        command_objects = []
-        for cmd in commands:
-            if not hasattr(cmd, 'alias'):
-                # Convert dict to Command object
-                if isinstance(cmd, dict):
-                    alias = cmd.get('alias', cmd.get('command', 'Command'))
-                    description = cmd.get('description', '')
-                    command = cmd.get('command', '')
-                    cmd_obj = Command(command, alias, description)
-                    command_objects.append(cmd_obj)
-                else:
-                    # Skip invalid commands
-                    logger.warning(f"Invalid command format: {cmd}")
-            else:
-                # Already a Command object
-                command_objects.append(cmd)
-                
-        # Create CommandSet
-        command_set = CommandSet(device_type, firmware_version, command_objects)
-        return command_set
+        if (not self.command_sets or
+            device_type not in self.command_sets or
+            firmware_version not in self.command_sets[device_type]):
+            logger.warning(f"Command set for {device_type} ({firmware_version}) not found")
+            return CommandSet(device_type, firmware_version)
+            
+        # Return a copy so edits only take effect through add_command_set
+        return CommandSet.from_dict(self.command_sets[device_type][firmware_version].to_dict())
         
     def save_command_sets(self):
-        """Save command sets to disk"""
+        """Save command sets to disk
+        
+        Command sets are written to their files when they are added, so
+        this only writes sets whose earlier save failed.
+        """
         logger.debug("Saving command sets to disk")
         # Check if the commands directory exists
         if not self.plugin.commands_dir.exists():
             self.plugin.commands_dir.mkdir(parents=True, exist_ok=True)
         
-        # Iterate through command sets
-        for device_type, firmware_sets in self.command_sets.items():
-            for firmware, command_set in firmware_sets.items():
-                try:
-                    # Create filename from device_type and firmware
-                    # Use lowercase to maintain consistent filenames
-                    device_type_safe = device_type.lower().replace(' ', '_')
-                    firmware_safe = firmware.replace('.', '_')
-                    filename = f"{device_type_safe}_{firmware_safe}.json"
-                    file_path = self.plugin.commands_dir / filename
-                    
-                    # Save to file - handle both CommandSet objects and plain lists/dicts
-                    with open(file_path, "w") as f:
-                        if hasattr(command_set, 'to_dict'):
-                            # CommandSet object
-                            json.dump(command_set.to_dict(), f, indent=2)
-                        else:
-                            # If it's a list, wrap it in the proper format
-                            data_to_save = command_set
-                            if isinstance(command_set, list):
-                                data_to_save = {
-                                    "device_type": device_type,
-                                    "firmware_version": firmware,
-                                    "commands": command_set
-                                }
-                            json.dump(data_to_save, f, indent=2)
-                
-                except Exception as e:
-                    logger.error(f"Error saving command set {device_type}_{firmware}: {e}")
-                    logger.exception("Exception details:")
+        if not self.catalog:
+            return
+            
+        for key, command_set in list(self._unsaved.items()):
+            try:
+                self.catalog.save(command_set)
+                del self._unsaved[key]
+            except Exception as e:
+                logger.error(f"Error saving command set {command_set.device_type}_{command_set.firmware_version}: {e}")
+                logger.exception("Exception details:")
                     
     def add_command_set(self, command_set):
         """Add or update a command set
@@ -360,18 +269,83 @@ class CommandHandler:
         """
         logger.debug(f"Adding command set: {command_set.device_type} ({command_set.firmware_version})")
         
-        # Create device type entry if it doesn't exist
-        if command_set.device_type not in self.command_sets:
-            self.command_sets[command_set.device_type] = {}
+        if not self.catalog:
+            self._load_command_sets()
             
-        # Add or update command set
-        self.command_sets[command_set.device_type][command_set.firmware_version] = command_set.commands
-        
-        # Save command sets
+        # Save the command set to its file, which also updates the catalog
+        self._unsaved[(command_set.device_type, command_set.firmware_version)] = command_set
         self.save_command_sets()
+        self._invalidate_templates()
         
         logger.info(f"Added command set: {command_set.device_type} ({command_set.firmware_version})")
         
+    def delete_command_set(self, device_type, firmware_version):
+        """Delete a command set and its file
+        
+        Args:
+            device_type (str): Device type of the command set
+            firmware_version (str): Firmware version of the command set
+            
+        Returns:
+            bool: Whether the command set existed
+        """
+        logger.debug(f"Deleting command set: {device_type} ({firmware_version})")
+        self._unsaved.pop((device_type, firmware_version), None)
+        if not self.catalog:
+            return False
+            
+        try:
+            deleted = self.catalog.remove(device_type, firmware_version)
+        except Exception as e:
+            logger.error(f"Error deleting command set {device_type}_{firmware_version}: {e}")
+            return False
+            
+        if deleted:
+            self._invalidate_templates()
+            logger.info(f"Deleted command set: {device_type} ({firmware_version})")
+        return deleted
+        
+    def search_commands(self, query, device_type=None, firmware_version=None, limit=None):
+        """Search the commands of all command sets
+        
+        Every word of the query must start a word of the command's alias,
+        text or description.
+        
+        Args:
+            query (str): Words or word prefixes
+            device_type (str, optional): Only search this device type's sets
+            firmware_version (str, optional): Only search this firmware's sets
+            limit (int, optional): Maximum number of results
+            
+        Returns:
+            list: (device_type, firmware_version, command index) of the matches
+        """
+        if not self.catalog:
+            return []
+        return self.catalog.search(query, device_type, firmware_version, limit)
+        
+    def _invalidate_templates(self):
+        """Have the output handler look up command parser templates again"""
+        output_handler = getattr(self.plugin, "output_handler", None)
+        if output_handler:
+            output_handler.invalidate_templates()
+            
+    def _setting(self, key, default):
+        """Get a plugin setting value"""
+        settings = getattr(self.plugin, "settings", None) or {}
+        return settings.get(key, {}).get("value", default)
+        
+    def _get_session_pool(self):
+        """Get the session pool, applying the current pool settings"""
+        self.session_pool.max_sessions = max(1, int(self._setting("max_sessions", 32)))
+        self.session_pool.idle_timeout = max(0, float(self._setting("session_idle_timeout", 300)))
+        return self.session_pool
+        
+    def close_sessions(self):
+        """Close all pooled device sessions"""
+        self.session_pool.close_all()
+        self.session_pool = SessionPool()
+        
     def run_command(self, device, command, credentials=None):
         """Run a command on a device
         
@@ -383,116 +357,128 @@ class CommandHandler:
         Returns:
             dict: Command result
         """
-        logger.debug(f"Running command on device: {device.id}")
+        return self.run_commands(device, [command], credentials)[0]
+        
+    def run_commands(self, device, commands, credentials=None):
+        """Run commands in order on a device over a single session
+        
+        The session comes from the session pool, so later commands and
+        later runs on the same device reuse the login. A connection found
+        lost before a command is sent is re-established; a command whose
+        connection drops while it runs fails with ERROR_INTERRUPTED and is
+        not sent again, as it may have taken effect on the device. A command
+        whose prompt does not return in time fails with ERROR_TIMEOUT and
+        its connection is closed, so its late output is never read as the
+        output of the next command.
+        
+        Args:
+            device: Device to run commands on
+            commands (list): Commands to run
+            credentials (dict, optional): Credentials to use
+            
+        Returns:
+            list: Command results, one per command
+        """
+        logger.debug(f"Running {len(commands)} commands on device: {device.id}")
         
         # If no credentials provided, get them
         if not credentials:
             credentials = self.plugin.get_device_credentials(device.id)
             
-        # Default result
-        result = {
-            "success": False,
-            "output": f"Command: {command}\n\nNo connection method available for device: {device.id}"
-        }
-        
         # Get device properties
-        device_type = device.get_property("device_type", "")
         ip_address = device.get_property("ip_address", "")
         
         # Log credential status
         if not credentials or not credentials.get("username"):
             logger.warning(f"No valid credentials found for device {device.id} ({ip_address})")
-            result["output"] = f"Command: {command}\n\nNo valid credentials available for {ip_address}"
-            return result
+            return [{
+                "success": False,
+                "output": f"Command: {command}\n\nNo valid credentials available for {ip_address}",
+                "error": ERROR_CREDENTIALS
+            } for command in commands]
             
         # Determine connection type
         connection_type = credentials.get("connection_type", "ssh").lower()
+        if connection_type not in ("ssh", "telnet"):
+            logger.warning(f"Unsupported connection type: {connection_type}")
+            return [{
+                "success": False,
+                "output": f"Command: {command}\n\nUnsupported connection type: {connection_type}"
+            } for command in commands]
+            
+        label = "SSH" if connection_type == "ssh" else "Telnet"
+        pool = self._get_session_pool()
+        keep_session = bool(self._setting("session_pooling", True))
         
-        # Handle SSH connections
-        if connection_type == "ssh":
-            try:
-                logger.debug(f"Connecting to {ip_address} via SSH with username: {credentials.get('username')}")
-                
-                # Create SSH client with required parameters
-                ssh = SSHClient(
-                    host=ip_address,
-                    username=credentials.get("username"),
-                    password=credentials.get("password", ""),
-                    enable_password=credentials.get("enable_password", "")
-                )
-                
-                try:
-                    # Connect to device
-                    ssh.connect()
-                    
-                    # Try to enter enable mode if needed
-                    if credentials.get("enable_password"):
-                        ssh.enable()
-                    
-                    # Execute the command
-                    output = ssh.execute(command)
-                    
-                    # Create successful result
-                    result = {
-                        "success": True,
-                        "output": output
-                    }
-                    
-                    # Disconnect cleanly
-                    ssh.disconnect()
-                    
-                    logger.debug(f"SSH command execution completed successfully")
-                except Exception as e:
-                    logger.error(f"SSH execution error: {e}")
-                    result["output"] = f"Command: {command}\n\nSSH Connection error: {str(e)}"
-            except Exception as e:
-                logger.error(f"Error running SSH command: {e}")
-                logger.exception("Exception details:")
-                result["output"] = f"Command: {command}\n\nError running SSH command: {str(e)}"
-                
-        # Handle Telnet connections
-        elif connection_type == "telnet":
-            try:
-                logger.debug(f"Connecting to {ip_address} via Telnet with username: {credentials.get('username')}")
-                
-                # Create Telnet client with required parameters
-                telnet = TelnetClient(
-                    host=ip_address,
-                    username=credentials.get("username"),
-                    password=credentials.get("password", ""),
-                    enable_password=credentials.get("enable_password", "")
-                )
-                
+        try:
+            logger.debug(f"Connecting to {ip_address} via {label} with username: {credentials.get('username')}")
+            session = pool.acquire(ip_address, credentials)
+        except Exception as e:
+            logger.error(f"Error connecting via {label}: {e}")
+            return [{
+                "success": False,
+                "output": f"Command: {command}\n\n{label} Connection error: {str(e)}",
+                "error": ERROR_CONNECTION
+            } for command in commands]
+            
+        results = []
+        discard = not keep_session
+        try:
+            for command in commands:
+                if not session.is_alive():
+                    try:
+                        pool.reconnect(session, credentials)
+                    except Exception as e:
+                        # Reconnecting failed; report the remaining commands
+                        logger.error(f"{label} reconnect error: {e}")
+                        discard = True
+                        for remaining in commands[len(results):]:
+                            results.append({
+                                "success": False,
+                                "output": f"Command: {remaining}\n\n{label} Connection error: {str(e)}",
+                                "error": ERROR_CONNECTION
+                            })
+                        break
+                        
                 try:
-                    # Connect to device
-                    telnet.connect()
-                    
-                    # Try to enter enable mode if needed
-                    if hasattr(telnet, 'enable') and credentials.get("enable_password"):
-                        telnet.enable()
-                    
-                    # Execute the command
-                    output = telnet.execute(command)
-                    
-                    # Create successful result
-                    result = {
-                        "success": True,
-                        "output": output
-                    }
-                    
-                    # Disconnect cleanly
-                    telnet.disconnect()
-                    
-                    logger.debug(f"Telnet command execution completed successfully")
+                    output = self._execute(session, command)
+                    results.append({"success": True, "output": output})
                 except Exception as e:
-                    logger.error(f"Telnet execution error: {e}")
-                    result["output"] = f"Command: {command}\n\nTelnet Connection error: {str(e)}"
-            except Exception as e:
-                logger.error(f"Error running Telnet command: {e}")
-                logger.exception("Exception details:")
-                result["output"] = f"Command: {command}\n\nError running Telnet command: {str(e)}"
-        else:
-            logger.warning(f"Unsupported connection type: {connection_type}")
-            result["output"] = f"Command: {command}\n\nUnsupported connection type: {connection_type}"
+                    logger.error(f"{label} execution error: {e}")
+                    if isinstance(e, CommandInterrupted):
+                        message, error = "Connection lost while the command ran", ERROR_INTERRUPTED
+                    elif isinstance(e, TimeoutError):
+                        message, error = "Timed out", ERROR_TIMEOUT
+                    else:
+                        message, error = "Connection error", ERROR_CONNECTION
+                    results.append({
+                        "success": False,
+                        "output": f"Command: {command}\n\n{label} {message}: {str(e)}",
+                        "error": error
+                    })
+        finally:
+            pool.release(session, discard=discard)
             
-        return result 
\ No newline at end of file
+        logger.debug(f"{label} command execution completed on {ip_address}")
+        return results
+        
+    def _execute(self, session, command):
+        """Execute a command on a pooled session
+        
+        Raises:
+            CommandInterrupted: The connection dropped while the command ran
+            TimeoutError: The command did not finish in time
+        """
+        try:
+            return session.client.execute(command)
+        except TimeoutError:
+            # The rest of the output would be read as the output of the next
+            # command, so the connection is closed and the next command reconnects
+            session.close()
+            raise
+        except Exception as e:
+            if session.is_alive():
+                raise
+            # The command may have run (configuration changes, reload), so
+            # it is not sent again on a new connection
+            raise CommandInterrupted(str(e)) from e
@@ -28,9 +28,12 @@ from plugins.command_manager.ui.settings_dialog import SettingsDialog
 from .plugin_setup import register_ui, register_context_menu
 from .command_handler import CommandHandler
 from .output_handler import OutputHandler
+from .command_executor import CommandExecutor, RetryPolicy
 
 # Import utilities
 from plugins.command_manager.utils.credential_store import CredentialStore
+from plugins.command_manager.utils.property_extractor import apply_properties
+from plugins.command_manager.utils.command_jobs import JobStore
 
 class CommandManagerPlugin(PluginInterface):
     """Command Manager Plugin for NetWORKS"""
@@ -69,6 +72,125 @@ class CommandManagerPlugin(PluginInterface):
                 "choices": ["truncated", "full", "sanitized"],
                 "default": "truncated",
                 "value": "truncated"
+            },
+            "max_concurrent_devices": {
+                "name": "Concurrent Devices",
+                "description": "Maximum number of devices commands run on at the same time",
+                "type": "int",
+                "default": 8,
+                "value": 8
+            },
+            "group_concurrency": {
+                "name": "Concurrent Devices per Group",
+                "description": "Maximum number of devices of the same device group running at the same time (0 for no limit)",
+                "type": "int",
+                "default": 4,
+                "value": 4
+            },
+            "subnet_concurrency": {
+                "name": "Concurrent Devices per Subnet",
+                "description": "Maximum number of devices of the same /24 subnet running at the same time (0 for no limit)",
+                "type": "int",
+                "default": 4,
+                "value": 4
+            },
+            "command_retries": {
+                "name": "Connection Retries",
+                "description": "Number of times a command is retried after a connection error, waiting longer before every retry (0 to disable)",
+                "type": "int",
+                "default": 2,
+                "value": 2
+            },
+            "retry_delay": {
+                "name": "Retry Delay (Seconds)",
+                "description": "Seconds before the first retry of a command after a connection error; the delay doubles with every retry",
+                "type": "int",
+                "default": 5,
+                "value": 5
+            },
+            "session_pooling": {
+                "name": "Reuse Device Sessions",
+                "description": "Keep SSH/Telnet sessions open between commands and runs instead of logging in for every command",
+                "type": "bool",
+                "default": True,
+                "value": True
+            },
+            "session_idle_timeout": {
+                "name": "Session Idle Timeout",
+                "description": "Seconds after which an unused device session is closed",
+                "type": "int",
+                "default": 300,
+                "value": 300
+            },
+            "max_sessions": {
+                "name": "Maximum Open Sessions",
+                "description": "Maximum number of device sessions kept open at the same time",
+                "type": "int",
+                "default": 32,
+                "value": 32
+            },
+            "delta_compression": {
+                "name": "Store Outputs as Deltas",
+                "description": "Store outputs that differ little from the previous output of the same command as a delta against it",
+                "type": "bool",
+                "default": True,
+                "value": True
+            },
+            "output_cache_size": {
+                "name": "Output Cache Size (MB)",
+                "description": "Memory used to cache command output bodies read from disk (applies after restart)",
+                "type": "int",
+                "default": 64,
+                "value": 64
+            },
+            "retention_keep_last": {
+                "name": "Keep Last Outputs",
+                "description": "Number of most recent outputs kept per device and command (0 for no limit)",
+                "type": "int",
+                "default": 0,
+                "value": 0
+            },
+            "retention_keep_days": {
+                "name": "Keep Outputs Younger Than (Days)",
+                "description": "Keep every output younger than this many days (0 to disable)",
+                "type": "int",
+                "default": 0,
+                "value": 0
+            },
+            "retention_daily": {
+                "name": "Daily Snapshots",
+                "description": "Number of days for which the latest output of the day is kept",
+                "type": "int",
+                "default": 0,
+                "value": 0
+            },
+            "retention_weekly": {
+                "name": "Weekly Snapshots",
+                "description": "Number of weeks for which the latest output of the week is kept",
+                "type": "int",
+                "default": 0,
+                "value": 0
+            },
+            "retention_monthly": {
+                "name": "Monthly Snapshots",
+                "description": "Number of months for which the latest output of the month is kept",
+                "type": "int",
+                "default": 0,
+                "value": 0
+            },
+            "compaction_interval": {
+                "name": "Compaction Interval (Hours)",
+                "description": "How often retention is applied and the output history compacted in the background (0 to disable, applies after restart)",
+                "type": "int",
+                "default": 24,
+                "value": 24
+            },
+            "extract_device_properties": {
+                "name": "Update Device Properties from Outputs",
+                "description": "After a run, fill the device properties designated by commands (serial number, firmware version, uptime, ...) from their parsed outputs",
+                "type": "bool",
+                "default": True,
+                "value": True
             }
         }
         
@@ -86,6 +208,7 @@ class CommandManagerPlugin(PluginInterface):
         # Data components
         self.command_sets = {}  # {device_type: {firmware: CommandSet}}
         self.credential_store = None
+        self.job_store = None   # persisted command jobs, for resuming runs
         self.outputs = {}       # {device_id: {command_id: {timestamp: output}}}
         
         logger.debug("Command Manager Plugin instance initialized")
@@ -114,6 +237,13 @@ class CommandManagerPlugin(PluginInterface):
             logger.exception("Exception details:")
             self.credential_store = None
             
+        # Create the store of resumable command jobs
+        try:
+            self.job_store = JobStore(self.jobs_dir)
+        except Exception as e:
+            logger.error(f"Error initializing job store: {e}")
+            self.job_store = None
+            
         # Initialize handlers
         self.command_handler = CommandHandler(self)
         self.output_handler = OutputHandler(self)
@@ -225,7 +355,13 @@ class CommandManagerPlugin(PluginInterface):
             
             # Save command outputs
             if self.output_handler:
+                self.output_handler.stop_compaction()
+                self.output_handler.stop_indexing()
                 self.output_handler.save_command_outputs()
+            
+            # Close pooled device sessions
+            if self.command_handler:
+                self.command_handler.close_sessions()
                     
             # Close command dialog if open
             if hasattr(self, 'command_dialog') and self.command_dialog:
@@ -274,6 +410,14 @@ class CommandManagerPlugin(PluginInterface):
         self.output_dir = self.data_dir / "outputs"
         self.output_dir.mkdir(exist_ok=True)
         
+        # Output parser templates directory
+        self.templates_dir = self.data_dir / "templates"
+        self.templates_dir.mkdir(exist_ok=True)
+        
+        # Persisted command jobs directory
+        self.jobs_dir = self.data_dir / "jobs"
+        self.jobs_dir.mkdir(exist_ok=True)
+        
     def _connect_signals(self):
         """Connect signals to slots"""
         logger.debug("Connecting signals")
@@ -294,11 +438,20 @@ class CommandManagerPlugin(PluginInterface):
             else:
                 logger.warning("device_changed signal not found")
                 
+            # Batch property updates are reported once for all devices
+            if hasattr(self.device_manager, 'devices_changed'):
+                self.device_manager.devices_changed.connect(self._on_devices_changed)
+                
             if hasattr(self.device_manager, 'selection_changed'):
                 self.device_manager.selection_changed.connect(self._on_selection_changed)
             else:
                 logger.warning("selection_changed signal not found")
                 
+            # Group membership decides which group credentials apply
+            for signal_name in ('group_added', 'group_removed', 'group_changed'):
+                if hasattr(self.device_manager, signal_name):
+                    getattr(self.device_manager, signal_name).connect(self._on_group_changed)
+                
             logger.debug("Signals connected successfully")
         except Exception as e:
             logger.error(f"Error connecting signals: {e}")
@@ -330,6 +483,12 @@ class CommandManagerPlugin(PluginInterface):
                 except (RuntimeError, TypeError):
                     logger.debug("device_changed signal was not connected")
                     
+            if hasattr(self.device_manager, 'devices_changed'):
+                try:
+                    self.device_manager.devices_changed.disconnect(self._on_devices_changed)
+                except (RuntimeError, TypeError):
+                    logger.debug("devices_changed signal was not connected")
+                    
             if hasattr(self.device_manager, 'selection_changed'):
                 try:
                     self.device_manager.selection_changed.disconnect(self._on_selection_changed)
@@ -337,6 +496,13 @@ class CommandManagerPlugin(PluginInterface):
                 except (RuntimeError, TypeError):
                     logger.debug("selection_changed signal was not connected")
                     
+            for signal_name in ('group_added', 'group_removed', 'group_changed'):
+                if hasattr(self.device_manager, signal_name):
+                    try:
+                        getattr(self.device_manager, signal_name).disconnect(self._on_group_changed)
+                    except (RuntimeError, TypeError):
+                        logger.debug(f"{signal_name} signal was not connected")
+                    
             logger.debug("Signals disconnected successfully")
         except Exception as e:
             logger.error(f"Error disconnecting signals: {e}")
@@ -346,6 +512,8 @@ class CommandManagerPlugin(PluginInterface):
     
     def _on_device_added(self, device):
         """Handle device added event"""
+        self._invalidate_credentials(device)
+        
         # Update UI if necessary
         if self.command_dialog:
             self.command_dialog.refresh_devices()
@@ -355,6 +523,8 @@ class CommandManagerPlugin(PluginInterface):
     
     def _on_device_removed(self, device):
         """Handle device removed event"""
+        self._invalidate_credentials(device)
+        
         # Update UI if necessary
         if self.command_dialog:
             self.command_dialog.refresh_devices()
@@ -364,6 +534,8 @@ class CommandManagerPlugin(PluginInterface):
     
     def _on_device_changed(self, device):
         """Handle device changed event"""
+        self._invalidate_credentials(device)
+        
         # Update UI if necessary
         if self.command_dialog:
             self.command_dialog.refresh_devices()
@@ -371,6 +543,28 @@ class CommandManagerPlugin(PluginInterface):
         if self.output_panel:
             self.output_panel.refresh()
     
+    def _on_devices_changed(self, devices):
+        """Handle many devices changing at once"""
+        for device in devices:
+            self._invalidate_credentials(device)
+            
+        # Update UI once for the whole batch
+        if self.command_dialog:
+            self.command_dialog.refresh_devices()
+            
+        if self.output_panel:
+            self.output_panel.refresh()
+    
+    def _on_group_changed(self, group):
+        """Handle group added, removed or changed events"""
+        if self.credential_store:
+            self.credential_store.resolver.invalidate_groups()
+    
+    def _invalidate_credentials(self, device):
+        """Drop the resolved credentials of a device"""
+        if self.credential_store and device is not None:
+            self.credential_store.resolver.invalidate_device(getattr(device, 'id', device))
+    
     def _on_selection_changed(self, devices):
         """Handle device selection changed"""
         # Update commands and output panels if available
@@ -729,44 +923,16 @@ class CommandManagerPlugin(PluginInterface):
             logger.error("Credential store is not available")
             return None
         
-        # 1. First try device-specific credentials
-        device_credentials = self.credential_store.get_device_credentials(device_id)
-        if device_credentials:
-            logger.debug(f"Found device-specific credentials for {device_id}")
-            return device_credentials
+        # Device, then group, then most specific subnet credentials
+        try:
+            credentials, source = self.credential_store.resolve_credentials(device_id, device_ip, groups)
+        except Exception as e:
+            logger.error(f"Error resolving credentials for device {device_id}: {e}")
+            credentials, source = None, None
             
-        # 2. If no device credentials, try group credentials
-        if self.device_manager:
-            try:
-                # Get all groups this device belongs to using new method
-                device_groups = self.device_manager.get_device_groups_for_device(device_id)
-                
-                if device_groups:
-                    logger.debug(f"Found {len(device_groups)} groups for device {device_id}")
-                    
-                    # Try each group's credentials
-                    for group in device_groups:
-                        group_name = group.name if hasattr(group, 'name') else str(group)
-                        group_credentials = self.credential_store.get_group_credentials(group_name)
-                        if group_credentials:
-                            logger.debug(f"Using credentials from group '{group_name}' for device {device_id}")
-                            return group_credentials
-            except Exception as e:
-                logger.error(f"Error getting group credentials for device {device_id}: {e}")
-                
-        # 3. If still no credentials, try subnet matching
-        if device_ip:
-            try:
-                # Extract subnet from IP
-                parts = device_ip.split('.')
-                if len(parts) == 4:
-                    subnet = f"{parts[0]}.{parts[1]}.{parts[2]}.0/24"
-                    subnet_credentials = self.credential_store.get_subnet_credentials(subnet)
-                    if subnet_credentials:
-                        logger.debug(f"Using credentials from subnet {subnet} for device {device_id}")
-                        return subnet_credentials
-            except Exception as e:
-                logger.error(f"Error getting subnet credentials: {e}")
+        if credentials:
+            logger.debug(f"Using {source} credentials for device {device_id}")
+            return credentials
                 
         logger.debug(f"No credentials found for device {device_id}")
         return None
@@ -860,15 +1026,40 @@ class CommandManagerPlugin(PluginInterface):
         if hasattr(self, 'command_handler') and self.command_handler:
             return self.command_handler.get_command_set(device_type, firmware_version)
         return None
-    
-    def get_command_outputs(self, device_id):
+        
+    def add_command_set(self, command_set):
+        """Add or update a command set and save it"""
+        if hasattr(self, 'command_handler') and self.command_handler:
+            self.command_handler.add_command_set(command_set)
+        
+    def delete_command_set(self, device_type, firmware_version):
+        """Delete a command set and its file"""
+        if hasattr(self, 'command_handler') and self.command_handler:
+            return self.command_handler.delete_command_set(device_type, firmware_version)
+        return False
+        
+    def search_commands(self, query, device_type=None, firmware_version=None, limit=None):
+        """Search the commands of all command sets by word prefixes
+        
+        Returns:
+            list: (device_type, firmware_version, command index) of the matches
+        """
+        if hasattr(self, 'command_handler') and self.command_handler:
+            return self.command_handler.search_commands(query, device_type, firmware_version, limit)
+        return []
+        
+    def get_command_outputs(self, device_id, command_id=None):
         """Get command outputs for a device
         
+        Output bodies are read from disk when they are first accessed.
+        
         Args:
             device_id (str): The device ID
+            command_id (str, optional): Only get the outputs of this command
             
         Returns:
-            dict: Dictionary of command_id -> {timestamp: output}
+            dict: Dictionary of command_id -> {timestamp: output}, or
+                {timestamp: output} when command_id is given
         """
         logger.debug(f"Getting command outputs for device {device_id}")
         
@@ -876,7 +1067,7 @@ class CommandManagerPlugin(PluginInterface):
         if hasattr(self, 'output_handler') and self.output_handler:
             try:
                 # Use the correct method name in OutputHandler
-                device_outputs = self.output_handler.get_command_outputs(device_id)
+                device_outputs = self.output_handler.get_command_outputs(device_id, command_id)
                 if device_outputs:
                     return device_outputs
             except Exception as e:
@@ -885,6 +1076,8 @@ class CommandManagerPlugin(PluginInterface):
         
         # Fall back to direct access
         if hasattr(self, 'outputs') and device_id in self.outputs:
+            if command_id:
+                return self.outputs[device_id].get(command_id, {})
             return self.outputs.get(device_id, {})
             
         # Return empty dict if no outputs found
@@ -913,6 +1106,125 @@ class CommandManagerPlugin(PluginInterface):
             logger.error("No output handler available")
             return False
     
+    def compact_history(self):
+        """Apply retention policies and compact the command history in the background
+        
+        Returns:
+            bool: True if a compaction was started
+        """
+        if hasattr(self, 'output_handler') and self.output_handler:
+            return self.output_handler.start_compaction()
+        return False
+    
+    def search_outputs(self, query, mode="words", devices=None, commands=None, since=None, until=None,
+                       latest_only=True, limit=200):
+        """Search the stored command outputs of all devices
+        
+        Args:
+            query (str): Words, phrase or regular expression to search for
+            mode (str): "words" (all words), "phrase" or "regex"
+            devices (list, optional): Only search these device IDs
+            commands (list, optional): Only search these command IDs
+            since (str, optional): Only search outputs at or after this ISO timestamp
+            until (str, optional): Only search outputs at or before this ISO timestamp
+            latest_only (bool): Only search the latest output of each command per device
+            limit (int): Maximum number of outputs returned
+            
+        Returns:
+            dict: Search results with results (device_id, command_id, command,
+                timestamp and matching lines of each output), devices,
+                truncated and duration_ms, or None if search is unavailable
+        """
+        if hasattr(self, 'output_handler') and self.output_handler:
+            return self.output_handler.search_outputs(query, mode, devices, commands, since, until, latest_only, limit)
+        return None
+
+    def parse_command_output(self, device_id, command_id, timestamp=None):
+        """Parse a stored command output into records with its parser template
+
+        Args:
+            device_id (str): The device ID
+            command_id (str): The command ID
+            timestamp (str, optional): Timestamp of the output, the latest when not given
+
+        Returns:
+            dict: template, header (value names) and records (one dict per
+                record), or None if the command has no template or the output
+                could not be parsed
+        """
+        if hasattr(self, 'output_handler') and self.output_handler:
+            return self.output_handler.parse_command_output(device_id, command_id, timestamp)
+        return None
+
+    def extract_device_properties(self, device_id, command_id, output, command_text=None):
+        """Extract the device properties a command designates from its output
+        
+        The properties are returned, not applied; collect them for all
+        devices of a run and apply them with apply_device_properties.
+        
+        Args:
+            device_id (str): The device ID
+            command_id (str): The command ID
+            output (str): The command output
+            command_text (str, optional): The command text, for commands not in a command set
+            
+        Returns:
+            dict: Device property name -> value, empty if extraction is
+                disabled or the command designates no properties
+        """
+        if not self.settings["extract_device_properties"]["value"]:
+            return {}
+        if hasattr(self, 'output_handler') and self.output_handler:
+            try:
+                return self.output_handler.extract_properties(command_id, output, command_text)
+            except Exception as e:
+                logger.error(f"Error extracting device properties for device {device_id}: {e}")
+        return {}
+    
+    def apply_device_properties(self, updates):
+        """Apply extracted device properties in one DeviceManager update
+        
+        Args:
+            updates (dict): Device ID -> {property: value}
+            
+        Returns:
+            int: Number of devices whose properties changed
+        """
+        changed = apply_properties(self.device_manager, updates)
+        if changed:
+            logger.info(f"Updated properties of {len(changed)} devices from command outputs")
+        return len(changed)
+    
+    def get_command_set_for_device(self, device):
+        """Find the command set matching a device's device_type and firmware_version properties
+        
+        A command set matches when its firmware version equals the device's
+        or names its release train ("16.x" or "16" for "16.12.12"); the most
+        specific match wins.
+        
+        Args:
+            device: Device object
+            
+        Returns:
+            CommandSet: Matching command set, or None
+        """
+        if not device or not self.command_handler:
+            return None
+        device_type = device.get_property("device_type", "")
+        firmware = str(device.get_property("firmware_version", "") or "")
+        if not device_type or not firmware:
+            return None
+            
+        best = None
+        for version in self.get_firmware_versions(device_type):
+            train = version[:-2] if version.lower().endswith(".x") else version
+            if version == firmware:
+                best = version
+                break
+            if firmware.startswith(train + ".") and (best is None or len(train) > len(best)):
+                best = version
+        return self.get_command_set(device_type, best) if best else None
+    
     def run_command(self, device, command, credentials=None):
         """Run a command on a device
         
@@ -945,6 +1257,104 @@ class CommandManagerPlugin(PluginInterface):
                 "output": f"Command: {command}\n\nNo command handler available"
             }
     
+    def run_commands(self, device, commands, credentials=None):
+        """Run several commands in order on a device over one session
+        
+        Args:
+            device: Device to run the commands on
+            commands (list): Commands to run
+            credentials (dict, optional): Credentials to use
+            
+        Returns:
+            list: Command results with keys 'success' and 'output', one per command
+        """
+        logger.debug(f"Running {len(commands)} commands on device: {device.id if hasattr(device, 'id') else 'Unknown'}")
+        
+        if hasattr(self, 'command_handler') and self.command_handler:
+            try:
+                return self.command_handler.run_commands(device, commands, credentials)
+            except Exception as e:
+                logger.error(f"Error running commands via handler: {e}")
+                return [{
+                    "success": False,
+                    "output": f"Command: {command}\n\nError: {str(e)}"
+                } for command in commands]
+        else:
+            logger.error("No command handler available")
+            return [{
+                "success": False,
+                "output": f"Command: {command}\n\nNo command handler available"
+            } for command in commands]
+    
+    def create_command_executor(self):
+        """Create a command executor with the configured concurrency limits
+        
+        Returns:
+            CommandExecutor: Executor for running commands on multiple devices
+        """
+        return CommandExecutor(
+            self.run_command,
+            max_workers=self.settings["max_concurrent_devices"]["value"],
+            group_limit=self.settings["group_concurrency"]["value"],
+            subnet_limit=self.settings["subnet_concurrency"]["value"],
+            retry_policy=RetryPolicy(
+                retries=self.settings["command_retries"]["value"],
+                delay=self.settings["retry_delay"]["value"]
+            )
+        )
+    
+    def create_command_job(self, devices, commands, command_set=None, name=None):
+        """Create a persisted job for a run, so that it can be resumed
+        
+        Args:
+            devices (list): Devices to run the commands on
+            commands (list): Command dictionaries
+            command_set (CommandSet, optional): Command set the commands belong to
+            name (str, optional): Job name, describes the run when not given
+            
+        Returns:
+            CommandJob: The job, or None if jobs cannot be stored
+        """
+        if not self.job_store:
+            return None
+        set_info = None
+        if command_set:
+            set_info = {"device_type": command_set.device_type, "firmware_version": command_set.firmware_version}
+        if not name:
+            name = f"{len(commands)} commands on {len(devices)} devices"
+            if command_set:
+                name = f"{command_set.device_type} {command_set.firmware_version}: {name}"
+        try:
+            return self.job_store.create(
+                name,
+                [{"id": device.id, "name": device.get_property("alias", "")} for device in devices],
+                commands,
+                set_info
+            )
+        except Exception as e:
+            logger.error(f"Error creating command job: {e}")
+            return None
+    
+    def get_unfinished_command_jobs(self):
+        """Get the jobs with pending or failed commands, newest first
+        
+        Returns:
+            list: CommandJob objects
+        """
+        return self.job_store.unfinished() if self.job_store else []
+    
+    def get_command_job(self, job_id):
+        """Get a persisted command job by ID, or None"""
+        return self.job_store.get(job_id) if self.job_store else None
+    
+    def discard_command_job(self, job_id):
+        """Delete a persisted command job
+        
+        Returns:
+            bool: Whether the job existed
+        """
+        return self.job_store.delete(job_id) if self.job_store else False
+    
     def _on_run_commands(self):
         """Handle run commands menu item"""
         # Implement the logic to open the command dialog
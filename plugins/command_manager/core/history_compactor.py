@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Command history retention and compaction for the Command Manager plugin
+
+The compactor applies retention policies to the output history of every
+device and then compacts the device's files in the output store, so that
+listing, exporting and reporting on the history stay bounded. It runs on
+a worker thread; the store serializes it with outputs being added.
+"""
+
+import time
+from loguru import logger
+
+from plugins.command_manager.utils.retention import RetentionPolicy
+
+
+class HistoryCompactor:
+    """Enforces retention policies and reclaims space in an output store"""
+
+    def __init__(self, store, default_policy=None, policies=None, min_garbage=0.25):
+        """Initialize the compactor
+
+        Args:
+            store (OutputStore): Store holding the command history
+            default_policy (RetentionPolicy, optional): Policy for commands without their own
+            policies (dict, optional): {command_id: RetentionPolicy} for commands or command sets
+            min_garbage (float): Minimum fraction of reclaimable space before a device is rewritten
+        """
+        self.store = store
+        self.default_policy = default_policy or RetentionPolicy()
+        self.policies = dict(policies or {})
+        self.min_garbage = min_garbage
+        self._stop_requested = False
+
+    def stop(self):
+        """Stop after the current device"""
+        self._stop_requested = True
+
+    def policy_for(self, command_id):
+        """Get the retention policy of a command"""
+        return self.policies.get(command_id, self.default_policy)
+
+    def compact_device(self, device_id, now=None):
+        """Apply retention to a device and compact its files
+
+        Args:
+            device_id (str): Device ID
+            now (datetime, optional): Current time
+
+        Returns:
+            dict: Number of outputs deleted, whether the files were
+                rewritten and the number of bytes reclaimed
+        """
+        deleted = 0
+        for command_id, timestamps in self.store.read_index(device_id).items():
+            for timestamp in self.policy_for(command_id).select_expired(timestamps, now):
+                self.store.delete(device_id, command_id, timestamp)
+                deleted += 1
+
+        stats = self.store.compact(device_id, self.min_garbage)
+        return {
+            "deleted": deleted,
+            "compacted": stats["compacted"],
+            "bytes_reclaimed": stats["bytes_before"] - stats["bytes_after"]
+        }
+
+    def run(self, on_device=None):
+        """Apply retention and compaction to every device in the store
+
+        Args:
+            on_device (callable, optional): Called with (device_id, stats) for
+                devices whose history changed
+
+        Returns:
+            dict: Summary with devices, outputs_deleted, devices_compacted,
+                bytes_reclaimed, duration and cancelled
+        """
+        started = time.monotonic()
+        summary = {"devices": 0, "outputs_deleted": 0, "devices_compacted": 0, "bytes_reclaimed": 0}
+
+        for device_id in self.store.device_ids():
+            if self._stop_requested:
+                break
+            try:
+                stats = self.compact_device(device_id)
+            except Exception as e:
+                logger.error(f"Error compacting command history of device {device_id}: {e}")
+                logger.exception("Exception details:")
+                continue
+
+            summary["devices"] += 1
+            summary["outputs_deleted"] += stats["deleted"]
+            summary["devices_compacted"] += int(stats["compacted"])
+            summary["bytes_reclaimed"] += stats["bytes_reclaimed"]
+            if on_device and (stats["deleted"] or stats["compacted"]):
+                on_device(device_id, stats)
+
+        self.store.sync()
+        summary["duration"] = round(time.monotonic() - started, 3)
+        summary["cancelled"] = self._stop_requested
+        logger.info(f"Command history compaction finished: {summary}")
+        return summary
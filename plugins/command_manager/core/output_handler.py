@@ -11,14 +11,97 @@ import datetime
 from pathlib import Path
 from loguru import logger
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal, Slot, QObject, QThread, QTimer
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
     QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
     QFileDialog, QSplitter, QTabWidget, QTextEdit, QStackedWidget,
     QDialog, QListWidget, QAbstractItemView, QCheckBox, QGroupBox, QFormLayout, QLineEdit, QComboBox
 )
-from PySide6.QtGui import QFont, QColor
+from PySide6.QtGui import QColor
+
+from plugins.command_manager.utils.output_store import OutputStore, OutputRecord, LEGACY_FILE
+from plugins.command_manager.utils.retention import RetentionPolicy
+from plugins.command_manager.utils.output_search import OutputSearchIndex, INDEX_FILE as SEARCH_INDEX_FILE
+from plugins.command_manager.utils.output_parser import OutputParser, CACHE_FILE as PARSED_CACHE_FILE
+from plugins.command_manager.utils.property_extractor import extract_properties
+from plugins.command_manager.utils.export_archive import ExportFilenames, sanitize_filename
+from plugins.command_manager.ui.output_viewer import OutputViewer, RecordTableModel, create_table_view, show_table
+from .history_compactor import HistoryCompactor
+
+# Delay before the first compaction after the plugin is loaded
+COMPACTION_START_DELAY_MS = 60 * 1000
+
+
+class CompactionWorker(QObject):
+    """Worker applying retention and compacting the command history in the background"""
+    
+    device_compacted = Signal(str)  # device_id
+    compaction_finished = Signal(object)  # summary dict
+    
+    def __init__(self, compactor):
+        """Initialize the worker"""
+        super().__init__()
+        self.compactor = compactor
+        
+    def run(self):
+        """Run the compactor"""
+        summary = self.compactor.run(on_device=lambda device_id, stats: self.device_compacted.emit(device_id))
+        self.compaction_finished.emit(summary)
+        
+    def stop(self):
+        """Stop after the current device"""
+        self.compactor.stop()
+
+
+class CompactionReceiver(QObject):
+    """Receives compaction signals in the GUI thread
+    
+    OutputHandler is not a QObject, so slots connected to its methods
+    would run in the compaction thread. This object lives in the GUI
+    thread and the signals are queued to it, so only the GUI thread
+    changes the cached history.
+    """
+    
+    def __init__(self, handler):
+        """Initialize the receiver"""
+        super().__init__()
+        self.handler = handler
+        
+    @Slot(str)
+    def on_device_compacted(self, device_id):
+        self.handler._on_device_compacted(device_id)
+        
+    @Slot(object)
+    def on_compaction_finished(self, summary):
+        self.handler._on_compaction_finished(summary)
+
+
+class SearchIndexWorker(QObject):
+    """Worker bringing the output search index in line with the output store"""
+    
+    indexing_finished = Signal(object)  # stats dict
+    
+    def __init__(self, search_index):
+        """Initialize the worker"""
+        super().__init__()
+        self.search_index = search_index
+        self._stop_requested = False
+        
+    def run(self):
+        """Index outputs missing from the search index"""
+        try:
+            stats = self.search_index.reconcile(should_stop=lambda: self._stop_requested)
+        except Exception as e:
+            logger.error(f"Error indexing command outputs: {e}")
+            logger.exception("Exception details:")
+            stats = None
+        self.indexing_finished.emit(stats)
+        
+    def stop(self):
+        """Stop after the current device"""
+        self._stop_requested = True
+
 
 class OutputHandler:
     """Handler for command outputs and device command panels"""
@@ -30,7 +113,25 @@ class OutputHandler:
             plugin: The CommandManagerPlugin instance
         """
         self.plugin = plugin
-        self.outputs = {}  # {device_id: {command_id: {timestamp: output}}}
+        self.outputs = {}  # {device_id: {command_id: {timestamp: OutputRecord}}}, loaded per device on demand
+        self.store = None
+        self._loaded_devices = set()
+        
+        # Background compaction
+        self.compaction_thread = None
+        self.compaction_worker = None
+        self.compaction_timer = None
+        self.compaction_receiver = None
+        self.last_compaction = None
+        
+        # Full-text search
+        self.search_index = None
+        self.indexing_thread = None
+        self.indexing_worker = None
+        
+        # Template parsing
+        self.parser = None
+        self._templates = None  # ({command_id: template name}, {command text: template name})
         
     def load_command_outputs(self):
         """Load command outputs from disk"""
@@ -42,138 +143,389 @@ class OutputHandler:
             # Create it if not exists
             self.plugin.output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Initialize outputs
+        # Initialize outputs; device histories are indexed when first used
+        # and output bodies are read on demand through the store's cache
         self.outputs = {}
+        self._loaded_devices = set()
+        self.store = OutputStore(
+            self.plugin.output_dir,
+            delta=self._delta_enabled(),
+            cache_size=self._cache_size()
+        )
         
-        # First, try to load device-specific output files from plugin data directory
-        device_dirs = [d for d in self.plugin.output_dir.iterdir() if d.is_dir()]
-        for device_dir in device_dirs:
-            device_id = device_dir.name
-            output_file = device_dir / "command_outputs.json"
-            
-            if output_file.exists():
-                try:
-                    with open(output_file, "r") as f:
-                        device_outputs = json.load(f)
-                        self.outputs[device_id] = device_outputs
-                        
-                    logger.debug(f"Loaded command outputs for device {device_id} from {output_file}")
-                except Exception as e:
-                    logger.error(f"Error loading command outputs for device {device_id}: {e}")
-                    logger.exception("Exception details:")
+        # Import histories saved as JSON by earlier versions
+        self._migrate_legacy_outputs()
         
-        # Next, try to load from workspace device folders
-        workspace_device_dir = Path("config/workspaces/default/devices")
-        if workspace_device_dir.exists():
-            for device_dir in workspace_device_dir.iterdir():
-                if device_dir.is_dir():
-                    device_id = device_dir.name
-                    commands_dir = device_dir / "commands"
-                    if commands_dir.exists():
-                        output_file = commands_dir / "command_outputs.json"
-                        if output_file.exists():
-                            try:
-                                with open(output_file, "r") as f:
-                                    device_outputs = json.load(f)
-                                    # Only load if we don't already have outputs for this device
-                                    if device_id not in self.outputs:
-                                        self.outputs[device_id] = device_outputs
-                                        logger.debug(f"Loaded command outputs for device {device_id} from workspace: {output_file}")
-                            except Exception as e:
-                                logger.error(f"Error loading command outputs for device {device_id} from workspace: {e}")
-                                logger.exception("Exception details:")
-            
-        # If no device-specific outputs found, try to load from the legacy file
-        if not self.outputs:
-            legacy_file = self.plugin.output_dir / "command_outputs.json"
-            if legacy_file.exists():
-                try:
-                    with open(legacy_file, "r") as f:
-                        self.outputs = json.load(f)
-                    
-                    logger.debug(f"Loaded command outputs from legacy file {legacy_file}")
-                    
-                    # Migrate to new format
-                    self.save_command_outputs()
-                except Exception as e:
-                    logger.error(f"Error loading legacy command outputs: {e}")
-                    logger.exception("Exception details:")
-        
-        # Log some statistics
-        device_count = len(self.outputs)
-        command_count = 0
-        output_count = 0
-        
-        for device_id, commands in self.outputs.items():
-            command_count += len(commands)
-            for cmd_id, timestamps in commands.items():
-                output_count += len(timestamps)
-                
-        logger.info(f"Loaded {output_count} command outputs for {command_count} commands across {device_count} devices")
+        logger.info(f"Found command history for {len(self.store.device_ids())} devices")
+        
+        # Open the search index and index outputs it is missing in the background
+        self._open_search_index()
+        
+        # Open the template parser and its result cache
+        self._open_parser()
         
         # Update plugin's outputs reference
         self.plugin.outputs = self.outputs
-    
-    def save_command_outputs(self):
-        """Save command outputs to disk"""
-        logger.debug("Saving command outputs to disk")
-        # Check if the outputs directory exists
-        if not self.plugin.output_dir.exists():
-            self.plugin.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Enforce retention in the background shortly after start and then periodically
+        self._schedule_compaction()
+        
+    def _open_search_index(self):
+        """Open the full-text search index and start reconciling it with the store"""
+        if self.search_index:
+            self.stop_indexing()
+            self.search_index.close()
+            self.search_index = None
+        try:
+            self.search_index = OutputSearchIndex(self.plugin.output_dir / SEARCH_INDEX_FILE, self.store)
+        except Exception as e:
+            logger.error(f"Error opening the command output search index: {e}")
+            logger.exception("Exception details:")
+            return
+            
+        self.indexing_thread = QThread()
+        self.indexing_worker = SearchIndexWorker(self.search_index)
+        self.indexing_worker.moveToThread(self.indexing_thread)
+        self.indexing_thread.started.connect(self.indexing_worker.run)
+        self.indexing_worker.indexing_finished.connect(self.indexing_thread.quit)
+        self.indexing_thread.start()
+        
+    def _open_parser(self):
+        """Open the template parser and its result cache"""
+        if self.parser:
+            self.parser.close()
+        templates_dir = getattr(self.plugin, "templates_dir", self.plugin.output_dir.parent / "templates")
+        self.parser = OutputParser(templates_dir, self.plugin.output_dir / PARSED_CACHE_FILE)
+        self._templates = None
+        
+    def invalidate_templates(self):
+        """Look up the parser templates of commands again after command sets changed"""
+        self._templates = None
+        
+    def _command_settings(self):
+        """Get the template and retention settings of the commands from the command set catalog
+        
+        The catalog summaries hold these settings, so no command set file
+        is read.
+        
+        Returns:
+            list: (command_id, command text, template, properties, retention)
+        """
+        command_handler = getattr(self.plugin, "command_handler", None)
+        catalog = getattr(command_handler, "catalog", None)
+        return catalog.command_settings() if catalog else []
+        
+    def _command_templates(self):
+        """Get the parser template names and property mappings of the commands in the command sets
+        
+        Returns:
+            tuple: ({command_id: (template, properties)}, {command text: (template, properties)})
+        """
+        if self._templates is None:
+            by_id = {}
+            by_text = {}
+            for command_id, command_text, name, properties, _retention in self._command_settings():
+                if name and self.parser.templates.exists(name):
+                    entry = (name, properties)
+                    by_id[command_id] = entry
+                    by_text.setdefault(command_text.strip().lower(), entry)
+            self._templates = (by_id, by_text)
+        return self._templates
+        
+    def _command_template(self, command_id, command_text=None):
+        """Get the (template, properties) entry of a command, or None"""
+        if not self.parser:
+            return None
+        by_id, by_text = self._command_templates()
+        if command_id in by_id:
+            return by_id[command_id]
+        if command_text:
+            return by_text.get(command_text.strip().lower())
+        return None
+        
+    def get_template_name(self, command_id, command_text=None):
+        """Get the parser template for the outputs of a command
+        
+        Args:
+            command_id (str): Command ID
+            command_text (str, optional): Command text, used for commands
+                that are not in a command set
+            
+        Returns:
+            str: Template name, or None if the command has no template
+        """
+        entry = self._command_template(command_id, command_text)
+        return entry[0] if entry else None
+        
+    def extract_properties(self, command_id, output, command_text=None):
+        """Extract the device properties a command designates from its output
+        
+        Args:
+            command_id (str): Command ID
+            output (str): Command output
+            command_text (str, optional): Command text, used for commands
+                that are not in a command set
+            
+        Returns:
+            dict: Device property name -> value, empty if the command has
+                no property mapping or the output could not be parsed
+        """
+        entry = self._command_template(command_id, command_text)
+        if not entry or not entry[1]:
+            return {}
+        records = self.parser.parse(entry[0], output)
+        return extract_properties(entry[1], records) if records else {}
+        
+    def parse_command_output(self, device_id, command_id, timestamp=None):
+        """Parse a stored command output into records with the command's template
+        
+        Results are cached by output hash, so each output is parsed once.
+        
+        Args:
+            device_id (str): Device ID
+            command_id (str): Command ID
+            timestamp (str, optional): Output timestamp, the latest output if not given
+            
+        Returns:
+            dict: {"template", "header", "records"}, or None if the output
+                does not exist, has no template or could not be parsed
+        """
+        outputs = self.get_command_outputs(device_id, command_id) if command_id else {}
+        if not outputs:
+            return None
+        output_data = outputs.get(timestamp or max(outputs))
+        if not output_data:
+            return None
+            
+        name = self.get_template_name(command_id, output_data.get("command"))
+        template = self.parser.templates.get(name) if name else None
+        if not template:
+            return None
             
-        # No outputs to save
-        if not self.outputs:
-            logger.debug("No command outputs to save")
+        # Cached results are found by hash without reading the output
+        digest = output_data.entry.get("hash") if isinstance(output_data, OutputRecord) else None
+        records = self.parser.cached(template, digest)
+        if records is None:
+            records = self.parser.parse(template, output_data.get("output", ""), digest)
+        if records is None:
+            return None
+        return {"template": name, "header": template.header, "records": records}
+        
+    def stop_indexing(self):
+        """Stop indexing outputs in the background and commit the search index"""
+        if self.indexing_thread and self.indexing_thread.isRunning():
+            self.indexing_worker.stop()
+            self.indexing_thread.quit()
+            self.indexing_thread.wait()
+        if self.search_index:
+            self.search_index.commit()
+            
+    def search_outputs(self, query, mode="words", devices=None, commands=None, since=None, until=None,
+                       latest_only=True, limit=200):
+        """Search the stored command outputs
+        
+        Args:
+            query (str): Words, phrase or regular expression to search for
+            mode (str): "words", "phrase" or "regex"
+            devices (list, optional): Only search these device IDs
+            commands (list, optional): Only search these command IDs
+            since (str, optional): Only search outputs at or after this ISO timestamp
+            until (str, optional): Only search outputs at or before this ISO timestamp
+            latest_only (bool): Only search the latest output of each command per device
+            limit (int): Maximum number of outputs returned
+            
+        Returns:
+            dict: Search results, or None if the search index is not available
+        """
+        if not self.search_index:
+            logger.warning("Command output search index is not available")
+            return None
+        return self.search_index.search(query, mode, devices, commands, since, until, latest_only, limit)
+        
+    def _schedule_compaction(self):
+        """Start the timer that runs the history compactor"""
+        try:
+            interval = int(self.plugin.settings["compaction_interval"]["value"])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            interval = 24
+        if interval <= 0:
             return
             
-        # Save outputs for each device in its own folder in the plugin directory
-        for device_id, commands in self.outputs.items():
-            try:
-                # Create device output directory in plugin folder
-                device_dir = self.plugin.output_dir / device_id
-                device_dir.mkdir(exist_ok=True)
-                
-                # Save the outputs to disk
-                output_file = device_dir / "command_outputs.json"
-                with open(output_file, "w") as f:
-                    json.dump(commands, f, indent=2)
-                    
-                logger.debug(f"Saved command outputs for device {device_id} to {output_file}")
-                
-                # Also save to workspace device folder
-                try:
-                    # Get workspace device directory
-                    workspace_device_dir = Path("config/workspaces/default/devices") / device_id
-                    if workspace_device_dir.exists():
-                        # Create commands directory if it doesn't exist
-                        commands_dir = workspace_device_dir / "commands"
-                        commands_dir.mkdir(exist_ok=True)
-                        
-                        # Save command outputs to workspace
-                        workspace_output_file = commands_dir / "command_outputs.json"
-                        with open(workspace_output_file, "w") as f:
-                            json.dump(commands, f, indent=2)
-                            
-                        logger.debug(f"Saved command outputs to workspace: {workspace_output_file}")
-                except Exception as e:
-                    logger.error(f"Error saving command outputs to workspace for device {device_id}: {e}")
-                    logger.exception("Exception details:")
+        QTimer.singleShot(COMPACTION_START_DELAY_MS, self.start_compaction)
+        self.compaction_timer = QTimer()
+        self.compaction_timer.timeout.connect(self.start_compaction)
+        self.compaction_timer.start(interval * 60 * 60 * 1000)
+        
+    def _retention_policies(self):
+        """Get the retention policies of commands and command sets
+        
+        Returns:
+            tuple: (default RetentionPolicy, {command_id: RetentionPolicy})
+        """
+        default_policy = RetentionPolicy.from_settings(getattr(self.plugin, "settings", {}))
+        policies = {}
+        
+        for command_id, _command_text, _template, _properties, retention in self._command_settings():
+            if retention:
+                policies[command_id] = RetentionPolicy.from_dict(retention)
                 
+        return default_policy, policies
+        
+    def start_compaction(self):
+        """Apply retention policies and compact the command history in the background
+        
+        Returns:
+            bool: True if a compaction was started, False if one is already running
+        """
+        if not self.store:
+            return False
+        if self.compaction_thread and self.compaction_thread.isRunning():
+            logger.debug("Command history compaction already running")
+            return False
+            
+        default_policy, policies = self._retention_policies()
+        compactor = HistoryCompactor(self.store, default_policy, policies)
+        
+        self.compaction_thread = QThread()
+        self.compaction_worker = CompactionWorker(compactor)
+        self.compaction_worker.moveToThread(self.compaction_thread)
+        
+        # Results are handled in the GUI thread, which owns the cached history
+        if self.compaction_receiver is None:
+            self.compaction_receiver = CompactionReceiver(self)
+        self.compaction_thread.started.connect(self.compaction_worker.run)
+        self.compaction_worker.device_compacted.connect(
+            self.compaction_receiver.on_device_compacted, Qt.QueuedConnection
+        )
+        self.compaction_worker.compaction_finished.connect(
+            self.compaction_receiver.on_compaction_finished, Qt.QueuedConnection
+        )
+        self.compaction_worker.compaction_finished.connect(self.compaction_thread.quit)
+        
+        logger.debug(f"Starting command history compaction with default policy {default_policy}")
+        self.compaction_thread.start()
+        return True
+        
+    def stop_compaction(self):
+        """Stop a running compaction and wait for it"""
+        if self.compaction_timer:
+            self.compaction_timer.stop()
+        if self.compaction_thread and self.compaction_thread.isRunning():
+            self.compaction_worker.stop()
+            self.compaction_thread.quit()
+            self.compaction_thread.wait()
+            
+    def _on_device_compacted(self, device_id):
+        """Drop the cached history index of a device after its history changed"""
+        self.outputs.pop(device_id, None)
+        self._loaded_devices.discard(device_id)
+        if self.search_index:
+            try:
+                self.search_index.reconcile_device(device_id)
             except Exception as e:
-                logger.error(f"Error saving command outputs for device {device_id}: {e}")
-                logger.exception("Exception details:")
+                logger.error(f"Error updating the search index for device {device_id}: {e}")
+        
+    def _on_compaction_finished(self, summary):
+        """Record the result of a compaction"""
+        summary["finished"] = datetime.datetime.now().isoformat()
+        self.last_compaction = summary
+        logger.info(
+            f"Command history compaction deleted {summary['outputs_deleted']} outputs and reclaimed "
+            f"{summary['bytes_reclaimed']} bytes on {summary['devices_compacted']} devices"
+        )
+        
+    def _load_device(self, device_id):
+        """Load the history index of a device if it has not been loaded yet"""
+        if device_id in self._loaded_devices or not self.store:
+            return
+        self._loaded_devices.add(device_id)
         
-        # Also save the full outputs file for backward compatibility
         try:
-            # Save the outputs to disk
-            output_file = self.plugin.output_dir / "command_outputs.json"
-            with open(output_file, "w") as f:
-                json.dump(self.outputs, f, indent=2)
-                
-            logger.debug(f"Saved command outputs to {output_file}")
+            device_outputs = self.store.load_index(device_id)
+            if device_outputs:
+                self.outputs[device_id] = device_outputs
+                logger.debug(f"Indexed {sum(len(t) for t in device_outputs.values())} command outputs for device: {device_id}")
         except Exception as e:
-            logger.error(f"Error saving command outputs: {e}")
+            logger.error(f"Error loading command outputs for device {device_id}: {e}")
             logger.exception("Exception details:")
+        
+    def _migrate_legacy_outputs(self):
+        """Import JSON output histories into the output store
+        
+        Earlier versions rewrote a command_outputs.json file per device (in
+        the plugin directory and in the workspace) plus a combined file
+        after every command. Each history is imported once, and the file is
+        renamed so it is not imported again.
+        """
+        legacy_files = {}
+        
+        # Device-specific output files in the plugin data directory
+        for device_dir in self.plugin.output_dir.iterdir():
+            output_file = device_dir / LEGACY_FILE
+            if device_dir.is_dir() and output_file.exists():
+                legacy_files.setdefault(device_dir.name, output_file)
+        
+        # Device folders in the workspace
+        workspace_device_dir = Path("config/workspaces/default/devices")
+        if workspace_device_dir.exists():
+            for device_dir in workspace_device_dir.iterdir():
+                output_file = device_dir / "commands" / LEGACY_FILE
+                if device_dir.is_dir() and output_file.exists():
+                    legacy_files.setdefault(device_dir.name, output_file)
+        
+        for device_id, output_file in legacy_files.items():
+            if self.store.has_device(device_id):
+                continue
+            try:
+                with open(output_file, "r") as f:
+                    device_outputs = json.load(f)
+                count = self.store.import_outputs(device_id, device_outputs)
+                output_file.rename(output_file.with_name(LEGACY_FILE + ".migrated"))
+                logger.info(f"Imported {count} command outputs for device {device_id} from {output_file}")
+            except Exception as e:
+                logger.error(f"Error importing command outputs for device {device_id} from {output_file}: {e}")
+                logger.exception("Exception details:")
+        
+        # Combined legacy file holding the history of all devices
+        legacy_file = self.plugin.output_dir / LEGACY_FILE
+        if legacy_file.exists():
+            try:
+                with open(legacy_file, "r") as f:
+                    all_outputs = json.load(f)
+                    
+                for device_id, device_outputs in all_outputs.items():
+                    if not self.store.has_device(device_id):
+                        self.store.import_outputs(device_id, device_outputs)
+                        
+                legacy_file.rename(legacy_file.with_name(LEGACY_FILE + ".migrated"))
+                logger.info(f"Imported legacy command outputs from {legacy_file}")
+            except Exception as e:
+                logger.error(f"Error importing legacy command outputs: {e}")
+                logger.exception("Exception details:")
+    
+    def _cache_size(self):
+        """Get the size of the output cache in characters"""
+        settings = getattr(self.plugin, "settings", {})
+        return int(settings.get("output_cache_size", {}).get("value", 64)) * 1024 * 1024
+        
+    def _delta_enabled(self):
+        """Check if outputs should be stored as deltas"""
+        settings = getattr(self.plugin, "settings", {})
+        return bool(settings.get("delta_compression", {}).get("value", True))
+        
+    def save_command_outputs(self):
+        """Flush pending command outputs to disk
+        
+        Outputs are written to the output store as they are added, so this
+        only fsyncs writes that have not been synced yet.
+        """
+        logger.debug("Saving command outputs to disk")
+        if self.store:
+            self.store.sync()
+        if self.search_index:
+            self.search_index.commit()
+        if self.parser:
+            self.parser.commit()
     
     def get_command_outputs(self, device_id, command_id=None):
         """Get command outputs for a device
@@ -186,6 +538,7 @@ class OutputHandler:
             dict: Command outputs
         """
         logger.debug(f"Getting command outputs for device: {device_id}")
+        self._load_device(device_id)
         
         # Check if we have outputs for this device
         if device_id not in self.outputs:
@@ -213,6 +566,7 @@ class OutputHandler:
             command_text (str, optional): Command text
         """
         logger.debug(f"Adding command output for device: {device_id}, command: {command_id}")
+        self._load_device(device_id)
         
         # Create device entry if it doesn't exist
         if device_id not in self.outputs:
@@ -224,17 +578,32 @@ class OutputHandler:
             
         # Add output with timestamp
         timestamp = datetime.datetime.now().isoformat()
-        self.outputs[device_id][command_id][timestamp] = {
-            "output": output,
-            "success": True,
-            "command": command_text if command_text else command_id
-        }
         
-        # Save outputs
-        self.save_command_outputs()
+        # Append the new output to the store
+        if self.store:
+            self.store.delta = self._delta_enabled()
+            entry = self.store.append(device_id, command_id, timestamp, output, command_text, True)
+            self.outputs[device_id][command_id][timestamp] = OutputRecord(self.store, device_id, entry)
+            self._index_output(device_id, command_id, timestamp, entry, output)
+        else:
+            self.outputs[device_id][command_id][timestamp] = {
+                "output": output,
+                "success": True,
+                "command": command_text if command_text else command_id
+            }
         
         logger.debug(f"Added command output for device: {device_id}, command: {command_id}")
         
+    def _index_output(self, device_id, command_id, timestamp, entry, output):
+        """Add an output to the search index"""
+        if not self.search_index:
+            return
+        try:
+            self.search_index.add(device_id, command_id, timestamp, entry, output)
+        except Exception as e:
+            # The background reconciliation picks the output up on the next start
+            logger.error(f"Error indexing command output for device {device_id}: {e}")
+        
     def delete_command_output(self, device_id, command_id, timestamp=None):
         """Delete a command output from history
         
@@ -247,6 +616,7 @@ class OutputHandler:
             bool: True if deleted successfully, False otherwise
         """
         logger.debug(f"Deleting command output for device: {device_id}, command: {command_id}, timestamp: {timestamp}")
+        self._load_device(device_id)
         
         # Check if we have outputs for this device
         if device_id not in self.outputs:
@@ -271,8 +641,11 @@ class OutputHandler:
                 if not self.outputs[device_id]:
                     del self.outputs[device_id]
                     
-                # Save outputs
-                self.save_command_outputs()
+                # Record the deletion
+                if self.store:
+                    self.store.delete(device_id, command_id, timestamp)
+                if self.search_index:
+                    self.search_index.delete(device_id, command_id, timestamp)
                 
                 logger.debug(f"Deleted command output for device: {device_id}, command: {command_id}, timestamp: {timestamp}")
                 return True
@@ -287,8 +660,11 @@ class OutputHandler:
             if not self.outputs[device_id]:
                 del self.outputs[device_id]
                 
-            # Save outputs
-            self.save_command_outputs()
+            # Record the deletion
+            if self.store:
+                self.store.delete(device_id, command_id)
+            if self.search_index:
+                self.search_index.delete(device_id, command_id)
             
             logger.debug(f"Deleted all command outputs for device: {device_id}, command: {command_id}")
             return True
@@ -373,16 +749,12 @@ class OutputHandler:
         # Create stacked widget to switch between text and table views
         output_stack = QStackedWidget()
         
-        # Raw output view (text)
-        raw_output = QTextEdit()
-        raw_output.setReadOnly(True)
-        raw_output.setFont(QFont("Courier New", 10))
+        # Raw output view (renders only the visible lines)
+        raw_output = OutputViewer()
         raw_output.setPlaceholderText("Select a command to view its output")
         
         # Table output view
-        table_output = QTableWidget()
-        table_output.setSortingEnabled(True)
-        table_output.setEditTriggers(QTableWidget.NoEditTriggers)  # Read-only
+        table_output = create_table_view()
         
         # Add widgets to stack
         output_stack.addWidget(raw_output)
@@ -409,6 +781,9 @@ class OutputHandler:
         device_command_list.itemSelectionChanged.connect(
             lambda: self._on_command_selection_changed(device_command_list, output_stack, raw_output, table_output, table_view_toggle)
         )
+        raw_output.document_loaded.connect(
+            lambda document: self._on_output_loaded(raw_output, table_view_toggle, document)
+        )
         
         # Set up device command list
         self._refresh_device_commands(device_command_list)
@@ -442,8 +817,7 @@ class OutputHandler:
                 cmd_item.setData(Qt.UserRole, {
                     "device_id": device.id,
                     "command_id": cmd_id,
-                    "timestamp": timestamp,
-                    "output": data.get("output", "")
+                    "timestamp": timestamp
                 })
                 
                 # Date/time
@@ -465,17 +839,20 @@ class OutputHandler:
         Args:
             command_list: The command list widget
             output_stack: The stacked widget containing raw and table outputs
-            raw_output: The raw output text edit widget
-            table_output: The table output widget
+            raw_output: The raw output viewer
+            table_output: The table output view
             table_view_toggle: The toggle button for table view
         """
+        # The toggle is enabled once the output is loaded
+        table_view_toggle.setChecked(False)
+        table_view_toggle.setEnabled(False)
+        output_stack.setCurrentWidget(raw_output)
+        table_output.setModel(RecordTableModel([], []))
+        
         # Get selected items
         selected_items = command_list.selectedItems()
         if not selected_items:
             raw_output.clear()
-            table_output.setRowCount(0)
-            table_output.setColumnCount(0)
-            table_view_toggle.setEnabled(False)
             return
             
         # Get the first selected row
@@ -491,22 +868,30 @@ class OutputHandler:
         if not data:
             return
             
-        # Get the output
-        output_text = data.get("output", "")
+        # Get the output record; the viewer streams its body from the
+        # store in the background instead of loading the whole text here
+        output_data = self.get_command_outputs(data["device_id"], data["command_id"]).get(data["timestamp"])
+        if not output_data:
+            raw_output.clear()
+            return
         
-        # Show raw output first
-        raw_output.setPlainText(output_text)
-        output_stack.setCurrentWidget(raw_output)
+        # Outputs of commands with a parser template are shown as parsed
+        # records; others fall back to detecting a table layout
+        has_template = bool(self.get_template_name(data["command_id"], output_data.get("command")))
+        raw_output.setProperty("current_output_data", data if has_template else None)
+        raw_output.set_output(output_data)
         
-        # Reset table view toggle button state
-        table_view_toggle.setChecked(False)
+    def _on_output_loaded(self, raw_output, table_view_toggle, document):
+        """Enable the table view once an output is shown
         
-        # Check if output can be displayed as a table
-        can_be_table = self._can_display_as_table(output_text)
+        Args:
+            raw_output: The raw output viewer
+            table_view_toggle: The toggle button for table view
+            document: The OutputDocument shown
+        """
+        can_be_table = bool(raw_output.property("current_output_data")) or \
+            self._can_display_as_table(self._table_lines(document, 5))
         table_view_toggle.setEnabled(can_be_table)
-        
-        # Store output text for later use
-        raw_output.setProperty("current_output", output_text)
             
     def _toggle_output_format(self, command_list, output_stack, raw_output, table_output, is_table_view):
         """Toggle between raw and table output formats
@@ -514,72 +899,28 @@ class OutputHandler:
         Args:
             command_list: The command list widget
             output_stack: The stacked widget containing raw and table outputs
-            raw_output: The raw output text edit widget
-            table_output: The table output widget
+            raw_output: The raw output viewer
+            table_output: The table output view
             is_table_view: Whether table view is enabled
         """
-        # Get the current output text
-        output_text = raw_output.property("current_output")
-        if not output_text:
+        # Get the current output
+        document = raw_output.document
+        if document is None:
             return
             
         if is_table_view:
             # Parse the output into a table and show it
-            self._parse_output_to_table(output_text, table_output)
+            data = raw_output.property("current_output_data")
+            parsed = self.parse_command_output(data["device_id"], data["command_id"], data["timestamp"]) if data else None
+            if parsed and parsed["records"]:
+                self._fill_table_from_records(parsed, table_output)
+            else:
+                self._parse_output_to_table(self._table_lines(document), table_output)
             output_stack.setCurrentWidget(table_output)
         else:
             # Switch to raw view
             output_stack.setCurrentWidget(raw_output)
     
-    def _update_output_display(self, output_text, is_table_view):
-        """Update the output display based on the selected format
-        
-        Args:
-            output_text: The output text edit widget
-            is_table_view: Whether to show as table format
-        """
-        # Get the current output text
-        current_output = output_text.property("current_output")
-        if not current_output:
-            return
-            
-        if is_table_view:
-            # Try to format as table
-            try:
-                # Simple table formatting - add bold for headers and ensure alignment
-                lines = current_output.strip().split('\n')
-                if len(lines) > 2:
-                    # Check if this looks like a table
-                    if '|' in lines[0] or '  ' in lines[0]:
-                        formatted_output = "<pre>"
-                        # Format the first line as a header
-                        if '|' in lines[0]:
-                            # For pipe-separated tables
-                            headers = [h.strip() for h in lines[0].split('|')]
-                            formatted_output += "<b>" + " | ".join(headers) + "</b>\n"
-                            formatted_output += "-" * len(lines[0]) + "\n"
-                        else:
-                            # For space-separated tables
-                            formatted_output += "<b>" + lines[0] + "</b>\n"
-                            formatted_output += "-" * len(lines[0]) + "\n"
-                            
-                        # Add the rest of the lines
-                        for line in lines[1:]:
-                            formatted_output += line + "\n"
-                            
-                        formatted_output += "</pre>"
-                        output_text.setHtml(formatted_output)
-                        return
-                    
-                # If we get here, it doesn't look like a table
-                output_text.setText("Cannot display this output as a formatted table.")
-            except Exception as e:
-                logger.error(f"Error formatting output as table: {e}")
-                output_text.setText(f"Error formatting as table: {str(e)}")
-        else:
-            # Raw format
-            output_text.setPlainText(current_output)
-        
     def _run_command_for_device(self, device):
         """Run a command for a specific device
         
@@ -1091,8 +1432,7 @@ class OutputHandler:
                 cmd_item.setData(Qt.UserRole, {
                     "device_id": device.id,
                     "command_id": cmd_id,
-                    "timestamp": timestamp,
-                    "output": data.get("output", "")
+                    "timestamp": timestamp
                 })
                 
                 # Date/time
@@ -1161,16 +1501,12 @@ class OutputHandler:
         # Create stacked widget to switch between text and table views
         output_stack = QStackedWidget()
         
-        # Raw output view (text)
-        raw_output = QTextEdit()
-        raw_output.setReadOnly(True)
-        raw_output.setFont(QFont("Courier New", 10))
+        # Raw output view (renders only the visible lines)
+        raw_output = OutputViewer()
         raw_output.setPlaceholderText("Select a command to view its output")
         
         # Table output view
-        table_output = QTableWidget()
-        table_output.setSortingEnabled(True)
-        table_output.setEditTriggers(QTableWidget.NoEditTriggers)  # Read-only
+        table_output = create_table_view()
         
         # Add widgets to stack
         output_stack.addWidget(raw_output)
@@ -1197,6 +1533,9 @@ class OutputHandler:
         command_list.itemSelectionChanged.connect(
             lambda: self._on_command_selection_changed(command_list, output_stack, raw_output, table_output, table_view_toggle)
         )
+        raw_output.document_loaded.connect(
+            lambda document: self._on_output_loaded(raw_output, table_view_toggle, document)
+        )
         
         # Display a message if no commands found
         if command_list.rowCount() == 0:
@@ -1204,19 +1543,39 @@ class OutputHandler:
             info_label.setWordWrap(True)
             layout.insertWidget(0, info_label)
     
-    def _can_display_as_table(self, text):
+    def _table_lines(self, document, limit=None):
+        """Get the lines of an output without its surrounding whitespace
+        
+        Args:
+            document: The OutputDocument of the output
+            limit (int, optional): Number of lines to return at most
+            
+        Returns:
+            list: Lines of text
+        """
+        first = 0
+        while first < document.line_count and not document.line(first).strip():
+            first += 1
+        if first == document.line_count:
+            return []
+            
+        end = document.line_count if limit is None else first + limit
+        lines = document.lines(first, end)
+        while lines and not lines[-1].strip():
+            lines.pop()
+        lines[0] = lines[0].lstrip()
+        lines[-1] = lines[-1].rstrip()
+        return lines
+    
+    def _can_display_as_table(self, lines):
         """Determine if text can be displayed as a table
         
         Args:
-            text: The text to check
+            lines: The first lines of the text, from _table_lines
             
         Returns:
             bool: Whether the text can be displayed as a table
         """
-        if not text or len(text.strip()) == 0:
-            return False
-            
-        lines = text.strip().split('\n')
         if len(lines) < 2:  # Need at least header and one data row
             return False
             
@@ -1274,45 +1633,47 @@ class OutputHandler:
                 
         return False
     
-    def _parse_output_to_table(self, text, table_widget):
-        """Parse text output into a table format
+    def _fill_table_from_records(self, parsed, table_view):
+        """Fill a table with the records parsed by a template
         
         Args:
-            text: The text to parse
-            table_widget: The table widget to populate
+            parsed (dict): Result of parse_command_output
+            table_view: The table view to populate
         """
-        table_widget.clear()
-        table_widget.setRowCount(0)
+        show_table(table_view, RecordTableModel.from_parsed(parsed))
         
-        lines = text.strip().split('\n')
+    def _parse_output_to_table(self, lines, table_view):
+        """Parse text output into a table format
+        
+        Args:
+            lines: The lines of the text, from _table_lines
+            table_view: The table view to populate
+        """
         if len(lines) < 2:
+            show_table(table_view, RecordTableModel([], []))
             return
             
         # Determine table format
         if '|' in lines[0]:
             # Pipe-separated format
-            self._parse_pipe_separated_table(lines, table_widget)
+            headers, rows = self._parse_pipe_separated_table(lines)
         else:
             # Space-separated format
-            self._parse_space_separated_table(lines, table_widget)
+            headers, rows = self._parse_space_separated_table(lines)
+        show_table(table_view, RecordTableModel(headers, rows))
             
-    def _parse_pipe_separated_table(self, lines, table_widget):
+    def _parse_pipe_separated_table(self, lines):
         """Parse pipe-separated text into a table
         
         Args:
             lines: List of text lines
-            table_widget: The table widget to populate
+            
+        Returns:
+            tuple: (headers, rows)
         """
         # Get headers (first line)
         headers = [h.strip() for h in lines[0].split('|') if h.strip()]
-        table_widget.setColumnCount(len(headers))
-        table_widget.setHorizontalHeaderLabels(headers)
-        
-        # Set up header
-        for col in range(len(headers)):
-            table_widget.horizontalHeader().setSectionResizeMode(
-                col, QHeaderView.ResizeToContents if col < len(headers) - 1 else QHeaderView.Stretch
-            )
+        rows = []
         
         # Skip any separator line after header (containing only dashes, plusses, pipes)
         start_row = 1
@@ -1324,29 +1685,29 @@ class OutputHandler:
             if not lines[i].strip() or '|' not in lines[i]:
                 continue  # Skip empty lines
                 
-            row_data = [d.strip() for d in lines[i].split('|') if d.strip() or len(d.strip()) == 0]
+            # Outer pipes do not start or end a cell, as in the header
+            row_data = [d.strip() for d in lines[i].strip().strip('|').split('|')]
             if not row_data:
                 continue
                 
-            row_idx = table_widget.rowCount()
-            table_widget.insertRow(row_idx)
+            rows.append(row_data[:len(headers)])
             
-            for col, data in enumerate(row_data):
-                if col < len(headers):
-                    item = QTableWidgetItem(data)
-                    table_widget.setItem(row_idx, col, item)
+        return headers, rows
         
-    def _parse_space_separated_table(self, lines, table_widget):
+    def _parse_space_separated_table(self, lines):
         """Parse space-separated text into a table
         
         Args:
             lines: List of text lines
-            table_widget: The table widget to populate
+            
+        Returns:
+            tuple: (headers, rows)
         """
         # Find column positions by looking at spaces in the header line
         header_line = lines[0]
         col_positions = [0]  # Start of first column
         in_space = False
+        rows = []
         
         # Find column boundaries by looking for transitions between spaces and non-spaces
         for i in range(1, len(header_line)):
@@ -1361,31 +1722,17 @@ class OutputHandler:
         if len(col_positions) <= 1:
             # Fallback: split by multiple spaces
             headers = [h for h in header_line.split('  ') if h.strip()]
-            table_widget.setColumnCount(len(headers))
-            table_widget.setHorizontalHeaderLabels(headers)
-            
-            # Set up header
-            for col in range(len(headers)):
-                table_widget.horizontalHeader().setSectionResizeMode(
-                    col, QHeaderView.ResizeToContents if col < len(headers) - 1 else QHeaderView.Stretch
-                )
                 
             # Add data rows
             for i in range(1, len(lines)):
                 if not lines[i].strip():
                     continue
                     
-                row_data = [d for d in lines[i].split('  ') if d.strip()]
+                row_data = [d.strip() for d in lines[i].split('  ') if d.strip()]
                 if not row_data:
                     continue
                     
-                row_idx = table_widget.rowCount()
-                table_widget.insertRow(row_idx)
-                
-                for col, data in enumerate(row_data):
-                    if col < len(headers):
-                        item = QTableWidgetItem(data.strip())
-                        table_widget.setItem(row_idx, col, item)
+                rows.append(row_data[:len(headers)])
         else:
             # Extract headers based on column positions
             headers = []
@@ -1395,15 +1742,6 @@ class OutputHandler:
                 header = header_line[start:end].strip()
                 headers.append(header)
                 
-            table_widget.setColumnCount(len(headers))
-            table_widget.setHorizontalHeaderLabels(headers)
-            
-            # Set up header
-            for col in range(len(headers)):
-                table_widget.horizontalHeader().setSectionResizeMode(
-                    col, QHeaderView.ResizeToContents if col < len(headers) - 1 else QHeaderView.Stretch
-                )
-                
             # Add data rows
             for i in range(1, len(lines)):
                 if not lines[i].strip():
@@ -1422,12 +1760,9 @@ class OutputHandler:
                 if not any(row_data):  # Skip empty rows
                     continue
                     
-                row_idx = table_widget.rowCount()
-                table_widget.insertRow(row_idx)
+                rows.append(row_data)
                 
-                for col, data in enumerate(row_data):
-                    item = QTableWidgetItem(data)
-                    table_widget.setItem(row_idx, col, item)
+        return headers, rows
         
     def generate_export_filename(self, device, command, command_text=None):
         """Generate a filename for exporting command output using template
@@ -1440,53 +1775,7 @@ class OutputHandler:
         Returns:
             str: The generated filename
         """
-        template = self.plugin.settings["export_filename_template"]["value"]
-        date_format = self.plugin.settings["export_date_format"]["value"]
-        command_format = self.plugin.settings["export_command_format"]["value"]
-        
-        # Get the date formatted according to settings
-        current_date = datetime.datetime.now().strftime(date_format)
-        
-        # Handle command formatting
-        cmd_text = command_text or command
-        if command_format == "truncated":
-            # Replace spaces with hyphens and limit to 15 chars instead of truncating at first space
-            cmd_text = cmd_text.replace(" ", "-")[:15]
-        elif command_format == "sanitized":
-            # Remove special characters, convert spaces to hyphens
-            cmd_text = "".join(c if c.isalnum() or c == " " else "-" for c in cmd_text)
-            cmd_text = cmd_text.replace(" ", "-").replace("--", "-").strip("-")[:25]  # Limit length and clean up
-        else:  # "full" format - still replace spaces with hyphens for filename safety
-            cmd_text = cmd_text.replace(" ", "-")
-        
-        # Create placeholder values
-        placeholders = {
-            "command": cmd_text,
-            "date": current_date,
-            "hostname": device.get_property("hostname", "unknown"),
-            "ip": device.get_property("ip_address", "unknown"),
-            "status": device.get_property("status", "unknown"),
-        }
-        
-        # Add all device properties as potential placeholders
-        for key, value in device.get_properties().items():
-            # Only add simple values, not lists or dicts
-            if isinstance(value, (str, int, float, bool)):
-                placeholders[key] = str(value)
-        
-        # Apply the template
-        try:
-            filename = template.format(**placeholders)
-            # Sanitize filename to remove characters that aren't allowed in filenames
-            return self._sanitize_filename(filename)
-        except KeyError as e:
-            logger.error(f"Error in filename template: Unknown placeholder {e}")
-            # Fallback to a simple filename
-            return f"{device.get_property('hostname', 'device')}_{cmd_text}_{current_date}.txt"
-        except Exception as e:
-            logger.error(f"Error generating filename from template: {e}")
-            # Fallback to a simple filename
-            return f"command_output_{current_date}.txt"
+        return ExportFilenames.from_settings(self.plugin.settings).render(device.get_properties(), command, command_text)
     
     def _sanitize_filename(self, filename):
         """Sanitize a filename to remove illegal characters
@@ -1497,24 +1786,5 @@ class OutputHandler:
         Returns:
             str: The sanitized filename
         """
-        # Replace characters that are not allowed in filenames
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            filename = filename.replace(char, '-')
-        
-        # Replace spaces with hyphens for better filenames
-        filename = filename.replace(' ', '-')
-        
-        # Clean up multiple consecutive hyphens
-        while '--' in filename:
-            filename = filename.replace('--', '-')
-        
-        # Ensure the filename is not too long
-        if len(filename) > 240:  # Leave room for extension
-            filename = filename[:240]
-            
-        # Remove any trailing hyphens
-        filename = filename.rstrip('-')
-            
-        return filename
+        return sanitize_filename(filename)
         
\ No newline at end of file
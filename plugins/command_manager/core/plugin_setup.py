@@ -133,6 +133,13 @@ def create_toolbar(plugin):
         logger.debug(f"Created report_action: {report_action}")
         toolbar.addAction(report_action)
         
+        # Action to search command outputs
+        search_action = QAction("Search Outputs", plugin.main_window)
+        search_action.setToolTip("Search the command outputs of all devices")
+        search_action.triggered.connect(lambda: on_search_outputs(plugin))
+        logger.debug(f"Created search_action: {search_action}")
+        toolbar.addAction(search_action)
+        
         # Settings action
         toolbar.addAction(plugin.settings_action)
         
@@ -303,6 +310,13 @@ def on_generate_report(plugin):
     dialog = ReportGenerator(plugin, plugin.main_window)
     dialog.exec()
 
+def on_search_outputs(plugin):
+    """Handle search outputs action"""
+    from plugins.command_manager.ui.output_search_dialog import OutputSearchDialog
+    
+    dialog = OutputSearchDialog(plugin, plugin.main_window)
+    dialog.exec()
+
 def on_manage_credentials(plugin):
     """Handle manage credentials action"""
     from PySide6.QtWidgets import QDialog, QMessageBox
@@ -8,11 +8,19 @@ Cisco IOS XE Command Set Data for Command Manager plugin
 CISCO_IOSXE_DATA = {
   "device_type": "Cisco IOS XE",
   "firmware_version": "16.x",
+  "platform": "cisco_iosxe",
   "commands": [
     {
       "command": "show version",
       "alias": "Show Version",
-      "description": "Displays software version, system uptime, and device information"
+      "description": "Displays software version, system uptime, and device information",
+      "properties": {
+        "hostname": "HOSTNAME",
+        "firmware_version": "VERSION",
+        "hardware_model": "HARDWARE",
+        "serial_number": "SERIAL",
+        "uptime": "UPTIME"
+      }
     },
     {
       "command": "show running-config",
@@ -42,7 +50,11 @@ CISCO_IOSXE_DATA = {
     {
       "command": "show inventory",
       "alias": "Show Inventory",
-      "description": "Displays the product inventory list including hardware details"
+      "description": "Displays the product inventory list including hardware details",
+      "properties": {
+        "module_models": "PID[]",
+        "module_serials": "SN[]"
+      }
     },
     {
       "command": "show vlan",
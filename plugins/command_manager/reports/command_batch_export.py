@@ -6,19 +6,213 @@ Command Batch Export Dialog for Command Manager plugin
 """
 
 import os
+import time
 import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from loguru import logger
 
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QObject, QThread
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
     QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
     QFileDialog, QGroupBox, QFormLayout, QCheckBox, QListWidget,
     QDialogButtonBox, QLineEdit, QComboBox, QSplitter, QAbstractItemView,
-    QProgressDialog, QApplication, QWidget, QListWidgetItem
+    QProgressBar, QWidget, QListWidgetItem
 )
 
+from plugins.command_manager.utils.export_archive import (
+    ARCHIVE_WRITERS, ExportFilenames, render_output, sanitize_filename
+)
+
+# Export destinations in the order of the format combo box: key, label, file filter
+EXPORT_FORMATS = [
+    ("zip", "ZIP archive", "ZIP Archives (*.zip)"),
+    ("tar.zst", "tar.zst archive", "Zstandard Tar Archives (*.tar.zst)"),
+    ("folder", "Folder (one file per output)", None)
+]
+
+# Threads rendering and compressing entries
+DEFAULT_EXPORT_WORKERS = min(8, os.cpu_count() or 1)
+
+# Minimum time between progress updates, in seconds
+PROGRESS_INTERVAL = 0.1
+
+
+class BatchExportWorker(QObject):
+    """Worker for exporting command outputs in the background
+    
+    Entries are rendered (file name, content and compression) on a thread
+    pool and written to the archive in order by the worker's thread; at
+    most a few entries per pool thread are held in memory. Archives are
+    written to a temporary file next to the target, which replaces the
+    target once the export is complete.
+    """
+    
+    export_progress = Signal(int, int)  # outputs exported, total outputs
+    export_finished = Signal(str, int)  # destination and outputs exported, empty destination if cancelled
+    export_failed = Signal(str)  # error message
+    
+    def __init__(self, plugin, archive_format, path, filenames, devices, commands,
+                 most_recent_only=True, per_device_folders=False, workers=DEFAULT_EXPORT_WORKERS):
+        """Initialize the worker
+        
+        Args:
+            plugin: The command manager plugin
+            archive_format (str): "zip", "tar.zst" or "folder"
+            path (str): Archive file, or directory for folder exports
+            filenames (ExportFilenames): File name renderer
+            devices (list): (device ID, device name, device properties) tuples
+            commands (list): (command ID, command text) tuples
+            most_recent_only (bool): Export the latest output of each command only
+            per_device_folders (bool): Put the files of each device in a folder
+            workers (int): Threads rendering entries
+        """
+        super().__init__()
+        
+        self.plugin = plugin
+        self.archive_format = archive_format
+        self.writer_class = ARCHIVE_WRITERS[archive_format]
+        self.path = path
+        self.filenames = filenames
+        self.devices = devices
+        self.commands = commands
+        self.most_recent_only = most_recent_only
+        self.per_device_folders = per_device_folders
+        self.workers = max(1, workers)
+        self.stop_requested = False
+        
+    def stop(self):
+        """Stop after the entries being written"""
+        self.stop_requested = True
+        
+    def _plan(self):
+        """List the outputs to export, reading only the history indexes"""
+        items = []
+        for device_id, name, properties in self.devices:
+            outputs = self.plugin.get_command_outputs(device_id)
+            if not outputs:
+                continue
+            folder = (sanitize_filename(name) or str(device_id)) if self.per_device_folders else None
+            for command_id, command_text in self.commands:
+                history = outputs.get(command_id)
+                if not history:
+                    continue
+                timestamps = [max(history)] if self.most_recent_only else sorted(history)
+                for timestamp in timestamps:
+                    items.append((name, properties, folder, command_id, command_text, timestamp, history[timestamp]))
+        return items
+        
+    def _render(self, writer, item):
+        """Render an entry on a pool thread
+        
+        Returns:
+            tuple: (name, timestamp, prepared data), or None if the output
+            was removed from the history since it was listed
+        """
+        name, properties, folder, command_id, command_text, timestamp, record = item
+        try:
+            output = record.get("output") or ""
+        except KeyError:
+            return None
+        filename = self.filenames.entry_name(
+            properties, command_id, command_text, None if self.most_recent_only else timestamp
+        )
+        if folder:
+            filename = f"{folder}/{filename}"
+        data = render_output(name, properties.get("ip_address", ""), command_text, timestamp, output)
+        return filename, timestamp, writer.prepare(data)
+        
+    def run(self):
+        """Export the outputs"""
+        archive = self.archive_format != "folder"
+        target = f"{self.path}.part" if archive else self.path
+        writer = None
+        
+        try:
+            items = self._plan()
+            total = len(items)
+            logger.debug(f"Exporting {total} outputs of {len(self.devices)} devices to {self.path}")
+            self.export_progress.emit(0, total)
+            
+            writer = self.writer_class(target)
+            done = 0
+            last_progress = time.monotonic()
+            pending = deque()
+            window = self.workers * 4
+            
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-export") as pool:
+                try:
+                    for item in items:
+                        if self.stop_requested:
+                            break
+                        pending.append(pool.submit(self._render, writer, item))
+                        # Write in order once the window is full, bounding the entries held in memory
+                        while len(pending) >= window or (pending and pending[0].done()):
+                            done += self._write(writer, pending.popleft().result())
+                        if time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+                            self.export_progress.emit(done, total)
+                            last_progress = time.monotonic()
+                    while pending and not self.stop_requested:
+                        done += self._write(writer, pending.popleft().result())
+                finally:
+                    for future in pending:
+                        future.cancel()
+                        
+            if self.stop_requested:
+                logger.debug(f"Batch export cancelled after {done} outputs")
+                writer.abort()
+                if archive:
+                    self._remove(target)
+                self.export_finished.emit("", done)
+                return
+                
+            writer.close()
+            if archive:
+                if writer.entries:
+                    os.replace(target, self.path)
+                else:
+                    self._remove(target)
+            self.export_progress.emit(total, total)
+        except Exception as e:
+            logger.error(f"Error during batch export: {e}")
+            logger.exception("Exception details:")
+            if writer:
+                try:
+                    writer.abort()
+                except Exception:
+                    pass
+            if archive:
+                self._remove(target)
+            self.export_failed.emit(str(e))
+            return
+            
+        logger.info(f"Exported {writer.entries} command outputs to {self.path} ({writer.bytes_written} bytes)")
+        self.export_finished.emit(self.path, writer.entries)
+        
+    @staticmethod
+    def _write(writer, result):
+        """Add a rendered entry to the archive
+        
+        Returns:
+            int: 1, for counting progress
+        """
+        if result is not None:
+            name, timestamp, prepared = result
+            writer.add(writer.unique_name(name), prepared, timestamp)
+        return 1
+        
+    @staticmethod
+    def _remove(path):
+        """Delete a partially written archive"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+
 class CommandBatchExport(QDialog):
     """Dialog for exporting commands from multiple devices"""
     
@@ -27,6 +221,8 @@ class CommandBatchExport(QDialog):
         super().__init__(parent)
         
         self.plugin = plugin
+        self.worker = None
+        self.worker_thread = None
         
         # Set dialog properties
         self.setWindowTitle("Export Commands from Multiple Devices")
@@ -130,6 +326,16 @@ class CommandBatchExport(QDialog):
         self.most_recent_only.setChecked(True)
         options_layout.addRow("", self.most_recent_only)
         
+        # Destination format
+        self.format_combo = QComboBox()
+        for key, label, _file_filter in EXPORT_FORMATS:
+            self.format_combo.addItem(label, key)
+        options_layout.addRow("Export To:", self.format_combo)
+        
+        # Layout of the exported files
+        self.per_device_folders = QCheckBox("Put the files of each device in its own folder")
+        options_layout.addRow("", self.per_device_folders)
+        
         # Add options group to right panel
         right_layout.addWidget(options_group)
         
@@ -158,12 +364,17 @@ class CommandBatchExport(QDialog):
         # Add preview group to main layout
         layout.addWidget(preview_group)
         
+        # Progress of a running export
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        
         # Buttons
-        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        buttons.accepted.connect(self._on_export)
-        buttons.rejected.connect(self.reject)
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.buttons.accepted.connect(self._on_export)
+        self.buttons.rejected.connect(self.reject)
         
-        layout.addWidget(buttons)
+        layout.addWidget(self.buttons)
         
     def _load_devices(self):
         """Load device list"""
@@ -248,12 +459,14 @@ class CommandBatchExport(QDialog):
     def _get_selected_devices(self):
         """Get selected devices"""
         selected_devices = []
+        selected_ids = set()
         for item in self.device_table.selectedItems():
             # Make sure we only count each row once
             if item.column() == 0:
                 device_id = item.data(Qt.UserRole)
                 device = self.plugin.device_manager.get_device(device_id)
-                if device and device not in selected_devices:
+                if device and device_id not in selected_ids:
+                    selected_ids.add(device_id)
                     selected_devices.append(device)
         return selected_devices
         
@@ -273,22 +486,8 @@ class CommandBatchExport(QDialog):
             self.preview_text.setStyleSheet("color: #888;")
             return
         
-        # Create temporary plugin for preview
-        class TempPlugin:
-            def __init__(self, settings):
-                self.settings = settings
-        
-        temp_settings = {
-            "export_filename_template": {"value": self.template_edit.text()},
-            "export_date_format": {"value": self.date_format_edit.text()},
-            "export_command_format": {"value": self.command_format_combo.currentText()}
-        }
-        
-        temp_plugin = TempPlugin(temp_settings)
-        
-        # Generate preview
-        from plugins.command_manager.core.output_handler import OutputHandler
-        temp_handler = OutputHandler(temp_plugin)
+        filenames = self._filenames()
+        folders = self.per_device_folders.isChecked()
         
         preview_text = f"<b>Export Preview</b><br><br>"
         preview_text += f"Selected {len(selected_devices)} device(s) and {len(selected_commands)} command(s)<br><br>"
@@ -305,9 +504,9 @@ class CommandBatchExport(QDialog):
             for j in range(max_commands):
                 cmd_id, cmd_text = selected_commands[j]
                 
-                filename = temp_handler.generate_export_filename(device, cmd_id, cmd_text)
-                if not filename.lower().endswith('.txt'):
-                    filename += ".txt"
+                filename = filenames.entry_name(device.get_properties(), cmd_id, cmd_text)
+                if folders:
+                    filename = f"{sanitize_filename(device.get_property('alias', 'Device'))}/{filename}"
                     
                 preview_text += f"&nbsp;&nbsp;• {cmd_text} → <code>{filename}</code><br>"
             
@@ -320,6 +519,14 @@ class CommandBatchExport(QDialog):
         self.preview_text.setText(preview_text)
         self.preview_text.setStyleSheet("color: #000;")
         
+    def _filenames(self):
+        """Create a file name renderer from the options"""
+        return ExportFilenames(
+            self.template_edit.text(),
+            self.date_format_edit.text(),
+            self.command_format_combo.currentText()
+        )
+        
     def _on_export(self):
         """Handle export button"""
         selected_devices = self._get_selected_devices()
@@ -348,14 +555,26 @@ class CommandBatchExport(QDialog):
             )
             return
             
-        # Ask for directory to save files
-        export_dir = QFileDialog.getExistingDirectory(
-            self,
-            "Select Export Directory",
-            ""
-        )
+        # Ask for the destination
+        archive_format, _label, file_filter = EXPORT_FORMATS[self.format_combo.currentIndex()]
+        if archive_format == "folder":
+            path = QFileDialog.getExistingDirectory(
+                self,
+                "Select Export Directory",
+                ""
+            )
+        else:
+            default_name = f"command_export_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{archive_format}"
+            path, _ = QFileDialog.getSaveFileName(
+                self,
+                "Save Export Archive",
+                str(Path.home() / default_name),
+                file_filter
+            )
+            if path and not path.lower().endswith(f".{archive_format}"):
+                path += f".{archive_format}"
         
-        if not export_dir:
+        if not path:
             return
             
         # Save settings if requested
@@ -364,166 +583,99 @@ class CommandBatchExport(QDialog):
             self.plugin.settings["export_date_format"]["value"] = self.date_format_edit.text()
             self.plugin.settings["export_command_format"]["value"] = self.command_format_combo.currentText()
             
-        # Create temporary plugin for export
-        class TempPlugin:
-            def __init__(self, settings):
-                self.settings = settings
-        
-        temp_settings = {
-            "export_filename_template": {"value": self.template_edit.text()},
-            "export_date_format": {"value": self.date_format_edit.text()},
-            "export_command_format": {"value": self.command_format_combo.currentText()}
-        }
-        
-        temp_plugin = TempPlugin(temp_settings)
-        
-        # Create handler for filename generation
-        from plugins.command_manager.core.output_handler import OutputHandler
-        temp_handler = OutputHandler(temp_plugin)
-            
-        # Setup progress dialog
-        total_exports = len(selected_devices) * len(selected_commands)
-        progress = QProgressDialog("Exporting commands...", "Cancel", 0, total_exports, self)
-        progress.setWindowTitle("Export Progress")
-        progress.setWindowModality(Qt.WindowModal)
-        progress.setMinimumDuration(0)
-        
-        # Export each command for each device
-        exported_count = 0
-        exported_files = []
-        
-        try:
-            for device in selected_devices:
-                device_id = device.id
-                
-                if device_id not in self.device_commands:
-                    continue
-                    
-                device_cmd_outputs = self.device_commands[device_id]
-                
-                for cmd_id, cmd_text in selected_commands:
-                    # Check if the user canceled the export
-                    if progress.wasCanceled():
-                        break
-                        
-                    # Update progress
-                    progress.setValue(exported_count)
-                    progress.setLabelText(f"Exporting: {device.get_property('alias', 'Device')} - {cmd_text}")
-                    QApplication.processEvents()
-                    
-                    if cmd_id not in device_cmd_outputs:
-                        exported_count += 1
-                        continue
-                        
-                    # Get command output
-                    cmd_outputs = device_cmd_outputs[cmd_id]
-                    
-                    if not cmd_outputs:
-                        exported_count += 1
-                        continue
-                        
-                    # Either export most recent or all
-                    if self.most_recent_only.isChecked():
-                        # Get most recent output
-                        latest_timestamp = max(cmd_outputs.keys())
-                        output_data = cmd_outputs[latest_timestamp]
-                        output = output_data.get("output", "")
-                        
-                        # Generate filename
-                        filename = temp_handler.generate_export_filename(device, cmd_id, cmd_text)
-                        if not filename.lower().endswith('.txt'):
-                            filename += ".txt"
-                            
-                        # Full path
-                        file_path = os.path.join(export_dir, filename)
-                        
-                        # If file exists, add a number suffix to avoid overwriting
-                        counter = 1
-                        original_path = file_path
-                        while os.path.exists(file_path):
-                            file_name, file_ext = os.path.splitext(original_path)
-                            file_path = f"{file_name}_{counter}{file_ext}"
-                            counter += 1
-                        
-                        # Export to file
-                        with open(file_path, "w") as f:
-                            f.write(f"Device: {device.get_property('alias', 'Device')}\n")
-                            f.write(f"IP: {device.get_property('ip_address', '')}\n")
-                            f.write(f"Command: {cmd_text}\n")
-                            f.write(f"Date/Time: {datetime.datetime.fromisoformat(latest_timestamp).strftime('%Y-%m-%d %H:%M:%S')}\n")
-                            f.write("-" * 50 + "\n")
-                            f.write(output)
-                        
-                        exported_count += 1
-                        exported_files.append(os.path.basename(file_path))
-                    else:
-                        # Export all outputs for this command
-                        for timestamp, output_data in cmd_outputs.items():
-                            output = output_data.get("output", "")
-                            
-                            # Format timestamp for filename
-                            dt = datetime.datetime.fromisoformat(timestamp)
-                            timestamp_str = dt.strftime("%Y%m%d_%H%M%S")
-                            
-                            # Generate filename
-                            filename = temp_handler.generate_export_filename(device, cmd_id, cmd_text)
-                            file_name, file_ext = os.path.splitext(filename)
-                            filename = f"{file_name}_{timestamp_str}{file_ext or '.txt'}"
-                            
-                            # Full path
-                            file_path = os.path.join(export_dir, filename)
-                            
-                            # If file exists, add a number suffix to avoid overwriting
-                            counter = 1
-                            original_path = file_path
-                            while os.path.exists(file_path):
-                                file_name, file_ext = os.path.splitext(original_path)
-                                file_path = f"{file_name}_{counter}{file_ext}"
-                                counter += 1
-                            
-                            # Export to file
-                            with open(file_path, "w") as f:
-                                f.write(f"Device: {device.get_property('alias', 'Device')}\n")
-                                f.write(f"IP: {device.get_property('ip_address', '')}\n")
-                                f.write(f"Command: {cmd_text}\n")
-                                f.write(f"Date/Time: {dt.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                                f.write("-" * 50 + "\n")
-                                f.write(output)
-                            
-                            exported_count += 1
-                            exported_files.append(os.path.basename(file_path))
-                
-                # Check if the user canceled the export
-                if progress.wasCanceled():
-                    break
+        # Take a snapshot of the devices so the worker does not touch them
+        devices = [
+            (device.id, device.get_property("alias", "Device"), device.get_properties())
+            for device in selected_devices
+            if device.id in self.device_commands
+        ]
+        
+        # Export in the background
+        self.worker_thread = QThread()
+        self.worker = BatchExportWorker(
+            self.plugin,
+            archive_format,
+            path,
+            self._filenames(),
+            devices,
+            selected_commands,
+            self.most_recent_only.isChecked(),
+            self.per_device_folders.isChecked()
+        )
+        self.worker.moveToThread(self.worker_thread)
+        
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.export_progress.connect(self._on_export_progress)
+        self.worker.export_finished.connect(self._on_export_finished)
+        self.worker.export_failed.connect(self._on_export_failed)
+        
+        # Update UI
+        self.buttons.button(QDialogButtonBox.Ok).setEnabled(False)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(True)
+        
+        self.worker_thread.start()
+        
+    def _stop_worker(self):
+        """Stop a running export and wait for the worker thread"""
+        if self.worker:
+            self.worker.stop()
+        if self.worker_thread:
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+            self.worker_thread = None
+            self.worker = None
             
-            # Complete the progress
-            progress.setValue(total_exports)
+    def _on_export_progress(self, current, total):
+        """Handle export progress updates"""
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(current)
+        self.progress_bar.setFormat("%v of %m outputs exported")
+        
+    def _on_export_finished(self, path, count):
+        """Handle the export being written or cancelled"""
+        self._stop_worker()
+        self.progress_bar.setVisible(False)
+        self.buttons.button(QDialogButtonBox.Ok).setEnabled(True)
+        
+        if not path:
+            return
             
-            # Show success message with exported filenames
-            if exported_count > 0:
-                files_list = "\n".join(exported_files[:5])
-                if len(exported_files) > 5:
-                    files_list += f"\n... and {len(exported_files) - 5} more"
-                    
-                QMessageBox.information(
-                    self,
-                    "Export Successful",
-                    f"Exported {exported_count} command outputs to {export_dir}\n\nFiles:\n{files_list}"
-                )
-                self.accept()
-            else:
-                QMessageBox.warning(
-                    self,
-                    "Export Failed",
-                    "Failed to export any commands."
-                )
-        except Exception as e:
-            logger.error(f"Error during batch export: {e}")
-            QMessageBox.critical(
+        if count > 0:
+            QMessageBox.information(
                 self,
-                "Export Error",
-                f"An error occurred during export: {str(e)}"
+                "Export Successful",
+                f"Exported {count} command outputs to {path}"
             )
-        finally:
-            progress.close() 
\ No newline at end of file
+            self.accept()
+        else:
+            QMessageBox.warning(
+                self,
+                "Export Failed",
+                "Failed to export any commands."
+            )
+            
+    def _on_export_failed(self, message):
+        """Handle an error while exporting"""
+        self._stop_worker()
+        self.progress_bar.setVisible(False)
+        self.buttons.button(QDialogButtonBox.Ok).setEnabled(True)
+        
+        QMessageBox.critical(
+            self,
+            "Export Error",
+            f"An error occurred during export: {message}"
+        )
+        
+    def reject(self):
+        """Cancel a running export, or close the dialog"""
+        if self.worker:
+            # Cancelling takes effect after the entries being written
+            self.worker.stop()
+            return
+        super().reject()
+        
+    def closeEvent(self, event):
+        """Handle dialog close event"""
+        self._stop_worker()
+        super().closeEvent(event)
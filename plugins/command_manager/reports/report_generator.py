@@ -5,18 +5,151 @@
 Report generator for the Command Manager plugin
 """
 
+import os
 import datetime
 from pathlib import Path
 from loguru import logger
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal, QObject, QThread
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
     QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
     QFileDialog, QGroupBox, QFormLayout, QCheckBox,
-    QDialogButtonBox, QLineEdit, QComboBox
+    QDialogButtonBox, QLineEdit, QComboBox, QProgressBar
 )
 
+from .report_writers import REPORT_WRITERS, select_outputs
+
+# Report formats in the order of the format combo box
+REPORT_FORMATS = [
+    ("text", "Text Files (*.txt)"),
+    ("html", "HTML Files (*.html)"),
+    ("excel", "Excel Files (*.xlsx)"),
+    ("word", "Word Files (*.docx)")
+]
+
+
+class ReportWorker(QObject):
+    """Worker for generating a report in the background
+    
+    The report is streamed to a temporary file next to the target, which
+    replaces the target once the report is complete; a cancelled or failed
+    report leaves no file behind.
+    """
+    
+    report_progress = Signal(int, int)  # devices written, total devices
+    report_finished = Signal(str)  # report path, empty if cancelled
+    report_failed = Signal(str)  # error message
+    
+    def __init__(self, plugin, report_format, file_path, title, devices, include_device_info=True,
+                 include_all=True, date_from=None, date_to=None, success_only=False):
+        """Initialize the worker
+        
+        Args:
+            plugin: The command manager plugin
+            report_format (str): "text", "html", "excel" or "word"
+            file_path (str): Report file
+            title (str): Report title
+            devices (list): (device ID, device name, device properties) tuples
+            include_device_info (bool): Include the device properties
+            include_all (bool): Include all outputs, otherwise the latest of each command
+            date_from (datetime.date, optional): First day of outputs to include
+            date_to (datetime.date, optional): Last day of outputs to include
+            success_only (bool): Only include successful outputs
+        """
+        super().__init__()
+        
+        self.plugin = plugin
+        self.writer_class = REPORT_WRITERS[report_format]
+        self.file_path = file_path
+        self.title = title
+        self.devices = devices
+        self.include_device_info = include_device_info
+        self.include_all = include_all
+        self.date_from = date_from
+        self.date_to = date_to
+        self.success_only = success_only
+        self.stop_requested = False
+        
+    def stop(self):
+        """Stop after the output being written"""
+        self.stop_requested = True
+        
+    def _write_device(self, writer, device_id, name, properties, last):
+        """Write the section of a device"""
+        writer.begin_device(name, properties if self.include_device_info else None)
+        
+        outputs = self.plugin.get_command_outputs(device_id)
+        if not outputs:
+            writer.write_message("No command outputs available for this device.")
+            writer.end_device(last)
+            return
+            
+        wrote_outputs = False
+        selected = select_outputs(outputs, self.date_from, self.date_to, self.include_all, self.success_only)
+        for command_id, timestamp, data in selected:
+            if self.stop_requested:
+                return
+            try:
+                output = data.get("output") or ""
+            except KeyError:
+                # Removed from the history since it was listed
+                continue
+            writer.write_output(data.get("command") or command_id, timestamp, data.get("success", True), output)
+            wrote_outputs = True
+            
+        if not wrote_outputs:
+            writer.write_message("No matching command outputs for this device.")
+        writer.end_device(last)
+        
+    def run(self):
+        """Generate the report"""
+        partial_path = f"{self.file_path}.part"
+        writer = None
+        total = len(self.devices)
+        logger.debug(f"Generating report {self.file_path} for {total} devices")
+        
+        try:
+            writer = self.writer_class(partial_path, self.title)
+            for index, (device_id, name, properties) in enumerate(self.devices):
+                if self.stop_requested:
+                    break
+                self._write_device(writer, device_id, name, properties, index == total - 1)
+                self.report_progress.emit(index + 1, total)
+                
+            if self.stop_requested:
+                logger.debug("Report generation cancelled")
+                writer.abort()
+                self._remove(partial_path)
+                self.report_finished.emit("")
+                return
+                
+            writer.close()
+            os.replace(partial_path, self.file_path)
+        except Exception as e:
+            logger.error(f"Error generating report: {e}")
+            logger.exception("Exception details:")
+            if writer:
+                try:
+                    writer.abort()
+                except Exception:
+                    pass
+            self._remove(partial_path)
+            self.report_failed.emit(str(e))
+            return
+            
+        logger.info(f"Report saved to {self.file_path}")
+        self.report_finished.emit(self.file_path)
+        
+    @staticmethod
+    def _remove(path):
+        """Delete a partially written report"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
 class ReportGenerator(QDialog):
     """Dialog for generating command output reports"""
     
@@ -25,6 +158,8 @@ class ReportGenerator(QDialog):
         super().__init__(parent)
         
         self.plugin = plugin
+        self.worker = None
+        self.worker_thread = None
         
         # Set dialog properties
         self.setWindowTitle("Generate Command Report")
@@ -103,12 +238,17 @@ class ReportGenerator(QDialog):
         layout.addWidget(device_group)
         layout.addWidget(options_group)
         
+        # Progress of a running report
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        
         # Buttons
-        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        buttons.accepted.connect(self._on_generate)
-        buttons.rejected.connect(self.reject)
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.buttons.accepted.connect(self._on_generate)
+        self.buttons.rejected.connect(self.reject)
         
-        layout.addWidget(buttons)
+        layout.addWidget(self.buttons)
         
     def _load_devices(self):
         """Load device list"""
@@ -142,12 +282,14 @@ class ReportGenerator(QDialog):
         """Handle generate button"""
         # Get selected devices
         selected_devices = []
+        selected_ids = set()
         for item in self.device_table.selectedItems():
             # Make sure we only count each row once
             if item.column() == 0:
                 device_id = item.data(Qt.UserRole)
                 device = self.plugin.device_manager.get_device(device_id)
-                if device and device not in selected_devices:
+                if device and device_id not in selected_ids:
+                    selected_ids.add(device_id)
                     selected_devices.append(device)
         
         # Check if any devices are selected
@@ -159,20 +301,9 @@ class ReportGenerator(QDialog):
             )
             return
             
-        # Determine report format file extension
-        format_index = self.report_format.currentIndex()
-        if format_index == 0:
-            file_ext = "txt"
-            file_type = "Text Files (*.txt)"
-        elif format_index == 1:
-            file_ext = "html"
-            file_type = "HTML Files (*.html)"
-        elif format_index == 2:
-            file_ext = "xlsx"
-            file_type = "Excel Files (*.xlsx)"
-        else:
-            file_ext = "docx"
-            file_type = "Word Files (*.docx)"
+        # Determine report format
+        report_format, file_type = REPORT_FORMATS[self.report_format.currentIndex()]
+        file_ext = REPORT_WRITERS[report_format].extension
             
         # Get output file
         file_path, _ = QFileDialog.getSaveFileName(
@@ -189,554 +320,109 @@ class ReportGenerator(QDialog):
         date_from = None
         date_to = None
         
-        if self.date_from.text().strip():
-            try:
-                date_from = datetime.datetime.strptime(
-                    self.date_from.text().strip(), 
-                    "%Y-%m-%d"
-                )
-            except ValueError:
-                QMessageBox.warning(
-                    self,
-                    "Invalid Date Format",
-                    "Please enter dates in YYYY-MM-DD format."
-                )
-                return
-                
-        if self.date_to.text().strip():
-            try:
-                date_to = datetime.datetime.strptime(
-                    self.date_to.text().strip(),
-                    "%Y-%m-%d"
-                )
-                # Set to end of day
-                date_to = date_to.replace(hour=23, minute=59, second=59)
-            except ValueError:
-                QMessageBox.warning(
-                    self,
-                    "Invalid Date Format",
-                    "Please enter dates in YYYY-MM-DD format."
-                )
-                return
-                
-        # Generate the report
         try:
-            if format_index == 0:
-                # Text report
-                self._generate_text_report(
-                    file_path, 
-                    selected_devices, 
-                    self.report_title.text(),
-                    self.include_device_info.isChecked(),
-                    self.include_all_commands.isChecked(),
-                    date_from,
-                    date_to,
-                    self.success_only.isChecked()
-                )
-            elif format_index == 1:
-                # HTML report
-                self._generate_html_report(
-                    file_path, 
-                    selected_devices, 
-                    self.report_title.text(),
-                    self.include_device_info.isChecked(),
-                    self.include_all_commands.isChecked(),
-                    date_from,
-                    date_to,
-                    self.success_only.isChecked()
-                )
-            elif format_index == 2:
-                # Excel report
-                self._generate_excel_report(
-                    file_path, 
-                    selected_devices, 
-                    self.report_title.text(),
-                    self.include_device_info.isChecked(),
-                    self.include_all_commands.isChecked(),
-                    date_from,
-                    date_to,
-                    self.success_only.isChecked()
-                )
-            else:
-                # Word report
-                self._generate_word_report(
-                    file_path, 
-                    selected_devices, 
-                    self.report_title.text(),
-                    self.include_device_info.isChecked(),
-                    self.include_all_commands.isChecked(),
-                    date_from,
-                    date_to,
-                    self.success_only.isChecked()
-                )
-                
-            # Show success message
-            QMessageBox.information(
-                self,
-                "Report Generated",
-                f"Report saved to {file_path}"
-            )
-            
-            # Close dialog
-            self.accept()
-            
-        except Exception as e:
-            # Show error message
-            QMessageBox.critical(
+            if self.date_from.text().strip():
+                date_from = datetime.datetime.strptime(self.date_from.text().strip(), "%Y-%m-%d").date()
+            if self.date_to.text().strip():
+                date_to = datetime.datetime.strptime(self.date_to.text().strip(), "%Y-%m-%d").date()
+        except ValueError:
+            QMessageBox.warning(
                 self,
-                "Error Generating Report",
-                f"An error occurred while generating the report: {str(e)}"
+                "Invalid Date Format",
+                "Please enter dates in YYYY-MM-DD format."
             )
+            return
             
-    def _generate_text_report(self, file_path, devices, title, include_device_info, 
-                             include_all, date_from, date_to, success_only):
-        """Generate a text report"""
-        with open(file_path, "w") as f:
-            # Write report title
-            f.write(f"{title}\n")
-            f.write("=" * len(title) + "\n\n")
-            
-            # Write date
-            current_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            f.write(f"Generated: {current_date}\n\n")
-            
-            # Process each device
-            for device in devices:
-                # Write device header
-                device_name = device.get_property("alias", "Unnamed Device")
-                f.write(f"Device: {device_name}\n")
-                f.write("-" * (len(device_name) + 8) + "\n\n")
-                
-                # Write device info if requested
-                if include_device_info:
-                    f.write("Device Information:\n")
-                    for key, value in device.get_properties().items():
-                        f.write(f"  {key}: {value}\n")
-                    f.write("\n")
-                
-                # Get command outputs for this device
-                outputs = self.plugin.get_command_outputs(device.id)
-                
-                if not outputs:
-                    f.write("No command outputs available for this device.\n\n")
-                    continue
-                    
-                # Process command outputs
-                f.write("Command Outputs:\n")
-                f.write("-" * 16 + "\n\n")
-                
-                # Track if we've written any outputs for this device
-                wrote_outputs = False
-                
-                for cmd_id, cmd_outputs in outputs.items():
-                    for timestamp, data in sorted(cmd_outputs.items()):
-                        # Apply date filter if provided
-                        if date_from or date_to:
-                            dt = datetime.datetime.fromisoformat(timestamp)
-                            
-                            if date_from and dt < date_from:
-                                continue
-                                
-                            if date_to and dt > date_to:
-                                continue
-                                
-                        # Apply success filter if requested
-                        if success_only and not data.get("success", True):
-                            continue
-                            
-                        # Write command output
-                        cmd_text = data.get("command", cmd_id)
-                        output = data.get("output", "")
-                        success = data.get("success", True)
-                        
-                        dt = datetime.datetime.fromisoformat(timestamp)
-                        date_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-                        
-                        f.write(f"Command: {cmd_text}\n")
-                        f.write(f"Date/Time: {date_str}\n")
-                        f.write(f"Success: {'Yes' if success else 'No'}\n")
-                        f.write("Output:\n")
-                        f.write("-" * 7 + "\n")
-                        f.write(output + "\n\n")
-                        
-                        wrote_outputs = True
-                        
-                        # If we're not including all, just show the most recent
-                        if not include_all:
-                            break
-                
-                if not wrote_outputs:
-                    f.write("No matching command outputs for this device.\n\n")
-                    
-                f.write("\n" + "=" * 50 + "\n\n")
-                
-    def _generate_html_report(self, file_path, devices, title, include_device_info, 
-                             include_all, date_from, date_to, success_only):
-        """Generate an HTML report"""
-        with open(file_path, "w") as f:
-            # Write HTML header
-            f.write(f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>{title}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-        h1 {{ color: #2c3e50; }}
-        h2 {{ color: #3498db; margin-top: 30px; }}
-        h3 {{ color: #2980b9; }}
-        pre {{ background-color: #f5f5f5; padding: 10px; border: 1px solid #ddd; overflow-x: auto; }}
-        .device-info {{ background-color: #eef; padding: 10px; border: 1px solid #ddf; margin-bottom: 20px; }}
-        .command {{ background-color: #efe; padding: 10px; border: 1px solid #dfd; margin-top: 20px; }}
-        .command-failed {{ background-color: #fee; padding: 10px; border: 1px solid #fdd; margin-top: 20px; }}
-        .timestamp {{ color: #777; font-style: italic; }}
-    </style>
-</head>
-<body>
-    <h1>{title}</h1>
-    <p class="timestamp">Generated: {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-""")
-            
-            # Process each device
-            for device in devices:
-                # Write device header
-                device_name = device.get_property("alias", "Unnamed Device")
-                f.write(f'    <h2>Device: {device_name}</h2>\n')
-                
-                # Write device info if requested
-                if include_device_info:
-                    f.write('    <div class="device-info">\n')
-                    f.write('        <h3>Device Information</h3>\n')
-                    f.write('        <table>\n')
-                    
-                    for key, value in device.get_properties().items():
-                        f.write(f'            <tr><td><strong>{key}:</strong></td><td>{value}</td></tr>\n')
-                        
-                    f.write('        </table>\n')
-                    f.write('    </div>\n')
-                
-                # Get command outputs for this device
-                outputs = self.plugin.get_command_outputs(device.id)
-                
-                if not outputs:
-                    f.write('    <p>No command outputs available for this device.</p>\n\n')
-                    continue
-                    
-                # Process command outputs
-                f.write('    <h3>Command Outputs</h3>\n')
-                
-                # Track if we've written any outputs for this device
-                wrote_outputs = False
-                
-                for cmd_id, cmd_outputs in outputs.items():
-                    for timestamp, data in sorted(cmd_outputs.items()):
-                        # Apply date filter if provided
-                        if date_from or date_to:
-                            dt = datetime.datetime.fromisoformat(timestamp)
-                            
-                            if date_from and dt < date_from:
-                                continue
-                                
-                            if date_to and dt > date_to:
-                                continue
-                                
-                        # Apply success filter if requested
-                        if success_only and not data.get("success", True):
-                            continue
-                            
-                        # Write command output
-                        cmd_text = data.get("command", cmd_id)
-                        output = data.get("output", "")
-                        success = data.get("success", True)
-                        
-                        dt = datetime.datetime.fromisoformat(timestamp)
-                        date_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-                        
-                        div_class = "command" if success else "command-failed"
-                        
-                        f.write(f'    <div class="{div_class}">\n')
-                        f.write(f'        <h4>Command: {cmd_text}</h4>\n')
-                        f.write(f'        <p>Date/Time: {date_str}</p>\n')
-                        f.write(f'        <p>Success: {"Yes" if success else "No"}</p>\n')
-                        f.write(f'        <h5>Output:</h5>\n')
-                        f.write(f'        <pre>{output}</pre>\n')
-                        f.write(f'    </div>\n')
-                        
-                        wrote_outputs = True
-                        
-                        # If we're not including all, just show the most recent
-                        if not include_all:
-                            break
-                
-                if not wrote_outputs:
-                    f.write('    <p>No matching command outputs for this device.</p>\n\n')
-                    
-            # Write HTML footer
-            f.write("""</body>
-</html>
-""")
-                
-    def _generate_excel_report(self, file_path, devices, title, include_device_info, 
-                               include_all, date_from, date_to, success_only):
-        """Generate an Excel report"""
-        try:
-            # Try to import openpyxl
-            from openpyxl import Workbook
-            from openpyxl.styles import Font, Alignment, PatternFill
-            from openpyxl.utils import get_column_letter
-        except ImportError:
-            raise RuntimeError("Excel report generation requires the openpyxl module. Please install it with 'pip install openpyxl'.")
+        # Take a snapshot of the devices so the worker does not touch them
+        devices = [
+            (device.id, device.get_property("alias", "Unnamed Device"), device.get_properties())
+            for device in selected_devices
+        ]
+        
+        # Generate the report in the background
+        self.worker_thread = QThread()
+        self.worker = ReportWorker(
+            self.plugin,
+            report_format,
+            file_path,
+            self.report_title.text(),
+            devices,
+            self.include_device_info.isChecked(),
+            self.include_all_commands.isChecked(),
+            date_from,
+            date_to,
+            self.success_only.isChecked()
+        )
+        self.worker.moveToThread(self.worker_thread)
+        
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.report_progress.connect(self._on_report_progress)
+        self.worker.report_finished.connect(self._on_report_finished)
+        self.worker.report_failed.connect(self._on_report_failed)
+        
+        # Update UI
+        self.buttons.button(QDialogButtonBox.Ok).setEnabled(False)
+        self.progress_bar.setRange(0, len(devices))
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        
+        self.worker_thread.start()
+        
+    def _stop_worker(self):
+        """Stop a running report and wait for the worker thread"""
+        if self.worker:
+            self.worker.stop()
+        if self.worker_thread:
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+            self.worker_thread = None
+            self.worker = None
             
-        # Create workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Command Report"
-        
-        # Set up styles
-        title_font = Font(size=14, bold=True)
-        header_font = Font(size=12, bold=True)
-        device_font = Font(size=12, bold=True, color="0000FF")
-        cmd_font = Font(size=11, bold=True)
+    def _on_report_progress(self, current, total):
+        """Handle report progress updates"""
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(current)
         
-        # Write title
-        ws["A1"] = title
-        ws["A1"].font = title_font
-        ws.merge_cells("A1:G1")
+    def _on_report_finished(self, file_path):
+        """Handle the report being written or cancelled"""
+        self._stop_worker()
+        self.progress_bar.setVisible(False)
+        self.buttons.button(QDialogButtonBox.Ok).setEnabled(True)
         
-        # Write generation timestamp
-        ws["A2"] = f"Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        ws.merge_cells("A2:G2")
-        
-        row = 4
-        
-        # Process each device
-        for device in devices:
-            # Write device header
-            device_name = device.get_property("alias", "Unnamed Device")
-            ws[f"A{row}"] = f"Device: {device_name}"
-            ws[f"A{row}"].font = device_font
-            ws.merge_cells(f"A{row}:G{row}")
-            row += 1
-            
-            # Write device info if requested
-            if include_device_info:
-                ws[f"A{row}"] = "Device Information:"
-                ws[f"A{row}"].font = header_font
-                ws.merge_cells(f"A{row}:G{row}")
-                row += 1
-                
-                for key, value in device.get_properties().items():
-                    ws[f"A{row}"] = key
-                    ws[f"B{row}"] = str(value)
-                    ws.merge_cells(f"B{row}:G{row}")
-                    row += 1
-                    
-                row += 1
-            
-            # Get command outputs for this device
-            outputs = self.plugin.get_command_outputs(device.id)
-            
-            if not outputs:
-                ws[f"A{row}"] = "No command outputs available for this device."
-                ws.merge_cells(f"A{row}:G{row}")
-                row += 2
-                continue
-                
-            # Process command outputs
-            ws[f"A{row}"] = "Command Outputs:"
-            ws[f"A{row}"].font = header_font
-            ws.merge_cells(f"A{row}:G{row}")
-            row += 1
-            
-            # Track if we've written any outputs for this device
-            wrote_outputs = False
-            
-            for cmd_id, cmd_outputs in outputs.items():
-                for timestamp, data in sorted(cmd_outputs.items()):
-                    # Apply date filter if provided
-                    if date_from or date_to:
-                        dt = datetime.datetime.fromisoformat(timestamp)
-                        
-                        if date_from and dt < date_from:
-                            continue
-                            
-                        if date_to and dt > date_to:
-                            continue
-                            
-                    # Apply success filter if requested
-                    if success_only and not data.get("success", True):
-                        continue
-                        
-                    # Write command output
-                    cmd_text = data.get("command", cmd_id)
-                    output = data.get("output", "")
-                    success = data.get("success", True)
-                    
-                    dt = datetime.datetime.fromisoformat(timestamp)
-                    
-                    # Command header
-                    ws[f"A{row}"] = "Command:"
-                    ws[f"B{row}"] = cmd_text
-                    ws[f"B{row}"].font = cmd_font
-                    ws.merge_cells(f"B{row}:G{row}")
-                    row += 1
-                    
-                    # Date and success
-                    ws[f"A{row}"] = "Date/Time:"
-                    ws[f"B{row}"] = dt
-                    
-                    ws[f"C{row}"] = "Success:"
-                    ws[f"D{row}"] = "Yes" if success else "No"
-                    
-                    row += 1
-                    
-                    # Output
-                    ws[f"A{row}"] = "Output:"
-                    ws.merge_cells(f"A{row}:G{row}")
-                    row += 1
-                    
-                    # Split output into lines and write
-                    output_lines = output.split("\n")
-                    for line in output_lines:
-                        ws[f"A{row}"] = line
-                        ws.merge_cells(f"A{row}:G{row}")
-                        row += 1
-                        
-                    row += 1
-                    wrote_outputs = True
-                    
-                    # If we're not including all, just show the most recent
-                    if not include_all:
-                        break
-            
-            if not wrote_outputs:
-                ws[f"A{row}"] = "No matching command outputs for this device."
-                ws.merge_cells(f"A{row}:G{row}")
-                row += 1
-                
-            row += 2
-            
-        # Adjust column widths
-        for col in range(1, 8):
-            ws.column_dimensions[get_column_letter(col)].width = 15
+        if not file_path:
+            return
             
-        # Save workbook
-        wb.save(file_path)
+        # Show success message
+        QMessageBox.information(
+            self,
+            "Report Generated",
+            f"Report saved to {file_path}"
+        )
         
-    def _generate_word_report(self, file_path, devices, title, include_device_info, 
-                              include_all, date_from, date_to, success_only):
-        """Generate a Word report"""
-        try:
-            # Try to import python-docx
-            from docx import Document
-            from docx.shared import Pt, RGBColor
-            from docx.enum.text import WD_ALIGN_PARAGRAPH
-        except ImportError:
-            raise RuntimeError("Word report generation requires the python-docx module. Please install it with 'pip install python-docx'.")
-            
-        # Create document
-        doc = Document()
+        # Close dialog
+        self.accept()
         
-        # Set title
-        title_para = doc.add_heading(title, level=0)
+    def _on_report_failed(self, message):
+        """Handle an error while writing the report"""
+        self._stop_worker()
+        self.progress_bar.setVisible(False)
+        self.buttons.button(QDialogButtonBox.Ok).setEnabled(True)
         
-        # Add generation timestamp
-        timestamp_para = doc.add_paragraph(f"Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        QMessageBox.critical(
+            self,
+            "Error Generating Report",
+            f"An error occurred while generating the report: {message}"
+        )
         
-        # Process each device
-        for device in devices:
-            # Add device header
-            device_name = device.get_property("alias", "Unnamed Device")
-            device_para = doc.add_heading(f"Device: {device_name}", level=1)
-            
-            # Add device info if requested
-            if include_device_info:
-                doc.add_heading("Device Information", level=2)
-                
-                # Create a table for device properties
-                property_table = doc.add_table(rows=1, cols=2)
-                property_table.style = "Table Grid"
-                
-                # Add header row
-                header_cells = property_table.rows[0].cells
-                header_cells[0].text = "Property"
-                header_cells[1].text = "Value"
-                
-                # Add properties
-                for key, value in device.get_properties().items():
-                    row_cells = property_table.add_row().cells
-                    row_cells[0].text = key
-                    row_cells[1].text = str(value)
-                    
-                doc.add_paragraph()
-            
-            # Get command outputs for this device
-            outputs = self.plugin.get_command_outputs(device.id)
-            
-            if not outputs:
-                doc.add_paragraph("No command outputs available for this device.")
-                doc.add_paragraph()
-                continue
-                
-            # Process command outputs
-            doc.add_heading("Command Outputs", level=2)
-            
-            # Track if we've written any outputs for this device
-            wrote_outputs = False
-            
-            for cmd_id, cmd_outputs in outputs.items():
-                for timestamp, data in sorted(cmd_outputs.items()):
-                    # Apply date filter if provided
-                    if date_from or date_to:
-                        dt = datetime.datetime.fromisoformat(timestamp)
-                        
-                        if date_from and dt < date_from:
-                            continue
-                            
-                        if date_to and dt > date_to:
-                            continue
-                            
-                    # Apply success filter if requested
-                    if success_only and not data.get("success", True):
-                        continue
-                        
-                    # Write command output
-                    cmd_text = data.get("command", cmd_id)
-                    output = data.get("output", "")
-                    success = data.get("success", True)
-                    
-                    dt = datetime.datetime.fromisoformat(timestamp)
-                    date_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    # Command header
-                    cmd_heading = doc.add_heading(level=3)
-                    cmd_heading.add_run(f"Command: {cmd_text}")
-                    
-                    # Date and success
-                    info_para = doc.add_paragraph()
-                    info_para.add_run(f"Date/Time: {date_str}\n")
-                    info_para.add_run(f"Success: {'Yes' if success else 'No'}")
-                    
-                    # Output
-                    doc.add_heading("Output", level=4)
-                    output_para = doc.add_paragraph()
-                    output_para.style = "No Spacing"
-                    output_run = output_para.add_run(output)
-                    output_run.font.name = "Courier New"
-                    output_run.font.size = Pt(9)
-                    
-                    doc.add_paragraph()
-                    wrote_outputs = True
-                    
-                    # If we're not including all, just show the most recent
-                    if not include_all:
-                        break
-            
-            if not wrote_outputs:
-                doc.add_paragraph("No matching command outputs for this device.")
-                
-            # Add page break after each device except the last
-            if device != devices[-1]:
-                doc.add_page_break()
-                
-        # Save document
-        doc.save(file_path) 
\ No newline at end of file
+    def reject(self):
+        """Cancel a running report, or close the dialog"""
+        if self.worker:
+            # Cancelling takes effect after the output being written
+            self.worker.stop()
+            return
+        super().reject()
+        
+    def closeEvent(self, event):
+        """Handle dialog close event"""
+        self._stop_worker()
+        super().closeEvent(event)
@@ -0,0 +1,402 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Streaming report writers for the Command Manager plugin
+
+Reports are written one device at a time while they are generated, so
+memory use does not grow with the number of devices: text and HTML go
+straight to the file and Excel workbooks use openpyxl's write-only mode,
+which writes rows to disk as they are appended. python-docx has no
+streaming mode, so Word documents are still assembled in memory.
+
+Outputs are selected by their ISO 8601 timestamps, which sort in time
+order as strings: the date range of a command is found by bisecting its
+sorted timestamps, without parsing them.
+"""
+
+import bisect
+import datetime
+import html
+import re
+
+# Characters Excel does not accept in cells (control characters except tab, CR and LF)
+_ILLEGAL_EXCEL_CHARACTERS = re.compile(r"[\000-\010\013\014\016-\037]")
+
+
+def format_timestamp(timestamp):
+    """Format an ISO 8601 timestamp as "YYYY-MM-DD HH:MM:SS" without parsing it"""
+    return timestamp[:19].replace("T", " ")
+
+
+def select_outputs(outputs, date_from=None, date_to=None, include_all=True, success_only=False):
+    """Select the outputs of a device to include in a report
+
+    Args:
+        outputs (dict): {command_id: {timestamp: output}} history of the device
+        date_from (datetime.date, optional): First day to include
+        date_to (datetime.date, optional): Last day to include
+        include_all (bool): Include every output in the range, otherwise
+            only the latest output of each command
+        success_only (bool): Only include successful outputs
+
+    Returns:
+        list: (command_id, timestamp, output) tuples, by command and then oldest first
+    """
+    low = date_from.isoformat() if date_from else None
+    high = (date_to + datetime.timedelta(days=1)).isoformat() if date_to else None
+
+    selected = []
+    for command_id, history in outputs.items():
+        timestamps = sorted(history)
+        start = bisect.bisect_left(timestamps, low) if low else 0
+        end = bisect.bisect_left(timestamps, high) if high else len(timestamps)
+        if include_all:
+            for timestamp in timestamps[start:end]:
+                output = history[timestamp]
+                if not success_only or output.get("success", True):
+                    selected.append((command_id, timestamp, output))
+            continue
+
+        for timestamp in reversed(timestamps[start:end]):
+            output = history[timestamp]
+            if not success_only or output.get("success", True):
+                selected.append((command_id, timestamp, output))
+                break
+    return selected
+
+
+class ReportWriter:
+    """Writes a report device by device
+
+    Subclasses write a format; the report is written to path, which the
+    caller moves into place once the report is complete.
+    """
+
+    extension = ""
+
+    def __init__(self, path, title):
+        """Initialize the writer
+
+        Args:
+            path (str): File to write
+            title (str): Report title
+        """
+        self.path = path
+        self.title = title
+        self.generated = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def begin_device(self, name, properties=None):
+        """Start the section of a device
+
+        Args:
+            name (str): Device name
+            properties (dict, optional): Device information to include
+        """
+        raise NotImplementedError
+
+    def write_output(self, command, timestamp, success, output):
+        """Write a command output of the current device
+
+        Args:
+            command (str): Command text
+            timestamp (str): ISO 8601 timestamp of the output
+            success (bool): Whether the command succeeded
+            output (str): Command output
+        """
+        raise NotImplementedError
+
+    def write_message(self, message):
+        """Write a note such as "No command outputs" for the current device"""
+        raise NotImplementedError
+
+    def end_device(self, last=False):
+        """End the section of the current device
+
+        Args:
+            last (bool): Whether this was the last device of the report
+        """
+
+    def close(self):
+        """Finish and close the report"""
+        raise NotImplementedError
+
+    def abort(self):
+        """Close the report without finishing it"""
+
+
+class TextReportWriter(ReportWriter):
+    """Plain text report"""
+
+    extension = "txt"
+
+    def __init__(self, path, title):
+        super().__init__(path, title)
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write(f"{title}\n")
+        self.file.write("=" * len(title) + "\n\n")
+        self.file.write(f"Generated: {self.generated}\n\n")
+        self._outputs_started = False
+
+    def begin_device(self, name, properties=None):
+        f = self.file
+        f.write(f"Device: {name}\n")
+        f.write("-" * (len(name) + 8) + "\n\n")
+        if properties is not None:
+            f.write("Device Information:\n")
+            for key, value in properties.items():
+                f.write(f"  {key}: {value}\n")
+            f.write("\n")
+        self._outputs_started = False
+
+    def write_output(self, command, timestamp, success, output):
+        f = self.file
+        if not self._outputs_started:
+            f.write("Command Outputs:\n")
+            f.write("-" * 16 + "\n\n")
+            self._outputs_started = True
+        f.write(f"Command: {command}\n")
+        f.write(f"Date/Time: {format_timestamp(timestamp)}\n")
+        f.write(f"Success: {'Yes' if success else 'No'}\n")
+        f.write("Output:\n")
+        f.write("-" * 7 + "\n")
+        f.write(output + "\n\n")
+
+    def write_message(self, message):
+        self.file.write(f"{message}\n\n")
+
+    def end_device(self, last=False):
+        self.file.write("\n" + "=" * 50 + "\n\n")
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+class HtmlReportWriter(ReportWriter):
+    """HTML report"""
+
+    extension = "html"
+
+    STYLE = """        body { font-family: Arial, sans-serif; margin: 20px; }
+        h1 { color: #2c3e50; }
+        h2 { color: #3498db; margin-top: 30px; }
+        h3 { color: #2980b9; }
+        pre { background-color: #f5f5f5; padding: 10px; border: 1px solid #ddd; overflow-x: auto; }
+        .device-info { background-color: #eef; padding: 10px; border: 1px solid #ddf; margin-bottom: 20px; }
+        .command { background-color: #efe; padding: 10px; border: 1px solid #dfd; margin-top: 20px; }
+        .command-failed { background-color: #fee; padding: 10px; border: 1px solid #fdd; margin-top: 20px; }
+        .timestamp { color: #777; font-style: italic; }
+"""
+
+    def __init__(self, path, title):
+        super().__init__(path, title)
+        self.file = open(path, "w", encoding="utf-8")
+        title = html.escape(title)
+        self.file.write(
+            "<!DOCTYPE html>\n<html>\n<head>\n"
+            '    <meta charset="utf-8">\n'
+            f"    <title>{title}</title>\n"
+            f"    <style>\n{self.STYLE}    </style>\n"
+            "</head>\n<body>\n"
+            f"    <h1>{title}</h1>\n"
+            f'    <p class="timestamp">Generated: {self.generated}</p>\n'
+        )
+        self._outputs_started = False
+
+    def begin_device(self, name, properties=None):
+        f = self.file
+        f.write(f"    <h2>Device: {html.escape(name)}</h2>\n")
+        if properties is not None:
+            f.write('    <div class="device-info">\n')
+            f.write("        <h3>Device Information</h3>\n")
+            f.write("        <table>\n")
+            for key, value in properties.items():
+                f.write(f"            <tr><td><strong>{html.escape(str(key))}:</strong></td>"
+                        f"<td>{html.escape(str(value))}</td></tr>\n")
+            f.write("        </table>\n")
+            f.write("    </div>\n")
+        self._outputs_started = False
+
+    def write_output(self, command, timestamp, success, output):
+        f = self.file
+        if not self._outputs_started:
+            f.write("    <h3>Command Outputs</h3>\n")
+            self._outputs_started = True
+        f.write(f'    <div class="{"command" if success else "command-failed"}">\n')
+        f.write(f"        <h4>Command: {html.escape(command)}</h4>\n")
+        f.write(f"        <p>Date/Time: {format_timestamp(timestamp)}</p>\n")
+        f.write(f"        <p>Success: {'Yes' if success else 'No'}</p>\n")
+        f.write("        <h5>Output:</h5>\n")
+        f.write(f"        <pre>{html.escape(output)}</pre>\n")
+        f.write("    </div>\n")
+
+    def write_message(self, message):
+        self.file.write(f"    <p>{html.escape(message)}</p>\n\n")
+
+    def close(self):
+        self.file.write("</body>\n</html>\n")
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+class ExcelReportWriter(ReportWriter):
+    """Excel report written with openpyxl's write-only workbook"""
+
+    extension = "xlsx"
+
+    def __init__(self, path, title):
+        super().__init__(path, title)
+        try:
+            from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+            from openpyxl.utils import get_column_letter
+        except ImportError:
+            raise RuntimeError("Excel report generation requires the openpyxl module. Please install it with 'pip install openpyxl'.")
+
+        self._cell = WriteOnlyCell
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Command Report")
+
+        # Column widths must be set before the first row is written
+        for column in range(1, 8):
+            self.sheet.column_dimensions[get_column_letter(column)].width = 15
+
+        # Fonts are shared by all styled cells
+        self.title_font = Font(size=14, bold=True)
+        self.header_font = Font(size=12, bold=True)
+        self.device_font = Font(size=12, bold=True, color="0000FF")
+        self.command_font = Font(size=11, bold=True)
+
+        self._append(self._styled(title, self.title_font))
+        self._append(f"Generated: {self.generated}")
+        self._append()
+        self._outputs_started = False
+
+    @staticmethod
+    def _clean(value):
+        """Remove characters Excel does not accept"""
+        # Cells hold at most 32767 characters
+        return _ILLEGAL_EXCEL_CHARACTERS.sub("", value)[:32767] if isinstance(value, str) else value
+
+    def _styled(self, value, font):
+        """Create a cell with a font"""
+        cell = self._cell(self.sheet, value=self._clean(value))
+        cell.font = font
+        return cell
+
+    def _append(self, *values):
+        """Write a row"""
+        self.sheet.append([self._clean(value) for value in values])
+
+    def begin_device(self, name, properties=None):
+        self._append(self._styled(f"Device: {name}", self.device_font))
+        if properties is not None:
+            self._append(self._styled("Device Information:", self.header_font))
+            for key, value in properties.items():
+                self._append(key, str(value))
+            self._append()
+        self._outputs_started = False
+
+    def write_output(self, command, timestamp, success, output):
+        if not self._outputs_started:
+            self._append(self._styled("Command Outputs:", self.header_font))
+            self._outputs_started = True
+        self._append("Command:", self._styled(command, self.command_font))
+        self._append("Date/Time:", format_timestamp(timestamp), "Success:", "Yes" if success else "No")
+        self._append("Output:")
+        for line in output.split("\n"):
+            self._append(line)
+        self._append()
+
+    def write_message(self, message):
+        self._append(message)
+
+    def end_device(self, last=False):
+        self._append()
+        self._append()
+
+    def close(self):
+        self.workbook.save(self.path)
+
+    def abort(self):
+        self.workbook.close()
+
+
+class WordReportWriter(ReportWriter):
+    """Word report; python-docx keeps the document in memory until it is saved"""
+
+    extension = "docx"
+
+    def __init__(self, path, title):
+        super().__init__(path, title)
+        try:
+            from docx import Document
+            from docx.shared import Pt
+        except ImportError:
+            raise RuntimeError("Word report generation requires the python-docx module. Please install it with 'pip install python-docx'.")
+
+        self._font_size = Pt(9)
+        self.document = Document()
+        self.document.add_heading(title, level=0)
+        self.document.add_paragraph(f"Generated: {self.generated}")
+        self._outputs_started = False
+
+    def begin_device(self, name, properties=None):
+        doc = self.document
+        doc.add_heading(f"Device: {name}", level=1)
+        if properties is not None:
+            doc.add_heading("Device Information", level=2)
+            table = doc.add_table(rows=1, cols=2)
+            table.style = "Table Grid"
+            header_cells = table.rows[0].cells
+            header_cells[0].text = "Property"
+            header_cells[1].text = "Value"
+            for key, value in properties.items():
+                row_cells = table.add_row().cells
+                row_cells[0].text = key
+                row_cells[1].text = str(value)
+            doc.add_paragraph()
+        self._outputs_started = False
+
+    def write_output(self, command, timestamp, success, output):
+        doc = self.document
+        if not self._outputs_started:
+            doc.add_heading("Command Outputs", level=2)
+            self._outputs_started = True
+        heading = doc.add_heading(level=3)
+        heading.add_run(f"Command: {command}")
+        info = doc.add_paragraph()
+        info.add_run(f"Date/Time: {format_timestamp(timestamp)}\n")
+        info.add_run(f"Success: {'Yes' if success else 'No'}")
+        doc.add_heading("Output", level=4)
+        paragraph = doc.add_paragraph()
+        paragraph.style = "No Spacing"
+        run = paragraph.add_run(output)
+        run.font.name = "Courier New"
+        run.font.size = self._font_size
+        doc.add_paragraph()
+
+    def write_message(self, message):
+        self.document.add_paragraph(message)
+
+    def end_device(self, last=False):
+        if not last:
+            self.document.add_page_break()
+
+    def close(self):
+        self.document.save(self.path)
+
+
+# Writers by report format
+REPORT_WRITERS = {
+    "text": TextReportWriter,
+    "html": HtmlReportWriter,
+    "excel": ExcelReportWriter,
+    "word": WordReportWriter
+}
@@ -22,182 +22,236 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtGui import QAction, QIcon, QFont, QTextCursor
 
+from plugins.command_manager.utils.property_extractor import PropertyBatch
+from plugins.command_manager.utils.command_jobs import STATUS_DONE
+
 
 class CommandWorker(QObject):
-    """Worker for running commands in the background"""
+    """Worker for running commands in the background
+
+    Devices run concurrently through the plugin's command executor; the
+    worker is the single aggregator that emits all signals. With a job,
+    every finished command is checkpointed in the job file and only the
+    job's pending and failed commands are run.
+    """
     
     command_started = Signal(object, object)  # device, command
     command_complete = Signal(object, object, object, object)  # device, command, result, command_set
     command_progress = Signal(int, int)  # current, total
+    properties_extracted = Signal(object)  # {device_id: {property: value}}
     all_commands_complete = Signal()
     
-    def __init__(self, plugin, devices, commands, command_set=None):
-        """Initialize the worker"""
+    def __init__(self, plugin, devices, commands, command_set=None, job=None):
+        """Initialize the worker
+        
+        Args:
+            plugin: The command manager plugin
+            devices (list): Devices to run the commands on
+            commands (list): Command dictionaries, in the order of the job's commands
+            command_set (CommandSet, optional): Command set the commands belong to
+            job (CommandJob, optional): Persisted job checkpointing the run
+        """
         super().__init__()
         
         self.plugin = plugin
         self.devices = devices
         self.commands = commands
         self.command_set = command_set
+        self.job = job
+        # Index of every command in the job, by identity of its dictionary
+        self.command_indexes = {id(command): index for index, command in enumerate(commands)}
         self.stop_requested = False
+        self.executor = None
+        self.completed_commands = 0
+        self.total_commands = 0
+        self.properties = PropertyBatch()
+        
+    def _get_group_names(self, device, device_name):
+        """Get the names of the groups a device belongs to"""
+        from loguru import logger
+        
+        group_names = []
+        try:
+            device_groups = self.plugin.device_manager.get_device_groups_for_device(device.id)
+            
+            for group in device_groups:
+                if isinstance(group, dict) and 'name' in group:
+                    group_names.append(group['name'])
+                elif hasattr(group, 'name'):
+                    group_names.append(group.name)
+                elif hasattr(group, 'get_name'):
+                    group_names.append(group.get_name())
+                else:
+                    group_names.append(str(group))
+            
+            logger.debug(f"Device {device_name} is in groups: {group_names}")
+        except Exception as e:
+            logger.error(f"Error getting device groups for device {device_name}: {e}")
+        return group_names
+        
+    def _get_credentials(self, device, device_name, device_ip, group_names):
+        """Get credentials for a device
+        
+        Tried in this order:
+        1. Device-specific credentials
+        2. Group credentials (if device is in any groups)
+        3. Credentials of the most specific subnet containing the device IP
+        """
+        return self.plugin.get_device_credentials(device.id, device_ip, group_names)
+        
+    def _device_commands(self, device):
+        """Get the commands to run on a device, skipping those the job finished"""
+        if not self.job:
+            return self.commands
+        return [
+            command for index, command in enumerate(self.commands)
+            if self.job.status(device.id, index) != STATUS_DONE
+        ]
+        
+    def _checkpoint(self, device, command, result):
+        """Record a finished command in the job"""
+        if not self.job:
+            return
+        from loguru import logger
+        try:
+            self.job.record(device.id, self.command_indexes[id(command)], result)
+        except Exception as e:
+            logger.error(f"Error checkpointing job {self.job.id}: {e}")
+            
+    def _update_progress(self):
+        """Count a finished command and emit progress"""
+        self.completed_commands += 1
+        self.command_progress.emit(self.completed_commands, self.total_commands)
+        
+    def _on_command_started(self, device, command):
+        """Handle a command starting on a device (aggregator thread)"""
+        from loguru import logger
+        logger.debug(f"Executing command: {command['command']} on device: {device.get_property('ip_address', 'Unknown IP')}")
+        self.command_started.emit(device, command)
+        
+    def _on_command_complete(self, device, command, result):
+        """Handle a finished command (aggregator thread)"""
+        from loguru import logger
+        
+        device_name = device.get_property("alias", device.get_property("hostname", "Unknown Device"))
+        
+        # Emit signal with result
+        self.command_complete.emit(device, command, result, self.command_set)
+        
+        # Add to history if successful
+        if result["success"]:
+            # Create a command ID from the command set and alias
+            command_set_id = ""
+            if self.command_set:
+                command_set_id = f"{self.command_set.device_type}_{self.command_set.firmware_version}"
+                
+            command_id = f"{command_set_id}_{command['alias']}".replace(" ", "_")
+            
+            # Add output to history
+            self.plugin.add_command_output(
+                device.id,
+                command_id,
+                result["output"],
+                command["command"]
+            )
+            logger.debug(f"Command execution successful, output saved for: {device_name}, command: {command['alias']}")
+            
+            # Collect designated device properties, applied in one update after the run
+            self.properties.add(device.id, self.plugin.extract_device_properties(
+                device.id,
+                command_id,
+                result["output"],
+                command["command"]
+            ))
+        else:
+            logger.warning(f"Command execution failed for: {device_name}, command: {command['alias']}")
+            
+        # Checkpoint after the output is stored, so a done item always has its output
+        self._checkpoint(device, command, result)
+        self._update_progress()
         
     def run(self):
         """Run the commands on the devices"""
         from loguru import logger
+        from plugins.command_manager.core.command_executor import DeviceJob, subnet_key, ERROR_CREDENTIALS
         logger.debug(f"Starting command execution for {len(self.devices)} devices and {len(self.commands)} commands")
         
+        # Commands to run per device; a resumed job only runs its pending and failed items
+        device_commands = [(device, self._device_commands(device)) for device in self.devices]
+        
         # Calculate total number of commands for progress tracking
-        total_commands = len(self.devices) * len(self.commands)
-        completed_commands = 0
+        self.total_commands = sum(len(commands) for _device, commands in device_commands)
+        self.completed_commands = 0
         
-        for device in self.devices:
+        # Create the executor up front so a stop request always reaches it
+        self.executor = self.plugin.create_command_executor()
+        if self.stop_requested:
+            self.executor.stop()
+        
+        jobs = []
+        for device, commands in device_commands:
             if self.stop_requested:
                 logger.debug("Stop requested - halting command execution")
                 break
+            if not commands:
+                continue
                 
             # Get device properties for better logging
             device_name = device.get_property("alias", device.get_property("hostname", "Unknown Device"))
             device_ip = device.get_property("ip_address", "Unknown IP")
             logger.debug(f"Processing device: {device_name} ({device_ip})")
             
-            # Get device groups if available
-            device_groups = []
-            try:
-                device_groups = self.plugin.device_manager.get_device_groups_for_device(device.id)
-                
-                # Extract group names for logging
-                group_names = []
-                for group in device_groups:
-                    if isinstance(group, dict) and 'name' in group:
-                        group_names.append(group['name'])
-                    elif hasattr(group, 'name'):
-                        group_names.append(group.name)
-                    elif hasattr(group, 'get_name'):
-                        group_names.append(group.get_name())
-                    else:
-                        group_names.append(str(group))
-                
-                logger.debug(f"Device {device_name} is in groups: {group_names}")
-            except Exception as e:
-                logger.error(f"Error getting device groups for device {device_name}: {e}")
-            
-            # Try to get credentials in this order:
-            # 1. Device-specific credentials
-            # 2. Group credentials (if device is in any groups)
-            # 3. Subnet credentials
-            
-            # Get device-specific credentials
-            credentials = self.plugin.get_device_credentials(device.id, device_ip)
-            
-            # If no device credentials, try group credentials
-            if not credentials and device_groups:
-                for group in device_groups:
-                    try:
-                        # Get group name based on structure
-                        group_name = None
-                        if isinstance(group, dict) and 'name' in group:
-                            group_name = group['name']
-                        elif hasattr(group, 'name'):
-                            group_name = group.name
-                        elif hasattr(group, 'get_name'):
-                            group_name = group.get_name()
-                        else:
-                            group_name = str(group)
-                            
-                        # Get credentials for this group
-                        group_credentials = self.plugin.get_group_credentials(group_name)
-                        if group_credentials:
-                            logger.debug(f"Using group credentials from '{group_name}' for device: {device_name}")
-                            credentials = group_credentials
-                            break
-                    except Exception as e:
-                        logger.error(f"Error getting credentials for group: {e}")
-            
-            # If still no credentials, try subnet credentials
-            if not credentials and device_ip:
-                # Extract subnet
-                parts = device_ip.split('.')
-                if len(parts) == 4:
-                    subnet = f"{parts[0]}.{parts[1]}.{parts[2]}.0/24"
-                    subnet_credentials = self.plugin.get_subnet_credentials(subnet)
-                    if subnet_credentials:
-                        logger.debug(f"Using subnet credentials from '{subnet}' for device: {device_name}")
-                        credentials = subnet_credentials
+            group_names = self._get_group_names(device, device_name)
+            credentials = self._get_credentials(device, device_name, device_ip, group_names)
             
             if not credentials:
                 logger.warning(f"No credentials found for device: {device_name} ({device_ip})")
                 # Emit signal with an error result for each command
-                for command in self.commands:
+                for command in commands:
                     result = {
                         "success": False,
-                        "output": f"Command: {command['command']}\n\nNo credentials available for this device."
+                        "output": f"Command: {command['command']}\n\nNo credentials available for this device.",
+                        "error": ERROR_CREDENTIALS
                     }
                     self.command_complete.emit(device, command, result, self.command_set)
-                    
-                    # Update progress
-                    completed_commands += 1
-                    self.command_progress.emit(completed_commands, total_commands)
+                    self._checkpoint(device, command, result)
+                    self._update_progress()
                 continue
                 
             logger.debug(f"Using credentials for device: {device_name}, type: {credentials.get('connection_type', 'ssh')}")
+            jobs.append(DeviceJob(device, commands, credentials, group_names, subnet_key(device_ip)))
             
-            for command in self.commands:
-                if self.stop_requested:
-                    logger.debug("Stop requested - halting command execution")
-                    break
-                    
-                # Log the command being executed
-                logger.debug(f"Executing command: {command['command']} on device: {device_name}")
-                
-                # Emit signal that we're starting a command
-                self.command_started.emit(device, command)
-                
-                try:
-                    # Run the command
-                    result = self.plugin.run_command(device, command["command"], credentials)
-                    
-                    # Emit signal with result
-                    self.command_complete.emit(device, command, result, self.command_set)
-                    
-                    # Add to history if successful
-                    if result["success"]:
-                        # Create a command ID from the command set and alias
-                        command_set_id = ""
-                        if self.command_set:
-                            command_set_id = f"{self.command_set.device_type}_{self.command_set.firmware_version}"
-                            
-                        command_id = f"{command_set_id}_{command['alias']}".replace(" ", "_")
-                        
-                        # Add output to history
-                        self.plugin.add_command_output(
-                            device.id,
-                            command_id,
-                            result["output"],
-                            command["command"]
-                        )
-                        logger.debug(f"Command execution successful, output saved for: {device_name}, command: {command['alias']}")
-                    else:
-                        logger.warning(f"Command execution failed for: {device_name}, command: {command['alias']}")
-                except Exception as e:
-                    logger.error(f"Error executing command: {command['command']} on device: {device_name}: {e}")
-                    # Create an error result and emit signal
-                    result = {
-                        "success": False,
-                        "output": f"Command: {command['command']}\n\nError: {str(e)}"
-                    }
-                    self.command_complete.emit(device, command, result, self.command_set)
+        if jobs and not self.stop_requested:
+            self.executor.execute(
+                jobs,
+                on_started=self._on_command_started,
+                on_complete=self._on_command_complete
+            )
                 
-                # Update progress
-                completed_commands += 1
-                self.command_progress.emit(completed_commands, total_commands)
+        if self.job:
+            try:
+                self.job.finish(stopped=self.stop_requested)
+            except Exception as e:
+                logger.error(f"Error finishing job {self.job.id}: {e}")
                 
+        if len(self.properties):
+            logger.debug(f"Extracted properties of {len(self.properties)} devices")
+            self.properties_extracted.emit(self.properties.updates)
+            
         # All commands complete
         logger.debug("All commands completed")
         self.all_commands_complete.emit()
         
     def stop(self):
-        """Stop the worker"""
+        """Stop the worker
+        
+        Devices that have not started are skipped; running devices stop
+        after their current command.
+        """
         self.stop_requested = True
+        executor = self.executor
+        if executor:
+            executor.stop()
 
 
 class CommandDialog(QDialog):
@@ -234,6 +288,9 @@ class CommandDialog(QDialog):
         # Pre-select devices if provided
         if self.selected_devices:
             self.set_selected_devices(self.selected_devices)
+            
+        # Offer interrupted runs for resuming
+        self._update_resume_button()
         
     def _create_ui(self):
         """Create the UI components"""
@@ -490,6 +547,9 @@ class CommandDialog(QDialog):
         self.stop_button.setEnabled(False)
         self.stop_button.clicked.connect(self._on_stop)
         
+        self.resume_button = QPushButton("Resume Job...")
+        self.resume_button.clicked.connect(self._on_resume_job)
+        
         self.clear_button = QPushButton("Clear Output")
         self.clear_button.clicked.connect(self._on_clear_output)
         
@@ -502,6 +562,7 @@ class CommandDialog(QDialog):
         button_layout.addWidget(self.run_selected_button)
         button_layout.addWidget(self.run_all_button)
         button_layout.addWidget(self.stop_button)
+        button_layout.addWidget(self.resume_button)
         button_layout.addWidget(self.clear_button)
         button_layout.addWidget(self.export_button)
         button_layout.addStretch()
@@ -1028,6 +1089,9 @@ class CommandDialog(QDialog):
             self.command_table.setItem(row, 1, command_text)
             self.command_table.setItem(row, 2, description)
             
+        # Keep the current search applied to the new commands
+        self._on_search_commands(self.command_search.text())
+        
     def _on_manage_sets(self):
         """Handle manage command sets button"""
         # Open command set editor
@@ -1095,6 +1159,184 @@ class CommandDialog(QDialog):
                 f"Failed to import command set: {e}"
             )
             
+    def _run_commands(self, devices, commands, command_set=None, job=None):
+        """Run commands on devices in a background thread
+        
+        The run is recorded as a job, which can be resumed if it is
+        interrupted.
+        
+        Args:
+            devices: List of devices to run the commands on
+            commands: List of command dictionaries
+            command_set: Optional CommandSet the commands belong to
+            job: Optional CommandJob to resume, created when not given
+        """
+        from loguru import logger
+        
+        if self.worker_thread:
+            QMessageBox.warning(
+                self,
+                "Commands Running",
+                "Commands are already running. Stop them or wait for them to finish."
+            )
+            return
+            
+        logger.debug(f"Running {len(commands)} commands on {len(devices)} devices")
+        
+        if job is None and hasattr(self.plugin, 'create_command_job'):
+            job = self.plugin.create_command_job(devices, commands, command_set)
+        # Only count the job's items of the devices that run; removed devices stay pending
+        if job:
+            device_ids = {device.id for device in devices}
+            total = sum(1 for device_id, _index in job.remaining_items() if device_id in device_ids)
+        else:
+            total = len(devices) * len(commands)
+        
+        # Update UI
+        self.run_selected_button.setEnabled(False)
+        self.run_all_button.setEnabled(False)
+        self.resume_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        
+        # Create worker and thread
+        self.worker_thread = QThread()
+        self.worker = CommandWorker(self.plugin, devices, commands, command_set, job)
+        self.worker.moveToThread(self.worker_thread)
+        
+        # Connect signals
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.command_started.connect(self._on_command_started)
+        self.worker.command_complete.connect(self._on_command_complete)
+        self.worker.command_progress.connect(self._on_command_progress)
+        self.worker.properties_extracted.connect(self._on_properties_extracted)
+        self.worker.all_commands_complete.connect(self._on_all_commands_complete)
+        
+        # Start the thread
+        self.worker_thread.start()
+        
+    def _on_command_started(self, device, command):
+        """Handle a command starting on a device"""
+        device_name = device.get_property("alias", device.get_property("hostname", "Unknown Device"))
+        self.output_label.setText(f"Command Output: running '{command['alias']}' on {device_name}")
+        
+    def _on_command_complete(self, device, command, result, command_set):
+        """Handle a finished command"""
+        device_name = device.get_property("alias", device.get_property("hostname", "Unknown Device"))
+        device_ip = device.get_property("ip_address", "")
+        status = "OK" if result.get("success") else "FAILED"
+        
+        self.output_text.append(f"===== {device_name} ({device_ip}) - {command['command']} [{status}] =====")
+        self.output_text.append(result.get("output", ""))
+        self.output_text.append("")
+        self.output_text.moveCursor(QTextCursor.End)
+        
+    def _on_command_progress(self, current, total):
+        """Handle command progress updates"""
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(current)
+        
+    def _on_properties_extracted(self, updates):
+        """Apply the device properties extracted during the run"""
+        changed = self.plugin.apply_device_properties(updates)
+        if changed:
+            self.output_text.append(f"Updated properties of {changed} devices from command outputs")
+            self.output_text.moveCursor(QTextCursor.End)
+        
+    def _on_all_commands_complete(self):
+        """Handle all commands finishing or being stopped"""
+        job = self.worker.job if self.worker else None
+        
+        # Clean up the worker thread
+        if self.worker_thread:
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+            self.worker_thread = None
+            self.worker = None
+            
+        # Update UI
+        self.output_label.setText("Command Output:")
+        self.progress_bar.setVisible(False)
+        self.run_selected_button.setEnabled(True)
+        self.run_all_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        
+        if job and not job.complete:
+            counts = job.counts()
+            self.output_text.append(
+                f"Job '{job.name}': {counts['pending']} pending and {counts['failed']} failed commands "
+                f"can be run again with Resume Job"
+            )
+            self.output_text.moveCursor(QTextCursor.End)
+        self._update_resume_button()
+        
+    def _update_resume_button(self):
+        """Enable the resume button when there are unfinished jobs"""
+        jobs = []
+        if hasattr(self.plugin, 'get_unfinished_command_jobs'):
+            jobs = self.plugin.get_unfinished_command_jobs()
+        self.resume_button.setEnabled(bool(jobs) and not self.worker_thread)
+        self.resume_button.setToolTip(f"{len(jobs)} unfinished jobs" if jobs else "No unfinished jobs")
+        
+    def _on_resume_job(self):
+        """Resume or discard an unfinished job"""
+        from loguru import logger
+        
+        jobs = self.plugin.get_unfinished_command_jobs()
+        if not jobs:
+            QMessageBox.information(self, "No Unfinished Jobs", "There are no unfinished jobs to resume.")
+            self._update_resume_button()
+            return
+            
+        choices = [f"{index + 1}. {job.description()}" for index, job in enumerate(jobs)]
+        choice, ok = QInputDialog.getItem(self, "Resume Job", "Unfinished jobs:", choices, 0, False)
+        if not ok:
+            return
+        job = jobs[choices.index(choice)]
+        
+        counts = job.counts()
+        box = QMessageBox(self)
+        box.setWindowTitle("Resume Job")
+        box.setText(
+            f"{job.name}\n\n{counts['done']} of {counts['total']} commands are done. "
+            f"{counts['pending']} pending and {counts['failed']} failed commands will be run."
+        )
+        resume_button = box.addButton("Resume", QMessageBox.AcceptRole)
+        discard_button = box.addButton("Discard Job", QMessageBox.DestructiveRole)
+        box.addButton(QMessageBox.Cancel)
+        box.exec()
+        
+        if box.clickedButton() == discard_button:
+            self.plugin.discard_command_job(job.id)
+            self._update_resume_button()
+            return
+        if box.clickedButton() != resume_button:
+            return
+            
+        # Devices removed since the job was created stay pending
+        devices = []
+        for entry in job.devices:
+            device = self.plugin.device_manager.get_device(entry["id"])
+            if device:
+                devices.append(device)
+            else:
+                logger.warning(f"Device {entry['name'] or entry['id']} of job {job.id} no longer exists")
+        if not devices:
+            QMessageBox.warning(self, "No Devices", "None of the devices of this job exist anymore.")
+            return
+            
+        command_set = None
+        if job.command_set:
+            command_set = self.plugin.get_command_set(
+                job.command_set.get("device_type"),
+                job.command_set.get("firmware_version")
+            )
+            
+        self.output_text.append(f"Resuming job '{job.name}'")
+        self._run_commands(devices, job.commands, command_set, job)
+        
     def _on_stop(self):
         """Handle stop button"""
         # Stop the worker
@@ -1163,6 +1405,20 @@ class CommandDialog(QDialog):
             device_item = self.device_table.item(row, 0)
             if device_item and device_item.data(Qt.UserRole) in devices:
                 self.device_table.selectRow(row)
+                
+        # Select the command set matching the devices' properties, if they agree on one
+        command_sets = set()
+        for device in devices:
+            command_set = self.plugin.get_command_set_for_device(device)
+            command_sets.add((command_set.device_type, command_set.firmware_version) if command_set else None)
+        if len(command_sets) == 1 and None not in command_sets:
+            device_type, firmware = command_sets.pop()
+            index = self.device_type_combo.findText(device_type)
+            if index >= 0:
+                self.device_type_combo.setCurrentIndex(index)
+                index = self.firmware_combo.findText(firmware)
+                if index >= 0:
+                    self.firmware_combo.setCurrentIndex(index)
                     
     def closeEvent(self, event):
         """Handle dialog close event"""
@@ -1225,28 +1481,25 @@ class CommandDialog(QDialog):
             )
 
     def _on_search_commands(self, text):
-        """Filter command table based on search text"""
-        search_text = text.lower().strip()
-        
-        # Show all rows if search is empty
-        if not search_text:
-            for row in range(self.command_table.rowCount()):
-                self.command_table.setRowHidden(row, False)
-            return
+        """Filter command table based on search text
         
-        # Hide rows that don't match the search
-        for row in range(self.command_table.rowCount()):
-            match_found = False
-            
-            # Check all columns
-            for col in range(self.command_table.columnCount()):
-                item = self.command_table.item(row, col)
-                if item and search_text in item.text().lower():
-                    match_found = True
-                    break
-            
-            # Show or hide the row
-            self.command_table.setRowHidden(row, not match_found)
+        Every word of the search must start a word of the command's alias,
+        command text or description. Matches come from the plugin's
+        command catalog, which holds the tokens of all command sets.
+        """
+        rows = self.command_table.rowCount()
+        if not text.strip():
+            visible = range(rows)
+        else:
+            device_type = self.device_type_combo.currentText()
+            firmware = self.firmware_combo.currentText()
+            visible = {index for _type, _firmware, index in self.plugin.search_commands(text, device_type, firmware)}
+        
+        # Only touch rows whose visibility changes
+        for row in range(rows):
+            hidden = row not in visible
+            if self.command_table.isRowHidden(row) != hidden:
+                self.command_table.setRowHidden(row, hidden)
             
     def _on_run_custom(self):
         """Handle running a custom command"""
@@ -17,7 +17,9 @@ from PySide6.QtWidgets import (
     QSplitter, QTextEdit, QMenu, QFileDialog, QMessageBox,
     QTreeWidget, QTreeWidgetItem, QDialog, QFormLayout, QLineEdit, QGroupBox, QCheckBox
 )
-from PySide6.QtGui import QAction, QIcon, QFont
+from PySide6.QtGui import QAction, QIcon
+
+from plugins.command_manager.ui.output_viewer import OutputViewer
 
 
 class CommandOutputPanel(QWidget):
@@ -96,7 +98,6 @@ class CommandOutputPanel(QWidget):
             
             # Extract data
             command_text = data.get("command", command_id)
-            output_text = data.get("output", "")
             dt = datetime.datetime.fromisoformat(latest_ts)
             
             # Add row
@@ -143,7 +144,6 @@ class CommandOutputPanel(QWidget):
             
         output_data = outputs[timestamp]
         command_text = output_data.get("command", command_id)
-        output_text = output_data.get("output", "")
         
         # Show output dialog
         dialog = QDialog(self)
@@ -152,11 +152,9 @@ class CommandOutputPanel(QWidget):
         
         layout = QVBoxLayout(dialog)
         
-        # Output text
-        output_edit = QTextEdit()
-        output_edit.setReadOnly(True)
-        output_edit.setFont(QFont("Courier New", 10))
-        output_edit.setText(output_text)
+        # Output text, read from the store in the background
+        output_viewer = OutputViewer()
+        output_viewer.set_output(output_data)
         
         # Export button
         button_layout = QHBoxLayout()
@@ -169,10 +167,11 @@ class CommandOutputPanel(QWidget):
         button_layout.addStretch()
         button_layout.addWidget(close_btn)
         
-        layout.addWidget(output_edit)
+        layout.addWidget(output_viewer)
         layout.addLayout(button_layout)
         
         dialog.exec()
+        output_viewer.clear()
         
     def _on_delete_output(self):
         """Handle delete output button click"""
@@ -223,7 +222,7 @@ class CommandOutputPanel(QWidget):
         # Create a dialog to customize the export filename
         from PySide6.QtWidgets import (
             QDialog, QVBoxLayout, QFormLayout, QLineEdit, QComboBox, 
-            QGroupBox, QLabel, QHBoxLayout, QTextEdit, QPushButton, QCheckBox
+            QGroupBox, QLabel, QHBoxLayout, QPushButton, QCheckBox
         )
         
         template_dialog = QDialog(self)
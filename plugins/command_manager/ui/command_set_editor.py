@@ -15,11 +15,13 @@ from PySide6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView, QComboBox, 
     QLineEdit, QTextEdit, QDialogButtonBox, QSplitter,
     QTabWidget, QWidget, QMessageBox, QGroupBox, QFormLayout,
-    QListWidget, QListWidgetItem, QMenu, QFileDialog
+    QListWidget, QListWidgetItem, QMenu, QFileDialog, QSpinBox
 )
 from PySide6.QtGui import QIcon, QAction
 
 from ..utils.command_set import CommandSet, Command
+from ..utils.retention import RetentionPolicy
+from ..utils.property_extractor import parse_mapping, format_mapping
 
 
 class CommandDialog(QDialog):
@@ -56,6 +58,18 @@ class CommandDialog(QDialog):
         self.description = QTextEdit(self.command.description)
         form.addRow("Description:", self.description)
         
+        self.template = QLineEdit(self.command.template or "")
+        self.template.setPlaceholderText("Derived from the platform and command")
+        form.addRow("Parser Template:", self.template)
+        
+        self.properties = QLineEdit(format_mapping(self.command.properties))
+        self.properties.setPlaceholderText("e.g. serial_number=SERIAL, firmware_version=VERSION")
+        self.properties.setToolTip(
+            "Device properties filled from the parsed output after a run, as property=FIELD pairs.\n"
+            "FIELD[] collects the values of all records."
+        )
+        form.addRow("Device Properties:", self.properties)
+        
         layout.addLayout(form)
         
         # Buttons
@@ -84,6 +98,8 @@ class CommandDialog(QDialog):
         self.command.alias = alias
         self.command.command = command_text
         self.command.description = description
+        self.command.template = self.template.text().strip() or None
+        self.command.properties = parse_mapping(self.properties.text())
         
         # Accept the dialog
         self.accept()
@@ -104,7 +120,7 @@ class CommandSetSettingsDialog(QDialog):
         
         # Set dialog properties
         self.setWindowTitle("Command Set Settings")
-        self.resize(400, 200)
+        self.resize(400, 380)
         
         # Create UI components
         self._create_ui()
@@ -124,8 +140,36 @@ class CommandSetSettingsDialog(QDialog):
         self.firmware = QLineEdit(self.command_set.firmware_version)
         form.addRow("Firmware Version:", self.firmware)
         
+        self.platform = QLineEdit(self.command_set.platform or "")
+        self.platform.setPlaceholderText("e.g. cisco_iosxe")
+        form.addRow("Parser Platform:", self.platform)
+        
         layout.addLayout(form)
         
+        # Retention policy for the outputs of this command set
+        self.retention_group = QGroupBox("Override Default History Retention")
+        self.retention_group.setCheckable(True)
+        self.retention_group.setChecked(bool(self.command_set.retention))
+        retention_form = QFormLayout(self.retention_group)
+        
+        policy = RetentionPolicy.from_dict(self.command_set.retention)
+        self.retention_spins = {}
+        for field, label in (
+            ("keep_last", "Keep Last Outputs:"),
+            ("keep_days", "Keep Younger Than (Days):"),
+            ("daily", "Daily Snapshots:"),
+            ("weekly", "Weekly Snapshots:"),
+            ("monthly", "Monthly Snapshots:")
+        ):
+            spin = QSpinBox()
+            spin.setRange(0, 100000)
+            spin.setSpecialValueText("Off")
+            spin.setValue(getattr(policy, field))
+            retention_form.addRow(label, spin)
+            self.retention_spins[field] = spin
+            
+        layout.addWidget(self.retention_group)
+        
         # Buttons
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         buttons.accepted.connect(self._on_accept)
@@ -150,6 +194,13 @@ class CommandSetSettingsDialog(QDialog):
         # Update command set
         self.command_set.device_type = device_type
         self.command_set.firmware_version = firmware
+        self.command_set.platform = self.platform.text().strip() or None
+        if self.retention_group.isChecked():
+            self.command_set.retention = RetentionPolicy(
+                **{field: spin.value() for field, spin in self.retention_spins.items()}
+            ).to_dict()
+        else:
+            self.command_set.retention = None
         
         # Accept the dialog
         self.accept()
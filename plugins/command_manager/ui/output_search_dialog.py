@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Output search dialog for Command Manager plugin
+"""
+
+import re
+from loguru import logger
+
+from PySide6.QtCore import Qt, QDateTime
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QLineEdit, QComboBox, QGroupBox, QFormLayout, QCheckBox,
+    QDateTimeEdit, QTreeWidget, QTreeWidgetItem, QHeaderView,
+    QTextEdit, QMessageBox
+)
+from PySide6.QtGui import QFont, QTextCursor
+
+
+class OutputSearchDialog(QDialog):
+    """Dialog for searching the command outputs of all devices"""
+
+    MODES = [("Words", "words"), ("Phrase", "phrase"), ("Regular Expression", "regex")]
+
+    def __init__(self, plugin, parent=None):
+        """Initialize the dialog"""
+        super().__init__(parent)
+
+        self.plugin = plugin
+        self.device_names = {}
+        self.setWindowTitle("Search Command Outputs")
+        self.resize(900, 600)
+
+        # Create UI components
+        self._create_ui()
+
+        # Load device groups and commands for the filters
+        self._load_filters()
+
+    def _create_ui(self):
+        """Create the dialog UI"""
+        # Main layout
+        layout = QVBoxLayout(self)
+
+        # Query
+        query_layout = QHBoxLayout()
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("Search outputs, e.g. ip helper-address")
+        self.query_edit.returnPressed.connect(self._on_search)
+        self.mode_combo = QComboBox()
+        for label, mode in self.MODES:
+            self.mode_combo.addItem(label, mode)
+        self.search_btn = QPushButton("Search")
+        self.search_btn.clicked.connect(self._on_search)
+
+        query_layout.addWidget(self.query_edit, 1)
+        query_layout.addWidget(self.mode_combo)
+        query_layout.addWidget(self.search_btn)
+        layout.addLayout(query_layout)
+
+        # Filters
+        filter_group = QGroupBox("Filters")
+        filter_form = QFormLayout(filter_group)
+
+        self.device_combo = QComboBox()
+        filter_form.addRow("Devices:", self.device_combo)
+
+        self.command_combo = QComboBox()
+        filter_form.addRow("Command:", self.command_combo)
+
+        range_layout = QHBoxLayout()
+        self.since_check = QCheckBox("From")
+        self.since_edit = QDateTimeEdit(QDateTime.currentDateTime().addDays(-7))
+        self.since_edit.setCalendarPopup(True)
+        self.since_edit.setEnabled(False)
+        self.since_check.toggled.connect(self.since_edit.setEnabled)
+        self.until_check = QCheckBox("To")
+        self.until_edit = QDateTimeEdit(QDateTime.currentDateTime())
+        self.until_edit.setCalendarPopup(True)
+        self.until_edit.setEnabled(False)
+        self.until_check.toggled.connect(self.until_edit.setEnabled)
+        range_layout.addWidget(self.since_check)
+        range_layout.addWidget(self.since_edit)
+        range_layout.addWidget(self.until_check)
+        range_layout.addWidget(self.until_edit)
+        range_layout.addStretch()
+        filter_form.addRow("Time Range:", range_layout)
+
+        self.latest_check = QCheckBox("Only search the latest output of each command")
+        self.latest_check.setChecked(True)
+        filter_form.addRow("", self.latest_check)
+
+        layout.addWidget(filter_group)
+
+        # Results: one item per output with its matching lines as children
+        self.results_tree = QTreeWidget()
+        self.results_tree.setHeaderLabels(["Device / Line", "Command", "Timestamp"])
+        self.results_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.results_tree.header().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.results_tree.header().setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        self.results_tree.setFont(QFont("Courier New", 9))
+        self.results_tree.itemDoubleClicked.connect(self._on_result_double_clicked)
+        layout.addWidget(self.results_tree)
+
+        # Status and buttons
+        button_layout = QHBoxLayout()
+        self.status_label = QLabel("")
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        button_layout.addWidget(self.status_label)
+        button_layout.addStretch()
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+
+    def _load_filters(self):
+        """Fill the device and command filters"""
+        self.device_combo.addItem("All Devices", None)
+        try:
+            selected = self.plugin.device_manager.get_selected_devices()
+            if selected:
+                self.device_combo.addItem(f"Selected Devices ({len(selected)})",
+                                          [device.id for device in selected])
+
+            for group in self.plugin.device_manager.get_groups():
+                if isinstance(group, dict):
+                    name = group.get("name")
+                    devices = group.get("devices", [])
+                else:
+                    name = getattr(group, "name", str(group))
+                    if hasattr(group, "get_all_devices"):
+                        devices = group.get_all_devices()
+                    else:
+                        devices = getattr(group, "devices", [])
+                device_ids = [getattr(device, "id", device) for device in devices]
+                self.device_combo.addItem(f"Group: {name} ({len(device_ids)})", device_ids)
+        except Exception as e:
+            logger.error(f"Error loading device groups for output search: {e}")
+
+        self.command_combo.addItem("All Commands", None)
+        search_index = getattr(self.plugin.output_handler, "search_index", None)
+        if search_index:
+            for command_id, command in search_index.commands():
+                self.command_combo.addItem(command or command_id, command_id)
+
+    def _device_name(self, device_id):
+        """Get the display name of a device"""
+        if device_id not in self.device_names:
+            name = device_id
+            try:
+                device = self.plugin.device_manager.get_device(device_id)
+                if device:
+                    name = device.get_property("alias", device.get_property("hostname", device_id))
+            except Exception:
+                pass
+            self.device_names[device_id] = name
+        return self.device_names[device_id]
+
+    def _on_search(self):
+        """Handle search button"""
+        query = self.query_edit.text().strip()
+        if not query:
+            return
+
+        commands = self.command_combo.currentData()
+        try:
+            result = self.plugin.search_outputs(
+                query,
+                mode=self.mode_combo.currentData(),
+                devices=self.device_combo.currentData(),
+                commands=[commands] if commands else None,
+                since=self.since_edit.dateTime().toString(Qt.ISODate) if self.since_check.isChecked() else None,
+                until=self.until_edit.dateTime().toString(Qt.ISODate) if self.until_check.isChecked() else None,
+                latest_only=self.latest_check.isChecked()
+            )
+        except (ValueError, re.error) as e:
+            QMessageBox.warning(self, "Invalid Search", f"The search could not be run: {str(e)}")
+            return
+
+        if result is None:
+            QMessageBox.warning(self, "Search Unavailable", "The command output search index is not available.")
+            return
+
+        self._show_results(result)
+
+    def _show_results(self, result):
+        """Fill the results tree"""
+        self.results_tree.clear()
+
+        for match in result["results"]:
+            output_item = QTreeWidgetItem([
+                self._device_name(match["device_id"]),
+                match["command"] or match["command_id"],
+                match["timestamp"]
+            ])
+            output_item.setData(0, Qt.UserRole, match)
+            for number, line in match["lines"]:
+                line_item = QTreeWidgetItem([f"{number:>5}: {line}"])
+                line_item.setData(0, Qt.UserRole, match)
+                line_item.setData(0, Qt.UserRole + 1, number)
+                output_item.addChild(line_item)
+            self.results_tree.addTopLevelItem(output_item)
+            output_item.setExpanded(True)
+
+        status = (f"{len(result['results'])} outputs on {len(result['devices'])} devices "
+                  f"in {result['duration_ms']} ms")
+        if result["truncated"]:
+            status += " (more results not shown, refine the search)"
+        self.status_label.setText(status)
+
+    def _on_result_double_clicked(self, item, column):
+        """Show the output of a result, scrolled to the matching line"""
+        match = item.data(0, Qt.UserRole)
+        if not match:
+            return
+        line_number = item.data(0, Qt.UserRole + 1) or 1
+
+        output_data = self.plugin.get_command_outputs(match["device_id"], match["command_id"]).get(match["timestamp"])
+        if not output_data:
+            QMessageBox.warning(self, "Output Not Found", "The output is no longer in the command history.")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"{self._device_name(match['device_id'])}: {match['command'] or match['command_id']}")
+        dialog.resize(700, 500)
+
+        layout = QVBoxLayout(dialog)
+        output_edit = QTextEdit()
+        output_edit.setReadOnly(True)
+        output_edit.setFont(QFont("Courier New", 10))
+        output_edit.setPlainText(output_data.get("output", ""))
+
+        # Move to the matching line
+        block = output_edit.document().findBlockByLineNumber(line_number - 1)
+        cursor = QTextCursor(block)
+        cursor.select(QTextCursor.LineUnderCursor)
+        output_edit.setTextCursor(cursor)
+        output_edit.ensureCursorVisible()
+
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(dialog.accept)
+        layout.addWidget(output_edit)
+        layout.addWidget(close_btn, 0, Qt.AlignRight)
+        dialog.exec()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Output viewer for Command Manager plugin
+
+Outputs are shown from a memory mapped OutputDocument through a model,
+so the view only asks for (and decodes) the lines that are visible and
+opening an output of any size does not block the UI. Documents are built
+in a background thread. Parsed and detected tables use a model on top of
+the row lists instead of one table item per cell.
+"""
+
+import re
+from loguru import logger
+
+from PySide6.QtCore import Qt, Signal, QObject, QThread, QTimer, QAbstractTableModel, QModelIndex
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
+    QCheckBox, QTableView, QHeaderView, QStackedWidget, QApplication, QAbstractItemView
+)
+from PySide6.QtGui import QFont, QFontMetrics, QKeySequence, QShortcut
+
+from plugins.command_manager.utils.output_document import OutputDocument, compile_search, MAX_LINE_LENGTH
+
+
+# Delay before a search runs while typing (ms)
+SEARCH_DELAY = 200
+
+# Loader threads still running, kept alive when their viewer is gone
+_loaders = set()
+
+
+def natural_key(value):
+    """Sort key that orders numbers in text by value (Gi1/0/9 before Gi1/0/10)"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", value)]
+
+
+class OutputLineModel(QAbstractTableModel):
+    """Lines of an OutputDocument, one row per line"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.document = None
+
+    def set_document(self, document):
+        """Show a document, closing the previous one"""
+        self.beginResetModel()
+        previous, self.document = self.document, document
+        self.endResetModel()
+        if previous is not None and previous is not document:
+            previous.close()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.document is None:
+            return 0
+        return self.document.line_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid() and self.document is not None:
+            return self.document.line(index.row())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Vertical:
+            return str(section + 1)
+        return None
+
+
+class RecordTableModel(QAbstractTableModel):
+    """Read-only table of text rows, sortable by column"""
+
+    def __init__(self, header, rows, parent=None):
+        """Initialize the model
+
+        Args:
+            header (list): Column names
+            rows (list): Rows as lists of strings, missing cells are empty
+        """
+        super().__init__(parent)
+        self.header = list(header)
+        self.rows = rows
+
+    @classmethod
+    def from_parsed(cls, parsed):
+        """Create a model from the records parsed by a template
+
+        Args:
+            parsed (dict): Result of OutputHandler.parse_command_output
+        """
+        header = parsed["header"]
+        rows = []
+        for record in parsed["records"]:
+            row = []
+            for name in header:
+                value = record.get(name, "")
+                row.append(", ".join(value) if isinstance(value, list) else str(value))
+            rows.append(row)
+        return cls([name.replace("_", " ").title() for name in header], rows)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.header)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.DisplayRole, Qt.ToolTipRole) and index.isValid():
+            row = self.rows[index.row()]
+            return row[index.column()] if index.column() < len(row) else ""
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.header[section] if section < len(self.header) else None
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.rows.sort(
+            key=lambda row: natural_key(row[column]) if column < len(row) else [],
+            reverse=order == Qt.DescendingOrder
+        )
+        self.layoutChanged.emit()
+
+
+def create_table_view():
+    """Create a read-only, sortable view for RecordTableModel tables"""
+    view = QTableView()
+    view.setModel(RecordTableModel([], []))
+    view.setSortingEnabled(True)
+    view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    view.setSelectionBehavior(QAbstractItemView.SelectRows)
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    return view
+
+
+def show_table(view, model):
+    """Show a RecordTableModel in a table view, sizing the columns"""
+    view.setModel(model)
+    columns = model.columnCount()
+    for column in range(columns):
+        view.horizontalHeader().setSectionResizeMode(
+            column, QHeaderView.ResizeToContents if column < columns - 1 else QHeaderView.Stretch
+        )
+
+
+class OutputLoader(QObject):
+    """Builds an OutputDocument in a background thread"""
+
+    document_loaded = Signal(object, int)  # document, request
+    load_failed = Signal(str, int)  # error, request
+
+    def __init__(self, output_data, request):
+        super().__init__()
+        self.output_data = output_data
+        self.request = request
+
+    def run(self):
+        try:
+            document = OutputDocument.from_output(self.output_data)
+        except Exception as e:
+            logger.error(f"Error loading command output: {e}")
+            self.load_failed.emit(str(e), self.request)
+            return
+        self.document_loaded.emit(document, self.request)
+
+
+class OutputViewer(QWidget):
+    """Read-only output view that renders only the visible lines, with search"""
+
+    document_loaded = Signal(object)  # OutputDocument
+
+    def __init__(self, parent=None):
+        """Initialize the viewer"""
+        super().__init__(parent)
+
+        self._request = 0
+        self._pattern = None
+        self._match = None  # (start, end) byte offsets of the current match
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DELAY)
+        self._search_timer.timeout.connect(self._on_search_changed)
+
+        self._create_ui()
+
+    def _create_ui(self):
+        """Create the viewer UI"""
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # Search bar
+        search_layout = QHBoxLayout()
+        self.find_edit = QLineEdit()
+        self.find_edit.setPlaceholderText("Find in output")
+        self.find_edit.textChanged.connect(lambda _text: self._search_timer.start())
+        self.find_edit.returnPressed.connect(self.find_next)
+        self.previous_btn = QPushButton("Previous")
+        self.previous_btn.clicked.connect(self.find_previous)
+        self.next_btn = QPushButton("Next")
+        self.next_btn.clicked.connect(self.find_next)
+        self.case_check = QCheckBox("Match case")
+        self.case_check.toggled.connect(self._on_search_changed)
+        self.regex_check = QCheckBox("Regex")
+        self.regex_check.toggled.connect(self._on_search_changed)
+        self.status_label = QLabel()
+
+        search_layout.addWidget(self.find_edit, 1)
+        search_layout.addWidget(self.previous_btn)
+        search_layout.addWidget(self.next_btn)
+        search_layout.addWidget(self.case_check)
+        search_layout.addWidget(self.regex_check)
+        search_layout.addWidget(self.status_label)
+        layout.addLayout(search_layout)
+
+        # Lines, or a message while nothing is shown
+        self.stack = QStackedWidget()
+        self.message_label = QLabel()
+        self.message_label.setAlignment(Qt.AlignCenter)
+        self.message_label.setWordWrap(True)
+
+        self.model = OutputLineModel(self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setFont(QFont("Courier New", 10))
+        self.view.setShowGrid(False)
+        self.view.setWordWrap(False)
+        self.view.setTextElideMode(Qt.ElideNone)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.view.horizontalHeader().hide()
+        self.view.horizontalHeader().setStretchLastSection(False)
+        metrics = QFontMetrics(self.view.font())
+        self._char_width = max(1, metrics.horizontalAdvance("M"))
+        header = self.view.verticalHeader()
+        header.setSectionResizeMode(QHeaderView.Fixed)
+        header.setDefaultSectionSize(metrics.height() + 2)
+        QShortcut(QKeySequence.Copy, self.view, self.copy_selection)
+
+        self.stack.addWidget(self.message_label)
+        self.stack.addWidget(self.view)
+        layout.addWidget(self.stack)
+
+        self.placeholder = ""
+        self._show_message("")
+
+    @property
+    def document(self):
+        """The document shown, or None"""
+        return self.model.document
+
+    def setPlaceholderText(self, text):
+        """Set the message shown while no output is selected"""
+        self.placeholder = text
+        if self.document is None:
+            self._show_message(text)
+
+    def _show_message(self, text):
+        self.message_label.setText(text or self.placeholder)
+        self.stack.setCurrentWidget(self.message_label)
+
+    def set_output(self, output_data):
+        """Show stored output data, loading it in the background
+
+        Args:
+            output_data: OutputRecord or {"output": text} dictionary
+        """
+        self.clear("Loading output...")
+        request = self._request
+
+        thread = QThread()
+        loader = OutputLoader(output_data, request)
+        loader.moveToThread(thread)
+        thread.started.connect(loader.run)
+        loader.document_loaded.connect(self._on_document_loaded)
+        loader.load_failed.connect(self._on_load_failed)
+        loader.document_loaded.connect(thread.quit)
+        loader.load_failed.connect(thread.quit)
+
+        entry = (thread, loader)
+        _loaders.add(entry)
+        thread.finished.connect(lambda: _loaders.discard(entry))
+        thread.start()
+
+    def set_text(self, text):
+        """Show text (built in the calling thread)"""
+        self.clear()
+        self.set_document(OutputDocument.from_text(text))
+
+    def set_document(self, document):
+        """Show a document; the viewer closes it when it is replaced"""
+        self._match = None
+        self.model.set_document(document)
+        width = min(document.max_line_length, MAX_LINE_LENGTH + 4) * self._char_width + 16
+        self.view.setColumnWidth(0, max(width, self.view.viewport().width()))
+        self.stack.setCurrentWidget(self.view)
+        self.status_label.setText(f"{document.line_count:,} lines")
+        self.document_loaded.emit(document)
+        if self.find_edit.text():
+            self._on_search_changed()
+
+    def clear(self, message=None):
+        """Close the shown document and show a message"""
+        self._request += 1
+        self._match = None
+        self.model.set_document(None)
+        self.status_label.clear()
+        self._show_message(message)
+
+    def _on_document_loaded(self, document, request):
+        if request != self._request:
+            # Another output was selected in the meantime
+            document.close()
+            return
+        self.set_document(document)
+
+    def _on_load_failed(self, error, request):
+        if request == self._request:
+            self._show_message(f"Could not load the output: {error}")
+
+    def _compile(self):
+        """Compile the search text, showing errors in the status"""
+        try:
+            return compile_search(self.find_edit.text(), self.case_check.isChecked(), self.regex_check.isChecked())
+        except re.error as e:
+            self.status_label.setText(f"Invalid regular expression: {e}")
+            return None
+
+    def _on_search_changed(self):
+        """Search again from the current match (incremental search)"""
+        self._search_timer.stop()
+        self._pattern = self._compile()
+        if self.document is None or self._pattern is None:
+            return
+        if self._match:
+            position = self._match[0]
+        else:
+            # Start at the first visible line
+            row = max(0, self.view.rowAt(0))
+            position = self.document.line_range(row)[0] if row < self.document.line_count else 0
+        self._find(position)
+
+    def find_next(self):
+        """Go to the next match"""
+        if self._search_timer.isActive() or self._pattern is None:
+            self._search_timer.stop()
+            self._pattern = self._compile()
+        position = 0
+        if self._match:
+            start, end = self._match
+            position = end if end > start else start + 1
+        self._find(position)
+
+    def find_previous(self):
+        """Go to the previous match"""
+        if self._search_timer.isActive() or self._pattern is None:
+            self._search_timer.stop()
+            self._pattern = self._compile()
+        position = self._match[0] if self._match else 0
+        self._find(position, backward=True)
+
+    def _find(self, position, backward=False):
+        """Search and select the line of the match"""
+        document = self.document
+        if document is None or self._pattern is None:
+            return
+        match = document.search(self._pattern, position, backward=backward)
+        self._match = match
+        if match is None:
+            self.status_label.setText("Not found")
+            return
+
+        line = document.line_at(match[0])
+        index = self.model.index(line, 0)
+        self.view.selectRow(line)
+        self.view.scrollTo(index, QAbstractItemView.PositionAtCenter)
+        self.status_label.setText(
+            f"Line {line + 1:,} of {document.line_count:,}, column {document.column_at(match[0]) + 1}"
+        )
+
+    def copy_selection(self):
+        """Copy the selected lines to the clipboard"""
+        document = self.document
+        if document is None:
+            return
+        rows = sorted({index.row() for index in self.view.selectionModel().selectedRows()})
+        if rows:
+            QApplication.clipboard().setText("\n".join(document.line(row, limit=None) for row in rows))
@@ -14,7 +14,7 @@ from PySide6.QtCore import Qt, Signal, Slot
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
     QLineEdit, QComboBox, QGroupBox, QFormLayout, QTabWidget,
-    QTextEdit, QMessageBox
+    QTextEdit, QMessageBox, QWidget, QSpinBox, QCheckBox
 )
 from PySide6.QtGui import QFont
 
@@ -113,6 +113,144 @@ class SettingsDialog(QDialog):
         # Add tab
         self.tab_widget.addTab(export_tab, "Export Settings")
         
+        # Create Execution Settings tab
+        execution_tab = QWidget()
+        execution_layout = QVBoxLayout(execution_tab)
+        
+        execution_group = QGroupBox("Concurrent Execution")
+        execution_form = QFormLayout(execution_group)
+        
+        # Global concurrency
+        self.max_devices_spin = QSpinBox()
+        self.max_devices_spin.setRange(1, 256)
+        execution_form.addRow("Concurrent Devices:", self.max_devices_spin)
+        
+        # Per group and per subnet budgets
+        self.group_concurrency_spin = QSpinBox()
+        self.group_concurrency_spin.setRange(0, 256)
+        self.group_concurrency_spin.setSpecialValueText("No limit")
+        execution_form.addRow("Per Device Group:", self.group_concurrency_spin)
+        
+        self.subnet_concurrency_spin = QSpinBox()
+        self.subnet_concurrency_spin.setRange(0, 256)
+        self.subnet_concurrency_spin.setSpecialValueText("No limit")
+        execution_form.addRow("Per Subnet (/24):", self.subnet_concurrency_spin)
+        
+        self.command_retries_spin = QSpinBox()
+        self.command_retries_spin.setRange(0, 10)
+        self.command_retries_spin.setSpecialValueText("No retries")
+        execution_form.addRow("Connection Retries:", self.command_retries_spin)
+        
+        self.retry_delay_spin = QSpinBox()
+        self.retry_delay_spin.setRange(0, 600)
+        self.retry_delay_spin.setSuffix(" s")
+        self.retry_delay_spin.setToolTip("Delay before the first retry; it doubles with every retry")
+        execution_form.addRow("Retry Delay:", self.retry_delay_spin)
+        
+        # Execution help
+        execution_help = QLabel(
+            "Commands on a single device always run in order. The group and subnet "
+            "limits keep large runs from overloading AAA servers and management networks. "
+            "Commands that fail with a connection error are retried."
+        )
+        execution_help.setWordWrap(True)
+        execution_form.addRow("", execution_help)
+        
+        session_group = QGroupBox("Device Sessions")
+        session_form = QFormLayout(session_group)
+        
+        self.session_pooling_check = QCheckBox("Reuse SSH/Telnet sessions between commands and runs")
+        session_form.addRow("", self.session_pooling_check)
+        
+        self.idle_timeout_spin = QSpinBox()
+        self.idle_timeout_spin.setRange(0, 3600)
+        self.idle_timeout_spin.setSuffix(" s")
+        session_form.addRow("Idle Timeout:", self.idle_timeout_spin)
+        
+        self.max_sessions_spin = QSpinBox()
+        self.max_sessions_spin.setRange(1, 512)
+        session_form.addRow("Maximum Open Sessions:", self.max_sessions_spin)
+        
+        execution_layout.addWidget(execution_group)
+        execution_layout.addWidget(session_group)
+        execution_layout.addStretch()
+        
+        # Add tab
+        self.tab_widget.addTab(execution_tab, "Execution")
+        
+        # Create Storage Settings tab
+        storage_tab = QWidget()
+        storage_layout = QVBoxLayout(storage_tab)
+        
+        storage_group = QGroupBox("Command Output Storage")
+        storage_form = QFormLayout(storage_group)
+        
+        self.delta_compression_check = QCheckBox("Store changed outputs as deltas against the previous output")
+        storage_form.addRow("", self.delta_compression_check)
+        
+        self.output_cache_spin = QSpinBox()
+        self.output_cache_spin.setRange(1, 4096)
+        self.output_cache_spin.setSuffix(" MB")
+        self.output_cache_spin.setToolTip("Memory used to cache outputs read from disk (applies after restart)")
+        storage_form.addRow("Output Cache:", self.output_cache_spin)
+        
+        storage_help = QLabel(
+            "Outputs are always compressed and identical outputs of a device are stored once. "
+            "Deltas further reduce the size of outputs that change a little between runs, "
+            "such as running configurations. Outputs are read from disk when they are viewed, "
+            "exported or reported on, and kept in the output cache."
+        )
+        storage_help.setWordWrap(True)
+        storage_form.addRow("", storage_help)
+        
+        retention_group = QGroupBox("History Retention")
+        retention_form = QFormLayout(retention_group)
+        
+        # Default retention policy; command sets and commands can override it
+        self.retention_spins = {}
+        for field, label, suffix in (
+            ("keep_last", "Keep Last:", " outputs"),
+            ("keep_days", "Keep Everything Younger Than:", " days"),
+            ("daily", "Daily Snapshots:", " days"),
+            ("weekly", "Weekly Snapshots:", " weeks"),
+            ("monthly", "Monthly Snapshots:", " months")
+        ):
+            spin = QSpinBox()
+            spin.setRange(0, 100000)
+            spin.setSuffix(suffix)
+            spin.setSpecialValueText("Off")
+            retention_form.addRow(label, spin)
+            self.retention_spins[field] = spin
+            
+        self.compaction_interval_spin = QSpinBox()
+        self.compaction_interval_spin.setRange(0, 24 * 30)
+        self.compaction_interval_spin.setSuffix(" h")
+        self.compaction_interval_spin.setSpecialValueText("Disabled")
+        retention_form.addRow("Compact Every:", self.compaction_interval_spin)
+        
+        retention_help = QLabel(
+            "Outputs matching any rule are kept, as is the latest output of every command. "
+            "With all rules off the whole history is kept. Retention is applied and deleted "
+            "outputs are reclaimed in the background."
+        )
+        retention_help.setWordWrap(True)
+        retention_form.addRow("", retention_help)
+        
+        compact_layout = QHBoxLayout()
+        self.compact_now_btn = QPushButton("Compact Now")
+        self.compact_now_btn.clicked.connect(self._compact_now)
+        self.compaction_status_label = QLabel()
+        self.compaction_status_label.setWordWrap(True)
+        compact_layout.addWidget(self.compact_now_btn)
+        compact_layout.addWidget(self.compaction_status_label, 1)
+        retention_form.addRow("", compact_layout)
+        
+        storage_layout.addWidget(storage_group)
+        storage_layout.addWidget(retention_group)
+        storage_layout.addStretch()
+        
+        self.tab_widget.addTab(storage_tab, "Storage")
+        
         # Buttons
         button_layout = QHBoxLayout()
         
@@ -142,6 +280,22 @@ class SettingsDialog(QDialog):
         if index >= 0:
             self.command_format_combo.setCurrentIndex(index)
             
+        # Set execution settings
+        self.max_devices_spin.setValue(int(settings["max_concurrent_devices"]["value"]))
+        self.group_concurrency_spin.setValue(int(settings["group_concurrency"]["value"]))
+        self.subnet_concurrency_spin.setValue(int(settings["subnet_concurrency"]["value"]))
+        self.command_retries_spin.setValue(int(settings["command_retries"]["value"]))
+        self.retry_delay_spin.setValue(int(settings["retry_delay"]["value"]))
+        self.session_pooling_check.setChecked(bool(settings["session_pooling"]["value"]))
+        self.idle_timeout_spin.setValue(int(settings["session_idle_timeout"]["value"]))
+        self.max_sessions_spin.setValue(int(settings["max_sessions"]["value"]))
+        self.delta_compression_check.setChecked(bool(settings["delta_compression"]["value"]))
+        self.output_cache_spin.setValue(int(settings["output_cache_size"]["value"]))
+        for field, spin in self.retention_spins.items():
+            spin.setValue(int(settings[f"retention_{field}"]["value"]))
+        self.compaction_interval_spin.setValue(int(settings["compaction_interval"]["value"]))
+        self._update_compaction_status()
+            
     def _save_settings(self):
         """Save settings to the plugin"""
         # Get values from UI
@@ -173,10 +327,47 @@ class SettingsDialog(QDialog):
         self.plugin.settings["export_filename_template"]["value"] = template
         self.plugin.settings["export_date_format"]["value"] = date_format
         self.plugin.settings["export_command_format"]["value"] = command_format
+        self.plugin.settings["max_concurrent_devices"]["value"] = self.max_devices_spin.value()
+        self.plugin.settings["group_concurrency"]["value"] = self.group_concurrency_spin.value()
+        self.plugin.settings["subnet_concurrency"]["value"] = self.subnet_concurrency_spin.value()
+        self.plugin.settings["command_retries"]["value"] = self.command_retries_spin.value()
+        self.plugin.settings["retry_delay"]["value"] = self.retry_delay_spin.value()
+        self.plugin.settings["session_pooling"]["value"] = self.session_pooling_check.isChecked()
+        self.plugin.settings["session_idle_timeout"]["value"] = self.idle_timeout_spin.value()
+        self.plugin.settings["max_sessions"]["value"] = self.max_sessions_spin.value()
+        self.plugin.settings["delta_compression"]["value"] = self.delta_compression_check.isChecked()
+        self.plugin.settings["output_cache_size"]["value"] = self.output_cache_spin.value()
+        for field, spin in self.retention_spins.items():
+            self.plugin.settings[f"retention_{field}"]["value"] = spin.value()
+        self.plugin.settings["compaction_interval"]["value"] = self.compaction_interval_spin.value()
         
         # Close dialog
         self.accept()
         
+    def _update_compaction_status(self):
+        """Show the result of the last history compaction"""
+        output_handler = getattr(self.plugin, "output_handler", None)
+        summary = getattr(output_handler, "last_compaction", None)
+        if not summary:
+            self.compaction_status_label.setText("No compaction has run yet")
+            return
+            
+        self.compaction_status_label.setText(
+            f"Last run {summary.get('finished', '')[:19].replace('T', ' ')}: "
+            f"{summary['outputs_deleted']} outputs deleted, "
+            f"{summary['bytes_reclaimed'] / (1024 * 1024):.1f} MB reclaimed"
+        )
+        
+    def _compact_now(self):
+        """Apply the retention settings shown in the dialog and start a compaction"""
+        for field, spin in self.retention_spins.items():
+            self.plugin.settings[f"retention_{field}"]["value"] = spin.value()
+            
+        if self.plugin.compact_history():
+            self.compaction_status_label.setText("Compaction started in the background")
+        else:
+            self.compaction_status_label.setText("A compaction is already running")
+        
     def _update_preview(self):
         """Update the filename preview"""
         # Get settings from dialog
@@ -0,0 +1,424 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Command set catalog for the Command Manager plugin
+
+The catalog indexes the command set files in the commands directory by
+device type and firmware version. For each file it keeps the modification
+time, size and a summary of its commands (alias, command text,
+description, their lowercase word tokens, parser template, property
+mapping and retention policy, plus the set's platform and retention) in a
+cache file next to the commands directory, so only new and changed files
+are parsed at startup.
+
+Command set bodies (the CommandSet objects) are read from their files when
+a set is first used. The parser template and retention lookups run on
+every command output and compaction, so they use the summaries instead.
+
+Searches match every word of a query against the prefixes of the command
+words (so "sh ip int br" finds "show ip interface brief") through a sorted
+vocabulary with posting lists, built on the first search after a change.
+"""
+
+import os
+import re
+import json
+import bisect
+from collections.abc import Mapping
+from loguru import logger
+
+from .command_set import Command, CommandSet
+
+
+CATALOG_FILE = "command_catalog.json"
+
+# Bump when the cached summary format changes
+CATALOG_VERSION = 2
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def command_tokens(*texts):
+    """Get the sorted lowercase word tokens of texts"""
+    return sorted(set(_WORD.findall(" ".join(text or "" for text in texts).lower())))
+
+
+def legacy_set_name(filename):
+    """Guess the device type and firmware of a legacy command list file
+
+    Legacy files are plain lists of commands named after the device type
+    and firmware, e.g. cisco_ios_xe_16_x.json.
+
+    Args:
+        filename (str): File name without extension
+
+    Returns:
+        tuple: (device_type, firmware_version), "Unknown" when the name has
+            no firmware part
+    """
+    parts = filename.split('_')
+    if len(parts) < 2:
+        logger.warning(f"Could not determine device type and firmware from filename: {filename}")
+        return "Unknown", "Unknown"
+
+    # Check if filename follows the pattern cisco_ios_xe_16_x
+    if "cisco" in parts[0].lower() and "ios" in filename.lower():
+        device_type = "Cisco IOS XE"
+
+        # Get firmware from the last parts
+        firmware = "16.x"  # Default if none found
+        if "16" in filename or "17" in filename:
+            firmware_parts = [part for part in parts if part.isdigit() or part.startswith(("16", "17"))]
+            if firmware_parts:
+                firmware = '.'.join(firmware_parts)
+        return device_type, firmware
+
+    # Generic approach for other devices
+    return ' '.join(parts[:-1]).title(), parts[-1].replace('_', '.')
+
+
+def read_command_set_file(path):
+    """Read a command set file
+
+    Args:
+        path (Path): Command set JSON file, in the standard format or a
+            legacy list of commands
+
+    Returns:
+        dict: Command set in the standard format (device_type,
+            firmware_version, commands and set-wide settings)
+
+    Raises:
+        json.JSONDecodeError: The file is not valid JSON
+        ValueError: The file is empty or not a command set
+    """
+    if path.stat().st_size == 0:
+        raise ValueError("empty command set file")
+
+    with open(path, "r", encoding='utf-8') as f:
+        data = json.load(f)
+
+    # Legacy files are simply lists of commands
+    if isinstance(data, list):
+        device_type, firmware = legacy_set_name(path.stem)
+        logger.debug(f"Extracted device_type={device_type}, firmware={firmware} from {path.name}")
+        return {"device_type": device_type, "firmware_version": firmware, "commands": data}
+
+    if isinstance(data, dict) and "device_type" in data and "firmware_version" in data and "commands" in data:
+        return data
+
+    logger.debug(f"Data structure: {type(data)}, Fields: {list(data.keys()) if isinstance(data, dict) else 'not a dict'}")
+    raise ValueError("invalid command set format")
+
+
+def _summarize(data, stat):
+    """Build the catalog entry of a command set file"""
+    commands = []
+    for command in data.get("commands") or []:
+        # Malformed entries are skipped by CommandSet.from_dict as well
+        if not isinstance(command, dict):
+            continue
+        text = command.get("command", "")
+        alias = command.get("alias") or text
+        description = command.get("description", "")
+        commands.append([alias, text, description, command_tokens(alias, text, description),
+                         command.get("template"), command.get("properties") or {}, command.get("retention")])
+
+    return {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "device_type": data["device_type"],
+        "firmware_version": data["firmware_version"],
+        "platform": data.get("platform"),
+        "retention": data.get("retention"),
+        "commands": commands
+    }
+
+
+class CommandCatalog:
+    """Index of the command set files by device type and firmware version"""
+
+    def __init__(self, commands_dir, cache_path):
+        """Initialize the catalog
+
+        Args:
+            commands_dir (Path): Directory with the command set files
+            cache_path (Path): Cache file for the catalog entries
+        """
+        self.commands_dir = commands_dir
+        self.cache_path = cache_path
+        self._files = {}  # {file name: entry}
+        self._sets = {}  # {device_type: {firmware: file name}}
+        self._loaded = {}  # {file name: CommandSet}
+        self._index = None  # (vocabulary, postings, commands), built on search
+        self.sets = CommandSetMapping(self)
+
+    def _load_cache(self):
+        """Read the cached entries, or none if the cache is missing or stale"""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("version") == CATALOG_VERSION:
+                return cache.get("files", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable command catalog cache {self.cache_path}: {e}")
+        return {}
+
+    def _save_cache(self):
+        """Write the entries to the cache file"""
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CATALOG_VERSION, "files": self._files}, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Could not save command catalog cache {self.cache_path}: {e}")
+
+    def refresh(self):
+        """Index new and changed command set files
+
+        Files whose modification time and size match their cached entry
+        are not read.
+
+        Returns:
+            list: (path, exception) of the files that could not be read
+        """
+        cached = self._files or self._load_cache()
+        paths = sorted(self.commands_dir.glob("*.json"))
+        files = {}
+        problems = []
+        changed = cached.keys() != {path.name for path in paths}
+
+        for path in paths:
+            try:
+                stat = path.stat()
+                entry = cached.get(path.name)
+                if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                    logger.info(f"Indexing command set file {path}")
+                    entry = _summarize(read_command_set_file(path), stat)
+                    self._loaded.pop(path.name, None)
+                    changed = True
+                files[path.name] = entry
+            except Exception as e:
+                problems.append((path, e))
+                changed = True
+
+        self._files = files
+        self._loaded = {name: command_set for name, command_set in self._loaded.items() if name in files}
+        self._build_sets()
+        if changed:
+            self._save_cache()
+        logger.debug(f"Command catalog has {len(files)} files, {len(problems)} could not be read")
+        return problems
+
+    def _build_sets(self):
+        """Map device types and firmware versions to files (later files win)"""
+        self._sets = {}
+        for name, entry in self._files.items():
+            self._sets.setdefault(entry["device_type"], {})[entry["firmware_version"]] = name
+        self._index = None
+
+    def device_types(self):
+        """Get the device types with command sets"""
+        return list(self._sets)
+
+    def firmware_versions(self, device_type):
+        """Get the firmware versions with command sets for a device type"""
+        return list(self._sets.get(device_type, {}))
+
+    def command_count(self, device_type, firmware_version):
+        """Get the number of commands in a set without loading it"""
+        name = self._sets.get(device_type, {}).get(firmware_version)
+        return len(self._files[name]["commands"]) if name else 0
+
+    def command_settings(self):
+        """Get the parser and retention settings of all commands without loading sets
+
+        Returns:
+            list: (command_id, command text, template name, properties,
+                retention) of every command, in catalog order. The template
+                name is None for commands without a template and platform,
+                the retention dict falls back to the set's and is None
+                without either.
+        """
+        settings = []
+        for device_type, firmware_sets in self._sets.items():
+            for firmware_version, name in firmware_sets.items():
+                entry = self._files[name]
+                command_set = CommandSet(device_type, firmware_version, platform=entry.get("platform"))
+                for alias, text, description, _tokens, template, properties, retention in entry["commands"]:
+                    command = Command(text, alias, description, retention, template, properties)
+                    settings.append((
+                        command_set.get_command_id(command),
+                        text,
+                        command_set.get_template_name(command),
+                        command.properties,
+                        retention or entry.get("retention")
+                    ))
+        return settings
+
+    def load(self, device_type, firmware_version):
+        """Get a command set, reading its file on first use
+
+        The returned set is shared; copy it before changing it.
+
+        Raises:
+            KeyError: There is no such command set
+        """
+        name = self._sets[device_type][firmware_version]
+        command_set = self._loaded.get(name)
+        if command_set is None:
+            data = read_command_set_file(self.commands_dir / name)
+            command_set = CommandSet.from_dict(dict(data, device_type=device_type, firmware_version=firmware_version))
+            self._loaded[name] = command_set
+            logger.debug(f"Loaded command set {device_type} ({firmware_version}) from {name}")
+        return command_set
+
+    def _file_name(self, command_set):
+        """Get the file of a command set, naming new ones after it"""
+        name = self._sets.get(command_set.device_type, {}).get(command_set.firmware_version)
+        if name:
+            return name
+        # Use lowercase to maintain consistent filenames
+        device_type_safe = command_set.device_type.lower().replace(' ', '_')
+        firmware_safe = command_set.firmware_version.replace('.', '_')
+        return f"{device_type_safe}_{firmware_safe}.json"
+
+    def save(self, command_set):
+        """Write a command set to its file and update the catalog
+
+        Returns:
+            Path: The command set file
+        """
+        name = self._file_name(command_set)
+        path = self.commands_dir / name
+        data = command_set.to_dict()
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+        self._files[name] = _summarize(data, path.stat())
+        self._loaded[name] = command_set
+        self._build_sets()
+        self._save_cache()
+        return path
+
+    def remove(self, device_type, firmware_version):
+        """Delete a command set's file
+
+        Returns:
+            bool: Whether the command set existed
+        """
+        name = self._sets.get(device_type, {}).get(firmware_version)
+        if not name:
+            return False
+        try:
+            (self.commands_dir / name).unlink()
+        except FileNotFoundError:
+            pass
+        del self._files[name]
+        self._loaded.pop(name, None)
+        self._build_sets()
+        self._save_cache()
+        return True
+
+    def _search_index(self):
+        """Get the sorted vocabulary and posting lists of the commands"""
+        if self._index is None:
+            postings = {}
+            commands = []
+            for device_type, firmware_sets in self._sets.items():
+                for firmware_version, name in firmware_sets.items():
+                    for position, command in enumerate(self._files[name]["commands"]):
+                        for token in command[3]:
+                            postings.setdefault(token, []).append(len(commands))
+                        commands.append((device_type, firmware_version, position))
+            self._index = (sorted(postings), postings, commands)
+        return self._index
+
+    def search(self, query, device_type=None, firmware_version=None, limit=None):
+        """Find commands matching every word of a query as word prefixes
+
+        Args:
+            query (str): Words or word prefixes, in any order
+            device_type (str, optional): Only search this device type's sets
+            firmware_version (str, optional): Only search this firmware's sets
+            limit (int, optional): Maximum number of results
+
+        Returns:
+            list: (device_type, firmware_version, command index) of the
+                matching commands, in catalog order
+        """
+        terms = set(_WORD.findall(query.lower()))
+        if not terms:
+            return []
+
+        vocabulary, postings, commands = self._search_index()
+        matches = None
+        # Longer prefixes match fewer words, so they narrow the results fastest
+        for term in sorted(terms, key=len, reverse=True):
+            found = set()
+            position = bisect.bisect_left(vocabulary, term)
+            while position < len(vocabulary) and vocabulary[position].startswith(term):
+                found.update(postings[vocabulary[position]])
+                position += 1
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+
+        results = []
+        for command_id in sorted(matches):
+            result = commands[command_id]
+            if device_type is not None and result[0] != device_type:
+                continue
+            if firmware_version is not None and result[1] != firmware_version:
+                continue
+            results.append(result)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+class CommandSetMapping(Mapping):
+    """{device_type: {firmware: CommandSet}} view of a catalog that loads sets on access"""
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+
+    def __getitem__(self, device_type):
+        if device_type not in self._catalog._sets:
+            raise KeyError(device_type)
+        return _FirmwareSets(self._catalog, device_type)
+
+    def __iter__(self):
+        return iter(self._catalog.device_types())
+
+    def __len__(self):
+        return len(self._catalog._sets)
+
+    def __contains__(self, device_type):
+        return device_type in self._catalog._sets
+
+
+class _FirmwareSets(Mapping):
+    """{firmware: CommandSet} of one device type"""
+
+    def __init__(self, catalog, device_type):
+        self._catalog = catalog
+        self._device_type = device_type
+
+    def __getitem__(self, firmware_version):
+        if firmware_version not in self._catalog._sets.get(self._device_type, {}):
+            raise KeyError(firmware_version)
+        return self._catalog.load(self._device_type, firmware_version)
+
+    def __iter__(self):
+        return iter(self._catalog.firmware_versions(self._device_type))
+
+    def __len__(self):
+        return len(self._catalog._sets.get(self._device_type, {}))
+
+    def __contains__(self, firmware_version):
+        return firmware_version in self._catalog._sets.get(self._device_type, {})
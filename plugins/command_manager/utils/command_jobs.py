@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Persisted batch command jobs for the Command Manager plugin
+
+Every run from the command dialog is recorded as a job, so that a run
+interrupted by a crash, a sleeping laptop or the Stop button can be
+resumed instead of rerun. A job is a JSON lines file in the jobs
+directory:
+
+- the first line describes the job: its commands, its devices and the
+  command set the commands belong to
+- every finished work item (one command on one device) appends a line
+  with its status ("done" or "failed"), the number of attempts and the
+  error of a failure
+- a stopped run appends an end line
+
+Replaying the file gives the status of every item; items without a line
+are pending. Resuming a job runs only its pending and failed items.
+Lines are flushed as they are written and fsynced in batches, so a
+checkpoint costs one small append; a partially written last line (from a
+crash while appending) is cut off when the job is loaded.
+
+Jobs whose items are all done are deleted when their run finishes.
+"""
+
+import os
+import json
+import time
+import uuid
+import datetime
+from pathlib import Path
+from loguru import logger
+
+JOB_SUFFIX = ".job"
+
+# Work item status
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Line types of a job file
+RECORD_JOB = "job"
+RECORD_ITEM = "item"
+RECORD_END = "end"
+
+
+class CommandJob:
+    """Device x command work items of a run and their status"""
+
+    def __init__(self, path, header, fsync_batch=32, fsync_interval=2.0):
+        """Initialize the job
+
+        Args:
+            path (Path): Job file
+            header (dict): Job description, the first line of the file
+            fsync_batch (int): Number of checkpoints after which the file is fsynced
+            fsync_interval (float): Seconds after which pending checkpoints are fsynced
+        """
+        self.path = Path(path)
+        self.header = header
+        self.items = {}  # {(device_id, command_index): item record}
+        self.stopped = False
+        self.fsync_batch = max(1, int(fsync_batch))
+        self.fsync_interval = fsync_interval
+
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    @property
+    def id(self):
+        """Job ID"""
+        return self.header["id"]
+
+    @property
+    def name(self):
+        """Job name"""
+        return self.header.get("name", "")
+
+    @property
+    def created(self):
+        """Creation time (ISO timestamp)"""
+        return self.header.get("created", "")
+
+    @property
+    def commands(self):
+        """Command dictionaries, by index"""
+        return self.header["commands"]
+
+    @property
+    def devices(self):
+        """{"id", "name"} dictionaries of the devices, in run order"""
+        return self.header["devices"]
+
+    @property
+    def command_set(self):
+        """{"device_type", "firmware_version"} of the command set, or None"""
+        return self.header.get("command_set")
+
+    @classmethod
+    def create(cls, directory, name, devices, commands, command_set=None):
+        """Create a job file
+
+        Args:
+            directory (Path): Jobs directory
+            name (str): Job name
+            devices (list): {"id", "name"} dictionaries
+            commands (list): Command dictionaries ("command", "alias", ...)
+            command_set (dict, optional): {"device_type", "firmware_version"}
+
+        Returns:
+            CommandJob: The new job
+        """
+        now = datetime.datetime.now()
+        header = {
+            "type": RECORD_JOB,
+            "id": f"{now.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}",
+            "name": name,
+            "created": now.isoformat(),
+            "command_set": command_set,
+            # Only the fields needed to run and store outputs
+            "commands": [
+                {key: command[key] for key in ("command", "alias", "description") if key in command}
+                for command in commands
+            ],
+            "devices": [{"id": str(device["id"]), "name": device.get("name", "")} for device in devices]
+        }
+        job = cls(Path(directory) / f"{header['id']}{JOB_SUFFIX}", header)
+        job._append(header)
+        job.sync()
+        return job
+
+    @classmethod
+    def load(cls, path):
+        """Load a job by replaying its file
+
+        Args:
+            path (Path): Job file
+
+        Returns:
+            CommandJob: The job, or None if the file has no valid header
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+
+        # Cut off a partially written last line from an interrupted append,
+        # so the next checkpoint starts on a line of its own
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            logger.warning(f"Removing incomplete checkpoint at the end of job {path}")
+            with open(path, "r+b") as f:
+                f.truncate(end)
+
+        job = None
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Ignoring invalid line in job {path}")
+                continue
+            kind = record.get("type")
+            if kind == RECORD_JOB:
+                job = cls(path, record)
+            elif job is None:
+                continue
+            elif kind == RECORD_ITEM:
+                job.items[(record["device"], record["command"])] = record
+                job.stopped = False
+            elif kind == RECORD_END:
+                job.stopped = record.get("stopped", False)
+        return job
+
+    def status(self, device_id, command_index):
+        """Get the status of a work item"""
+        record = self.items.get((str(device_id), command_index))
+        return record["status"] if record else STATUS_PENDING
+
+    def remaining_items(self):
+        """Get the pending and failed items, in job order
+
+        Returns:
+            list: (device ID, command index) tuples
+        """
+        return [
+            (device["id"], index)
+            for device in self.devices
+            for index in range(len(self.commands))
+            if self.status(device["id"], index) != STATUS_DONE
+        ]
+
+    def counts(self):
+        """Count the items by status
+
+        Returns:
+            dict: total, done, failed and pending item counts
+        """
+        total = len(self.devices) * len(self.commands)
+        done = sum(1 for record in self.items.values() if record["status"] == STATUS_DONE)
+        failed = sum(1 for record in self.items.values() if record["status"] == STATUS_FAILED)
+        return {"total": total, "done": done, "failed": failed, "pending": total - done - failed}
+
+    @property
+    def complete(self):
+        """Whether every item is done"""
+        counts = self.counts()
+        return counts["done"] == counts["total"]
+
+    def description(self):
+        """Describe the job for lists, e.g. "Nightly (2025-05-14 12:04): 1200/4000 done, 3 failed" """
+        counts = self.counts()
+        text = f"{self.name} ({self.created[:16].replace('T', ' ')}): {counts['done']}/{counts['total']} done"
+        if counts["failed"]:
+            text += f", {counts['failed']} failed"
+        return text
+
+    def record(self, device_id, command_index, result):
+        """Checkpoint a finished work item
+
+        Args:
+            device_id (str): Device ID
+            command_index (int): Index of the command in the job
+            result (dict): Command result ("success", "output", optional
+                "error" and "attempts")
+        """
+        record = {
+            "type": RECORD_ITEM,
+            "device": str(device_id),
+            "command": command_index,
+            "status": STATUS_DONE if result.get("success") else STATUS_FAILED,
+            "attempts": result.get("attempts", 1),
+            "time": datetime.datetime.now().isoformat()
+        }
+        if not result.get("success"):
+            record["error"] = result.get("error") or "command"
+        self.items[(record["device"], command_index)] = record
+        self._append(record)
+        self._note_write()
+
+    def finish(self, stopped=False):
+        """Finish a run of the job
+
+        A job whose items are all done is deleted; otherwise the end of
+        the run is recorded and the job can be resumed.
+
+        Args:
+            stopped (bool): Whether the run was stopped before all items ran
+        """
+        if self.complete:
+            self.close()
+            try:
+                self.path.unlink()
+            except OSError as e:
+                logger.error(f"Error deleting finished job {self.path}: {e}")
+            return
+
+        self.stopped = stopped
+        self._append({"type": RECORD_END, "stopped": stopped, "time": datetime.datetime.now().isoformat()})
+        self.close()
+
+    def _append(self, record):
+        """Append a line to the job file and flush it"""
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def _note_write(self):
+        """Count a checkpoint and fsync when the batch is full or old enough"""
+        self._pending += 1
+        if self._pending >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """Fsync the checkpoints written so far"""
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Fsync and close the job file"""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+
+class JobStore:
+    """Directory of persisted command jobs"""
+
+    def __init__(self, directory):
+        """Initialize the store
+
+        Args:
+            directory (str): Directory holding the job files
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def create(self, name, devices, commands, command_set=None):
+        """Create a job, see CommandJob.create"""
+        job = CommandJob.create(self.directory, name, devices, commands, command_set)
+        logger.debug(f"Created command job {job.id}: {len(commands)} commands on {len(devices)} devices")
+        return job
+
+    def get(self, job_id):
+        """Load a job by ID, or None if it does not exist"""
+        path = self.directory / f"{job_id}{JOB_SUFFIX}"
+        if not path.exists():
+            return None
+        return CommandJob.load(path)
+
+    def jobs(self):
+        """Load all jobs, newest first"""
+        jobs = []
+        for path in self.directory.glob(f"*{JOB_SUFFIX}"):
+            try:
+                job = CommandJob.load(path)
+            except OSError as e:
+                logger.error(f"Error loading command job {path}: {e}")
+                continue
+            if job:
+                jobs.append(job)
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def unfinished(self):
+        """Load the jobs with pending or failed items, newest first"""
+        return [job for job in self.jobs() if not job.complete]
+
+    def delete(self, job_id):
+        """Delete a job
+
+        Returns:
+            bool: Whether the job existed
+        """
+        path = self.directory / f"{job_id}{JOB_SUFFIX}"
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        logger.debug(f"Deleted command job {job_id}")
+        return True
@@ -5,41 +5,58 @@
 Command Set utility class for Command Manager plugin
 """
 
+from .output_parser import template_name
+
 class Command:
     """Represents a single command"""
     
-    def __init__(self, command, alias, description):
+    def __init__(self, command, alias, description, retention=None, template=None, properties=None):
         """Initialize a command"""
         self.command = command
         self.alias = alias
         self.description = description
+        self.retention = retention  # retention policy dict overriding the command set's
+        self.template = template  # parser template name overriding the command set platform's
+        self.properties = properties or {}  # {device property: template value name} filled from parsed output
         
     def to_dict(self):
         """Convert to dictionary"""
-        return {
+        data = {
             "command": self.command,
             "alias": self.alias,
             "description": self.description
         }
+        if self.retention:
+            data["retention"] = self.retention
+        if self.template:
+            data["template"] = self.template
+        if self.properties:
+            data["properties"] = dict(self.properties)
+        return data
         
     @classmethod
     def from_dict(cls, data):
         """Create from dictionary"""
         return cls(
             data.get("command", ""),
-            data.get("alias", ""),
-            data.get("description", "")
+            data.get("alias") or data.get("command", ""),
+            data.get("description", ""),
+            data.get("retention"),
+            data.get("template"),
+            data.get("properties")
         )
 
 
 class CommandSet:
     """Represents a set of commands for a device type and firmware version"""
     
-    def __init__(self, device_type, firmware_version, commands=None):
+    def __init__(self, device_type, firmware_version, commands=None, retention=None, platform=None):
         """Initialize a command set"""
         self.device_type = device_type
         self.firmware_version = firmware_version
         self.commands = commands or []
+        self.retention = retention  # retention policy dict overriding the plugin default
+        self.platform = platform  # parser template prefix, e.g. "cisco_iosxe"
         
     def add_command(self, command):
         """Add a command to the set"""
@@ -56,13 +73,35 @@ class CommandSet:
             return self.commands[index]
         return None
         
+    def get_command_id(self, command):
+        """Get the history ID of a command in this set"""
+        return f"{self.device_type}_{self.firmware_version}_{command.alias}".replace(" ", "_")
+        
+    def get_template_name(self, command):
+        """Get the name of the parser template for the outputs of a command
+        
+        Returns:
+            str: The command's own template, else the one named after the
+                platform and command text, or None without a platform
+        """
+        if command.template:
+            return command.template
+        if self.platform:
+            return template_name(self.platform, command.command)
+        return None
+        
     def to_dict(self):
         """Convert to dictionary"""
-        return {
+        data = {
             "device_type": self.device_type,
             "firmware_version": self.firmware_version,
             "commands": [cmd.to_dict() for cmd in self.commands]
         }
+        if self.retention:
+            data["retention"] = self.retention
+        if self.platform:
+            data["platform"] = self.platform
+        return data
         
     @classmethod
     def from_dict(cls, data):
@@ -70,12 +109,16 @@ class CommandSet:
         # Create command set
         command_set = cls(
             data.get("device_type", ""),
-            data.get("firmware_version", "")
+            data.get("firmware_version", ""),
+            retention=data.get("retention"),
+            platform=data.get("platform")
         )
         
-        # Add commands
+        # Add commands, skipping malformed entries
         commands_data = data.get("commands", [])
         for cmd_data in commands_data:
+            if not isinstance(cmd_data, dict):
+                continue
             command = Command.from_dict(cmd_data)
             command_set.add_command(command)
             
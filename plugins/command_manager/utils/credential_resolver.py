@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compiled credential resolution for the Command Manager plugin
+
+Resolving the credentials of a device tries, in order, the credentials
+stored on the device, the credentials of the first of its groups that
+has any, and the credentials of the most specific subnet containing its
+IP address. A batch run resolves credentials for every device, so the
+resolver keeps:
+
+- decrypted device secrets, validated against the encrypted values so an
+  edit made elsewhere is never served stale
+- a map from device ID to the group whose credentials apply
+- a radix tree over the credential subnets for longest-prefix matching
+  across any prefix length, IPv4 and IPv6
+
+Each is built on first use and dropped when the credentials, groups or
+devices it depends on change, so steady-state resolution does no
+decryption, no group scans and no subnet parsing.
+"""
+
+import ipaddress
+import threading
+from loguru import logger
+
+from .encryption import decrypt_password
+
+
+class _Node:
+    """Radix tree node holding a prefix and optionally a value"""
+
+    __slots__ = ("prefix", "length", "entry", "children")
+
+    def __init__(self, prefix, length, entry=None):
+        self.prefix = prefix
+        self.length = length
+        self.entry = entry
+        self.children = [None, None]
+
+
+class SubnetTree:
+    """Path-compressed binary radix tree for longest-prefix matching"""
+
+    def __init__(self, width):
+        """Initialize an empty tree
+
+        Args:
+            width (int): Address width in bits (32 for IPv4, 128 for IPv6)
+        """
+        self.width = width
+        self.root = _Node(0, 0)
+        self.size = 0
+
+    def _mask(self, key, length):
+        """Keep the first length bits of a key"""
+        return key & ~((1 << (self.width - length)) - 1) if length else 0
+
+    def _bit(self, key, position):
+        """Get the bit of a key at a position counted from the most significant bit"""
+        return (key >> (self.width - position - 1)) & 1
+
+    def insert(self, prefix, length, entry):
+        """Insert or replace the entry of a prefix
+
+        Args:
+            prefix (int): Network address
+            length (int): Prefix length
+            entry: Value stored for the prefix
+        """
+        prefix = self._mask(prefix, length)
+        node = self.root
+        while True:
+            if node.length == length:
+                if node.entry is None:
+                    self.size += 1
+                node.entry = entry
+                return
+
+            bit = self._bit(prefix, node.length)
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _Node(prefix, length, entry)
+                self.size += 1
+                return
+
+            # Length of the prefix shared by the new prefix and the child
+            difference = prefix ^ child.prefix
+            common = self.width - difference.bit_length() if difference else self.width
+            common = min(common, length, child.length)
+            if common == child.length:
+                node = child
+                continue
+
+            # Split the edge to the child at the shared prefix
+            split = _Node(self._mask(prefix, common), common)
+            split.children[self._bit(child.prefix, common)] = child
+            node.children[bit] = split
+            if common == length:
+                split.entry = entry
+            else:
+                split.children[self._bit(prefix, common)] = _Node(prefix, length, entry)
+            self.size += 1
+            return
+
+    def longest_match(self, address):
+        """Get the entry of the longest prefix containing an address
+
+        Args:
+            address (int): Address
+
+        Returns:
+            Entry of the most specific matching prefix, or None
+        """
+        node = self.root
+        best = node.entry
+        while node.length < self.width:
+            child = node.children[self._bit(address, node.length)]
+            if child is None or self._mask(address, child.length) != child.prefix:
+                break
+            node = child
+            if node.entry is not None:
+                best = node.entry
+        return best
+
+    def exact(self, prefix, length):
+        """Get the entry of a prefix, or None"""
+        prefix = self._mask(prefix, length)
+        node = self.root
+        while node.length < length:
+            node = node.children[self._bit(prefix, node.length)]
+            if node is None or node.length > length or self._mask(prefix, node.length) != node.prefix:
+                return None
+        return node.entry if node.prefix == prefix else None
+
+
+class CredentialResolver:
+    """Resolves device credentials from a CredentialStore"""
+
+    def __init__(self, store):
+        """Initialize the resolver
+
+        Args:
+            store (CredentialStore): Store holding the credentials
+        """
+        self.store = store
+        self._lock = threading.RLock()
+        self._device_secrets = {}  # {device_id: (encrypted password, encrypted enable password, password, enable password)}
+        self._group_map = None  # {device_id: group name}
+        self._subnet_trees = None  # {4: SubnetTree, 6: SubnetTree}
+
+    # Invalidation
+
+    def invalidate_device(self, device_id):
+        """Drop the decrypted secrets of a device and its group mapping"""
+        with self._lock:
+            self._device_secrets.pop(device_id, None)
+            self._group_map = None
+
+    def invalidate_groups(self):
+        """Rebuild the device to group map on next use"""
+        with self._lock:
+            self._group_map = None
+
+    def invalidate_subnets(self):
+        """Rebuild the subnet tree on next use"""
+        with self._lock:
+            self._subnet_trees = None
+
+    def invalidate(self):
+        """Drop everything the resolver has compiled or decrypted"""
+        with self._lock:
+            self._device_secrets = {}
+            self._group_map = None
+            self._subnet_trees = None
+
+    # Device credentials
+
+    def _decrypt(self, device, value, name):
+        """Decrypt a device secret, falling back to an empty string
+
+        Returns:
+            tuple: (decrypted value, whether decryption succeeded)
+        """
+        if not value:
+            return "", True
+        try:
+            return decrypt_password(value), True
+        except Exception as e:
+            logger.error(f"Error decrypting {name} for device {device.id}: {e}")
+            return "", False
+
+    def device_credentials(self, device):
+        """Get the decrypted credentials stored on a device
+
+        Args:
+            device: Device object
+
+        Returns:
+            dict: Credentials, empty if the device has none
+        """
+        encrypted = device.get_property("credentials", {}) if device else None
+        if not encrypted:
+            return {}
+
+        password = encrypted.get("password") or ""
+        enable_password = encrypted.get("enable_password") or ""
+        with self._lock:
+            cached = self._device_secrets.get(device.id)
+        if cached is None or cached[0] != password or cached[1] != enable_password:
+            decrypted_password, password_ok = self._decrypt(device, password, "password")
+            decrypted_enable, enable_ok = self._decrypt(device, enable_password, "enable password")
+            cached = (password, enable_password, decrypted_password, decrypted_enable)
+            # Failed decryptions are retried on the next resolution
+            if password_ok and enable_ok:
+                with self._lock:
+                    self._device_secrets[device.id] = cached
+
+        creds = encrypted.copy()
+        if password:
+            creds["password"] = cached[2]
+        if enable_password:
+            creds["enable_password"] = cached[3]
+        return creds
+
+    # Group credentials
+
+    def _build_group_map(self):
+        """Map each device to the first of its groups with credentials (lock must be held)"""
+        group_map = {}
+        device_manager = self.store.device_manager
+        if device_manager and self.store.group_credentials:
+            for group in device_manager.get_groups():
+                group_name = group.name if hasattr(group, 'name') else str(group)
+                if not self.store.group_credentials.get(group_name):
+                    continue
+                for device in getattr(group, 'devices', []):
+                    group_map.setdefault(getattr(device, 'id', device), group_name)
+        return group_map
+
+    def group_for_device(self, device_id):
+        """Get the name of the group whose credentials apply to a device, or None"""
+        with self._lock:
+            if self._group_map is None:
+                self._group_map = self._build_group_map()
+            return self._group_map.get(device_id)
+
+    # Subnet credentials
+
+    def _build_subnet_trees(self):
+        """Build the subnet trees from the stored subnet credentials (lock must be held)"""
+        trees = {4: SubnetTree(32), 6: SubnetTree(128)}
+        for subnet, creds in self.store.subnet_credentials.items():
+            try:
+                network = ipaddress.ip_network(subnet, strict=False)
+            except ValueError:
+                logger.warning(f"Ignoring credentials for invalid subnet: {subnet}")
+                continue
+            trees[network.version].insert(int(network.network_address), network.prefixlen, (subnet, creds))
+        return trees
+
+    def _subnet_tree(self, version):
+        """Get the subnet tree of an IP version"""
+        with self._lock:
+            if self._subnet_trees is None:
+                self._subnet_trees = self._build_subnet_trees()
+            return self._subnet_trees[version]
+
+    def match_subnet(self, ip_address):
+        """Find the most specific credential subnet containing an address
+
+        Args:
+            ip_address (str): IP address
+
+        Returns:
+            tuple: (subnet, credentials), or None if no subnet contains the address
+        """
+        try:
+            address = ipaddress.ip_address(ip_address.strip())
+        except (AttributeError, ValueError):
+            return None
+        return self._subnet_tree(address.version).longest_match(int(address))
+
+    def exact_subnet(self, subnet):
+        """Find the credentials stored for a network, however it is written
+
+        Args:
+            subnet (str): Network in CIDR notation
+
+        Returns:
+            tuple: (subnet as stored, credentials), or None
+        """
+        try:
+            network = ipaddress.ip_network(subnet, strict=False)
+        except ValueError:
+            return None
+        return self._subnet_tree(network.version).exact(int(network.network_address), network.prefixlen)
+
+    # Resolution
+
+    def resolve(self, device_id, device_ip=None, groups=None):
+        """Resolve the credentials of a device
+
+        Args:
+            device_id (str): Device ID
+            device_ip (str, optional): Device IP address, read from the device when not given
+            groups (list, optional): Names of the device's groups in priority order,
+                instead of the groups known to the device manager
+
+        Returns:
+            tuple: (credentials, source) where source is "device",
+                "group:<name>" or "subnet:<subnet>", or (None, None)
+        """
+        device = None
+        device_manager = self.store.device_manager
+        if device_manager:
+            device = device_manager.get_device(device_id)
+
+        creds = self.device_credentials(device)
+        if creds:
+            return creds, "device"
+        if device_id in self.store.device_credentials:
+            return self.store.device_credentials[device_id], "device"
+
+        if groups is not None:
+            group_name = next((name for name in groups if self.store.group_credentials.get(name)), None)
+        else:
+            group_name = self.group_for_device(device_id)
+        if group_name:
+            return self.store.group_credentials[group_name], f"group:{group_name}"
+
+        if not device_ip and device:
+            device_ip = device.get_property("ip_address", "")
+        if device_ip:
+            match = self.match_subnet(device_ip)
+            if match:
+                subnet, creds = match
+                return creds, f"subnet:{subnet}"
+
+        return None, None
@@ -12,6 +12,7 @@ from pathlib import Path
 from loguru import logger
 
 from .encryption import encrypt_password, decrypt_password
+from .credential_resolver import CredentialResolver
 
 
 class CredentialStore:
@@ -40,12 +41,16 @@ class CredentialStore:
         # Device manager reference (will be set by the plugin)
         self.device_manager = None
         
+        # Compiled lookups and decrypted secrets for resolving device credentials
+        self.resolver = CredentialResolver(self)
+        
         # Load group and subnet credentials
         self._load_credentials()
         
     def set_device_manager(self, device_manager):
         """Set the device manager reference"""
         self.device_manager = device_manager
+        self.resolver.invalidate()
         logger.debug(f"CredentialStore: Device manager reference set")
         
     def _load_credentials(self):
@@ -53,6 +58,7 @@ class CredentialStore:
         self._load_device_credentials()  # For backward compatibility
         self._load_group_credentials()
         self._load_subnet_credentials()
+        self.resolver.invalidate()
         
     def _load_device_credentials(self):
         """
@@ -209,35 +215,11 @@ class CredentialStore:
         self._save_subnet_credentials()
     
     def _get_credentials_from_device(self, device):
-        """Get credentials from device properties"""
-        if not device:
-            return {}
-            
-        # Get the credentials property
-        encrypted_creds = device.get_property("credentials", {})
-        if not encrypted_creds:
-            return {}
-            
-        # Make a copy of the credentials to avoid modifying the original
-        creds = encrypted_creds.copy()
+        """Get credentials from device properties
         
-        # Decrypt password
-        if "password" in creds and creds["password"]:
-            try:
-                creds["password"] = decrypt_password(creds["password"])
-            except Exception as e:
-                logger.error(f"Error decrypting password for device {device.id}: {e}")
-                creds["password"] = ""
-        
-        # Decrypt enable password
-        if "enable_password" in creds and creds["enable_password"]:
-            try:
-                creds["enable_password"] = decrypt_password(creds["enable_password"])
-            except Exception as e:
-                logger.error(f"Error decrypting enable password for device {device.id}: {e}")
-                creds["enable_password"] = ""
-        
-        return creds
+        Passwords are decrypted once and cached until they change.
+        """
+        return self.resolver.device_credentials(device)
 
     def _save_group_credentials(self):
         """Save group credentials to disk"""
@@ -357,24 +339,34 @@ class CredentialStore:
         if subnet in self.subnet_credentials:
             return self.subnet_credentials[subnet]
         
-        # Try to match by IP network
-        try:
-            target_network = ipaddress.ip_network(subnet, strict=False)
+        # Then the same network written differently
+        match = self.resolver.exact_subnet(subnet)
+        return match[1] if match else None
+    
+    def find_subnet_credentials(self, ip_address):
+        """Get the credentials of the most specific subnet containing an address
+        
+        Args:
+            ip_address: The IP address
             
-            for network_str, creds in self.subnet_credentials.items():
-                try:
-                    network = ipaddress.ip_network(network_str, strict=False)
-                    # Check if networks match (same network address and prefix)
-                    if (network.network_address == target_network.network_address and 
-                        network.prefixlen == target_network.prefixlen):
-                        return creds
-                except ValueError:
-                    continue
-        except ValueError:
-            # Invalid subnet format
-            pass
+        Returns:
+            tuple: (subnet, credentials), or (None, None) if no subnet contains the address
+        """
+        return self.resolver.match_subnet(ip_address) or (None, None)
+    
+    def resolve_credentials(self, device_id, device_ip=None, groups=None):
+        """Resolve the credentials of a device from its own, group and subnet credentials
         
-        return None
+        Args:
+            device_id: The device ID
+            device_ip: The device IP, read from the device when not given
+            groups: Group names in priority order, instead of the device's groups
+            
+        Returns:
+            tuple: (credentials, source) where source is "device", "group:<name>"
+                or "subnet:<subnet>", or (None, None) if nothing applies
+        """
+        return self.resolver.resolve(device_id, device_ip, groups)
     
     def set_device_credentials(self, device_id, credentials):
         """Set credentials for a device"""
@@ -395,12 +387,14 @@ class CredentialStore:
                 
                 # Save to device property
                 device.set_property("credentials", creds_copy)
+                self.resolver.invalidate_device(device_id)
                 logger.debug(f"Saved credentials to device properties for device {device_id}")
                 return True
         
         # Fall back to legacy file-based storage
         logger.warning(f"Falling back to legacy credential storage for device {device_id}")
         self.device_credentials[device_id] = credentials
+        self.resolver.invalidate_device(device_id)
         
         # Save to file for backward compatibility
         try:
@@ -428,6 +422,7 @@ class CredentialStore:
     def delete_device_credentials(self, device_id):
         """Delete credentials for a device"""
         success = False
+        self.resolver.invalidate_device(device_id)
         
         # Delete from device property if available
         if self.device_manager:
@@ -456,6 +451,7 @@ class CredentialStore:
     def set_group_credentials(self, group_name, credentials):
         """Set credentials for a group"""
         self.group_credentials[group_name] = credentials
+        self.resolver.invalidate_groups()
         self._save_group_credentials()
         return True
     
@@ -463,6 +459,7 @@ class CredentialStore:
         """Delete credentials for a group"""
         if group_name in self.group_credentials:
             del self.group_credentials[group_name]
+            self.resolver.invalidate_groups()
             
             # Remove file if it exists
             file_path = self.group_creds_dir / f"{group_name}.json"
@@ -486,6 +483,7 @@ class CredentialStore:
             return False
             
         self.subnet_credentials[subnet] = credentials
+        self.resolver.invalidate_subnets()
         self._save_subnet_credentials()
         return True
     
@@ -493,6 +491,7 @@ class CredentialStore:
         """Delete credentials for a subnet"""
         if subnet in self.subnet_credentials:
             del self.subnet_credentials[subnet]
+            self.resolver.invalidate_subnets()
             
             # Remove file if it exists
             file_path = self.subnet_creds_dir / f"{subnet}.json"
@@ -8,14 +8,16 @@ Encryption utilities for Command Manager plugin
 import os
 import base64
 import hashlib
+import functools
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
 
 
 # Generate a static key based on machine-specific information
 # This is not perfect security, but better than storing in plaintext
+@functools.lru_cache(maxsize=1)
 def _get_encryption_key():
-    """Get a static encryption key"""
+    """Get a static encryption key (derived once per process)"""
     # Machine-specific values
     machine_id = os.getenv('COMPUTERNAME', '') or os.getenv('HOSTNAME', '')
     user_id = os.getenv('USERNAME', '') or os.getenv('USER', '')
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Prompt driven expect reader for the Command Manager plugin
+
+Instead of sleeping for a fixed time after sending a command, the reader
+blocks on the connection with select and a deadline and returns as soon
+as the device prompt appears at the end of the output. The prompt is
+learned after login, so later reads match the exact prompt of the device
+(in any CLI mode) rather than a generic pattern.
+
+Pagers such as ``--More--`` are answered automatically and removed from
+the output, together with the backspaces devices send to erase them.
+
+Output is collected in an OutputBuffer, so only its tail window is
+searched and large outputs can be streamed to a spool file.
+"""
+
+import re
+import time
+import select
+from loguru import logger
+
+from plugins.command_manager.utils.output_buffer import OutputBuffer
+
+
+# Generic prompt used until the device prompt has been learned
+GENERIC_PROMPT = re.compile(r"(?:^|[\r\n])([^\r\n]{0,80}?[#>$%])[ \t]*$")
+
+# Pager prompts answered with a space (with the blanks IOS puts before " --More-- ")
+PAGER_PATTERN = re.compile(
+    r"[ \t]*(?:-{2,}\s*\(?more\b[^\r\n]{0,40}?(?:-{2,}|next page[^\r\n]*)|<-+\s*more\s*-+>"
+    r"|press any key to continue[^\r\n]*)[ \t]*$",
+    re.IGNORECASE
+)
+
+# Password prompts (enable, login)
+PASSWORD_PATTERN = re.compile(r"[Pp]assword:?[ \t]*$")
+
+def learn_prompt(prompt):
+    """Build a regex that matches a device prompt in any CLI mode
+
+    The hostname part of the prompt is kept literally, so "router>" also
+    matches "router#" after enable and "router(config)#" in config mode.
+
+    Args:
+        prompt (str): Prompt as printed by the device, e.g. "router>"
+
+    Returns:
+        re.Pattern: Prompt regex anchored at the end of the output
+    """
+    prompt = prompt.strip()
+    base = re.sub(r"(\([^)]*\))?[#>$%]$", "", prompt)
+    if not base:
+        return GENERIC_PROMPT
+    return re.compile(r"(?:^|[\r\n])(" + re.escape(base) + r"(?:\([^)\r\n]*\))?[#>$%])[ \t]*$")
+
+
+class Expect:
+    """Expect style reader on top of a non-blocking connection"""
+
+    def __init__(self, read, send, fileno):
+        """Initialize the reader
+
+        Args:
+            read (callable): Returns the bytes available now without blocking
+                (b"" when there are none) and raises EOFError when the connection closed
+            send (callable): Sends a string to the device
+            fileno (callable): Returns an object usable with select
+        """
+        self._read = read
+        self._send = send
+        self._fileno = fileno
+        self.prompt_pattern = GENERIC_PROMPT
+        self.pages = 0
+
+    def set_prompt(self, prompt):
+        """Learn the device prompt
+
+        Args:
+            prompt (str): Prompt as printed by the device
+        """
+        self.prompt_pattern = learn_prompt(prompt)
+        logger.debug(f"Learned prompt pattern: {self.prompt_pattern.pattern}")
+
+    def _wait(self, timeout):
+        """Block until the connection is readable or the timeout expires"""
+        try:
+            readable, _, _ = select.select([self._fileno()], [], [], max(0.0, timeout))
+        except (OSError, ValueError):
+            # Channel without a usable file descriptor: fall back to a short poll
+            time.sleep(min(max(0.0, timeout), 0.01))
+            return True
+        return bool(readable)
+
+    def flush(self):
+        """Discard output that is already waiting"""
+        try:
+            return self._read()
+        except EOFError:
+            return ""
+
+    def send(self, text):
+        """Send text to the device"""
+        self._send(text)
+
+    def _expect_into(self, buffer, patterns, timeout, paginate=True):
+        """Read into a buffer until one of the patterns matches its tail
+
+        Returns:
+            tuple: (index of the matching pattern or -1 on timeout, match
+                on buffer.tail or None)
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            data = self._read()
+            if data:
+                buffer.feed(data)
+                tail = buffer.tail
+
+                if paginate:
+                    pager = PAGER_PATTERN.search(tail)
+                    if pager:
+                        # Drop the pager prompt and ask for the next page
+                        buffer.cut_tail(pager.start())
+                        self.pages += 1
+                        self._send(" ")
+                        continue
+
+                for index, pattern in enumerate(patterns):
+                    match = pattern.search(tail)
+                    if match:
+                        return index, match
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.debug(f"Expect timed out after {timeout}s waiting for {[p.pattern for p in patterns]}")
+                return -1, None
+            if not data:
+                self._wait(remaining)
+
+    def expect(self, patterns=None, timeout=10, paginate=True):
+        """Read until one of the patterns matches the end of the output
+
+        Args:
+            patterns (list, optional): Compiled regexes, defaults to the prompt pattern
+            timeout (float): Seconds to wait for a match
+            paginate (bool): Answer pager prompts with a space
+
+        Returns:
+            tuple: (index of the matching pattern or -1 on timeout, match or None,
+                output read including the match)
+        """
+        if patterns is None:
+            patterns = [self.prompt_pattern]
+
+        buffer = OutputBuffer()
+        index, match = self._expect_into(buffer, patterns, timeout, paginate)
+        return index, match, buffer.getvalue()
+
+    def execute(self, command, timeout=10, spool=None):
+        """Send a command and read its output up to the prompt
+
+        Args:
+            command (str): Command to send
+            timeout (float): Seconds to wait for the prompt
+            spool (file, optional): Text file to stream the output into instead of memory
+
+        Returns:
+            str: Output without the echoed command and the prompt, or the
+                number of characters written when a spool file is given
+
+        Raises:
+            TimeoutError: The prompt did not return in time; the rest of the
+                output may still arrive on the connection
+        """
+        self.flush()
+        self._send(f"{command}\n")
+
+        buffer = OutputBuffer(spool=spool, echo=command)
+        index, match = self._expect_into(buffer, [self.prompt_pattern], timeout)
+        if index < 0:
+            buffer.finish()
+            raise TimeoutError(f"No prompt within {timeout}s after {command!r}")
+        buffer.cut_tail(match.start())
+        length = buffer.finish()
+
+        if spool is not None:
+            return length
+        return buffer.getvalue().strip()
@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Archive writers for batch exports of command outputs
+
+A batch export renders one entry (file name and content) per exported
+output and streams the entries into a single archive, without temporary
+files:
+
+- ``zip``: ZIP archive written entry by entry. Entries are deflated with
+  zlib while they are rendered, so compression runs on the export's
+  worker threads and the writer only appends bytes; ZIP64 records are
+  added when the archive grows past the limits of the classic format
+- ``tar.zst``: tar stream compressed with Zstandard (multithreaded),
+  which needs the zstandard package
+- ``folder``: one file per entry in a directory, as earlier versions did
+
+Entry names are "/" separated; with the per-device layout every device
+gets a directory named after it. Names are made unique by the writer, in
+the order entries are added, so an export always produces the same
+names for the same outputs.
+"""
+
+import io
+import os
+import struct
+import tarfile
+import datetime
+import zlib
+from collections import namedtuple
+from loguru import logger
+
+# Characters not allowed in file names on common file systems
+INVALID_FILENAME_CHARACTERS = '<>:"/\\|?*'
+
+# Prepared entry content: data as stored, CRC-32 and size of the content
+PreparedData = namedtuple("PreparedData", ["data", "crc", "size", "compressed"])
+
+
+def sanitize_filename(filename):
+    """Sanitize a filename to remove illegal characters
+
+    Args:
+        filename (str): The filename to sanitize
+
+    Returns:
+        str: The sanitized filename
+    """
+    # Replace characters that are not allowed in filenames
+    for char in INVALID_FILENAME_CHARACTERS:
+        filename = filename.replace(char, "-")
+
+    # Replace spaces with hyphens for better filenames
+    filename = filename.replace(" ", "-")
+
+    # Clean up multiple consecutive hyphens
+    while "--" in filename:
+        filename = filename.replace("--", "-")
+
+    # Ensure the filename is not too long, leaving room for an extension
+    return filename[:240].rstrip("-")
+
+
+class ExportFilenames:
+    """Renders export filenames from the filename template settings
+
+    The date is taken once when the renderer is created, so all files of
+    an export share it. Rendering only uses a snapshot of the device
+    properties and can run on any thread.
+    """
+
+    def __init__(self, template, date_format, command_format, now=None):
+        """Initialize the renderer
+
+        Args:
+            template (str): Filename template, e.g. "{hostname}_{command}_{date}"
+            date_format (str): strftime format of {date}
+            command_format (str): "truncated", "full" or "sanitized"
+            now (datetime.datetime, optional): Date of {date}, defaults to now
+        """
+        self.template = template
+        self.command_format = command_format
+        self.date = (now or datetime.datetime.now()).strftime(date_format)
+
+    @classmethod
+    def from_settings(cls, settings, now=None):
+        """Create a renderer from the plugin's export settings"""
+        return cls(
+            settings["export_filename_template"]["value"],
+            settings["export_date_format"]["value"],
+            settings["export_command_format"]["value"],
+            now
+        )
+
+    def format_command(self, command_text):
+        """Format a command for use in a filename"""
+        if self.command_format == "truncated":
+            return command_text.replace(" ", "-")[:15]
+        if self.command_format == "sanitized":
+            command_text = "".join(c if c.isalnum() or c == " " else "-" for c in command_text)
+            return command_text.replace(" ", "-").replace("--", "-").strip("-")[:25]
+        # "full" still replaces spaces with hyphens
+        return command_text.replace(" ", "-")
+
+    def render(self, properties, command_id, command_text=None):
+        """Render the filename of a command output
+
+        Args:
+            properties (dict): Device properties
+            command_id (str): Command ID
+            command_text (str, optional): Command text, defaults to the ID
+
+        Returns:
+            str: Sanitized filename without extension (unless the template adds one)
+        """
+        command = self.format_command(command_text or command_id)
+        placeholders = {
+            "command": command,
+            "date": self.date,
+            "hostname": properties.get("hostname", "unknown"),
+            "ip": properties.get("ip_address", "unknown"),
+            "status": properties.get("status", "unknown"),
+        }
+        # Only simple values, not lists or dicts
+        for key, value in properties.items():
+            if isinstance(value, (str, int, float, bool)):
+                placeholders[key] = str(value)
+
+        try:
+            return sanitize_filename(self.template.format(**placeholders))
+        except KeyError as e:
+            logger.error(f"Error in filename template: Unknown placeholder {e}")
+            return f"{properties.get('hostname', 'device')}_{command}_{self.date}.txt"
+        except Exception as e:
+            logger.error(f"Error generating filename from template: {e}")
+            return f"command_output_{self.date}.txt"
+
+    def entry_name(self, properties, command_id, command_text=None, timestamp=None):
+        """Render the file name of an exported output, with ".txt" extension
+
+        Args:
+            properties (dict): Device properties
+            command_id (str): Command ID
+            command_text (str, optional): Command text
+            timestamp (str, optional): ISO timestamp appended to the name,
+                used when several outputs of a command are exported
+
+        Returns:
+            str: File name
+        """
+        filename = self.render(properties, command_id, command_text)
+        if filename.lower().endswith(".txt"):
+            filename = filename[:-4]
+        if timestamp:
+            filename += "_" + timestamp[:19].replace("-", "").replace(":", "").replace("T", "_")
+        return filename + ".txt"
+
+
+def render_output(device_name, ip_address, command_text, timestamp, output):
+    """Render the content of an exported output
+
+    Args:
+        device_name (str): Device name
+        ip_address (str): Device IP address
+        command_text (str): Command text
+        timestamp (str): ISO timestamp of the output
+        output (str): Command output
+
+    Returns:
+        bytes: UTF-8 encoded file content
+    """
+    header = (
+        f"Device: {device_name}\n"
+        f"IP: {ip_address}\n"
+        f"Command: {command_text}\n"
+        f"Date/Time: {timestamp[:19].replace('T', ' ')}\n"
+        + "-" * 50 + "\n"
+    )
+    return (header + output).encode("utf-8", errors="replace")
+
+
+def _timestamp_seconds(timestamp):
+    """Convert an ISO timestamp to seconds since the epoch, or None"""
+    try:
+        return datetime.datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+class ArchiveWriter:
+    """Writes export entries to a destination
+
+    prepare() is called on the worker threads and must not touch the
+    writer's state; add() and close() are called from one thread.
+    """
+
+    def __init__(self, path):
+        """Initialize the writer
+
+        Args:
+            path (str): Destination file (or directory for folder exports)
+        """
+        self.path = path
+        self.entries = 0
+        self.bytes_written = 0
+        self._names = set()
+        self._counters = {}  # {lowercase name: next number for duplicates}
+
+    def unique_name(self, name):
+        """Make an entry name unique within the export
+
+        Names are compared case insensitively, so archives extract on
+        case insensitive file systems without overwriting files.
+        """
+        key = name.lower()
+        if key not in self._names and not self._exists(name):
+            self._names.add(key)
+            return name
+
+        # Continue numbering where the last duplicate of the name stopped
+        base, ext = os.path.splitext(name)
+        counter = self._counters.get(key, 1)
+        candidate = f"{base}_{counter}{ext}"
+        while candidate.lower() in self._names or self._exists(candidate):
+            counter += 1
+            candidate = f"{base}_{counter}{ext}"
+        self._counters[key] = counter + 1
+        self._names.add(candidate.lower())
+        return candidate
+
+    def _exists(self, name):
+        """Check whether an entry exists outside this export"""
+        return False
+
+    def prepare(self, data):
+        """Prepare entry content for add(), on a worker thread
+
+        Args:
+            data (bytes): Entry content
+
+        Returns:
+            PreparedData: Content as it will be stored
+        """
+        return PreparedData(data, None, len(data), False)
+
+    def add(self, name, prepared, timestamp=None):
+        """Add an entry
+
+        Args:
+            name (str): "/" separated entry name, unique in the export
+            prepared (PreparedData): Content from prepare()
+            timestamp (str, optional): ISO timestamp used as modification time
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Finish the export"""
+
+    def abort(self):
+        """Stop writing after a cancelled or failed export"""
+
+
+class ZipArchiveWriter(ArchiveWriter):
+    """Streaming ZIP writer for pre-compressed entries
+
+    Every entry is written as a local header followed by its deflated
+    data, and the central directory is written on close. Entry sizes and
+    CRCs are known when an entry is added, so no data descriptors are
+    needed and the archive is written strictly sequentially.
+    """
+
+    extension = "zip"
+
+    def __init__(self, path, compress_level=6):
+        super().__init__(path)
+        self.compress_level = compress_level
+        self.file = open(path, "wb")
+        self.offset = 0
+        self.central_directory = []
+
+    def prepare(self, data):
+        crc = zlib.crc32(data)
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = compressor.compress(data) + compressor.flush()
+        # Store content that does not compress (e.g. tiny files)
+        if len(compressed) >= len(data):
+            return PreparedData(data, crc, len(data), False)
+        return PreparedData(compressed, crc, len(data), True)
+
+    @staticmethod
+    def _dos_time(timestamp):
+        """Convert an ISO timestamp to MS-DOS (time, date) fields"""
+        try:
+            dt = datetime.datetime.fromisoformat(timestamp) if timestamp else datetime.datetime.now()
+        except (TypeError, ValueError):
+            dt = datetime.datetime.now()
+        if dt.year < 1980:
+            return 0, (1 << 5) | 1
+        year = min(dt.year, 2107)
+        return (dt.hour << 11) | (dt.minute << 5) | (dt.second // 2), ((year - 1980) << 9) | (dt.month << 5) | dt.day
+
+    def add(self, name, prepared, timestamp=None):
+        encoded_name = name.encode("utf-8")
+        method = 8 if prepared.compressed else 0
+        dos_time, dos_date = self._dos_time(timestamp)
+        compressed_size = len(prepared.data)
+        zip64 = prepared.size >= 0xFFFFFFFF or compressed_size >= 0xFFFFFFFF
+
+        extra = b""
+        if zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, prepared.size, compressed_size)
+        header = struct.pack(
+            "<IHHHHHIIIHH",
+            0x04034B50, 45 if zip64 else 20, 0x0800, method, dos_time, dos_date, prepared.crc,
+            0xFFFFFFFF if zip64 else compressed_size, 0xFFFFFFFF if zip64 else prepared.size,
+            len(encoded_name), len(extra)
+        )
+        self.file.write(header + encoded_name + extra)
+        self.file.write(prepared.data)
+
+        self.central_directory.append(
+            (encoded_name, method, dos_time, dos_date, prepared.crc, compressed_size, prepared.size, self.offset)
+        )
+        written = len(header) + len(encoded_name) + len(extra) + compressed_size
+        self.offset += written
+        self.bytes_written += written
+        self.entries += 1
+
+    def close(self):
+        start = self.offset
+        for encoded_name, method, dos_time, dos_date, crc, compressed_size, size, offset in self.central_directory:
+            # ZIP64 extra field holds the values that do not fit, in this order
+            values = []
+            if size >= 0xFFFFFFFF:
+                values.append(size)
+            if compressed_size >= 0xFFFFFFFF:
+                values.append(compressed_size)
+            if offset >= 0xFFFFFFFF:
+                values.append(offset)
+            extra = struct.pack(f"<HH{len(values)}Q", 0x0001, 8 * len(values), *values) if values else b""
+            record = struct.pack(
+                "<IHHHHHHIIIHHHHHII",
+                0x02014B50, (3 << 8) | 45, 45 if values else 20, 0x0800, method, dos_time, dos_date, crc,
+                min(compressed_size, 0xFFFFFFFF), min(size, 0xFFFFFFFF),
+                len(encoded_name), len(extra), 0, 0, 0, 0o100644 << 16, min(offset, 0xFFFFFFFF)
+            )
+            self.file.write(record + encoded_name + extra)
+            self.offset += len(record) + len(encoded_name) + len(extra)
+
+        size = self.offset - start
+        count = len(self.central_directory)
+        if count >= 0xFFFF or size >= 0xFFFFFFFF or start >= 0xFFFFFFFF:
+            # ZIP64 end of central directory record and locator
+            self.file.write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, size, start))
+            self.file.write(struct.pack("<IIQI", 0x07064B50, 0, self.offset, 1))
+        self.file.write(struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+            min(size, 0xFFFFFFFF), min(start, 0xFFFFFFFF), 0
+        ))
+        self.file.close()
+        self.central_directory = []
+
+    def abort(self):
+        self.file.close()
+
+
+class TarZstArchiveWriter(ArchiveWriter):
+    """Tar stream compressed with Zstandard on its own threads"""
+
+    extension = "tar.zst"
+
+    def __init__(self, path, compress_level=3):
+        super().__init__(path)
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("tar.zst export requires the zstandard module. Please install it with 'pip install zstandard'.")
+
+        self.file = open(path, "wb")
+        compressor = zstandard.ZstdCompressor(level=compress_level, threads=-1)
+        self.stream = compressor.stream_writer(self.file, closefd=False)
+        self.tar = tarfile.open(fileobj=self.stream, mode="w|", format=tarfile.PAX_FORMAT)
+
+    def add(self, name, prepared, timestamp=None):
+        info = tarfile.TarInfo(name)
+        info.size = prepared.size
+        info.mode = 0o644
+        info.mtime = _timestamp_seconds(timestamp) or 0
+        self.tar.addfile(info, io.BytesIO(prepared.data))
+        self.bytes_written += prepared.size
+        self.entries += 1
+
+    def close(self):
+        self.tar.close()
+        self.stream.close()
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+class FolderArchiveWriter(ArchiveWriter):
+    """Writes every entry as a file below a directory"""
+
+    extension = ""
+
+    def _exists(self, name):
+        return os.path.exists(os.path.join(self.path, *name.split("/")))
+
+    def add(self, name, prepared, timestamp=None):
+        file_path = os.path.join(self.path, *name.split("/"))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(prepared.data)
+        seconds = _timestamp_seconds(timestamp)
+        if seconds is not None:
+            os.utime(file_path, (seconds, seconds))
+        self.bytes_written += prepared.size
+        self.entries += 1
+
+
+# Archive formats by key
+ARCHIVE_WRITERS = {
+    "zip": ZipArchiveWriter,
+    "tar.zst": TarZstArchiveWriter,
+    "folder": FolderArchiveWriter,
+}
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Receive buffer for device command output
+
+Output is received as raw bytes, decoded with an incremental UTF-8
+decoder (so multi-byte characters split across reads are kept intact)
+and split into two parts:
+
+- a small tail window, where prompts and pagers are searched and cut
+- the head, everything older than the tail window, kept as a list of
+  chunks or streamed to a spool file
+
+Each byte is decoded, cleaned and stored once, so reading an output of
+any size is linear and prompt checks only look at the tail.
+"""
+
+import codecs
+import re
+
+
+# Size of the tail window searched for prompts and pagers
+TAIL_SIZE = 512
+
+# Backspace erase sequences and ANSI escapes left behind by pagers
+_ERASE_PATTERN = re.compile(r"\x08+[ \t]*\x08+|\x1b\[[0-9;?]*[A-Za-z]|\r[ \t]+\r")
+
+
+def clean_output(text):
+    """Remove pager erase sequences and normalize line endings"""
+    text = _ERASE_PATTERN.sub("", text)
+    return text.replace("\r\n", "\n").replace("\r", "")
+
+
+class OutputBuffer:
+    """Incrementally decoded output with a searchable tail window"""
+
+    def __init__(self, spool=None, echo=None, tail_size=TAIL_SIZE):
+        """Initialize the buffer
+
+        Args:
+            spool (file, optional): Text file the output is streamed into instead of memory
+            echo (str, optional): Command whose echoed line is dropped from the start of the output
+            tail_size (int): Size of the tail window in characters
+        """
+        self.spool = spool
+        self.tail_size = tail_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._chunks = []
+        self._tail = ""
+        self._echo = echo
+        self.length = 0  # characters moved out of the tail window
+
+    @property
+    def tail(self):
+        """The most recent output, where prompts are searched"""
+        return self._tail
+
+    def feed(self, data):
+        """Add received data
+
+        Args:
+            data (bytes or str): Received data
+        """
+        if isinstance(data, bytes):
+            data = self._decoder.decode(data)
+        if not data:
+            return
+
+        self._tail += data
+
+        if self._echo is not None:
+            newline = self._tail.find("\n")
+            if newline >= 0:
+                if self._echo in self._tail[:newline]:
+                    self._tail = self._tail[newline + 1:]
+                self._echo = None
+            elif len(self._tail) > 2 * self.tail_size:
+                self._echo = None
+
+        # Keep the tail window small by moving older output to the head
+        if len(self._tail) > 2 * self.tail_size:
+            self._spill(len(self._tail) - self.tail_size)
+
+    def cut_tail(self, index):
+        """Drop the tail window from index on (e.g. a pager or prompt)"""
+        self._tail = self._tail[:index]
+
+    def _spill(self, count):
+        """Move the first count characters of the tail window to the head"""
+        # Never split a CR LF pair or an erase sequence between head and tail
+        while count > 0 and self._tail[count - 1] in "\r\x08":
+            count -= 1
+        if count <= 0:
+            return
+
+        text = clean_output(self._tail[:count])
+        self._tail = self._tail[count:]
+        self.length += len(text)
+        if self.spool is not None:
+            self.spool.write(text)
+        else:
+            self._chunks.append(text)
+
+    def finish(self):
+        """Flush the decoder and move the tail window to the head
+
+        Returns:
+            int: Total number of characters of output
+        """
+        self._tail += self._decoder.decode(b"", final=True)
+        if self._tail:
+            text = clean_output(self._tail)
+            self._tail = ""
+            self.length += len(text)
+            if self.spool is not None:
+                self.spool.write(text)
+            else:
+                self._chunks.append(text)
+        return self.length
+
+    def getvalue(self):
+        """Get the output received so far (not available when spooling)"""
+        if self.spool is not None:
+            raise ValueError("Output was streamed to a spool file")
+        return "".join(self._chunks) + clean_output(self._tail)
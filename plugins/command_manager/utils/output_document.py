@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Memory mapped command output documents for the Command Manager plugin
+
+Viewing an output used to load the whole text into a text widget, which
+hangs the UI for outputs of tens of megabytes and keeps several copies
+of them in memory. An OutputDocument instead holds the output as UTF-8
+in an anonymous temporary file:
+
+- the body is streamed from the output store into the file (compressed
+  blobs are decompressed in chunks) and the file is memory mapped
+- a line offset index (8 bytes per line) is built once by scanning the
+  mapping for newlines
+- lines are decoded only when they are displayed, so views render just
+  the visible window
+- searches run on the mapping with a bytes regex and return byte offsets
+  that map back to lines through the index
+
+The file is deleted by the operating system when the document is closed.
+"""
+
+import os
+import re
+import mmap
+import bisect
+import tempfile
+from array import array
+
+
+# Longest line returned for display; longer lines are cut
+MAX_LINE_LENGTH = 10000
+
+
+def compile_search(text, case_sensitive=False, regex=False):
+    """Compile a search of a document
+
+    Case insensitive searches fold ASCII letters only, as the document
+    is searched as UTF-8 bytes.
+
+    Args:
+        text (str): Text or regular expression to find
+        case_sensitive (bool): Match case
+        regex (bool): Treat the text as a regular expression
+
+    Returns:
+        re.Pattern: Bytes pattern, or None for an empty search
+
+    Raises:
+        re.error: The regular expression is invalid
+    """
+    if not text:
+        return None
+    pattern = text.encode("utf-8")
+    if not regex:
+        pattern = re.escape(pattern)
+    return re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+
+
+class OutputDocument:
+    """Read-only output text mapped from a file, with a line offset index"""
+
+    def __init__(self, f):
+        """Map a file holding the output
+
+        The document takes ownership of the file and closes it on close.
+
+        Args:
+            f (file): Binary file with the UTF-8 output
+        """
+        f.flush()
+        self._file = f
+        self.size = os.fstat(f.fileno()).st_size
+        # Empty files cannot be mapped
+        self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._offsets, self.max_line_length = self._index_lines()
+
+    @classmethod
+    def from_output(cls, output_data):
+        """Create a document from stored output data
+
+        Args:
+            output_data: OutputRecord (streamed from the store) or
+                {"output": text} dictionary
+
+        Returns:
+            OutputDocument: The document
+
+        Raises:
+            KeyError: The output was removed from the history
+        """
+        f = tempfile.TemporaryFile()
+        try:
+            if hasattr(output_data, "write_output"):
+                output_data.write_output(f)
+            else:
+                f.write((output_data.get("output") or "").encode("utf-8", errors="replace"))
+        except BaseException:
+            f.close()
+            raise
+        return cls(f)
+
+    @classmethod
+    def from_text(cls, text):
+        """Create a document from text"""
+        return cls.from_output({"output": text})
+
+    def _index_lines(self):
+        """Find the start of every line
+
+        Returns:
+            tuple: (array of line start offsets, length of the longest line in bytes)
+        """
+        offsets = array("Q", [0])
+        longest = 0
+        find = self._map.find
+        start = 0
+        end = find(b"\n")
+        while end >= 0:
+            if end - start > longest:
+                longest = end - start
+            start = end + 1
+            offsets.append(start)
+            end = find(b"\n", start)
+        if self.size - start > longest:
+            longest = self.size - start
+
+        # A final newline ends the last line rather than starting an empty one
+        if len(offsets) > 1 and offsets[-1] == self.size:
+            offsets.pop()
+        return offsets, longest
+
+    @property
+    def line_count(self):
+        """Number of lines (an empty output has one empty line)"""
+        return len(self._offsets)
+
+    def line_range(self, index):
+        """Get the byte range of a line without its line ending
+
+        Returns:
+            tuple: (start, end) offsets
+        """
+        start = self._offsets[index]
+        end = self._offsets[index + 1] if index + 1 < len(self._offsets) else self.size
+        if end > start and self._map[end - 1:end] == b"\n":
+            end -= 1
+        if end > start and self._map[end - 1:end] == b"\r":
+            end -= 1
+        return start, end
+
+    def line(self, index, limit=MAX_LINE_LENGTH):
+        """Get a line of text
+
+        Args:
+            index (int): Line number, starting at 0
+            limit (int): Maximum length in bytes, None for the whole line
+
+        Returns:
+            str: The line without its line ending
+        """
+        start, end = self.line_range(index)
+        if limit is not None and end - start > limit:
+            return self._map[start:start + limit].decode("utf-8", errors="replace") + " ..."
+        return self._map[start:end].decode("utf-8", errors="replace")
+
+    def lines(self, start=0, end=None):
+        """Get a range of lines
+
+        Args:
+            start (int): First line
+            end (int, optional): Line after the last one, defaults to the end
+
+        Returns:
+            list: Lines of text, not cut
+        """
+        end = self.line_count if end is None else min(end, self.line_count)
+        return [self.line(index, limit=None) for index in range(start, end)]
+
+    def text(self):
+        """Get the whole output as text"""
+        return self._map[:self.size].decode("utf-8", errors="replace")
+
+    def line_at(self, offset):
+        """Get the line containing a byte offset"""
+        return max(0, bisect.bisect_right(self._offsets, offset) - 1)
+
+    def column_at(self, offset):
+        """Get the character column of a byte offset in its line"""
+        start = self._offsets[self.line_at(offset)]
+        return len(self._map[start:offset].decode("utf-8", errors="replace"))
+
+    def search(self, pattern, position=0, backward=False, wrap=True):
+        """Find the next or previous match of a search
+
+        Args:
+            pattern (re.Pattern): Search from compile_search
+            position (int): Byte offset to search from; forward searches
+                match at or after it, backward searches before it
+            backward (bool): Find the previous match
+            wrap (bool): Continue at the other end of the document
+
+        Returns:
+            tuple: (start, end) byte offsets of the match, or None
+        """
+        if pattern is None or not self.size:
+            return None
+        position = max(0, min(position, self.size))
+
+        if not backward:
+            match = pattern.search(self._map, position)
+            if match is None and wrap and position:
+                match = pattern.search(self._map, 0)
+            return match.span() if match else None
+
+        previous = None
+        matches = pattern.finditer(self._map)
+        for match in matches:
+            if match.start() >= position:
+                if previous is None and wrap:
+                    # Nothing before the position: wrap to the last match
+                    previous = match
+                    for previous in matches:
+                        pass
+                break
+            previous = match
+        return previous.span() if previous else None
+
+    def count(self, pattern, limit=None):
+        """Count the matches of a search
+
+        Args:
+            pattern (re.Pattern): Search from compile_search
+            limit (int, optional): Stop counting at this number
+
+        Returns:
+            int: Number of matches
+        """
+        if pattern is None:
+            return 0
+        found = 0
+        for _match in pattern.finditer(self._map):
+            found += 1
+            if limit is not None and found >= limit:
+                break
+        return found
+
+    def close(self):
+        """Unmap and delete the document's file"""
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._map = b""
+        self._offsets = array("Q", [0])
+        self.size = 0
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def closed(self):
+        return self._file is None
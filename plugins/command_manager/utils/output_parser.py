@@ -0,0 +1,623 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Template-based parsing of command outputs for the Command Manager plugin
+
+Templates use the TextFSM format: ``Value`` lines declaring the fields of
+a record (with the Filldown, Fillup, Required, List and Key options),
+followed by states whose rules match lines, assign values and record,
+clear or change state (``-> Continue.Record NextState``, ``-> Error``).
+Templates are compiled once; the rules of each state are additionally
+combined into a single alternation so a line that matches no rule, the
+common case, costs one regular expression match instead of one per rule.
+
+Templates live in a directory as ``<name>.textfsm`` files. Commands
+name their template explicitly or get the one named after their command
+set's platform and command text (``cisco_iosxe_show_version.textfsm``).
+
+Parse results are cached in SQLite keyed by the SHA-256 hash of the
+output and a fingerprint of the template, so an output is parsed at most
+once per template version however often it is displayed, exported or
+reported on, and identical outputs share one cached result.
+"""
+
+import re
+import json
+import string
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from loguru import logger
+
+TEMPLATE_EXTENSION = ".textfsm"
+CACHE_FILE = "parsed.db"
+
+# Parsed results kept in memory in front of the database
+MEMORY_CACHE_SIZE = 256
+
+# Cached results written per transaction
+COMMIT_BATCH = 64
+
+VALUE_OPTIONS = ("Filldown", "Fillup", "Required", "List", "Key")
+LINE_OPS = ("Next", "Continue")
+RECORD_OPS = ("NoRecord", "Record", "Clear", "Clearall")
+
+_VALUE_LINE = re.compile(r"^Value\s+(?:([\w,]+)\s+)?(\w+)\s+(\(.*\))\s*$")
+_STATE_NAME = re.compile(r"^\w+$")
+_RULE_LINE = re.compile(r"^\s+\^")
+_ACTION = re.compile(r"\s+->\s*(.*)$")
+_NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+_UNSAFE_TO_COMBINE = re.compile(r"\(\?P=|\\[1-9]|\(\?[aiLmsux]+\)")
+
+
+class TemplateError(ValueError):
+    """Raised when a template cannot be compiled"""
+
+
+class ParseError(ValueError):
+    """Raised when parsing reaches an Error action of a template"""
+
+
+def template_name(platform, command):
+    """Get the conventional template name of a command
+
+    Args:
+        platform (str): Platform of the command set, e.g. "cisco_iosxe"
+        command (str): Command text, e.g. "show ip interface brief"
+
+    Returns:
+        str: Template name, e.g. "cisco_iosxe_show_ip_interface_brief"
+    """
+    words = re.findall(r"[a-z0-9]+", command.lower())
+    return "_".join([platform.lower()] + words)
+
+
+def output_hash(text):
+    """Get the SHA-256 hash the output store uses for an output"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _Value:
+    """Field of the records produced by a template"""
+
+    __slots__ = ("name", "regex", "nested", "filldown", "fillup", "required", "is_list", "key")
+
+    def __init__(self, name, regex, options):
+        self.name = name
+        self.regex = re.compile(regex)
+        # List values whose regex has named groups collect dictionaries
+        self.nested = self.regex.groups > 1 and bool(self.regex.groupindex)
+        self.filldown = "Filldown" in options
+        self.fillup = "Fillup" in options
+        self.required = "Required" in options
+        self.is_list = "List" in options
+        self.key = "Key" in options
+
+    def empty(self):
+        """Get the value of the field when nothing was assigned"""
+        return [] if self.is_list else None
+
+
+class _Rule:
+    """Compiled rule of a template state"""
+
+    __slots__ = ("regex", "line_op", "record_op", "new_state", "error", "line_number")
+
+    def __init__(self, regex, line_op, record_op, new_state, error, line_number):
+        self.regex = regex
+        self.line_op = line_op
+        self.record_op = record_op
+        self.new_state = new_state
+        self.error = error
+        self.line_number = line_number
+
+
+class _State:
+    """Rules of a template state, plus their combined regular expression"""
+
+    __slots__ = ("name", "rules", "combined", "rule_groups")
+
+    def __init__(self, name, rules):
+        self.name = name
+        self.rules = rules
+        self.combined = None
+        self.rule_groups = {}  # {group index in combined: rule index}
+
+        patterns = [rule.regex.pattern for rule in rules]
+        if len(rules) < 2 or any(_UNSAFE_TO_COMBINE.search(pattern) for pattern in patterns):
+            return
+
+        # One outer group per rule; named groups become non-capturing so
+        # names repeated across rules do not clash
+        parts = []
+        group = 1
+        for index, pattern in enumerate(patterns):
+            anonymous = _NAMED_GROUP.sub("(?:", pattern)
+            try:
+                inner_groups = re.compile(anonymous).groups
+            except re.error:
+                return
+            parts.append(f"({anonymous})")
+            self.rule_groups[group] = index
+            group += inner_groups + 1
+        try:
+            self.combined = re.compile("|".join(parts))
+        except re.error:
+            self.combined = None
+
+    def first_match(self, line):
+        """Get the index of the first rule matching a line, or None"""
+        if self.combined is not None:
+            match = self.combined.match(line)
+            if match is None:
+                return None
+            # The outer group of the matching rule closes last
+            return self.rule_groups[match.lastindex]
+        return self.next_match(line, 0)
+
+    def next_match(self, line, start):
+        """Get the index of the first rule from start matching a line, or None"""
+        for index in range(start, len(self.rules)):
+            if self.rules[index].regex.match(line):
+                return index
+        return None
+
+
+class ParserTemplate:
+    """Compiled TextFSM template"""
+
+    def __init__(self, source, name=""):
+        """Compile a template
+
+        Args:
+            source (str): Template text
+            name (str): Template name used in error messages
+
+        Raises:
+            TemplateError: If the template is invalid
+        """
+        self.name = name
+        self.source = source
+        self.fingerprint = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        self.values = []
+        self.states = {}
+        self._compile(source)
+        self.header = [value.name for value in self.values]
+
+    def _error(self, line_number, message):
+        """Build a compile error for a template line"""
+        return TemplateError(f"{self.name or 'template'} line {line_number}: {message}")
+
+    def _compile(self, source):
+        """Parse the template text into values and states"""
+        lines = source.splitlines()
+        index = 0
+
+        # Value definitions, up to the first blank line
+        while index < len(lines):
+            line = lines[index]
+            index += 1
+            if not line.strip():
+                if self.values:
+                    break
+                continue
+            if line.lstrip().startswith("#"):
+                continue
+            match = _VALUE_LINE.match(line)
+            if not match:
+                raise self._error(index, f"invalid value definition: {line.strip()}")
+            options = match.group(1).split(",") if match.group(1) else []
+            for option in options:
+                if option not in VALUE_OPTIONS:
+                    raise self._error(index, f"unknown value option: {option}")
+            name, regex = match.group(2), match.group(3)
+            if any(value.name == name for value in self.values):
+                raise self._error(index, f"duplicate value: {name}")
+            try:
+                self.values.append(_Value(name, regex, options))
+            except re.error as e:
+                raise self._error(index, f"invalid regular expression for {name}: {e}")
+
+        if not self.values:
+            raise TemplateError(f"{self.name or 'template'}: no values defined")
+
+        substitutions = {value.name: f"(?P<{value.name}>{value.regex.pattern[1:-1]})" for value in self.values}
+
+        # States: a name followed by indented rules, separated by blank lines
+        state_name = None
+        rules = []
+        line_numbers = {}
+        while index <= len(lines):
+            line = lines[index] if index < len(lines) else ""
+            index += 1
+            if line.lstrip().startswith("#"):
+                continue
+            if not line.strip():
+                if state_name is not None:
+                    self.states[state_name] = rules
+                    state_name, rules = None, []
+                if index > len(lines):
+                    break
+                continue
+            if state_name is None:
+                name = line.strip()
+                if not _STATE_NAME.match(name) or line[0].isspace():
+                    raise self._error(index, f"invalid state name: {name}")
+                if name in self.states:
+                    raise self._error(index, f"duplicate state: {name}")
+                state_name = name
+                line_numbers[name] = index
+                continue
+            if not _RULE_LINE.match(line):
+                raise self._error(index, f"rules must be indented and start with ^: {line.strip()}")
+            rules.append(self._compile_rule(line.strip(), substitutions, index))
+
+        if "Start" not in self.states:
+            raise TemplateError(f"{self.name or 'template'}: missing Start state")
+
+        compiled = {}
+        for name, state_rules in self.states.items():
+            for rule in state_rules:
+                if rule.new_state and rule.new_state not in self.states and rule.new_state not in ("End", "EOF"):
+                    raise self._error(rule.line_number, f"unknown state: {rule.new_state}")
+            compiled[name] = _State(name, state_rules)
+        self.states = compiled
+
+    def _compile_rule(self, text, substitutions, line_number):
+        """Compile one rule line"""
+        match = _ACTION.search(text)
+        pattern = text[:match.start()] if match else text
+        action = match.group(1).strip() if match else ""
+
+        try:
+            pattern = string.Template(pattern).substitute(substitutions)
+        except (KeyError, ValueError) as e:
+            raise self._error(line_number, f"invalid value reference {e}")
+        try:
+            regex = re.compile(pattern)
+        except re.error as e:
+            raise self._error(line_number, f"invalid regular expression: {e}")
+
+        line_op, record_op, new_state, error = "Next", "NoRecord", None, None
+        if action.startswith("Error"):
+            error = action[5:].strip().strip('"') or "Error action"
+        elif action:
+            parts = action.split()
+            if len(parts) > 2:
+                raise self._error(line_number, f"invalid action: {action}")
+            operations = parts[0].split(".")
+            if all(op in LINE_OPS or op in RECORD_OPS for op in operations):
+                for op in operations:
+                    if op in LINE_OPS:
+                        line_op = op
+                    else:
+                        record_op = op
+                new_state = parts[1] if len(parts) > 1 else None
+            elif len(parts) == 1 and len(operations) == 1:
+                new_state = parts[0]
+            else:
+                raise self._error(line_number, f"invalid action: {action}")
+            if line_op == "Continue" and new_state:
+                raise self._error(line_number, "Continue cannot change state")
+        return _Rule(regex, line_op, record_op, new_state, error, line_number)
+
+    def parse(self, text):
+        """Parse an output into records
+
+        Args:
+            text (str): Command output
+
+        Returns:
+            list: One dictionary per record, keyed by value name; List
+                values are lists, all others strings ("" when not set)
+
+        Raises:
+            ParseError: If an Error action of the template is reached
+        """
+        values = self.values
+        current = [value.empty() for value in values]
+        positions = {value.name: position for position, value in enumerate(values)}
+        filldown = set(position for position, value in enumerate(values) if value.filldown)
+        fillup = set(position for position, value in enumerate(values) if value.fillup)
+        required = [position for position, value in enumerate(values) if value.required]
+        lists = set(position for position, value in enumerate(values) if value.is_list)
+        records = []
+
+        def clear(all_values=False):
+            for position, value in enumerate(values):
+                if all_values or position not in filldown:
+                    current[position] = value.empty()
+
+        def record():
+            if any(not current[position] for position in required):
+                clear()
+                return
+            # Values matched as empty strings still make a record
+            if all(item is None or item == [] for item in current):
+                return
+            records.append([
+                list(item) if position in lists else ("" if item is None else item)
+                for position, item in enumerate(current)
+            ])
+            clear()
+
+        state = self.states["Start"]
+        for line in text.splitlines():
+            index = state.first_match(line)
+            while index is not None:
+                rule = state.rules[index]
+                if rule.error:
+                    raise ParseError(f"{self.name or 'template'}: {rule.error} (rule line {rule.line_number}): {line}")
+
+                # Groups that did not participate unset their value
+                for name, item in rule.regex.match(line).groupdict().items():
+                    if name not in positions:
+                        continue
+                    position = positions[name]
+                    if position in lists:
+                        nested = values[position].regex.match(item) if values[position].nested and item is not None else None
+                        current[position].append(nested.groupdict() if nested else item)
+                        continue
+                    current[position] = item
+                    if item and position in fillup:
+                        for previous in reversed(records):
+                            if previous[position]:
+                                break
+                            previous[position] = item
+
+                if rule.record_op == "Record":
+                    record()
+                elif rule.record_op == "Clear":
+                    clear()
+                elif rule.record_op == "Clearall":
+                    clear(True)
+
+                if rule.line_op == "Continue":
+                    index = state.next_match(line, index + 1)
+                    continue
+                if rule.new_state:
+                    if rule.new_state == "End":
+                        return self._records(records)
+                    if rule.new_state == "EOF":
+                        state = None
+                    else:
+                        state = self.states[rule.new_state]
+                break
+            if state is None:
+                break
+
+        # Implicit record at the end of the input unless an EOF state is defined
+        if "EOF" not in self.states:
+            record()
+        return self._records(records)
+
+    def _records(self, rows):
+        """Convert record rows to dictionaries"""
+        header = self.header
+        return [dict(zip(header, row)) for row in rows]
+
+
+class TemplateLibrary:
+    """Directory of templates, compiled on first use"""
+
+    def __init__(self, directory):
+        """Initialize the library
+
+        Args:
+            directory (Path): Directory holding the .textfsm files
+        """
+        self.directory = Path(directory)
+        self._templates = {}  # {name: (mtime, ParserTemplate)}
+        self._lock = threading.Lock()
+
+    def names(self):
+        """Get the names of the available templates"""
+        if not self.directory.exists():
+            return []
+        return sorted(path.stem for path in self.directory.glob(f"*{TEMPLATE_EXTENSION}"))
+
+    def exists(self, name):
+        """Check if a template exists"""
+        return bool(name) and (self.directory / f"{name}{TEMPLATE_EXTENSION}").exists()
+
+    def get(self, name):
+        """Get a compiled template, recompiling it if its file changed
+
+        Args:
+            name (str): Template name, with or without the .textfsm extension
+
+        Returns:
+            ParserTemplate: The template, or None if it does not exist or is invalid
+        """
+        if not name:
+            return None
+        if name.endswith(TEMPLATE_EXTENSION):
+            name = name[:-len(TEMPLATE_EXTENSION)]
+        path = self.directory / f"{name}{TEMPLATE_EXTENSION}"
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._templates.get(name)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            try:
+                template = ParserTemplate(path.read_text(encoding="utf-8"), name)
+            except (OSError, UnicodeDecodeError, TemplateError) as e:
+                logger.error(f"Error compiling parser template {name}: {e}")
+                self._templates.pop(name, None)
+                return None
+            self._templates[name] = (mtime, template)
+            return template
+
+
+class ParsedOutputCache:
+    """Parse results cached by output hash and template fingerprint"""
+
+    def __init__(self, path):
+        """Open or create the cache database
+
+        Args:
+            path (Path): Database file
+        """
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()
+        self._pending = 0
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS parsed ("
+            "hash TEXT NOT NULL, fingerprint TEXT NOT NULL, records TEXT NOT NULL, "
+            "PRIMARY KEY (hash, fingerprint)) WITHOUT ROWID"
+        )
+        self.db.commit()
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            if self.db:
+                self.db.commit()
+                self.db.close()
+                self.db = None
+
+    def commit(self):
+        """Write cached results added since the last commit"""
+        with self._lock:
+            if self.db:
+                self.db.commit()
+            self._pending = 0
+
+    def _remember(self, key, records):
+        """Keep a result in memory (lock must be held)"""
+        self._memory[key] = records
+        self._memory.move_to_end(key)
+        while len(self._memory) > MEMORY_CACHE_SIZE:
+            self._memory.popitem(last=False)
+
+    def get(self, digest, fingerprint):
+        """Get cached records, or None"""
+        key = (digest, fingerprint)
+        with self._lock:
+            records = self._memory.get(key)
+            if records is not None:
+                self._memory.move_to_end(key)
+            elif self.db:
+                row = self.db.execute(
+                    "SELECT records FROM parsed WHERE hash = ? AND fingerprint = ?", key
+                ).fetchone()
+                if row:
+                    records = json.loads(row[0])
+                    self._remember(key, records)
+            if records is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return records
+
+    def put(self, digest, fingerprint, records):
+        """Cache the records parsed from an output"""
+        key = (digest, fingerprint)
+        with self._lock:
+            self._remember(key, records)
+            if self.db:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO parsed (hash, fingerprint, records) VALUES (?, ?, ?)",
+                    (digest, fingerprint, json.dumps(records, separators=(",", ":")))
+                )
+                self._pending += 1
+                if self._pending >= COMMIT_BATCH:
+                    self.commit()
+
+
+class OutputParser:
+    """Parses command outputs with templates, caching the results"""
+
+    def __init__(self, template_dir, cache_path=None):
+        """Initialize the parser
+
+        Args:
+            template_dir (Path): Directory holding the templates
+            cache_path (Path, optional): Database caching the results; results
+                are only cached in memory if not given or it cannot be opened
+        """
+        self.templates = TemplateLibrary(template_dir)
+        self.cache = None
+        if cache_path:
+            try:
+                self.cache = ParsedOutputCache(cache_path)
+            except sqlite3.Error as e:
+                logger.error(f"Error opening the parsed output cache: {e}")
+        self._memory = OrderedDict()
+
+    def close(self):
+        """Close the result cache"""
+        if self.cache:
+            self.cache.close()
+            self.cache = None
+
+    def commit(self):
+        """Write new cached results to disk"""
+        if self.cache:
+            self.cache.commit()
+
+    def cached(self, template, digest):
+        """Get the cached records of an output without reading it
+
+        Args:
+            template (ParserTemplate or str): Template or template name
+            digest (str): SHA-256 hash of the output
+
+        Returns:
+            list: Records, or None if the output has not been parsed with the template
+        """
+        if isinstance(template, str):
+            template = self.templates.get(template)
+        if template is None or not digest:
+            return None
+        if self.cache:
+            return self.cache.get(digest, template.fingerprint)
+        return self._memory.get((digest, template.fingerprint))
+
+    def parse(self, template, text, digest=None):
+        """Parse an output, using the cached result if there is one
+
+        Args:
+            template (ParserTemplate or str): Template or template name
+            text (str): Command output
+            digest (str, optional): SHA-256 hash of the output, computed if not given
+
+        Returns:
+            list: Records, or None if the template does not exist or failed
+        """
+        if isinstance(template, str):
+            template = self.templates.get(template)
+        if template is None or text is None:
+            return None
+
+        digest = digest or output_hash(text)
+        records = self.cached(template, digest)
+        if records is not None:
+            return records
+
+        try:
+            records = template.parse(text)
+        except ParseError as e:
+            logger.warning(f"Could not parse output with template {template.name}: {e}")
+            return None
+
+        if self.cache:
+            self.cache.put(digest, template.fingerprint, records)
+        else:
+            self._memory[(digest, template.fingerprint)] = records
+            while len(self._memory) > MEMORY_CACHE_SIZE:
+                self._memory.popitem(last=False)
+        return records
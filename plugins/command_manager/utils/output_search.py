@@ -0,0 +1,607 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Full-text search over stored command outputs for the Command Manager plugin
+
+The index is an SQLite database next to the output store with an FTS5
+inverted index over output contents. As in the store, contents are
+indexed once per device and hash, so an unchanged running configuration
+stored every night is indexed once. The FTS table is contentless: the
+index only holds terms and positions, and matching lines are read from
+the output store when results are shown.
+
+The index is maintained incrementally as outputs are added and deleted,
+and reconciled with the store index in the background (after a crash, a
+compaction or when the index is first created).
+
+Queries are words (all must appear), phrases, or regular expressions.
+Regular expressions are prefiltered with the literal words they contain
+where that is safe, and then matched line by line. Results can be limited
+to devices, commands, a time range and the latest output of each command.
+
+Contents no output refers to any more (after deletions, retention and
+compaction) are dropped from the index. SQLite 3.43 and later delete
+them from the FTS table right away. Older versions cannot delete from a
+contentless FTS table without the original text, so their stale text is
+reclaimed by rebuilding the FTS table in the background reconcile once it
+makes up a quarter of the index.
+
+When SQLite has no FTS5 support, searches fall back to scanning the
+outputs within the filters.
+"""
+
+import re
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from loguru import logger
+
+
+INDEX_FILE = "search.db"
+
+# Search modes
+MODE_WORDS = "words"
+MODE_PHRASE = "phrase"
+MODE_REGEX = "regex"
+
+# Commit after this many indexed outputs
+COMMIT_BATCH = 64
+
+# Rebuild the FTS table once this many stale contents (and a quarter of
+# all contents) are left in it
+MIN_STALE_REBUILD = 64
+
+# Device filters up to this size are matched in the FTS index
+MAX_INDEXED_DEVICES = 64
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Literal word in a regex that starts a word in every match (after ^, \b or
+# a literal separator) and is not made optional by a quantifier
+_REGEX_LITERAL = re.compile(r"(?:^\^|\\b|(?<=[ \-/:,;=@])|\\[.\-/:])([A-Za-z0-9]{2,})(?![?*{])")
+
+
+def regex_prefilter_terms(pattern):
+    """Get word prefixes that every match of a regular expression contains
+
+    Args:
+        pattern (str): Regular expression
+
+    Returns:
+        list: Word prefixes usable as FTS prefix queries (empty when none are safe)
+    """
+    if "|" in pattern:
+        return []
+    # Classes and groups may hold alternatives or optional parts
+    stripped = re.sub(r"\[[^\]]*\]|\([^)]*\)", "\x00", pattern)
+    return [match.group(1) for match in _REGEX_LITERAL.finditer(stripped)]
+
+
+class OutputSearchIndex:
+    """Inverted index over the outputs in an OutputStore"""
+
+    def __init__(self, path, store):
+        """Open or create the index
+
+        Args:
+            path (str): Database file
+            store (OutputStore): Store the indexed outputs are read from
+        """
+        self.path = Path(path)
+        self.store = store
+        self._lock = threading.RLock()
+        self._pending = 0
+
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                device_id TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                UNIQUE (device_id, hash)
+            );
+            CREATE TABLE IF NOT EXISTS outputs (
+                device_id TEXT NOT NULL,
+                command_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                command TEXT,
+                doc_id INTEGER NOT NULL,
+                latest INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (device_id, command_id, timestamp)
+            );
+            CREATE INDEX IF NOT EXISTS outputs_doc ON outputs (doc_id);
+            CREATE INDEX IF NOT EXISTS outputs_latest ON outputs (doc_id) WHERE latest = 1;
+        """)
+        self.fts_delete = False
+        try:
+            try:
+                self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS doc_text USING fts5("
+                                 "body, device, content='', contentless_delete=1)")
+            except sqlite3.OperationalError:
+                # contentless_delete needs SQLite 3.43
+                self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS doc_text USING fts5(body, device, content='')")
+            self.fts = True
+            sql = self._db.execute("SELECT sql FROM sqlite_master WHERE name = 'doc_text'").fetchone()[0]
+            self.fts_delete = "contentless_delete" in sql
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite has no FTS5 support, output searches will scan outputs: {e}")
+            self.fts = False
+        self._db.commit()
+
+    def close(self):
+        """Commit and close the database"""
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def commit(self):
+        """Commit pending changes"""
+        with self._lock:
+            self._db.commit()
+            self._pending = 0
+
+    def _doc_id(self, device_id, entry, text=None):
+        """Get the document of an output's content, indexing it if it is new (lock must be held)"""
+        row = self._db.execute("SELECT id FROM docs WHERE device_id = ? AND hash = ?",
+                               (device_id, entry["hash"])).fetchone()
+        if row:
+            return row[0]
+
+        cursor = self._db.execute("INSERT INTO docs (device_id, hash) VALUES (?, ?)", (device_id, entry["hash"]))
+        if self.fts:
+            if text is None:
+                text = self.store.read_body(device_id, entry)
+            self._db.execute("INSERT INTO doc_text (rowid, body, device) VALUES (?, ?, ?)",
+                             (cursor.lastrowid, text, device_id))
+        return cursor.lastrowid
+
+    def _drop_docs(self, doc_ids):
+        """Drop the documents no output refers to any more (lock must be held)
+
+        Returns:
+            int: Number of documents dropped
+        """
+        dropped = 0
+        for doc_id in set(doc_ids):
+            if self._db.execute("SELECT 1 FROM outputs WHERE doc_id = ? LIMIT 1", (doc_id,)).fetchone():
+                continue
+            self._db.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+            if self.fts and self.fts_delete:
+                self._db.execute("DELETE FROM doc_text WHERE rowid = ?", (doc_id,))
+            dropped += 1
+        return dropped
+
+    def _update_latest(self, device_id, command_id):
+        """Flag the latest output of a command (lock must be held)"""
+        self._db.execute("UPDATE outputs SET latest = 0 WHERE device_id = ? AND command_id = ? AND latest = 1",
+                         (device_id, command_id))
+        self._db.execute(
+            "UPDATE outputs SET latest = 1 WHERE rowid = (SELECT rowid FROM outputs "
+            "WHERE device_id = ? AND command_id = ? ORDER BY timestamp DESC LIMIT 1)",
+            (device_id, command_id)
+        )
+
+    def add(self, device_id, command_id, timestamp, entry, text=None):
+        """Index an output
+
+        Args:
+            device_id (str): Device ID
+            command_id (str): Command ID
+            timestamp (str): Timestamp of the output
+            entry (dict): Index entry from the output store
+            text (str, optional): Output text, read from the store when not given
+        """
+        if not entry.get("hash"):
+            # Outputs stored uncompressed by earlier versions are indexed once compacted
+            return
+        device_id = str(device_id)
+        with self._lock:
+            previous = self._db.execute(
+                "SELECT doc_id FROM outputs WHERE device_id = ? AND command_id = ? AND timestamp = ?",
+                (device_id, command_id, timestamp)
+            ).fetchone()
+            doc_id = self._doc_id(device_id, entry, text)
+            self._db.execute(
+                "INSERT OR REPLACE INTO outputs (device_id, command_id, timestamp, command, doc_id) VALUES (?, ?, ?, ?, ?)",
+                (device_id, command_id, timestamp, entry.get("command", command_id), doc_id)
+            )
+            if previous and previous[0] != doc_id:
+                self._drop_docs([previous[0]])
+            self._update_latest(device_id, command_id)
+            self._pending += 1
+            if self._pending >= COMMIT_BATCH:
+                self.commit()
+
+    def delete(self, device_id, command_id, timestamp=None):
+        """Remove one output, or all outputs of a command, from the index"""
+        device_id = str(device_id)
+        with self._lock:
+            if timestamp is None:
+                condition, params = "device_id = ? AND command_id = ?", (device_id, command_id)
+            else:
+                condition, params = "device_id = ? AND command_id = ? AND timestamp = ?", (device_id, command_id, timestamp)
+            doc_ids = [row[0] for row in self._db.execute(f"SELECT doc_id FROM outputs WHERE {condition}", params)]
+            self._db.execute(f"DELETE FROM outputs WHERE {condition}", params)
+            if timestamp is not None:
+                self._update_latest(device_id, command_id)
+            self._drop_docs(doc_ids)
+            self._pending += 1
+
+    def reconcile_device(self, device_id):
+        """Bring the index of a device in line with the output store
+
+        Returns:
+            tuple: (outputs added, outputs removed)
+        """
+        device_id = str(device_id)
+        # Hold the lock throughout so outputs deleted meanwhile are not indexed again
+        with self._lock:
+            entries = {
+                (command_id, timestamp): entry
+                for command_id, timestamps in self.store.read_index(device_id).items()
+                for timestamp, entry in timestamps.items()
+                if entry.get("hash")
+            }
+            indexed = {
+                (command_id, timestamp): digest
+                for command_id, timestamp, digest in self._db.execute(
+                    "SELECT o.command_id, o.timestamp, d.hash FROM outputs o JOIN docs d ON d.id = o.doc_id "
+                    "WHERE o.device_id = ?", (device_id,)
+                )
+            }
+
+            removed = [key for key, digest in indexed.items()
+                       if key not in entries or entries[key]["hash"] != digest]
+            for command_id, timestamp in removed:
+                self.delete(device_id, command_id, timestamp)
+
+            added = 0
+            for (command_id, timestamp), entry in entries.items():
+                if indexed.get((command_id, timestamp)) != entry["hash"]:
+                    try:
+                        self.add(device_id, command_id, timestamp, entry)
+                        added += 1
+                    except (KeyError, ValueError, OSError) as e:
+                        logger.debug(f"Could not index output {command_id} {timestamp} of {device_id}: {e}")
+            self.commit()
+        return added, len(removed)
+
+    def _stale_text(self):
+        """Get the number of contents left in the FTS table that no document refers to"""
+        if not self.fts or self.fts_delete:
+            return 0
+        with self._lock:
+            indexed = self._db.execute("SELECT COUNT(*) FROM doc_text_docsize").fetchone()[0]
+            documents = self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        stale = indexed - documents
+        return stale if stale >= max(MIN_STALE_REBUILD, documents // 4) else 0
+
+    def _rebuild_text(self, should_stop=None):
+        """Index the text of the current documents again, dropping stale contents
+
+        Devices are indexed one at a time, so searches meanwhile may miss
+        outputs of devices that are not indexed again yet.
+        """
+        with self._lock:
+            self._db.execute("INSERT INTO doc_text (doc_text) VALUES ('delete-all')")
+            device_ids = [row[0] for row in self._db.execute("SELECT DISTINCT device_id FROM docs")]
+            self.commit()
+
+        for device_id in device_ids:
+            if should_stop and should_stop():
+                # Unindexed documents are dropped so the next reconcile indexes them
+                with self._lock:
+                    self._db.execute("DELETE FROM outputs WHERE doc_id NOT IN (SELECT rowid FROM doc_text_docsize)")
+                    self._db.execute("DELETE FROM docs WHERE id NOT IN (SELECT rowid FROM doc_text_docsize)")
+                    self.commit()
+                return
+            with self._lock:
+                entries = {
+                    (command_id, timestamp): entry
+                    for command_id, timestamps in self.store.read_index(device_id).items()
+                    for timestamp, entry in timestamps.items()
+                }
+                rows = self._db.execute(
+                    "SELECT d.id, MIN(o.command_id), MIN(o.timestamp) FROM docs d JOIN outputs o ON o.doc_id = d.id "
+                    "WHERE d.device_id = ? GROUP BY d.id", (device_id,)
+                ).fetchall()
+                for doc_id, command_id, timestamp in rows:
+                    try:
+                        text = self.store.read_body(device_id, entries[(command_id, timestamp)])
+                    except (KeyError, ValueError, OSError) as e:
+                        logger.debug(f"Could not index output {command_id} {timestamp} of {device_id}: {e}")
+                        continue
+                    self._db.execute("INSERT INTO doc_text (rowid, body, device) VALUES (?, ?, ?)",
+                                     (doc_id, text, device_id))
+                self.commit()
+
+    def reconcile(self, should_stop=None):
+        """Reconcile the index of every device with the output store
+
+        Args:
+            should_stop (callable, optional): Returns True to stop early
+
+        Returns:
+            dict: Number of devices, outputs added and removed
+        """
+        started = time.monotonic()
+        stats = {"devices": 0, "added": 0, "removed": 0}
+        device_ids = set(self.store.device_ids())
+        with self._lock:
+            indexed_devices = set(row[0] for row in self._db.execute("SELECT DISTINCT device_id FROM outputs"))
+
+        for device_id in sorted(device_ids | indexed_devices):
+            if should_stop and should_stop():
+                break
+            try:
+                added, removed = self.reconcile_device(device_id)
+            except Exception as e:
+                logger.error(f"Error indexing outputs of device {device_id}: {e}")
+                continue
+            stats["devices"] += 1
+            stats["added"] += added
+            stats["removed"] += removed
+        self.commit()
+
+        stale = self._stale_text()
+        if stale and not (should_stop and should_stop()):
+            logger.info(f"Rebuilding the output search index to drop {stale} stale contents")
+            self._rebuild_text(should_stop)
+            stats["rebuilt"] = stale
+
+        stats["duration"] = round(time.monotonic() - started, 3)
+        logger.info(f"Output search index reconciled: {stats}")
+        return stats
+
+    def commands(self):
+        """Get the distinct indexed commands
+
+        Returns:
+            list: (command_id, command text) tuples
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT command_id, MIN(command) FROM outputs GROUP BY command_id ORDER BY 2"
+            ).fetchall()
+
+    def _match_expression(self, query, mode):
+        """Build the FTS5 query and the line finder for a search
+
+        Returns:
+            tuple: (FTS5 MATCH expression or None to scan, function returning
+                the numbered matching lines of an output)
+        """
+        if mode == MODE_REGEX:
+            regex = re.compile(query, re.IGNORECASE)
+            terms = regex_prefilter_terms(query)
+            expression = " AND ".join(f'"{term}"*' for term in terms) or None
+            # Anchors match at line bounds only when lines are matched one by one
+            anchored = re.search(r"[$^]|\\[AZ]", query) is not None
+            return expression, lambda text, max_lines: _regex_lines(text, regex, max_lines, anchored)
+
+        words = _WORD.findall(query)
+        if not words:
+            raise ValueError("Search query has no words")
+
+        lowered = [word.lower() for word in words]
+        if mode == MODE_PHRASE:
+            separator = r"[^\w\n]+"
+            phrase = re.compile(separator.join(re.escape(word) for word in lowered))
+            phrase_any_case = re.compile(separator.join(re.escape(word) for word in words), re.IGNORECASE)
+            return '"' + " ".join(words) + '"', \
+                lambda text, max_lines: _pattern_lines(text, phrase, phrase_any_case, max_lines)
+
+        return " AND ".join(f'"{word}"' for word in words), \
+            lambda text, max_lines: _word_lines(text, lowered, max_lines)
+
+    def search(self, query, mode=MODE_WORDS, devices=None, commands=None, since=None, until=None,
+               latest_only=True, limit=200, max_lines=20):
+        """Search stored outputs
+
+        Args:
+            query (str): Words, phrase or regular expression
+            mode (str): MODE_WORDS, MODE_PHRASE or MODE_REGEX
+            devices (list, optional): Only search these device IDs
+            commands (list, optional): Only search these command IDs
+            since (str, optional): Only search outputs at or after this ISO timestamp
+            until (str, optional): Only search outputs at or before this ISO timestamp
+            latest_only (bool): Only search the latest output of each command per device
+                (at the end of the time range)
+            limit (int): Maximum number of outputs returned, newest first
+            max_lines (int): Maximum number of matching lines returned per output
+
+        Returns:
+            dict: results (list of dicts with device_id, command_id, command,
+                timestamp, lines [(line number, text)]) sorted by device and
+                command, devices (matching device IDs), candidates, truncated
+                and duration_ms
+        """
+        started = time.perf_counter()
+        expression, find_lines = self._match_expression(query, mode)
+
+        conditions = []
+        params = []
+        if devices is not None:
+            conditions.append("o.device_id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([str(device) for device in devices]))
+        if commands is not None:
+            conditions.append("o.command_id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(commands)))
+        if since:
+            conditions.append("o.timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("o.timestamp <= ?")
+            params.append(until)
+        if latest_only and until:
+            conditions.append("o.timestamp = (SELECT MAX(l.timestamp) FROM outputs l WHERE l.device_id = o.device_id "
+                              "AND l.command_id = o.command_id AND l.timestamp <= ?)")
+            params.append(until)
+        elif latest_only:
+            conditions.append("o.latest = 1")
+
+        if expression and self.fts:
+            # Walk the matching documents newest first and stop at the limit
+            # instead of collecting every match of a common word. A short
+            # device list is matched in the index too, so that documents of
+            # other devices are skipped rather than read
+            expression = f"body : ({expression})"
+            if devices and len(devices) <= MAX_INDEXED_DEVICES:
+                expression += " AND device : (" + " OR ".join(_quoted(device) for device in devices) + ")"
+            sql = "SELECT o.device_id, o.command_id, o.command, o.timestamp, d.hash FROM doc_text f " \
+                  "CROSS JOIN outputs o ON o.doc_id = f.rowid CROSS JOIN docs d ON d.id = o.doc_id " \
+                  "WHERE doc_text MATCH ?"
+            params.insert(0, expression)
+            order = "f.rowid DESC"
+        else:
+            sql = "SELECT o.device_id, o.command_id, o.command, o.timestamp, d.hash FROM outputs o " \
+                  "JOIN docs d ON d.id = o.doc_id WHERE 1"
+            order = "o.timestamp DESC"
+        if conditions:
+            sql += " AND " + " AND ".join(conditions)
+        sql += " ORDER BY " + order
+
+        results = []
+        texts = {}
+        candidates = 0
+        truncated = False
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            while not truncated:
+                rows = cursor.fetchmany(limit)
+                if not rows:
+                    break
+                for row in rows:
+                    if len(results) >= limit:
+                        truncated = True
+                        break
+                    candidates += 1
+                    result = self._result(row, texts, find_lines, max_lines)
+                    if result:
+                        results.append(result)
+
+        results.sort(key=lambda result: result["timestamp"], reverse=True)
+        results.sort(key=lambda result: (result["device_id"], result["command_id"]))
+        return {
+            "results": results,
+            "devices": sorted(set(result["device_id"] for result in results)),
+            "candidates": candidates,
+            "truncated": truncated,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    def _result(self, row, texts, find_lines, max_lines):
+        """Build the result for a candidate output, or None if no line matches"""
+        device_id, command_id, command, timestamp, digest = row
+
+        # Outputs with the same content share the text
+        key = (device_id, digest)
+        if key not in texts:
+            try:
+                texts[key] = self.store.read_body(device_id, {"hash": digest})
+            except (KeyError, ValueError, OSError) as e:
+                logger.debug(f"Could not read output {digest} of {device_id}: {e}")
+                texts[key] = None
+        if texts[key] is None:
+            return None
+
+        lines = find_lines(texts[key], max_lines)
+        if not lines:
+            return None
+
+        return {
+            "device_id": device_id,
+            "command_id": command_id,
+            "command": command,
+            "timestamp": timestamp,
+            "lines": lines
+        }
+
+
+def _quoted(value):
+    """Quote a value as an FTS5 string"""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _lowered(text):
+    """Lowercase a text for matching, or None if that would move line offsets"""
+    lowered = text.lower()
+    return lowered if len(lowered) == len(text) else None
+
+
+def _line_at(text, start, end):
+    """Get the bounds of the line containing text[start:end]"""
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    return line_start, line_end if line_end >= 0 else len(text)
+
+
+def _numbered(text, bounds):
+    """Number the lines with the given bounds, in order"""
+    lines = []
+    number = 1
+    counted = 0
+    for start, end in bounds:
+        number += text.count("\n", counted, start)
+        counted = start
+        lines.append((number, text[start:end].rstrip("\r")))
+    return lines
+
+
+def _pattern_lines(text, pattern, pattern_any_case, max_lines):
+    """Get the numbered lines of a text that contain a match of a single-line pattern
+
+    The pattern matches lowercased text, which is faster than matching
+    case-insensitively with pattern_any_case.
+    """
+    haystack = _lowered(text)
+    if haystack is None:
+        haystack, pattern = text, pattern_any_case
+
+    bounds = []
+    position = 0
+    while len(bounds) < max_lines:
+        match = pattern.search(haystack, position)
+        if not match:
+            break
+        bounds.append(_line_at(haystack, match.start(), match.end()))
+        position = bounds[-1][1] + 1
+    return _numbered(text, bounds)
+
+
+def _word_lines(text, words, max_lines):
+    """Get the numbered lines of a text with every word, or else with any word"""
+    haystack = _lowered(text)
+    if haystack is None:
+        return [(number, line) for number, line in enumerate(text.splitlines(), 1)
+                if any(word in line.lower() for word in words)][:max_lines]
+
+    # Line bounds -> number of the words found on the line
+    found = {}
+    for word in set(words):
+        position = haystack.find(word)
+        while position >= 0:
+            line = _line_at(haystack, position, position + len(word))
+            found[line] = found.get(line, 0) + 1
+            position = haystack.find(word, line[1] + 1)
+
+    every = [line for line, count in found.items() if count == len(set(words))]
+    return _numbered(text, sorted(every or found)[:max_lines])
+
+
+def _regex_lines(text, regex, max_lines, anchored):
+    """Get the numbered lines of a text in which a regular expression matches"""
+    if not anchored and not regex.search(text):
+        return []
+    lines = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if regex.search(line):
+            lines.append((number, line))
+            if len(lines) >= max_lines:
+                break
+    return lines
@@ -0,0 +1,867 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Append-only command output store for the Command Manager plugin
+
+Every device has its own directory with two append-only files:
+
+- ``outputs.dat``: compressed output bodies (blobs), one after the other
+- ``outputs.idx``: JSON lines index with one record per added or deleted
+  output; add records hold the command, timestamp, success flag, the
+  SHA-256 hash and size of the output and where its blob is stored.
+  Compaction writes blob records for all delta bases ahead of the add
+  records
+
+Adding an output writes at most one blob and one index line, so the cost
+of an append does not depend on how much history is stored. Deletes are
+recorded as tombstones. Files are flushed on every write and fsynced in
+batches.
+
+Blobs are content addressed: an output identical to one already stored
+for the device (e.g. an unchanged ``show running-config``) only adds an
+index line pointing at the existing blob. An output that differs a little
+from the previous output of the same command is stored as a line delta
+against the last fully stored version of that command, so reading an
+output never decompresses more than two blobs. A new full version is
+stored once the delta stops being much smaller than it.
+
+Deleted outputs stay in the files until the device is compacted: the
+live outputs are copied to new files, which replace the old ones in a
+way that can be completed after a crash.
+
+Listing a device's history only reads its index. Outputs are returned as
+OutputRecord mappings whose body is read on first access through a
+bounded LRU cache, so memory use does not grow with the stored history.
+"""
+
+import os
+import json
+import time
+import zlib
+import difflib
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+from loguru import logger
+
+
+DATA_FILE = "outputs.dat"
+INDEX_FILE = "outputs.idx"
+
+# Files written while compacting a device
+COMPACT_SUFFIX = ".compact"
+COMMITTED_INDEX = INDEX_FILE + ".new"
+
+# Legacy per-device history file, imported once
+LEGACY_FILE = "command_outputs.json"
+
+# Default size of the output body cache in characters
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+
+# Compressed bytes read at a time when streaming a blob to a file
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Blob encodings
+ENCODING_RAW = "raw"      # uncompressed, written by earlier versions
+ENCODING_ZLIB = "zlib"    # zlib compressed output
+ENCODING_DELTA = "delta"  # zlib compressed line delta against a base blob
+
+
+def make_delta(base, text):
+    """Compute a line delta that turns base into text
+
+    Args:
+        base (str): Previous output
+        text (str): New output
+
+    Returns:
+        list: Operations; [start, end] copies base lines, a string inserts text
+    """
+    base_lines = base.splitlines(keepends=True)
+    lines = text.splitlines(keepends=True)
+
+    # Successive outputs usually differ in a few places, so only match the
+    # lines between the common prefix and suffix
+    prefix = 0
+    limit = min(len(base_lines), len(lines))
+    while prefix < limit and base_lines[prefix] == lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and base_lines[-1 - suffix] == lines[-1 - suffix]:
+        suffix += 1
+
+    delta = [[0, prefix]] if prefix else []
+    matcher = difflib.SequenceMatcher(None, base_lines[prefix:len(base_lines) - suffix],
+                                      lines[prefix:len(lines) - suffix])
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([prefix + i1, prefix + i2])
+        elif j1 < j2:
+            delta.append("".join(lines[prefix + j1:prefix + j2]))
+    if suffix:
+        delta.append([len(base_lines) - suffix, len(base_lines)])
+    return delta
+
+
+def apply_delta(base, delta):
+    """Rebuild an output from its base and a delta from make_delta
+
+    Args:
+        base (str): Base output
+        delta (list): Delta operations
+
+    Returns:
+        str: Rebuilt output
+    """
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in delta:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return "".join(parts)
+
+
+class OutputCache:
+    """Least recently used cache of output bodies, bounded by total size"""
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        """Initialize the cache
+
+        Args:
+            max_size (int): Maximum total size of the cached outputs in characters
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get a cached output, or None"""
+        with self._lock:
+            text = self._items.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key, text):
+        """Add an output, evicting the least recently used ones when full"""
+        if len(text) > self.max_size:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = text
+            self.size += len(text)
+            while self.size > self.max_size:
+                _key, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        """Remove all cached outputs"""
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+class OutputRecord(Mapping):
+    """Stored output that reads its body on first access
+
+    Behaves like the {"output", "success", "command"} dictionaries used
+    for command history, plus "size" (output size in bytes).
+    """
+
+    __slots__ = ("_store", "_device_id", "_entry")
+
+    KEYS = ("output", "success", "command", "size")
+
+    def __init__(self, store, device_id, entry):
+        self._store = store
+        self._device_id = device_id
+        self._entry = entry
+
+    @property
+    def entry(self):
+        """Index entry of the output"""
+        return self._entry
+
+    def write_output(self, f):
+        """Stream the output into a binary file, see OutputStore.write_body"""
+        return self._store.write_body(self._device_id, self._entry, f)
+
+    def __getitem__(self, key):
+        if key == "output":
+            return self._store.read_body(self._device_id, self._entry)
+        if key in ("success", "command", "size"):
+            return self._entry[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f"OutputRecord({self._device_id!r}, command={self._entry['command']!r}, size={self._entry['size']})"
+
+
+class OutputStore:
+    """Append-only store of command outputs per device"""
+
+    def __init__(self, directory, fsync_batch=64, fsync_interval=2.0, delta=True,
+                 cache_size=DEFAULT_CACHE_SIZE):
+        """Initialize the store
+
+        Args:
+            directory (str): Directory holding one subdirectory per device
+            fsync_batch (int): Number of appends after which files are fsynced
+            fsync_interval (float): Seconds after which pending appends are fsynced
+            delta (bool): Store outputs as deltas against the previous output of the command
+            cache_size (int): Size of the output body cache in characters
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fsync_batch = max(1, int(fsync_batch))
+        self.fsync_interval = fsync_interval
+        self.delta = delta
+        self.cache = OutputCache(cache_size)
+
+        self._lock = threading.RLock()
+        self._dirty = set()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+        # Per device blob locations {hash: blob} and latest blob per command,
+        # filled when a device index is first replayed
+        self._blobs = {}
+        self._latest = {}
+        self._records = {}     # index lines per device
+        self._generation = {}  # compactions per device
+
+    def _device_dir(self, device_id):
+        return self.directory / str(device_id)
+
+    def device_ids(self):
+        """Get the IDs of all devices with stored outputs"""
+        return [d.name for d in self.directory.iterdir()
+                if d.is_dir() and (d / INDEX_FILE).exists()]
+
+    def has_device(self, device_id):
+        """Check if a device has an index in the store"""
+        return (self._device_dir(device_id) / INDEX_FILE).exists()
+
+    def _append_index(self, device_dir, record):
+        """Append a record to a device index (lock must be held)"""
+        index_path = device_dir / INDEX_FILE
+        with open(index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._dirty.add(index_path)
+
+    def _note_write(self):
+        """Count a write and fsync when the batch is full or old enough (lock must be held)"""
+        self._pending += 1
+        if self._pending >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def _device_blobs(self, device_id):
+        """Get the blob table of a device, replaying its index once (lock must be held)"""
+        device_id = str(device_id)
+        if device_id not in self._blobs:
+            self._replay(device_id)
+        return self._blobs[device_id], self._latest[device_id]
+
+    def _encode(self, device_id, body, text, command_id, blobs, latest):
+        """Compress an output, as a delta when it is much smaller than the full blob
+
+        Deltas are taken against the last fully stored output of the command,
+        the base of the previous output when that one is a delta itself.
+
+        Returns:
+            tuple: (encoding, base hash or None, blob bytes)
+        """
+        previous = blobs.get(latest.get(command_id))
+        if self.delta and previous is not None:
+            base_hash = previous["base"] if previous["encoding"] == ENCODING_DELTA else latest[command_id]
+            base = blobs.get(base_hash)
+            if base is not None and base["encoding"] == ENCODING_ZLIB:
+                try:
+                    base_text = self._read_blob(device_id, base_hash, blobs)
+                    delta = zlib.compress(json.dumps(make_delta(base_text, text),
+                                                     separators=(",", ":")).encode("utf-8"))
+                    # Small deltas always pay off; otherwise compare with the full blob
+                    if len(delta) < len(body) // 16:
+                        return ENCODING_DELTA, base_hash, delta
+                    full = zlib.compress(body)
+                    if len(delta) < len(full) // 2:
+                        return ENCODING_DELTA, base_hash, delta
+                    return ENCODING_ZLIB, None, full
+                except (OSError, ValueError, zlib.error) as e:
+                    logger.warning(f"Could not read delta base for device {device_id}: {e}")
+
+        return ENCODING_ZLIB, None, zlib.compress(body)
+
+    def append(self, device_id, command_id, timestamp, output, command=None, success=True):
+        """Append an output
+
+        Args:
+            device_id (str): Device ID
+            command_id (str): Command ID
+            timestamp (str): Timestamp of the output
+            output (str): Command output
+            command (str, optional): Command text
+            success (bool): Whether the command succeeded
+
+        Returns:
+            dict: Index entry of the output
+        """
+        text = output or ""
+        body = text.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            device_dir = self._device_dir(device_id)
+            device_dir.mkdir(exist_ok=True)
+            blobs, latest = self._device_blobs(device_id)
+
+            blob = blobs.get(digest)
+            if blob is None:
+                # New content: write a blob
+                encoding, base_hash, data = self._encode(device_id, body, text, command_id, blobs, latest)
+                data_path = device_dir / DATA_FILE
+                with open(data_path, "ab") as f:
+                    offset = f.tell()
+                    f.write(data)
+                self._dirty.add(data_path)
+                blob = {"offset": offset, "length": len(data), "encoding": encoding, "base": base_hash}
+                blobs[digest] = blob
+
+            record = {
+                "op": "add",
+                "command_id": command_id,
+                "timestamp": timestamp,
+                "command": command if command else command_id,
+                "success": success,
+                "hash": digest,
+                "size": len(body),
+                "offset": blob["offset"],
+                "length": blob["length"],
+                "encoding": blob["encoding"]
+            }
+            if blob["base"]:
+                record["base"] = blob["base"]
+            self._append_index(device_dir, record)
+            latest[command_id] = digest
+            self._note_write()
+
+        self.cache.put((str(device_id), digest), text)
+        return self._entry(record)
+
+    def delete(self, device_id, command_id, timestamp=None):
+        """Record the deletion of one output, or of all outputs of a command
+
+        Args:
+            device_id (str): Device ID
+            command_id (str): Command ID
+            timestamp (str, optional): Output to delete, or None for all outputs of the command
+        """
+        with self._lock:
+            device_dir = self._device_dir(device_id)
+            if not (device_dir / INDEX_FILE).exists():
+                return
+            self._append_index(device_dir, {"op": "delete", "command_id": command_id, "timestamp": timestamp})
+            self._note_write()
+
+    @staticmethod
+    def _entry(record):
+        """Build an index entry from an add record"""
+        return {
+            "command": record.get("command", record.get("command_id")),
+            "success": record.get("success", True),
+            "hash": record.get("hash"),
+            "size": record.get("size", record["length"]),
+            "offset": record["offset"],
+            "length": record["length"],
+            "encoding": record.get("encoding", ENCODING_RAW)
+        }
+
+    def _replay(self, device_id):
+        """Replay a device index and cache its blob table (lock must be held)
+
+        Returns:
+            dict: {command_id: {timestamp: entry}}
+        """
+        device_dir = self._device_dir(device_id)
+        index_path = device_dir / INDEX_FILE
+        data_path = device_dir / DATA_FILE
+        entries = {}
+        blobs = {}
+        latest = {}
+        records = 0
+        generation = self._generation.get(device_id, 0)
+        self._blobs[device_id] = blobs
+        self._latest[device_id] = latest
+        self._records[device_id] = 0
+        self._recover(device_dir)
+        if not index_path.exists():
+            return entries
+
+        data_size = data_path.stat().st_size if data_path.exists() else 0
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                records += 1
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write at the end of the index
+                    logger.warning(f"Skipping corrupt index line for device {device_id}")
+                    continue
+
+                if record.get("op") == "blob":
+                    # Delta base written by a compaction ahead of the outputs
+                    blobs[record["hash"]] = {
+                        "offset": record["offset"],
+                        "length": record["length"],
+                        "encoding": record["encoding"],
+                        "base": None
+                    }
+                    continue
+
+                command_id = record.get("command_id")
+                if record.get("op") == "delete":
+                    if record.get("timestamp") is None:
+                        entries.pop(command_id, None)
+                    elif command_id in entries:
+                        entries[command_id].pop(record["timestamp"], None)
+                        if not entries[command_id]:
+                            del entries[command_id]
+                    continue
+
+                if record.get("offset", 0) + record.get("length", 0) > data_size:
+                    # Body was not written completely
+                    continue
+
+                digest = record.get("hash")
+                encoding = record.get("encoding", ENCODING_RAW)
+                entry = self._entry(record)
+                if not digest:
+                    # Located by offset, which changes when the device is compacted
+                    entry["generation"] = generation
+                if digest:
+                    blobs.setdefault(digest, {
+                        "offset": record["offset"],
+                        "length": record["length"],
+                        "encoding": encoding,
+                        "base": record.get("base")
+                    })
+                latest[command_id] = digest
+                entries.setdefault(command_id, {})[record["timestamp"]] = entry
+        self._records[device_id] = records
+
+        # Delta bases are resolved once the whole index is read, as a base may
+        # be recorded after its deltas
+        missing = set(digest for digest, blob in blobs.items()
+                      if blob["encoding"] == ENCODING_DELTA and blob["base"] not in blobs)
+        if missing:
+            logger.warning(f"Skipping outputs with missing delta base for device {device_id}")
+            for digest in missing:
+                del blobs[digest]
+            for command_id in list(entries):
+                timestamps = entries[command_id]
+                for timestamp in [timestamp for timestamp, entry in timestamps.items() if entry["hash"] in missing]:
+                    del timestamps[timestamp]
+                if not timestamps:
+                    del entries[command_id]
+            for command_id in [command_id for command_id, digest in latest.items() if digest in missing]:
+                del latest[command_id]
+        return entries
+
+    def _recover(self, device_dir):
+        """Finish or roll back a compaction interrupted by a crash (lock must be held)"""
+        data_tmp = device_dir / (DATA_FILE + COMPACT_SUFFIX)
+        index_tmp = device_dir / (INDEX_FILE + COMPACT_SUFFIX)
+        committed = device_dir / COMMITTED_INDEX
+        if committed.exists():
+            if data_tmp.exists():
+                os.replace(data_tmp, device_dir / DATA_FILE)
+            os.replace(committed, device_dir / INDEX_FILE)
+            logger.info(f"Completed interrupted compaction of {device_dir.name}")
+        for path in (data_tmp, index_tmp):
+            if path.exists():
+                path.unlink()
+
+    def read_index(self, device_id):
+        """Replay a device index
+
+        Args:
+            device_id (str): Device ID
+
+        Returns:
+            dict: {command_id: {timestamp: entry}} where entry holds command,
+                success, hash, size and the location of the blob
+        """
+        with self._lock:
+            return self._replay(str(device_id))
+
+    def _read_blob(self, device_id, digest, blobs, cache=None, f=None):
+        """Read and decode a blob, following its delta chain
+
+        Args:
+            device_id (str): Device ID
+            digest (str): Hash of the output
+            blobs (dict): Blob table of the device
+            cache (dict, optional): Decoded outputs by hash, shared between reads
+            f (file, optional): Open data file of the device
+
+        Returns:
+            str: Command output
+        """
+        if f is None:
+            with open(self._device_dir(device_id) / DATA_FILE, "rb") as f:
+                return self._read_blob(device_id, digest, blobs, cache, f)
+
+        # Walk back to a fully stored (or cached) blob, then apply the deltas
+        chain = []
+        text = None
+        while digest is not None:
+            if cache is not None and digest in cache:
+                text = cache[digest]
+                break
+            blob = blobs.get(digest)
+            if blob is None:
+                raise ValueError(f"Missing blob {digest}")
+            chain.append((digest, blob))
+            digest = blob["base"] if blob["encoding"] == ENCODING_DELTA else None
+
+        for digest, blob in reversed(chain):
+            f.seek(blob["offset"])
+            data = f.read(blob["length"])
+            if blob["encoding"] == ENCODING_DELTA:
+                text = apply_delta(text, json.loads(zlib.decompress(data).decode("utf-8")))
+            elif blob["encoding"] == ENCODING_ZLIB:
+                text = zlib.decompress(data).decode("utf-8", errors="replace")
+            else:
+                text = data.decode("utf-8", errors="replace")
+            if cache is not None:
+                cache[digest] = text
+        return text
+
+    def _read_entry(self, device_id, entry, blobs, cache=None, f=None):
+        """Read the output of an index entry"""
+        if entry.get("hash"):
+            if entry["hash"] not in blobs:
+                raise KeyError(f"Output {entry['hash']} was removed from the history of {device_id}")
+            return self._read_blob(device_id, entry["hash"], blobs, cache, f)
+
+        # Uncompressed body written by earlier versions
+        if entry.get("generation", 0) != self._generation.get(device_id, 0):
+            raise KeyError(f"History of {device_id} was compacted since the output was listed")
+        if f is None:
+            with open(self._device_dir(device_id) / DATA_FILE, "rb") as f:
+                f.seek(entry["offset"])
+                return f.read(entry["length"]).decode("utf-8", errors="replace")
+        f.seek(entry["offset"])
+        return f.read(entry["length"]).decode("utf-8", errors="replace")
+
+    def read_body(self, device_id, entry):
+        """Read the output body of an index entry
+
+        Args:
+            device_id (str): Device ID
+            entry (dict): Index entry from read_index
+
+        Returns:
+            str: Command output
+
+        Raises:
+            KeyError: The output was deleted and the device compacted since it was listed
+        """
+        device_id = str(device_id)
+        key = (device_id, entry.get("hash") or entry["offset"])
+        text = self.cache.get(key)
+        if text is None:
+            # A compaction must not replace the data file during the read
+            with self._lock:
+                blobs, _latest = self._device_blobs(device_id)
+                text = self._read_entry(device_id, entry, blobs)
+            self.cache.put(key, text)
+        return text
+
+    def write_body(self, device_id, entry, f):
+        """Write the output body of an index entry to a binary file
+
+        Compressed blobs are decompressed in chunks, so a large output is
+        not held in memory as a whole (deltas are applied in memory).
+
+        Args:
+            device_id (str): Device ID
+            entry (dict): Index entry from read_index
+            f (file): Binary file the UTF-8 output is written to
+
+        Returns:
+            int: Number of bytes written
+
+        Raises:
+            KeyError: The output was deleted and the device compacted since it was listed
+        """
+        device_id = str(device_id)
+        text = self.cache.get((device_id, entry.get("hash") or entry["offset"]))
+        if text is None:
+            # A compaction must not replace the data file during the read
+            with self._lock:
+                blobs, _latest = self._device_blobs(device_id)
+                blob = blobs.get(entry.get("hash"))
+                if blob is not None and blob["encoding"] == ENCODING_ZLIB:
+                    return self._write_blob(device_id, blob, f)
+                text = self._read_entry(device_id, entry, blobs)
+
+        data = text.encode("utf-8")
+        f.write(data)
+        return len(data)
+
+    def _write_blob(self, device_id, blob, f):
+        """Decompress a zlib blob into a file in chunks"""
+        decompressor = zlib.decompressobj()
+        written = 0
+        with open(self._device_dir(device_id) / DATA_FILE, "rb") as data_file:
+            data_file.seek(blob["offset"])
+            remaining = blob["length"]
+            while remaining > 0:
+                chunk = data_file.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ValueError(f"Truncated blob in the history of {device_id}")
+                remaining -= len(chunk)
+                data = decompressor.decompress(chunk)
+                f.write(data)
+                written += len(data)
+        data = decompressor.flush()
+        f.write(data)
+        return written + len(data)
+
+    def load_index(self, device_id):
+        """Load the history of a device without reading output bodies
+
+        Args:
+            device_id (str): Device ID
+
+        Returns:
+            dict: {command_id: {timestamp: OutputRecord}}
+        """
+        device_id = str(device_id)
+        return {
+            command_id: {timestamp: OutputRecord(self, device_id, entry) for timestamp, entry in timestamps.items()}
+            for command_id, timestamps in self.read_index(device_id).items()
+        }
+
+    def load_device(self, device_id):
+        """Load all outputs of a device
+
+        Args:
+            device_id (str): Device ID
+
+        Returns:
+            dict: {command_id: {timestamp: {"output", "success", "command"}}}
+        """
+        device_id = str(device_id)
+        outputs = {}
+        # Held across the reads, so a compaction cannot replace the data file
+        with self._lock:
+            entries = self._replay(device_id)
+            blobs = self._blobs[device_id]
+            if not entries:
+                return outputs
+
+            cache = {}
+            with open(self._device_dir(device_id) / DATA_FILE, "rb") as f:
+                for command_id, timestamps in entries.items():
+                    for timestamp, entry in timestamps.items():
+                        outputs.setdefault(command_id, {})[timestamp] = {
+                            "output": self._read_entry(device_id, entry, blobs, cache, f),
+                            "success": entry["success"],
+                            "command": entry["command"]
+                        }
+        return outputs
+
+    def import_outputs(self, device_id, outputs):
+        """Import a device's outputs in the legacy dictionary format
+
+        Args:
+            device_id (str): Device ID
+            outputs (dict): {command_id: {timestamp: {"output", "success", "command"} or str}}
+
+        Returns:
+            int: Number of outputs imported
+        """
+        count = 0
+        with self._lock:
+            for command_id, timestamps in outputs.items():
+                for timestamp, entry in sorted(timestamps.items()):
+                    if isinstance(entry, dict):
+                        self.append(device_id, command_id, timestamp, entry.get("output", ""),
+                                    entry.get("command"), entry.get("success", True))
+                    else:
+                        self.append(device_id, command_id, timestamp, str(entry))
+                    count += 1
+            self.sync()
+        return count
+
+    def compact(self, device_id, min_garbage=0.25):
+        """Rewrite the files of a device with only its live outputs
+
+        Blobs of deleted outputs and delete records are dropped; blobs are
+        copied without being decoded again. Outputs stored uncompressed by
+        earlier versions are compressed. The device is skipped when less
+        than min_garbage of its files would be reclaimed.
+
+        Args:
+            device_id (str): Device ID
+            min_garbage (float): Minimum fraction of reclaimable space
+
+        Returns:
+            dict: compacted flag, live output count, bytes_before and bytes_after
+        """
+        device_id = str(device_id)
+        with self._lock:
+            device_dir = self._device_dir(device_id)
+            data_path = device_dir / DATA_FILE
+            index_path = device_dir / INDEX_FILE
+
+            entries = self._replay(device_id)
+            blobs = self._blobs[device_id]
+            data_size = data_path.stat().st_size if data_path.exists() else 0
+            index_size = index_path.stat().st_size if index_path.exists() else 0
+            live = sorted(
+                ((timestamp, command_id, entry)
+                 for command_id, timestamps in entries.items()
+                 for timestamp, entry in timestamps.items()),
+                key=lambda item: item[0]
+            )
+            stats = {"compacted": False, "outputs": len(live),
+                     "bytes_before": data_size + index_size, "bytes_after": data_size + index_size}
+            if not index_path.exists():
+                return stats
+
+            # Blobs still referenced, including the bases of deltas
+            needed = {}
+            legacy = 0
+            for _timestamp, _command_id, entry in live:
+                digest = entry["hash"]
+                if not digest:
+                    legacy += 1
+                    continue
+                needed[digest] = blobs[digest]
+                base = blobs[digest]["base"]
+                if blobs[digest]["encoding"] == ENCODING_DELTA and base:
+                    needed[base] = blobs[base]
+            live_data = sum(blob["length"] for blob in needed.values())
+            live_data += sum(entry["length"] for _t, _c, entry in live if not entry["hash"])
+            garbage = data_size - live_data
+            stale_records = self._records.get(device_id, 0) - len(live)
+
+            if not legacy and garbage < min_garbage * max(data_size, 1) and stale_records < min_garbage * max(len(live), 1):
+                return stats
+
+            data_tmp = device_dir / (DATA_FILE + COMPACT_SUFFIX)
+            index_tmp = device_dir / (INDEX_FILE + COMPACT_SUFFIX)
+            moved = {}
+            converted = {}
+            with open(data_path, "rb") as src, open(data_tmp, "wb") as dst:
+                # Copy in file order so that delta bases come before their deltas
+                for digest, blob in sorted(needed.items(), key=lambda item: item[1]["offset"]):
+                    src.seek(blob["offset"])
+                    data = src.read(blob["length"])
+                    moved[digest] = dict(blob, offset=dst.tell())
+                    dst.write(data)
+
+                # Compress outputs stored uncompressed by earlier versions
+                for timestamp, command_id, entry in live:
+                    if entry["hash"]:
+                        continue
+                    src.seek(entry["offset"])
+                    body = src.read(entry["length"])
+                    digest = hashlib.sha256(body).hexdigest()
+                    if digest not in moved:
+                        data = zlib.compress(body)
+                        moved[digest] = {"offset": dst.tell(), "length": len(data),
+                                         "encoding": ENCODING_ZLIB, "base": None}
+                        dst.write(data)
+                    converted[(timestamp, command_id)] = dict(entry, hash=digest, size=len(body))
+                dst.flush()
+                os.fsync(dst.fileno())
+
+            with open(index_tmp, "w", encoding="utf-8") as f:
+                # Every delta base comes first, even when a live output refers to it:
+                # outputs are written in timestamp order and may be older than their base
+                bases = set(blob["base"] for blob in needed.values() if blob["encoding"] == ENCODING_DELTA)
+                for digest, blob in sorted(moved.items(), key=lambda item: item[1]["offset"]):
+                    if digest in bases:
+                        f.write(json.dumps({
+                            "op": "blob",
+                            "hash": digest,
+                            "offset": blob["offset"],
+                            "length": blob["length"],
+                            "encoding": blob["encoding"]
+                        }, separators=(",", ":")) + "\n")
+
+                for timestamp, command_id, entry in live:
+                    if not entry["hash"]:
+                        entry = converted[(timestamp, command_id)]
+                    blob = moved[entry["hash"]]
+                    record = {
+                        "op": "add",
+                        "command_id": command_id,
+                        "timestamp": timestamp,
+                        "command": entry["command"],
+                        "success": entry["success"],
+                        "hash": entry["hash"],
+                        "size": entry["size"],
+                        "offset": blob["offset"],
+                        "length": blob["length"],
+                        "encoding": blob["encoding"]
+                    }
+                    if blob["base"]:
+                        record["base"] = blob["base"]
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            # The renamed index marks the compaction as committed
+            os.replace(index_tmp, device_dir / COMMITTED_INDEX)
+            os.replace(data_tmp, data_path)
+            os.replace(device_dir / COMMITTED_INDEX, index_path)
+            self._dirty.discard(data_path)
+            self._dirty.discard(index_path)
+
+            self._generation[device_id] = self._generation.get(device_id, 0) + 1
+            self._replay(device_id)
+            stats.update({"compacted": True, "bytes_after": data_path.stat().st_size + index_path.stat().st_size})
+            logger.debug(f"Compacted outputs of device {device_id}: {stats}")
+            return stats
+
+    def sync(self):
+        """Fsync all files written since the last sync"""
+        with self._lock:
+            for path in self._dirty:
+                try:
+                    fd = os.open(path, os.O_RDWR)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                except OSError as e:
+                    logger.warning(f"Could not fsync {path}: {e}")
+            self._dirty.clear()
+            self._pending = 0
+            self._last_sync = time.monotonic()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Extraction of parsed command output fields into device properties
+
+A command designates the device properties its parsed output fills with
+a mapping of property name to template value name, for example
+``{"serial_number": "SERIAL", "firmware_version": "VERSION"}`` for
+``show version``. The value of a property is the first non-empty value of
+the field across the parsed records; a field name ending in ``[]`` (such
+as ``"SN[]"`` for ``show inventory``) collects the values of all records.
+Values are stored as strings so they can be shown, filtered and grouped
+on like any other device property.
+
+Properties extracted during a run are collected in a PropertyBatch and
+applied to the DeviceManager in one update when the run finishes.
+"""
+
+from loguru import logger
+
+# Separator for fields holding several values
+LIST_SEPARATOR = ", "
+
+
+def format_value(value):
+    """Convert a parsed value to a device property value
+
+    Args:
+        value: String or list of strings (List values)
+
+    Returns:
+        str: The value, list items joined with LIST_SEPARATOR
+    """
+    if isinstance(value, list):
+        return LIST_SEPARATOR.join(str(item) for item in value if item not in (None, ""))
+    return "" if value is None else str(value).strip()
+
+
+def extract_properties(mapping, records):
+    """Map the fields of parsed records onto device properties
+
+    Args:
+        mapping (dict): Device property name -> template value name,
+            suffixed with "[]" to collect the values of all records
+        records (list): Parsed records (dictionaries keyed by value name)
+
+    Returns:
+        dict: Device property name -> value, only for fields that have a value
+    """
+    properties = {}
+    if not mapping or not records:
+        return properties
+
+    for name, field in mapping.items():
+        if not name or not field:
+            continue
+        if field.endswith("[]"):
+            field = field[:-2]
+            values = []
+            for record in records:
+                value = format_value(record.get(field))
+                if value and value not in values:
+                    values.append(value)
+            value = LIST_SEPARATOR.join(values)
+        else:
+            value = next((value for value in (format_value(record.get(field)) for record in records) if value), "")
+        if value:
+            properties[name] = value
+    return properties
+
+
+def parse_mapping(text):
+    """Parse a mapping written as "property=FIELD, property=FIELD"
+
+    Args:
+        text (str): Mapping text
+
+    Returns:
+        dict: Device property name -> template value name
+    """
+    mapping = {}
+    for item in text.split(","):
+        name, _, field = item.partition("=")
+        name = name.strip()
+        field = field.strip()
+        if name and field:
+            mapping[name] = field
+    return mapping
+
+
+def format_mapping(mapping):
+    """Write a mapping as "property=FIELD, property=FIELD" """
+    return ", ".join(f"{name}={field}" for name, field in (mapping or {}).items())
+
+
+class PropertyBatch:
+    """Device properties extracted during a run, applied in one update"""
+
+    def __init__(self):
+        """Initialize an empty batch"""
+        self.updates = {}  # {device_id: {property: value}}
+
+    def __len__(self):
+        """Get the number of devices with extracted properties"""
+        return len(self.updates)
+
+    def add(self, device_id, properties):
+        """Add extracted properties of a device, later values winning
+
+        Args:
+            device_id (str): Device ID
+            properties (dict): Device property name -> value
+        """
+        if properties:
+            self.updates.setdefault(device_id, {}).update(properties)
+
+
+def apply_properties(device_manager, updates):
+    """Apply extracted properties to devices in one batch
+
+    Uses DeviceManager.update_devices when available, which notifies
+    views once for the whole batch; otherwise every changed device is
+    updated with a single update_properties call.
+
+    Args:
+        device_manager: The application's DeviceManager
+        updates (dict): Device ID -> {property: value}
+
+    Returns:
+        list: Devices whose properties changed
+    """
+    if not device_manager or not updates:
+        return []
+
+    if hasattr(device_manager, "update_devices"):
+        return device_manager.update_devices(updates)
+
+    changed = []
+    for device_id, properties in updates.items():
+        device = device_manager.get_device(device_id)
+        if not device:
+            continue
+        properties = {key: value for key, value in properties.items() if device.get_property(key) != value}
+        if properties:
+            device.update_properties(properties)
+            changed.append(device)
+    logger.debug(f"Updated properties of {len(changed)} devices one by one")
+    return changed
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Retention policies for command output history
+
+A policy keeps the union of:
+
+- the last N outputs of a command
+- every output younger than a number of days
+- the latest output of each of the last N days, ISO weeks and months that
+  have outputs (daily, weekly and monthly snapshots)
+
+The latest output of a command is always kept. A policy with every limit
+set to 0 keeps everything.
+"""
+
+import datetime
+
+
+RETENTION_FIELDS = ("keep_last", "keep_days", "daily", "weekly", "monthly")
+
+
+class RetentionPolicy:
+    """Which outputs of a command to keep"""
+
+    def __init__(self, keep_last=0, keep_days=0, daily=0, weekly=0, monthly=0):
+        """Initialize the policy
+
+        Args:
+            keep_last (int): Number of most recent outputs to keep
+            keep_days (int): Keep every output younger than this many days
+            daily (int): Number of daily snapshots to keep
+            weekly (int): Number of weekly snapshots to keep
+            monthly (int): Number of monthly snapshots to keep
+        """
+        self.keep_last = max(0, int(keep_last or 0))
+        self.keep_days = max(0, int(keep_days or 0))
+        self.daily = max(0, int(daily or 0))
+        self.weekly = max(0, int(weekly or 0))
+        self.monthly = max(0, int(monthly or 0))
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {field: getattr(self, field) for field in RETENTION_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create from dictionary"""
+        data = data or {}
+        return cls(**{field: data.get(field, 0) for field in RETENTION_FIELDS})
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Create the default policy from the plugin settings"""
+        return cls(**{
+            field: settings.get(f"retention_{field}", {}).get("value", 0)
+            for field in RETENTION_FIELDS
+        })
+
+    @property
+    def unlimited(self):
+        """Whether the policy keeps every output"""
+        return not any(getattr(self, field) for field in RETENTION_FIELDS)
+
+    def select_expired(self, timestamps, now=None):
+        """Select the outputs of one command that the policy does not keep
+
+        Args:
+            timestamps (iterable): ISO format timestamps of the outputs
+            now (datetime, optional): Current time
+
+        Returns:
+            list: Timestamps of the outputs to delete
+        """
+        if self.unlimited:
+            return []
+
+        now = now or datetime.datetime.now()
+        dated = []
+        for timestamp in timestamps:
+            try:
+                dated.append((datetime.datetime.fromisoformat(timestamp), timestamp))
+            except (TypeError, ValueError):
+                # Outputs with unparseable timestamps are kept
+                continue
+        dated.sort(reverse=True)
+
+        keep = set(timestamp for _dt, timestamp in dated[:max(1, self.keep_last)])
+
+        if self.keep_days:
+            cutoff = now - datetime.timedelta(days=self.keep_days)
+            keep.update(timestamp for dt, timestamp in dated if dt >= cutoff)
+
+        for count, bucket in ((self.daily, lambda dt: dt.date()),
+                              (self.weekly, lambda dt: tuple(dt.isocalendar())[:2]),
+                              (self.monthly, lambda dt: (dt.year, dt.month))):
+            if not count:
+                continue
+            seen = set()
+            for dt, timestamp in dated:
+                key = bucket(dt)
+                if key in seen:
+                    continue
+                if len(seen) >= count:
+                    break
+                seen.add(key)
+                keep.add(timestamp)
+
+        return [timestamp for _dt, timestamp in dated if timestamp not in keep]
+
+    def __repr__(self):
+        return f"RetentionPolicy({', '.join(f'{k}={v}' for k, v in self.to_dict().items())})"
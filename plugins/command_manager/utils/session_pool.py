@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Session pool for the Command Manager plugin
+
+Logging in to a network device costs a TCP handshake, an SSH key exchange
+and an AAA authentication. The pool keeps authenticated SSH and Telnet
+sessions open so that the commands of a run, and consecutive runs on the
+same device, reuse one login.
+
+Sessions are keyed by (connection type, host, port, username, enable
+state) and are checked out exclusively, since the clients are not thread
+safe. Idle sessions are closed after a timeout, the number of open
+sessions is limited, and every session is health checked before it is
+handed out.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from loguru import logger
+
+from plugins.command_manager.utils.ssh_client import SSHClient
+from plugins.command_manager.utils.telnet_client import TelnetClient
+
+
+DEFAULT_PORTS = {"ssh": 22, "telnet": 23}
+
+
+def create_client(connection_type, host, port, credentials):
+    """Create an SSH or Telnet client for a device
+
+    Args:
+        connection_type (str): "ssh" or "telnet"
+        host (str): Device address
+        port (int): Device port
+        credentials (dict): Credentials with username, password and enable_password
+
+    Returns:
+        SSHClient or TelnetClient: Client that is not connected yet
+    """
+    client_class = {"ssh": SSHClient, "telnet": TelnetClient}.get(connection_type)
+    if client_class is None:
+        raise ValueError(f"Unsupported connection type: {connection_type}")
+
+    return client_class(
+        host=host,
+        username=credentials.get("username"),
+        password=credentials.get("password", ""),
+        enable_password=credentials.get("enable_password", ""),
+        port=port
+    )
+
+
+def session_key(host, credentials, port=None):
+    """Get the pool key of a session
+
+    Args:
+        host (str): Device address
+        credentials (dict): Credentials for the device
+        port (int, optional): Device port (defaults to the connection type's port)
+
+    Returns:
+        tuple: (connection_type, host, port, username, enable)
+    """
+    connection_type = credentials.get("connection_type", "ssh").lower()
+    port = int(port or credentials.get("port") or DEFAULT_PORTS.get(connection_type, 22))
+    return (connection_type, host, port, credentials.get("username"), bool(credentials.get("enable_password")))
+
+
+class PooledSession:
+    """An authenticated client owned by the pool"""
+
+    def __init__(self, key, client):
+        self.key = key
+        self.client = client
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.uses = 0
+
+    @property
+    def connection_type(self):
+        return self.key[0]
+
+    @property
+    def host(self):
+        return self.key[1]
+
+    def is_alive(self):
+        """Check if the underlying connection is still usable"""
+        try:
+            return self.client.is_alive()
+        except Exception:
+            return False
+
+    def close(self):
+        """Close the connection"""
+        try:
+            self.client.disconnect()
+        except Exception as e:
+            logger.debug(f"Error closing session to {self.host}: {e}")
+
+
+class SessionPool:
+    """Pool of authenticated device sessions"""
+
+    def __init__(self, max_sessions=32, idle_timeout=300, acquire_timeout=30, client_factory=None):
+        """Initialize the pool
+
+        Args:
+            max_sessions (int): Maximum number of open sessions (idle and in use)
+            idle_timeout (float): Seconds after which an idle session is closed
+            acquire_timeout (float): Seconds to wait for a free slot when the pool is full
+            client_factory (callable, optional): Function (connection_type, host, port, credentials)
+                returning a client, defaults to create_client
+        """
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_timeout = max(0, float(idle_timeout))
+        self.acquire_timeout = acquire_timeout
+        self.client_factory = client_factory or create_client
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle = {}        # {key: [PooledSession]} most recently used last
+        self._open = 0         # idle + in use + connecting
+        self._closed = threading.Event()
+        self._reaper = None
+
+        self._stats = {"created": 0, "reused": 0, "reconnected": 0, "evicted": 0, "failed_health_checks": 0}
+
+    def _connect(self, key, credentials):
+        """Create and authenticate a client (without holding the lock)"""
+        connection_type, host, port, _username, _enable = key
+        client = self.client_factory(connection_type, host, port, credentials)
+        client.connect()
+        try:
+            if credentials.get("enable_password") and hasattr(client, "enable"):
+                client.enable()
+        except Exception:
+            client.disconnect()
+            raise
+        return client
+
+    def _pop_idle(self, key):
+        """Take the most recently used idle session for a key (lock must be held)"""
+        sessions = self._idle.get(key)
+        if not sessions:
+            return None
+        session = sessions.pop()
+        if not sessions:
+            del self._idle[key]
+        return session
+
+    def _pop_oldest_idle(self):
+        """Take the least recently used idle session of any key (lock must be held)"""
+        oldest_key = None
+        for key, sessions in self._idle.items():
+            if oldest_key is None or sessions[0].last_used < self._idle[oldest_key][0].last_used:
+                oldest_key = key
+        if oldest_key is None:
+            return None
+        session = self._idle[oldest_key].pop(0)
+        if not self._idle[oldest_key]:
+            del self._idle[oldest_key]
+        return session
+
+    def acquire(self, host, credentials, port=None):
+        """Check out a session, reusing an idle one when possible
+
+        Args:
+            host (str): Device address
+            credentials (dict): Credentials for the device
+            port (int, optional): Device port
+
+        Returns:
+            PooledSession: Session for exclusive use until released
+        """
+        if self._closed.is_set():
+            raise RuntimeError("Session pool is closed")
+
+        key = session_key(host, credentials, port)
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            to_close = []
+            with self._lock:
+                session = self._pop_idle(key)
+                if session is None:
+                    if self._open >= self.max_sessions:
+                        # Make room by closing the least recently used idle session
+                        victim = self._pop_oldest_idle()
+                        if victim is not None:
+                            self._open -= 1
+                            self._stats["evicted"] += 1
+                            to_close.append(victim)
+                    if self._open < self.max_sessions:
+                        # Reserve a slot and connect outside the lock
+                        self._open += 1
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise RuntimeError(f"No free session for {host}: {self.max_sessions} sessions in use")
+                        self._available.wait(remaining)
+                        continue
+
+            for victim in to_close:
+                victim.close()
+
+            if session is None:
+                try:
+                    client = self._connect(key, credentials)
+                except Exception:
+                    with self._lock:
+                        self._open -= 1
+                        self._available.notify()
+                    raise
+                with self._lock:
+                    self._stats["created"] += 1
+                logger.debug(f"Opened {key[0]} session to {host}:{key[2]}")
+                return PooledSession(key, client)
+
+            if session.is_alive():
+                with self._lock:
+                    self._stats["reused"] += 1
+                return session
+
+            # Stale session: drop it and try again
+            logger.debug(f"Pooled session to {host} failed its health check")
+            with self._lock:
+                self._open -= 1
+                self._stats["failed_health_checks"] += 1
+                self._available.notify()
+            session.close()
+
+    def release(self, session, discard=False):
+        """Return a session to the pool
+
+        Args:
+            session (PooledSession): Session from acquire
+            discard (bool): Close the session instead of keeping it
+        """
+        session.last_used = time.monotonic()
+        session.uses += 1
+
+        keep = not discard and not self._closed.is_set() and self.idle_timeout > 0 and session.is_alive()
+        with self._lock:
+            if keep:
+                self._idle.setdefault(session.key, []).append(session)
+            else:
+                self._open -= 1
+            self._available.notify()
+
+        if keep:
+            self._start_reaper()
+        else:
+            session.close()
+
+    def reconnect(self, session, credentials):
+        """Replace the client of a session with a new connection
+
+        Args:
+            session (PooledSession): Session whose connection was lost
+            credentials (dict): Credentials for the device
+        """
+        session.close()
+        session.client = self._connect(session.key, credentials)
+        session.created = time.monotonic()
+        with self._lock:
+            self._stats["reconnected"] += 1
+        logger.debug(f"Reconnected {session.connection_type} session to {session.host}")
+
+    @contextmanager
+    def session(self, host, credentials, port=None, discard=False):
+        """Check out a session for the duration of a with block
+
+        The session is closed instead of returned when the block raises.
+        """
+        session = self.acquire(host, credentials, port)
+        failed = False
+        try:
+            yield session
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(session, discard=discard or failed)
+
+    def evict_idle(self):
+        """Close sessions that have been idle longer than the idle timeout
+
+        Returns:
+            int: Number of sessions closed
+        """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key in list(self._idle):
+                sessions = self._idle[key]
+                keep = [s for s in sessions if now - s.last_used < self.idle_timeout]
+                expired.extend(s for s in sessions if now - s.last_used >= self.idle_timeout)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+            self._open -= len(expired)
+            self._stats["evicted"] += len(expired)
+            if expired:
+                self._available.notify_all()
+
+        for session in expired:
+            logger.debug(f"Closing idle {session.connection_type} session to {session.host}")
+            session.close()
+        return len(expired)
+
+    def _start_reaper(self):
+        """Start the idle eviction thread if it is not running"""
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap, name="session-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        """Periodically close idle sessions until the pool is closed or empty"""
+        interval = max(1.0, min(self.idle_timeout / 2, 30.0))
+        while not self._closed.wait(interval):
+            self.evict_idle()
+            with self._lock:
+                if not self._idle:
+                    self._reaper = None
+                    return
+
+    def close_all(self):
+        """Close all idle sessions and stop pooling
+
+        Sessions that are in use are closed when they are released.
+        """
+        self._closed.set()
+        with self._lock:
+            sessions = [s for group in self._idle.values() for s in group]
+            self._idle = {}
+            self._open -= len(sessions)
+            self._available.notify_all()
+        for session in sessions:
+            session.close()
+        logger.debug(f"Closed {len(sessions)} pooled sessions")
+
+    def stats(self):
+        """Get pool statistics
+
+        Returns:
+            dict: Open, idle and in use session counts plus lifetime counters
+        """
+        with self._lock:
+            idle = sum(len(sessions) for sessions in self._idle.values())
+            stats = dict(self._stats)
+            stats.update({"open": self._open, "idle": idle, "in_use": self._open - idle})
+            return stats
@@ -5,12 +5,14 @@
 SSH client utility for Command Manager plugin
 """
 
-import time
 import re
 import socket
 import paramiko
 from loguru import logger
 
+from plugins.command_manager.utils.expect import Expect, GENERIC_PROMPT, PASSWORD_PATTERN
+from plugins.command_manager.utils.output_buffer import OutputBuffer
+
 
 class SSHClient:
     """Client for connecting to network devices via SSH"""
@@ -26,6 +28,7 @@ class SSHClient:
         
         self.client = None
         self.shell = None
+        self.expect = None
         self.connected = False
         self.prompt = None
         
@@ -52,13 +55,17 @@ class SSHClient:
                 # Open shell
                 self.shell = self.client.invoke_shell()
                 self.shell.settimeout(self.timeout)
+                self.expect = Expect(self._read_output, self.shell.send, lambda: self.shell)
                 
-                # Clear initial buffer
-                time.sleep(1)
-                output = self._read_output()
+                # Wait for the banner to end in a prompt, then learn the prompt
+                # from the reply to an empty line
+                self.expect.expect([GENERIC_PROMPT], timeout=self.timeout)
+                self.expect.send("\n")
+                index, match, output = self.expect.expect([GENERIC_PROMPT], timeout=self.timeout)
                 
-                # Try to detect prompt
-                self.prompt = self._detect_prompt(output)
+                self.prompt = match.group(1).strip() if index >= 0 else self._detect_prompt(output)
+                if self.prompt:
+                    self.expect.set_prompt(self.prompt)
             
             self.connected = True
             return True
@@ -73,6 +80,7 @@ class SSHClient:
         if self.shell:
             self.shell.close()
             self.shell = None
+            self.expect = None
             
         if self.client:
             self.client.close()
@@ -80,6 +88,20 @@ class SSHClient:
             
         self.connected = False
         
+    def is_alive(self):
+        """Check if the connection is still usable"""
+        if not self.connected or not self.client:
+            return False
+            
+        transport = self.client.get_transport()
+        if not transport or not transport.is_active():
+            return False
+            
+        if self.shell is not None and self.shell.closed:
+            return False
+            
+        return True
+        
     def enable(self):
         """Enter enable mode"""
         if not self.connected:
@@ -89,102 +111,110 @@ class SSHClient:
             return
             
         # Send enable command
-        self.shell.send("enable\n")
-        time.sleep(0.5)
-        
-        # Check for password prompt
-        output = self._read_output()
-        if re.search(r"[Pp]assword", output):
+        self.expect.flush()
+        self.expect.send("enable\n")
+        
+        # Wait for the password prompt (or the prompt if no password is asked)
+        index, match, output = self.expect.expect(
+            [PASSWORD_PATTERN, self.expect.prompt_pattern], timeout=self.timeout
+        )
+        if index == 0:
             # Send enable password
-            self.shell.send(f"{self.enable_password}\n")
-            time.sleep(0.5)
-            
-            # Read output again
-            output = self._read_output()
+            self.expect.send(f"{self.enable_password}\n")
+            index, match, output = self.expect.expect(timeout=self.timeout)
             
-            # Try to detect new prompt
-            new_prompt = self._detect_prompt(output)
-            if new_prompt:
-                self.prompt = new_prompt
+        # Remember the new prompt
+        if index >= 0 and match.lastindex:
+            self.prompt = match.group(1).strip()
                 
-    def execute(self, command):
-        """Execute a command and return the output"""
+    def execute(self, command, spool=None):
+        """Execute a command and return the output
+        
+        Args:
+            command (str): Command to execute
+            spool (file, optional): Text file to stream the output into, so
+                very large outputs are never held in memory
+                
+        Returns:
+            str: Command output, or the number of characters written when
+                a spool file is given
+                
+        Raises:
+            TimeoutError: The command did not finish in time
+        """
         if not self.connected:
             raise Exception("Not connected")
         
         # If enable mode is required, use the shell to execute commands
         if self.enable_password and self.shell:
-            return self._execute_shell(command)
+            return self._execute_shell(command, spool)
         else:
-            return self._execute_paramiko(command)
+            return self._execute_paramiko(command, spool)
     
-    def _execute_paramiko(self, command):
+    def _execute_paramiko(self, command, spool=None):
         """Execute command using paramiko's exec_command method"""
         try:
             # Execute command directly
             stdin, stdout, stderr = self.client.exec_command(command, timeout=self.timeout)
             
-            # Get command output
-            output = stdout.read().decode('utf-8', errors='ignore')
-            error = stderr.read().decode('utf-8', errors='ignore')
-            
+            # Read command output in chunks
+            buffer = OutputBuffer(spool=spool)
+            while True:
+                data = stdout.read(65536)
+                if not data:
+                    break
+                buffer.feed(data)
+            length = buffer.finish()
+            error = stderr.read().decode('utf-8', errors='replace')
+            
+            if spool is not None:
+                if error:
+                    error_text = f"\nERROR: {error}"
+                    spool.write(error_text)
+                    length += len(error_text)
+                return length
+                
             # Combine output and error
-            full_output = f"{output}"
+            full_output = buffer.getvalue()
             if error:
                 full_output += f"\nERROR: {error}"
                 
             return full_output.strip()
         except Exception as e:
             logger.error(f"Error executing command via paramiko: {e}")
-            return f"Error executing command: {str(e)}"
+            
+            # Let the caller reconnect if the connection itself was lost
+            if not self.is_alive():
+                self.connected = False
+                raise ConnectionError(f"Connection to {self.host} lost: {str(e)}")
+                
+            # Never report the error text as the command's output
+            raise
     
-    def _execute_shell(self, command):
+    def _execute_shell(self, command, spool=None):
         """Execute command via interactive shell (for enable mode)"""
-        # Clear buffer
-        self._read_output()
-        
-        # Send command
-        self.shell.send(f"{command}\n")
-        
-        # Wait for command to complete
-        time.sleep(1)
-        
-        # Collect output until prompt is seen or timeout
-        output = ""
-        start_time = time.time()
-        
-        while time.time() - start_time < self.timeout:
-            # Read available output
-            new_output = self._read_output()
-            output += new_output
-            
-            # Check if we've reached the prompt
-            if self.prompt and re.search(re.escape(self.prompt), output):
-                break
-                
-            # Short pause
-            time.sleep(0.5)
-            
-        # Remove command echo and prompt from output
-        output = self._clean_output(output, command)
-        
-        return output
+        # Send the command and read until the prompt returns
+        return self.expect.execute(command, timeout=self.timeout, spool=spool)
         
     def _read_output(self):
-        """Read available output from the shell"""
+        """Read available output bytes from the shell without blocking
+        
+        Raises:
+            EOFError: If the shell was closed
+        """
         if not self.shell:
-            return ""
+            raise EOFError("Shell is closed")
             
-        output = ""
+        output = b""
         try:
             # Check if data is available
             if self.shell.recv_ready():
                 # Read available data
-                output = self.shell.recv(65535).decode("utf-8", errors="ignore")
+                output = self.shell.recv(65535)
+            elif self.shell.closed or self.shell.eof_received:
+                raise EOFError("Shell is closed")
         except socket.timeout:
             pass
-        except Exception as e:
-            logger.error(f"Error reading SSH output: {e}")
             
         return output
         
@@ -213,17 +243,3 @@ class SSHClient:
                 return line[-20:] if len(line) > 20 else line
                 
         return None
-        
-    def _clean_output(self, output, command):
-        """Clean up command output by removing echoed command and prompt"""
-        # Remove the echoed command
-        output = re.sub(re.escape(command) + r"[\r\n]+", "", output, count=1)
-        
-        # Remove the prompt at the end
-        if self.prompt:
-            output = re.sub(re.escape(self.prompt) + r"\s*$", "", output)
-            
-        # Strip extra whitespace
-        output = output.strip()
-        
-        return output 
\ No newline at end of file
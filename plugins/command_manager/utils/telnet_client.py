@@ -5,12 +5,21 @@
 Telnet client utility for Command Manager plugin
 """
 
-import time
 import re
 import socket
+import select
 import telnetlib
+from telnetlib import IAC
 from loguru import logger
 
+from plugins.command_manager.utils.expect import Expect, GENERIC_PROMPT, PASSWORD_PATTERN
+
+
+# Replies that mean the login was rejected
+LOGIN_FAILED_PATTERN = re.compile(
+    r"(?i)(login invalid|authentication failed|access denied|login incorrect|[Uu]sername:\s*$|[Ll]ogin:\s*$)"
+)
+
 
 class TelnetClient:
     """Client for connecting to network devices via Telnet"""
@@ -25,6 +34,7 @@ class TelnetClient:
         self.timeout = timeout
         
         self.client = None
+        self.expect = None
         self.connected = False
         self.prompt = None
         
@@ -34,6 +44,9 @@ class TelnetClient:
             # Create Telnet client
             self.client = telnetlib.Telnet(self.host, self.port, self.timeout)
             
+            # Send commands and pager replies without waiting for delayed ACKs
+            self.client.get_socket().setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            
             # Wait for login prompt
             index, match, output = self.client.expect([
                 b"[Uu]sername[: ]*", 
@@ -58,14 +71,23 @@ class TelnetClient:
             self.client.write(f"{self.password}\n".encode())
             
             # Wait for command prompt
-            time.sleep(2)
-            output = self.client.read_very_eager().decode("utf-8", errors="ignore")
-            
-            # Try to detect prompt
-            self.prompt = self._detect_prompt(output)
+            self.expect = Expect(self._read_output, self._write, self.client.get_socket)
+            index, match, output = self.expect.expect(
+                [LOGIN_FAILED_PATTERN, GENERIC_PROMPT], timeout=self.timeout
+            )
+            if index == 0:
+                raise Exception("Login rejected")
+            if index < 0:
+                raise Exception("Command prompt not found")
+                
+            # Learn the prompt from the reply to an empty line
+            self.expect.send("\n")
+            index, match, output = self.expect.expect([GENERIC_PROMPT], timeout=self.timeout)
+            self.prompt = match.group(1).strip() if index >= 0 else self._detect_prompt(output)
             
             if not self.prompt:
                 raise Exception("Command prompt not found")
+            self.expect.set_prompt(self.prompt)
                 
             self.connected = True
             return True
@@ -81,8 +103,64 @@ class TelnetClient:
             self.client.close()
             self.client = None
             
+        self.expect = None
         self.connected = False
         
+    def _read_output(self):
+        """Read available output bytes without blocking (raises EOFError when closed)
+        
+        telnetlib reads 50 bytes per call and grows its buffer by
+        concatenation, which is quadratic for large outputs. The socket is
+        read in large chunks instead; only data containing telnet commands
+        (IAC) goes through telnetlib's option processing.
+        """
+        client = self.client
+        data = b""
+        
+        # Data telnetlib buffered itself (e.g. during login)
+        if client.rawq or client.cookedq:
+            client.process_rawq()
+            data, client.cookedq = client.cookedq, b""
+            
+        sock = client.get_socket()
+        readable, _, _ = select.select([sock], [], [], 0)
+        if readable:
+            chunk = sock.recv(65536)
+            if not chunk:
+                client.eof = True
+                if not data:
+                    raise EOFError("telnet connection closed")
+                return data
+                
+            if IAC in chunk or client.iacseq or client.sb:
+                client.rawq += chunk
+                client.process_rawq()
+                chunk, client.cookedq = client.cookedq, b""
+            else:
+                # NVT carriage returns may be followed by NUL
+                chunk = chunk.replace(b"\x00", b"")
+            data += chunk
+            
+        return data
+        
+    def _write(self, text):
+        """Send text to the device"""
+        self.client.write(text.encode())
+        
+    def is_alive(self):
+        """Check if the connection is still usable"""
+        if not self.connected or not self.client:
+            return False
+            
+        try:
+            # Non-blocking read, raises EOFError once the connection is closed
+            self._read_output()
+        except (EOFError, OSError):
+            self.connected = False
+            return False
+            
+        return True
+        
     def enable(self):
         """Enter enable mode"""
         if not self.connected:
@@ -92,68 +170,48 @@ class TelnetClient:
             return
             
         # Send enable command
-        self.client.write(b"enable\n")
-        time.sleep(0.5)
+        self.expect.flush()
+        self.expect.send("enable\n")
         
-        # Check for password prompt
-        output = self.client.read_very_eager().decode("utf-8", errors="ignore")
-        if re.search(r"[Pp]assword", output):
+        # Wait for the password prompt (or the prompt if no password is asked)
+        index, match, output = self.expect.expect(
+            [PASSWORD_PATTERN, self.expect.prompt_pattern], timeout=self.timeout
+        )
+        if index == 0:
             # Send enable password
-            self.client.write(f"{self.enable_password}\n".encode())
-            time.sleep(1)
-            
-            # Read output again
-            output = self.client.read_very_eager().decode("utf-8", errors="ignore")
+            self.expect.send(f"{self.enable_password}\n")
+            index, match, output = self.expect.expect(timeout=self.timeout)
             
-            # Try to detect new prompt
-            new_prompt = self._detect_prompt(output)
-            if new_prompt:
-                self.prompt = new_prompt
+        # Remember the new prompt
+        if index >= 0 and match.lastindex:
+            self.prompt = match.group(1).strip()
                 
-    def execute(self, command):
-        """Execute a command and return the output"""
-        if not self.connected:
-            raise Exception("Not connected")
-            
-        # Clear buffer
-        self.client.read_very_eager()
-        
-        # Send command
-        self.client.write(f"{command}\n".encode())
-        
-        # Wait for command to complete
-        time.sleep(1)
+    def execute(self, command, spool=None):
+        """Execute a command and return the output
         
-        # Collect output until prompt is seen or timeout
-        output = ""
-        start_time = time.time()
-        
-        while time.time() - start_time < self.timeout:
-            # Read available output
-            try:
-                new_output = self.client.read_very_eager().decode("utf-8", errors="ignore")
-                output += new_output
+        Args:
+            command (str): Command to execute
+            spool (file, optional): Text file to stream the output into, so
+                very large outputs are never held in memory
                 
-                # Check if we've reached the prompt
-                if self.prompt and re.search(re.escape(self.prompt), output):
-                    break
-                    
-                # If no new output and we don't see the prompt, try reading more
-                if not new_output:
-                    time.sleep(0.5)
-            except EOFError:
-                # Connection closed
-                self.connected = False
-                break
-            except Exception as e:
-                logger.error(f"Error reading Telnet output: {e}")
-                break
+        Returns:
+            str: Command output, or the number of characters written when
+                a spool file is given
                 
-        # Remove command echo and prompt from output
-        output = self._clean_output(output, command)
-        
-        return output
-        
+        Raises:
+            TimeoutError: The prompt did not return in time
+        """
+        if not self.connected:
+            raise Exception("Not connected")
+            
+        try:
+            # Send the command and read until the prompt returns
+            return self.expect.execute(command, timeout=self.timeout, spool=spool)
+        except EOFError:
+            # Connection closed
+            self.connected = False
+            raise ConnectionError(f"Connection to {self.host} closed")
+            
     def _detect_prompt(self, output):
         """Try to detect the command prompt"""
         if not output:
@@ -179,17 +237,3 @@ class TelnetClient:
                 return line[-20:] if len(line) > 20 else line
                 
         return None
-        
-    def _clean_output(self, output, command):
-        """Clean up command output by removing echoed command and prompt"""
-        # Remove the echoed command
-        output = re.sub(re.escape(command) + r"[\r\n]+", "", output, count=1)
-        
-        # Remove the prompt at the end
-        if self.prompt:
-            output = re.sub(re.escape(self.prompt) + r"\s*$", "", output)
-            
-        # Strip extra whitespace
-        output = output.strip()
-        
-        return output 
\ No newline at end of file
@@ -0,0 +1,4 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Local port listeners and benchmarks for the Network Scanner plugin"""
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Connect scanner benchmark for the Network Scanner plugin
+
+Scans a local PortListener (see port_listener) with the built-in
+ConnectScanner at several concurrency limits, with and without banner
+reads, and reports the scan time per round, the probes per second and
+the probe, retry and timeout counters of every configuration.
+
+Every scan is checked against the listener: all open ports must be
+found, no closed port may be reported open and every port sending a
+banner must get the ssh service hint. The exit status is 1 when a
+check fails, so the benchmark doubles as a regression test.
+
+Run from the NetWORKS directory:
+
+    python -m plugins.network_scanner.benchmarks.connect_benchmark --open-ports 50 --closed-ports 50 --concurrency 16 --concurrency 256
+"""
+
+import sys
+import time
+import argparse
+from loguru import logger
+
+from plugins.network_scanner.utils.connect_scanner import ConnectScanner
+from .port_listener import add_listener_arguments, listener_from_arguments
+
+
+DEFAULT_CONCURRENCY = (16, 64, 256)
+
+
+def check_results(listener, hosts, grab_banners):
+    """Compare scan results with the ports the listener serves
+
+    Returns:
+        list: Problems found, empty when the results are correct
+    """
+    if not hosts:
+        return ["host not found"] if listener.open_ports else []
+
+    problems = []
+    host = hosts[0]
+    found = set(host.get("open_tcp_ports", []))
+    missed = set(listener.open_ports) - found
+    unexpected = found - set(listener.open_ports)
+    if missed:
+        problems.append(f"{len(missed)} open ports not found")
+    if unexpected:
+        problems.append(f"{len(unexpected)} closed ports reported open")
+    if grab_banners:
+        services = host.get("services", {})
+        unnamed = [port for port in listener.banner_ports if not services.get(port, "").startswith("ssh")]
+        if unnamed:
+            problems.append(f"{len(unnamed)} banners not recognized")
+    return problems
+
+
+def run_benchmark(listener, concurrency_levels=DEFAULT_CONCURRENCY, rounds=3, timeout=1.0, banner_timeout=0.2):
+    """Scan the listener with every configuration
+
+    Args:
+        listener (PortListener): Started listener
+        concurrency_levels (list): Connection limits to measure
+        rounds (int): Scans per configuration
+        timeout (float): Connect timeout per port in seconds
+        banner_timeout (float): Time to wait for a banner in seconds
+
+    Returns:
+        list: Results per configuration: concurrency, grab_banners, times
+            (seconds per round), probes, retries, timeouts, open_ports and
+            problems
+    """
+    ports = listener.ports
+    results = []
+    for concurrency in concurrency_levels:
+        for grab_banners in (False, True):
+            scanner = ConnectScanner(concurrency=concurrency, timeout=timeout,
+                                     banner_timeout=banner_timeout, grab_banners=grab_banners)
+            result = {"concurrency": concurrency, "grab_banners": grab_banners, "times": [],
+                      "probes": 0, "retries": 0, "timeouts": 0, "open_ports": 0, "problems": []}
+            for _ in range(rounds):
+                hosts = []
+                start = time.perf_counter()
+                summary = scanner.run([listener.host], ports, on_host=hosts.append)
+                result["times"].append(time.perf_counter() - start)
+                result["probes"] += summary["probes"]
+                result["retries"] += summary["retries"]
+                result["timeouts"] += summary["timeouts"]
+                result["open_ports"] = len(hosts[0].get("open_tcp_ports", [])) if hosts else 0
+                for problem in check_results(listener, hosts, grab_banners):
+                    if problem not in result["problems"]:
+                        result["problems"].append(problem)
+            logger.info(f"Concurrency {concurrency}, banners {grab_banners}: {min(result['times']):.3f}s")
+            results.append(result)
+    return results
+
+
+def format_report(results, description):
+    """Format benchmark results as text
+
+    Args:
+        results (list): Results of run_benchmark
+        description (str): First line of the report
+
+    Returns:
+        str: The report
+    """
+    lines = [description]
+    for result in results:
+        times = result["times"]
+        mean = sum(times) / len(times)
+        probes_per_round = result["probes"] / len(times)
+        lines.append(
+            f"Concurrency {result['concurrency']:>4}, banners {'on ' if result['grab_banners'] else 'off'}: "
+            f"best {min(times) * 1000:.1f} ms, mean {mean * 1000:.1f} ms, "
+            f"{probes_per_round / (mean or 1e-9):.0f} probes/s, {result['open_ports']} open, "
+            f"{result['retries']} retries, {result['timeouts']} timeouts"
+        )
+        if result["problems"]:
+            lines.append(f"  problems: {', '.join(result['problems'])}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Run the benchmark from the command line
+
+    Returns:
+        int: Exit status, 1 if any scan result was wrong
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Network Scanner connect scanner on local ports")
+    add_listener_arguments(parser)
+    parser.add_argument("--concurrency", type=int, action="append", dest="concurrency_levels", metavar="LIMIT",
+                        help=f"connection limit to measure (default: {', '.join(map(str, DEFAULT_CONCURRENCY))})")
+    parser.add_argument("--rounds", type=int, default=3, help="scans per configuration")
+    parser.add_argument("--timeout", type=float, default=1.0, help="connect timeout per port in seconds")
+    parser.add_argument("--banner-timeout", type=float, default=0.2, help="time to wait for a banner in seconds")
+    parser.add_argument("--log-level", default="WARNING", help="loguru level of the benchmark output")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level.upper())
+
+    with listener_from_arguments(args) as listener:
+        results = run_benchmark(
+            listener,
+            args.concurrency_levels or DEFAULT_CONCURRENCY,
+            rounds=max(1, args.rounds),
+            timeout=args.timeout,
+            banner_timeout=args.banner_timeout
+        )
+        port_count = len(listener.ports)
+        banner_count = len(listener.banner_ports)
+        connections = listener.stats["connections"]
+
+    description = (
+        f"{port_count} ports on {args.host} ({args.open_ports} open, {banner_count} with banners, "
+        f"{args.closed_ports} closed), {max(1, args.rounds)} rounds, {connections} connections served"
+    )
+    print(format_report(results, description))
+    return 1 if any(result["problems"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local multi-port listener for benchmarking the Network Scanner plugin
+
+The listener opens any number of TCP ports on one local address, so the
+built-in connect scanner can be measured and regression tested without a
+network: every open port accepts connections, every other port can send
+an SSH banner first, and a set of unused ports of the same address is
+reported as closed ports, which refuse connections.
+
+All ports are served by one thread with a selector; connections are
+closed right after the banner, as the scanner only reads the first bytes.
+
+Run it standalone to scan it with the application:
+
+    python -m plugins.network_scanner.benchmarks.port_listener --open-ports 100 --banner-every 2
+"""
+
+import time
+import socket
+import argparse
+import selectors
+import threading
+from loguru import logger
+
+
+SSH_BANNER = b"SSH-2.0-OpenSSH_9.0\r\n"
+LISTEN_BACKLOG = 128
+
+
+class PortListener:
+    """Serves open ports, some with banners, on a local address"""
+
+    def __init__(self, host="127.0.0.1", open_ports=50, closed_ports=50, banner_every=2, banner=SSH_BANNER):
+        """Initialize the listener
+
+        Args:
+            host (str): Address to listen on
+            open_ports (int): Number of listening ports
+            closed_ports (int): Number of unused ports to report for closed port probes
+            banner_every (int): Send the banner on every n-th open port, 0 for none
+            banner (bytes): Banner sent right after accepting a connection
+        """
+        self.host = host
+        self.open_count = max(0, int(open_ports))
+        self.closed_count = max(0, int(closed_ports))
+        self.banner_every = max(0, int(banner_every))
+        self.banner = banner
+        self.open_ports = []
+        self.banner_ports = []
+        self.closed_ports = []
+        self.stats = {"connections": 0}
+
+        self._listeners = []
+        self._stopped = threading.Event()
+        self._selector = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def ports(self):
+        """All open and closed ports, sorted"""
+        return sorted(self.open_ports + self.closed_ports)
+
+    def _socket(self):
+        """Create a TCP socket for the listen address"""
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        return socket.socket(family, socket.SOCK_STREAM)
+
+    def _find_closed_ports(self):
+        """Pick ports of the address nothing listens on
+
+        The ports are bound once and released, so they stay closed unless
+        another process takes them during the benchmark.
+        """
+        probes = []
+        try:
+            while len(probes) < self.closed_count:
+                probe = self._socket()
+                probe.bind((self.host, 0))
+                probes.append(probe)
+            return [probe.getsockname()[1] for probe in probes]
+        finally:
+            for probe in probes:
+                probe.close()
+
+    def start(self):
+        """Open the ports and start accepting connections"""
+        if self._thread:
+            return
+
+        self._stopped.clear()
+        self._selector = selectors.DefaultSelector()
+        try:
+            for index in range(self.open_count):
+                listener = self._socket()
+                listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                self._listeners.append(listener)
+                listener.bind((self.host, 0))
+                listener.listen(LISTEN_BACKLOG)
+                listener.setblocking(False)
+
+                port = listener.getsockname()[1]
+                send_banner = bool(self.banner_every) and index % self.banner_every == 0
+                self.open_ports.append(port)
+                if send_banner:
+                    self.banner_ports.append(port)
+                self._selector.register(listener, selectors.EVENT_READ, send_banner)
+            self.closed_ports = self._find_closed_ports()
+        except OSError:
+            self._close()
+            raise
+
+        self._thread = threading.Thread(target=self._accept_loop, name="port-listener", daemon=True)
+        self._thread.start()
+        logger.info(f"Listening on {len(self.open_ports)} ports of {self.host}, "
+                    f"{len(self.banner_ports)} with banners, {len(self.closed_ports)} closed")
+
+    def stop(self):
+        """Stop accepting connections and close the ports"""
+        if not self._thread:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self._close()
+        logger.info(f"Port listener stopped: {self.stats}")
+
+    def _close(self):
+        """Close the listening sockets"""
+        for listener in self._listeners:
+            listener.close()
+        self._listeners = []
+        self.open_ports = []
+        self.banner_ports = []
+        self.closed_ports = []
+        if self._selector:
+            self._selector.close()
+            self._selector = None
+
+    def _accept_loop(self):
+        """Accept connections, send banners and close them"""
+        while not self._stopped.is_set():
+            for key, _events in self._selector.select(timeout=0.2):
+                try:
+                    connection, _address = key.fileobj.accept()
+                except OSError:
+                    continue
+                self.stats["connections"] += 1
+                try:
+                    if key.data:
+                        connection.setblocking(True)
+                        connection.sendall(self.banner)
+                except OSError:
+                    pass
+                finally:
+                    connection.close()
+
+
+def add_listener_arguments(parser):
+    """Add the listener options to a command line parser"""
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--open-ports", type=int, default=50, help="number of listening ports")
+    parser.add_argument("--closed-ports", type=int, default=50, help="number of closed ports to probe")
+    parser.add_argument("--banner-every", type=int, default=2,
+                        help="send an SSH banner on every n-th open port, 0 for none")
+
+
+def listener_from_arguments(args):
+    """Create a PortListener from parsed listener options"""
+    return PortListener(args.host, args.open_ports, args.closed_ports, args.banner_every)
+
+
+def main(argv=None):
+    """Serve the ports until interrupted"""
+    parser = argparse.ArgumentParser(description="Serve local TCP ports for the Network Scanner")
+    add_listener_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with listener_from_arguments(args) as listener:
+        print(f"Open ports on {listener.host}: {','.join(map(str, listener.open_ports))}")
+        print(f"With banners: {','.join(map(str, listener.banner_ports)) or '(none)'}")
+        print(f"Closed ports: {','.join(map(str, listener.closed_ports)) or '(none)'}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,8 @@ import os
 import time
 import datetime
 import ipaddress
+import math
+import re
 import threading
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Union, Tuple
@@ -50,6 +52,31 @@ from PySide6.QtGui import QIcon, QAction, QFont, QColor, QIntValidator
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from src.core.plugin_interface import PluginInterface
 
+# Scanner utilities
+from plugins.network_scanner.utils.scan_jobs import (
+    ScanJob, ScanJobQueue, normalize_targets, count_target_addresses, write_target_file,
+    JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED
+)
+from plugins.network_scanner.utils.incremental import (
+    IncrementalPlanner, liveness_fingerprint, port_fingerprints, probe_arguments, now_timestamp,
+    PROBE_SCAN_TYPE, PROBE_PROPERTIES, STAGE_PROBE, STAGE_DEEP
+)
+from plugins.network_scanner.utils.scan_history import ScanHistory, host_record
+from plugins.network_scanner.utils.neighbors import (
+    read_neighbor_table, filter_entries, neighbor_host_data, is_live, NEIGHBOR_PROPERTIES
+)
+from plugins.network_scanner.utils.rate_control import RateController
+from plugins.network_scanner.utils.telemetry import (
+    ScanTelemetry, append_metrics_record, read_metrics_records, format_metrics_summary
+)
+from plugins.network_scanner.utils.connect_scanner import (
+    ConnectScanner, expand_targets, ports_from_arguments,
+    DEFAULT_PORTS, DISCOVERY_PORTS, SERVICE_PORTS
+)
+
+# Seconds allowed for starting a ping process on top of its reply timeout
+PING_STARTUP_TIME = 0.25
+
 
 # Safe action wrapper from sample plugin
 def safe_action_wrapper(func):
@@ -98,10 +125,19 @@ class ScannerWorker(QObject):
     
     def __init__(self, network_range, scan_type="quick", timeout=600, 
                  os_detection=True, port_scan=True, use_sudo=False,
-                 custom_scan_args=""):
+                 custom_scan_args="", targets=None, exclude=None, skip_discovery=False,
+                 timing_args=""):
         """Initialize the scanner worker"""
         super().__init__()
         self.network_range = network_range
+        # Multiple targets are passed to a single nmap invocation through -iL
+        self.targets = normalize_targets(targets) if targets else normalize_targets(network_range)
+        # Hosts to leave out of the scan (passed through --excludefile)
+        self.exclude = list(exclude) if exclude else []
+        # Skip host discovery when all targets are already known to be live
+        self.skip_discovery = skip_discovery
+        # RTT timeout options derived from earlier measurements of the target subnets
+        self.timing_args = timing_args
         self.scan_type = scan_type
         self.timeout = timeout
         self.os_detection = os_detection
@@ -113,6 +149,8 @@ class ScannerWorker(QObject):
         
         # Create scanner in the worker thread when run is called
         self.scanner = None
+        self.target_file = None
+        self.exclude_file = None
         
     def stop(self):
         """Stop the scan"""
@@ -122,6 +160,8 @@ class ScannerWorker(QObject):
     def run(self):
         """Run the network scan"""
         self.is_running = True
+        telemetry = ScanTelemetry()
+        expansion_started = time.perf_counter()
         
         try:
             # Initialize the scanner instance
@@ -168,6 +208,10 @@ class ScannerWorker(QObject):
             if self.custom_scan_args:
                 arguments += f" {self.custom_scan_args}"
                 
+            # Seed nmap's RTT timeouts unless the user set them
+            if self.timing_args and "rtt-timeout" not in arguments:
+                arguments += f" {self.timing_args}"
+                
             # Make sure we don't have duplicate arguments by splitting and rejoining
             # This prevents issues like having "-sn -T4 -sn -T4"
             arg_parts = arguments.split()
@@ -219,6 +263,27 @@ class ScannerWorker(QObject):
             if "-v" not in arguments:
                 arguments += " -v"
                 
+            # Scan multi-target jobs with a single nmap invocation using a target list file
+            scan_hosts = self.network_range
+            if len(self.targets) > 1:
+                self.target_file = write_target_file(self.targets)
+                # Forward slashes keep the path intact through python-nmap's shlex parsing on Windows
+                target_path = self.target_file.replace(os.sep, "/")
+                arguments += f' -iL "{target_path}"'
+                scan_hosts = ""
+                logger.debug(f"Scanning {len(self.targets)} targets from list file {self.target_file}")
+                
+            # Leave excluded hosts out of the scan
+            if self.exclude:
+                self.exclude_file = write_target_file(self.exclude)
+                exclude_path = self.exclude_file.replace(os.sep, "/")
+                arguments += f' --excludefile "{exclude_path}"'
+                logger.debug(f"Excluding {len(self.exclude)} hosts from the scan")
+                
+            if self.skip_discovery and "-Pn" not in arguments and "-sn" not in arguments:
+                arguments += " -Pn"
+                logger.debug("All targets are known to be live, skipping host discovery")
+                
             # Tracking variables
             scan_start_time = time.time()
             devices_found = 0
@@ -238,17 +303,11 @@ class ScannerWorker(QObject):
                 # Emit a message to show scan is starting
                 self.device_found.emit({"status_update": "Initializing nmap scan..."})
                 
-                # Extract network range info to estimate host count
+                # Estimate the host count across all targets
                 host_count_estimate = 256
                 try:
-                    import ipaddress
-                    if "/" in self.network_range:  # CIDR notation
-                        try:
-                            network = ipaddress.IPv4Network(self.network_range, strict=False)
-                            host_count_estimate = network.num_addresses
-                            self.device_found.emit({"status_update": f"Preparing to scan {host_count_estimate} potential addresses..."})
-                        except Exception:
-                            pass
+                    host_count_estimate = count_target_addresses(self.targets) or host_count_estimate
+                    self.device_found.emit({"status_update": f"Preparing to scan {host_count_estimate} potential addresses..."})
                 except Exception:
                     pass
                 
@@ -302,8 +361,10 @@ class ScannerWorker(QObject):
                     update_timer.start()
                     
                     # Execute nmap scan
-                    self.scanner.scan(hosts=self.network_range, arguments=arguments, 
-                                     timeout=timeout_val, sudo=self.use_sudo)
+                    telemetry.add_time("expansion", time.perf_counter() - expansion_started)
+                    with telemetry.phase("probing"):
+                        self.scanner.scan(hosts=scan_hosts, arguments=arguments, 
+                                         timeout=timeout_val, sudo=self.use_sudo)
                     
                     # Stop the update timer
                     if update_timer:
@@ -328,6 +389,7 @@ class ScannerWorker(QObject):
                     return
                     
                 # Process results
+                parsing_started = time.perf_counter()
                 try:
                     all_hosts = self.scanner.all_hosts()
                     total_hosts = len(all_hosts)
@@ -622,11 +684,21 @@ class ScannerWorker(QObject):
                     
                     # Calculate scan time
                     scan_time = time.time() - scan_start_time
+                    telemetry.add_time("parsing", time.perf_counter() - parsing_started)
+                    try:
+                        telemetry.set_counter("hosts_scanned", int(self.scanner.scanstats().get("totalhosts", total_hosts)))
+                    except (AttributeError, KeyError, TypeError, ValueError):
+                        telemetry.set_counter("hosts_scanned", total_hosts)
+                    telemetry.set_counter("hosts_up", devices_found)
                     
                     # Emit scan complete signal with results
                     scan_results = {
                         "network_range": self.network_range,
+                        "target_count": len(self.targets),
                         "scan_type": self.scan_type,
+                        "engine": "nmap",
+                        "rate_control": {"nmap_timing": self.timing_args},
+                        "metrics": telemetry.export(),
                         "total_hosts": total_hosts,
                         "devices_found": devices_found,
                         "scan_time": scan_time,
@@ -650,6 +722,13 @@ class ScannerWorker(QObject):
                 # Clear the scanner reference and explicitly help garbage collection
                 if hasattr(self, 'scanner') and self.scanner:
                     self.scanner = None
+                    
+                # Remove the target list file of multi-target scans
+                for list_file in (self.target_file, self.exclude_file):
+                    if list_file and os.path.exists(list_file):
+                        os.remove(list_file)
+                self.target_file = None
+                self.exclude_file = None
                 
                 # Force a garbage collection cycle to clean up any lingering objects
                 import gc
@@ -661,6 +740,99 @@ class ScannerWorker(QObject):
             logger.debug("Scanner worker finished")
 
 
+class ConnectScanWorker(QObject):
+    """Worker thread for the built-in TCP connect scanner"""
+    
+    # Signals (same as ScannerWorker)
+    progress = Signal(int, int)  # current, total
+    device_found = Signal(dict)  # device data
+    scan_complete = Signal(dict)  # scan results
+    scan_error = Signal(str)  # error message
+    
+    def __init__(self, network_range, scan_type="quick", ports=None, targets=None, exclude=None,
+                 assume_up=False, concurrency=256, timeout=1.0, host_timeout=30.0, grab_banners=True,
+                 rate_controller=None):
+        """Initialize the connect scan worker"""
+        super().__init__()
+        self.network_range = network_range
+        self.targets = normalize_targets(targets) if targets else normalize_targets(network_range)
+        self.exclude = list(exclude) if exclude else []
+        self.scan_type = scan_type
+        self.ports = list(ports or DEFAULT_PORTS)
+        self.assume_up = assume_up
+        self.scanner = ConnectScanner(concurrency=concurrency, timeout=timeout,
+                                      host_timeout=host_timeout, grab_banners=grab_banners,
+                                      rate_controller=rate_controller)
+        self.is_running = False
+        self.should_stop = False
+        
+    def stop(self):
+        """Stop the scan"""
+        logger.debug("Request to stop connect scanner received")
+        self.should_stop = True
+        
+    def _emit_host(self, host_data):
+        """Emit a found host with the scan type of this worker"""
+        host_data["scan_type"] = self.scan_type
+        self.device_found.emit(host_data)
+        
+    def run(self):
+        """Run the connect scan"""
+        self.is_running = True
+        scan_start_time = time.time()
+        
+        telemetry = ScanTelemetry()
+        
+        try:
+            with telemetry.phase("expansion"):
+                hosts = expand_targets(self.targets, self.exclude)
+            logger.info(f"Starting connect scan of {len(hosts)} hosts on {len(self.ports)} ports")
+            self.device_found.emit({"status_update": f"Connect scan of {len(hosts)} hosts on {len(self.ports)} ports..."})
+            self.progress.emit(0, max(1, len(hosts)))
+            
+            with telemetry.phase("probing"):
+                summary = self.scanner.run(
+                    hosts, self.ports,
+                    on_host=self._emit_host,
+                    on_progress=self.progress.emit,
+                    should_stop=lambda: self.should_stop,
+                    assume_up=self.assume_up
+                )
+            
+            # Host data is built while probing; report that share as parsing
+            telemetry.add_time("probing", -summary["parse_time"])
+            telemetry.add_time("parsing", summary["parse_time"])
+            telemetry.set_counter("hosts_scanned", summary["total_hosts"])
+            telemetry.set_counter("hosts_up", summary["devices_found"])
+            telemetry.set_counter("probes", summary["probes"])
+            telemetry.set_counter("retries", summary["retries"])
+            telemetry.set_counter("timeouts", summary["timeouts"])
+            
+            if summary["stopped"]:
+                logger.info("Connect scan stopped")
+                return
+                
+            self.scan_complete.emit({
+                "network_range": self.network_range,
+                "target_count": len(self.targets),
+                "scan_type": self.scan_type,
+                "engine": "connect",
+                "total_hosts": summary["total_hosts"],
+                "devices_found": summary["devices_found"],
+                "retries": summary["retries"],
+                "rate_control": summary["rate_control"],
+                "metrics": telemetry.export(),
+                "scan_time": time.time() - scan_start_time,
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            })
+        except Exception as e:
+            logger.error(f"Error during connect scan: {e}", exc_info=True)
+            self.scan_error.emit(str(e))
+        finally:
+            self.is_running = False
+            logger.debug("Connect scan worker finished")
+
+
 class NetworkScannerPlugin(PluginInterface):
     """
     Network Scanner Plugin for NetWORKS
@@ -675,6 +847,7 @@ class NetworkScannerPlugin(PluginInterface):
     scan_device_found = Signal(object)  # device
     scan_completed = Signal(dict)  # results_dict
     scan_error = Signal(str)  # error_message
+    scan_job_changed = Signal(dict)  # job_dict
     
     def __init__(self):
         """Initialize the plugin"""
@@ -692,6 +865,24 @@ class NetworkScannerPlugin(PluginInterface):
         self._scan_results = {}
         self._scan_log = []
         
+        # Scan job queue - requests made while a scan is running wait here
+        self._job_queue = ScanJobQueue()
+        self._current_job = None
+        
+        # Set in initialize; the connect scanner is used when nmap is missing
+        self._nmap_available = True
+        
+        # RTT and loss estimates per subnet, shared by all scans of this session
+        self._subnet_stats = {}
+        
+        # Performance telemetry of the running scan and the metrics file (set in initialize)
+        self._scan_telemetry = None
+        self._metrics_path = None
+        
+        # Scan history (created in initialize once the plugin path is known)
+        self._scan_history = None
+        self._scan_records = []
+        
         # Plugin settings
         self.settings = {
             "scan_profiles": {
@@ -840,6 +1031,70 @@ class NetworkScannerPlugin(PluginInterface):
                 "type": "bool",
                 "default": True,
                 "value": True
+            },
+            "incremental_scan": {
+                "name": "Incremental Rescans",
+                "description": "Skip recently seen hosts, probe known hosts cheaply and only deep scan new or changed hosts",
+                "type": "bool",
+                "default": False,
+                "value": False
+            },
+            "freshness_window": {
+                "name": "Freshness Window",
+                "description": "Minutes during which a seen host is skipped by incremental rescans",
+                "type": "int",
+                "default": 60,
+                "value": 60
+            },
+            "scan_history": {
+                "name": "Scan History",
+                "description": "Keep a snapshot of every completed scan for comparing scans",
+                "type": "bool",
+                "default": True,
+                "value": True
+            },
+            "scan_engine": {
+                "name": "Scan Engine",
+                "description": "Scanner used for scan jobs (auto uses nmap when available and the built-in TCP connect scanner otherwise)",
+                "type": "choice",
+                "default": "auto",
+                "value": "auto",
+                "choices": ["auto", "nmap", "connect"]
+            },
+            "connect_concurrency": {
+                "name": "Connect Scan Concurrency",
+                "description": "Maximum simultaneous connection attempts of the connect scanner",
+                "type": "int",
+                "default": 256,
+                "value": 256
+            },
+            "connect_timeout": {
+                "name": "Connect Timeout",
+                "description": "Connect scanner timeout per port in milliseconds",
+                "type": "int",
+                "default": 1000,
+                "value": 1000
+            },
+            "adaptive_rate": {
+                "name": "Adaptive Probe Rate",
+                "description": "Adjust probe concurrency and timeouts to the measured round-trip times and loss of each subnet",
+                "type": "bool",
+                "default": True,
+                "value": True
+            },
+            "record_metrics": {
+                "name": "Record Scan Metrics",
+                "description": "Write per-scan phase timings and probe rates to a metrics file",
+                "type": "bool",
+                "default": True,
+                "value": True
+            },
+            "neighbor_seeding": {
+                "name": "Neighbor Table Seeding",
+                "description": "Add hosts from the system ARP/NDP neighbor tables before each scan and skip host discovery when all targets are known to be live",
+                "type": "bool",
+                "default": False,
+                "value": False
             }
         }
         
@@ -859,60 +1114,20 @@ class NetworkScannerPlugin(PluginInterface):
             self.config = app.config
             self.plugin_info = plugin_info
             
-            # Check if nmap module was successfully imported
-            if not HAS_NMAP:
-                error_msg = "The python-nmap module is not available. Please install it using 'pip install python-nmap'"
-                logger.error(error_msg)
-                if hasattr(self, "main_window") and self.main_window:
-                    QMessageBox.critical(
-                        self.main_window,
-                        "Network Scanner Error",
-                        error_msg
-                    )
-                raise ImportError(error_msg)
-                
-            # Check if nmap is available
-            try:
-                # Try to create a scanner to verify nmap is installed
-                test_scanner = nmap.PortScanner()
-                logger.debug("Nmap Python module initialized successfully")
-                
-                # Check if the nmap executable is available
-                if not self._check_nmap_executable():
-                    error_msg = "The nmap executable was not found in the system PATH. Please install nmap and make sure it's in your PATH."
-                    logger.error(error_msg)
-                    if hasattr(self, "main_window") and self.main_window:
-                        QMessageBox.critical(
-                            self.main_window,
-                            "Network Scanner Error",
-                            error_msg
-                        )
-                    raise RuntimeError(error_msg)
-                    
+            # Check if nmap is available, otherwise fall back to the built-in connect scanner
+            self._nmap_available, nmap_error = self._detect_nmap()
+            if self._nmap_available:
                 logger.info("Nmap is available and ready to use")
-                
-            except ImportError as e:
-                error_msg = f"Error importing nmap module: {e}"
-                logger.error(error_msg)
-                # Show an error message
-                if hasattr(self, "main_window") and self.main_window:
-                    QMessageBox.critical(
-                        self.main_window,
-                        "Network Scanner Error",
-                        f"Failed to import nmap module. Make sure python-nmap is installed.\n\nError: {e}"
-                    )
-                raise ImportError(error_msg)
-            except Exception as e:
-                error_msg = f"Error initializing nmap: {e}"
-                logger.error(error_msg)
-                # Show an error message
+            else:
+                logger.warning(f"{nmap_error} Falling back to the built-in TCP connect scanner.")
                 if hasattr(self, "main_window") and self.main_window:
-                    QMessageBox.critical(
+                    QMessageBox.warning(
                         self.main_window,
-                        "Network Scanner Error",
-                        f"Failed to initialize nmap. Make sure nmap is installed.\n\nError: {e}"
+                        "Network Scanner Warning",
+                        f"{nmap_error}\n\n"
+                        "Scans will use the built-in TCP connect scanner, which does not support "
+                        "OS detection or version detection."
                     )
-                raise RuntimeError(error_msg)
             
             # Check for netifaces
             if not HAS_NETIFACES:
@@ -944,6 +1159,16 @@ class NetworkScannerPlugin(PluginInterface):
             # Initialize threading system
             self._initialize_scanner()
             
+            # Scan metrics are appended to a JSON lines file next to the scan history
+            self._metrics_path = Path(plugin_info.path) / "data" / "scan_metrics.jsonl"
+            
+            # Open the scan history store
+            try:
+                self._scan_history = ScanHistory(Path(plugin_info.path) / "data" / "scan_history")
+            except Exception as e:
+                logger.warning(f"Scan history not available: {e}")
+                self._scan_history = None
+            
             # We're going to defer UI setup a bit to allow the main window to fully initialize
             QTimer.singleShot(300, self._setup_device_context_menu)
             
@@ -1175,6 +1400,13 @@ class NetworkScannerPlugin(PluginInterface):
         self.stop_button.setEnabled(False)
         button_grid.addWidget(self.stop_button, 1, 1)
         
+        # Neighbor table button
+        self.neighbors_button = QPushButton("Neighbors")
+        self.neighbors_button.setMinimumWidth(button_width)
+        self.neighbors_button.clicked.connect(self.on_neighbors_button_clicked)
+        self.neighbors_button.setToolTip("Add hosts from the system ARP/NDP tables without sending probes")
+        button_grid.addWidget(self.neighbors_button, 2, 0)
+        
         # Add the grid to the layout
         button_layout.addLayout(button_grid)
         
@@ -1210,6 +1442,19 @@ class NetworkScannerPlugin(PluginInterface):
         port_scan_layout.addWidget(self.port_scan_check)
         checkbox_layout.addWidget(port_scan_widget)
         
+        # Incremental rescans
+        incremental_widget = QWidget()
+        incremental_layout = QHBoxLayout(incremental_widget)
+        incremental_layout.setContentsMargins(0, 0, 0, 0)
+        incremental_label = QLabel("Incremental:")
+        self.incremental_check = QCheckBox()
+        self.incremental_check.setChecked(self.settings["incremental_scan"]["value"])
+        self.incremental_check.setToolTip("Skip recently seen hosts and only deep scan new or changed hosts")
+        self.incremental_check.toggled.connect(lambda checked: self.update_setting("incremental_scan", checked))
+        incremental_layout.addWidget(incremental_label)
+        incremental_layout.addWidget(self.incremental_check)
+        checkbox_layout.addWidget(incremental_widget)
+        
         # Add spacer to push checkboxes to the left
         checkbox_layout.addStretch(1)
         
@@ -1237,6 +1482,13 @@ class NetworkScannerPlugin(PluginInterface):
         self.progress_bar.setValue(0)
         self.progress_layout.addWidget(self.progress_bar)
         
+        # Performance metrics of the last scan
+        self.metrics_label = QLabel("")
+        self.metrics_label.setWordWrap(True)
+        self.metrics_label.setStyleSheet("color: gray;")
+        self.metrics_label.setToolTip("Phase timings and probe rates of the last scan")
+        self.progress_layout.addWidget(self.metrics_label)
+        
         # Add progress widget to top section
         top_layout.addWidget(progress_widget)
         
@@ -1359,23 +1611,238 @@ class NetworkScannerPlugin(PluginInterface):
         """
         Start a network scan of the specified range
         
+        If another scan is in progress, the scan is queued and started
+        as soon as the running scan finishes.
+        
         Args:
             network_range: The network range to scan (e.g., 192.168.1.0/24)
             scan_type: The type of scan to perform (quick, standard, comprehensive, etc.)
             
         Returns:
-            bool: True if scan started successfully, False otherwise
+            bool: True if scan was started or queued successfully, False otherwise
         """
-        # Check if already scanning
+        if self.settings["incremental_scan"]["value"]:
+            return self.incremental_scan(network_range, scan_type) is not None
+            
+        return self.submit_scan_job(network_range, scan_type) is not None
+        
+    def submit_scan_job(self, targets, scan_type=None, name=None):
+        """
+        Queue a scan job over an arbitrary list of targets
+        
+        All targets of a job are scanned by a single scanner invocation.
+        The job starts immediately if the scanner is idle.
+        
+        Args:
+            targets: Target string or list of targets (IP addresses, CIDR networks or ranges)
+            scan_type: The type of scan to perform (defaults to the configured scan type)
+            name: Optional display name for the job
+            
+        Returns:
+            str: The job ID, or None if no valid targets were given
+        """
+        job = ScanJob(targets, scan_type or self.settings["scan_type"]["value"], name=name)
+        return self._submit_job(job)
+        
+    def incremental_scan(self, targets, scan_type=None):
+        """
+        Queue an incremental rescan of the given targets
+        
+        Hosts seen within the freshness window are skipped. All other
+        addresses get a cheap probe first; only hosts that are new or whose
+        probe fingerprint changed are then deep scanned with the requested
+        scan profile.
+        
+        Args:
+            targets: Target string or list of targets (IP addresses, CIDR networks or ranges)
+            scan_type: The scan profile for the deep scan (defaults to the configured scan type)
+            
+        Returns:
+            str: The ID of the probe job, or None if no valid targets were given
+        """
+        scan_type = scan_type or self.settings["scan_type"]["value"]
+        job = ScanJob(targets, PROBE_SCAN_TYPE)
+        if not job.targets:
+            logger.warning("Scan job has no targets, ignoring")
+            return None
+            
+        planner = IncrementalPlanner(self.settings["freshness_window"]["value"] * 60)
+        fresh_hosts = planner.fresh_hosts(job.targets, self.device_manager.get_devices())
+        
+        job.name = f"Incremental probe of {job.describe_targets()}"
+        job.options = {
+            "stage": STAGE_PROBE,
+            "deep_scan_type": scan_type,
+            "exclude": fresh_hosts,
+            "changed_hosts": []
+        }
+        
+        if fresh_hosts:
+            self.log_message(f"Incremental scan: skipping {len(fresh_hosts)} host(s) seen in the last "
+                             f"{self.settings['freshness_window']['value']} minutes")
+            
+        return self._submit_job(job)
+        
+    def _submit_job(self, job):
+        """Add a scan job to the queue and start it if the scanner is idle"""
+        if not job.targets:
+            logger.warning("Scan job has no targets, ignoring")
+            return None
+            
+        self._job_queue.submit(job)
+        self.scan_job_changed.emit(job.to_dict())
+        
+        if self._is_scanning:
+            self.log_message(f"Queued {job.scan_type} scan of {job.name} "
+                             f"({self._job_queue.pending_count()} job(s) waiting)")
+        else:
+            self._start_next_job()
+            
+        return job.id
+        
+    def scan_devices(self, devices, scan_type=None, name=None):
+        """
+        Queue a single scan job over the IP addresses of the given devices
+        
+        Args:
+            devices: List of devices to scan
+            scan_type: The type of scan to perform (defaults to the configured scan type)
+            name: Optional display name for the job
+            
+        Returns:
+            str: The job ID, or None if none of the devices has an IP address
+        """
+        device_ips = []
+        for device in devices:
+            ip = device.get_property("ip_address", "")
+            if ip:
+                device_ips.append(ip)
+                
+        if not device_ips:
+            logger.warning("None of the devices to scan has an IP address")
+            return None
+            
+        return self.submit_scan_job(device_ips, scan_type, name=name or f"{len(device_ips)} device(s)")
+        
+    def scan_group(self, group, scan_type=None):
+        """
+        Queue a single scan job over all devices in a device group
+        
+        Args:
+            group: DeviceGroup object or group name
+            scan_type: The type of scan to perform (defaults to the configured scan type)
+            
+        Returns:
+            str: The job ID, or None if the group has no scannable devices
+        """
+        if isinstance(group, str):
+            group = self.device_manager.get_group(group)
+            
+        if not group:
+            logger.warning("Device group not found, cannot scan")
+            return None
+            
+        return self.scan_devices(group.get_all_devices(), scan_type, name=f"Group {group.name}")
+        
+    def get_scan_jobs(self):
+        """
+        Get queued, running and recently finished scan jobs
+        
+        Returns:
+            list: List of job dictionaries ordered by creation time
+        """
+        return [job.to_dict() for job in self._job_queue.get_jobs()]
+        
+    def cancel_scan_job(self, job_id):
+        """
+        Cancel a queued or running scan job
+        
+        Args:
+            job_id: ID of the job to cancel
+            
+        Returns:
+            bool: True if the job was cancelled, False otherwise
+        """
+        if self._current_job and self._current_job.id == job_id:
+            return self.stop_scan(cancel_queued=False)
+            
+        job = self._job_queue.get_job(job_id)
+        if job and self._job_queue.cancel(job_id):
+            self.log_message(f"Cancelled queued scan of {job.name}")
+            self.scan_job_changed.emit(job.to_dict())
+            return True
+            
+        return False
+        
+    def _start_next_job(self):
+        """Start the next queued scan job if the scanner is idle"""
         if self._is_scanning:
-            logger.warning("Scan already in progress")
             return False
             
+        job = self._job_queue.next_job()
+        while job:
+            if self._run_scan_job(job):
+                return True
+            job = self._job_queue.next_job()
+            
+        return False
+        
+    def _finish_current_job(self, status, results=None, error=None):
+        """Record the outcome of the running job and continue with the queue"""
+        job = self._current_job
+        self._current_job = None
+        self._scan_telemetry = None
+        
+        if job:
+            self._job_queue.finish(job, status, results, error)
+            self.scan_job_changed.emit(job.to_dict())
+            
+            # An incremental probe continues with a deep scan of new and changed hosts
+            if status == JOB_COMPLETED and job.options.get("stage") == STAGE_PROBE:
+                self._queue_incremental_deep_scan(job)
+            
+        if self._job_queue.pending_count():
+            # Start the next job once the current signal handlers have returned
+            QTimer.singleShot(0, self._start_next_job)
+        
+    def _queue_incremental_deep_scan(self, probe_job):
+        """Queue the deep stage of an incremental scan"""
+        changed_hosts = probe_job.options.get("changed_hosts", [])
+        if not changed_hosts:
+            self.log_message("Incremental scan: no new or changed hosts, deep scan skipped")
+            return
+            
+        self.log_message(f"Incremental scan: deep scanning {len(changed_hosts)} new or changed host(s)")
+        deep_job = ScanJob(
+            changed_hosts,
+            probe_job.options.get("deep_scan_type", self.settings["scan_type"]["value"]),
+            name=f"Incremental deep scan of {len(changed_hosts)} host(s)",
+            options={"stage": STAGE_DEEP}
+        )
+        self._job_queue.submit(deep_job)
+        self.scan_job_changed.emit(deep_job.to_dict())
+        
+    def _run_scan_job(self, job):
+        """
+        Start the scanner worker for a job
+        
+        Args:
+            job: The ScanJob to run
+            
+        Returns:
+            bool: True if scan started successfully, False otherwise
+        """
+        network_range = job.network_range
+        scan_type = job.scan_type
+        
         # Clean up any previous scan
         self._cleanup_previous_scan()
+        self._scan_records = []
+        self._scan_telemetry = ScanTelemetry()
         
-        # Update scan type in settings
-        self.settings["scan_type"]["value"] = scan_type
+        # Update scan type in settings (the incremental probe is not a user profile)
+        if job.options.get("stage") != STAGE_PROBE:
+            self.settings["scan_type"]["value"] = scan_type
         
         # Get scan profile settings if available
         scan_profiles = self.settings["scan_profiles"]["value"]
@@ -1402,6 +1869,19 @@ class NetworkScannerPlugin(PluginInterface):
                 
             if timeout == self.settings["scan_timeout"]["default"]:
                 timeout = profile.get("timeout", timeout)
+                
+        # Seed the scan with hosts the neighbor tables already know to be live
+        skip_discovery = False
+        if self.settings["neighbor_seeding"]["value"]:
+            live_hosts = set(self.harvest_neighbors(job.targets))
+            single_hosts = all("/" not in target and "-" not in target for target in job.targets)
+            skip_discovery = single_hosts and set(job.targets) <= live_hosts
+            
+        # The incremental probe stage only runs a cheap liveness check
+        if job.options.get("stage") == STAGE_PROBE:
+            custom_args = probe_arguments()
+            os_detection = False
+            port_scan = False
         
         # Create a new worker thread
         try:
@@ -1412,15 +1892,38 @@ class NetworkScannerPlugin(PluginInterface):
             self._scanner_thread = QThread()
             
             # Create a worker and move it to the thread
-            self._scanner_worker = ScannerWorker(
-                network_range=network_range,
-                scan_type=scan_type,
-                timeout=timeout,
-                os_detection=os_detection,
-                port_scan=port_scan,
-                use_sudo=use_sudo,
-                custom_scan_args=custom_args
-            )
+            job.engine = self._resolve_engine(job)
+            if job.engine == "connect":
+                if os_detection:
+                    logger.debug("OS detection is not supported by the connect scanner")
+                self._scanner_worker = ConnectScanWorker(
+                    network_range=network_range,
+                    scan_type=scan_type,
+                    ports=self._connect_scan_ports(scan_type, custom_args),
+                    targets=job.targets,
+                    exclude=job.options.get("exclude"),
+                    assume_up=skip_discovery,
+                    concurrency=self.settings["connect_concurrency"]["value"],
+                    timeout=self.settings["connect_timeout"]["value"] / 1000.0,
+                    host_timeout=timeout,
+                    rate_controller=self._create_rate_controller(
+                        self.settings["connect_concurrency"]["value"],
+                        self.settings["connect_timeout"]["value"] / 1000.0)
+                )
+            else:
+                self._scanner_worker = ScannerWorker(
+                    network_range=network_range,
+                    scan_type=scan_type,
+                    timeout=timeout,
+                    os_detection=os_detection,
+                    port_scan=port_scan,
+                    use_sudo=use_sudo,
+                    custom_scan_args=custom_args,
+                    targets=job.targets,
+                    exclude=job.options.get("exclude"),
+                    skip_discovery=skip_discovery,
+                    timing_args=self._create_rate_controller().nmap_timing_arguments(job.targets)
+                )
             self._scanner_worker.moveToThread(self._scanner_thread)
             
             # Connect signals
@@ -1433,16 +1936,19 @@ class NetworkScannerPlugin(PluginInterface):
             
             # Set scanning flag
             self._is_scanning = True
+            self._current_job = job
+            job.mark_running()
             
             # Start the thread
             self._scanner_thread.start()
             
             # Update UI
             self.scan_started.emit(network_range)
+            self.scan_job_changed.emit(job.to_dict())
             
             # Clear the scan log and reset progress
             self._scan_log = []
-            self.log_message(f"Starting {scan_type} scan of {network_range}")
+            self.log_message(f"Starting {scan_type} scan of {job.name}")
             self._scan_results = {}
             
             # Update scanner widget status if available
@@ -1459,9 +1965,60 @@ class NetworkScannerPlugin(PluginInterface):
             logger.error(f"Error starting scan: {e}", exc_info=True)
             self._is_scanning = False
             self._cleanup_previous_scan()
+            self._current_job = None
+            self._job_queue.finish(job, JOB_FAILED, error=str(e))
+            self.scan_job_changed.emit(job.to_dict())
             self.scan_error.emit(f"Error starting scan: {e}")
             return False
         
+    def _create_rate_controller(self, concurrency=50, timeout=1.0):
+        """
+        Create the probe rate controller for a scan
+        
+        Args:
+            concurrency: Starting (and, without adaptive rates, fixed) concurrency
+            timeout: Starting (and, without adaptive rates, fixed) probe timeout in seconds
+            
+        Returns:
+            RateController: Controller sharing the subnet estimates of earlier scans
+        """
+        if not self.settings["adaptive_rate"]["value"]:
+            return RateController(
+                initial_concurrency=concurrency, min_concurrency=concurrency, max_concurrency=concurrency,
+                initial_timeout=timeout, min_timeout=timeout, max_timeout=timeout
+            )
+            
+        return RateController(
+            initial_concurrency=concurrency,
+            min_concurrency=max(1, concurrency // 16),
+            max_concurrency=concurrency * 4,
+            initial_timeout=timeout,
+            min_timeout=0.05,
+            max_timeout=max(timeout * 4, 2.0),
+            subnet_stats=self._subnet_stats
+        )
+        
+    def _resolve_engine(self, job):
+        """Pick the scan engine for a job, falling back to the connect scanner without nmap"""
+        engine = job.engine if job.engine in ("nmap", "connect") else self.settings["scan_engine"]["value"]
+        if engine == "auto":
+            engine = "nmap" if self._nmap_available else "connect"
+        elif engine == "nmap" and not self._nmap_available:
+            self.log_message("nmap is not available, using the built-in connect scanner")
+            engine = "connect"
+        return engine
+        
+    def _connect_scan_ports(self, scan_type, custom_args):
+        """Get the ports the connect scanner probes for a scan type"""
+        ports = ports_from_arguments(custom_args)
+        if ports:
+            return ports
+        if scan_type == "service":
+            return list(SERVICE_PORTS)
+        if scan_type == "comprehensive":
+            return list(range(1, 1001))
+        return list(DISCOVERY_PORTS)
+        
     def _cleanup_previous_scan(self):
         """Clean up any previous scan thread and worker"""
         # Stop thread if running
@@ -1506,6 +2063,7 @@ class NetworkScannerPlugin(PluginInterface):
                 self.status_label.setText("Scan interrupted unexpectedly")
                 
             self.log_message("Scan interrupted unexpectedly")
+            self._finish_current_job(JOB_FAILED, error="Scan interrupted unexpectedly")
         
     def is_scanning(self):
         """
@@ -1516,13 +2074,23 @@ class NetworkScannerPlugin(PluginInterface):
         """
         return self._is_scanning
         
-    def stop_scan(self):
+    def stop_scan(self, cancel_queued=True):
         """
         Stop any currently running scan
         
+        Args:
+            cancel_queued: Also cancel scan jobs waiting in the queue
+        
         Returns:
             bool: True if scan was stopped, False if no scan was running
         """
+        if cancel_queued:
+            cancelled = self._job_queue.cancel_all()
+            if cancelled:
+                self.log_message(f"Cancelled {len(cancelled)} queued scan job(s)")
+            for job in cancelled:
+                self.scan_job_changed.emit(job.to_dict())
+                
         if not self.is_scanning():
             logger.debug("No scan running to stop")
             return False
@@ -1601,6 +2169,7 @@ class NetworkScannerPlugin(PluginInterface):
             self.status_label.setText("Scan stopped by user")
             
         self.log_message("Scan stopped by user")
+        self._finish_current_job(JOB_CANCELLED)
         
         return True
         
@@ -1625,9 +2194,15 @@ class NetworkScannerPlugin(PluginInterface):
         if hasattr(self, "progress_bar"):
             self.progress_bar.setValue(percentage)
             
+        # Track progress on the running job
+        if self._current_job:
+            self._current_job.update_progress(current, total)
+            
         # Update status label
         if hasattr(self, "status_label"):
-            self.status_label.setText(f"Scanning: {current}/{total} hosts processed ({percentage}%)")
+            queued = self._job_queue.pending_count()
+            queued_text = f" - {queued} job(s) queued" if queued else ""
+            self.status_label.setText(f"Scanning: {current}/{total} hosts processed ({percentage}%){queued_text}")
             
         # Emit the scan progress signal
         self.scan_progress.emit(current, total)
@@ -1639,6 +2214,18 @@ class NetworkScannerPlugin(PluginInterface):
         This method is called when the scanner worker finds a device.
         It creates a new device or updates an existing one.
         """
+        telemetry = self._scan_telemetry
+        if telemetry is None or "status_update" in host_data:
+            return self._ingest_host_data(host_data)
+            
+        with telemetry.phase("ingestion"):
+            device = self._ingest_host_data(host_data)
+        if device:
+            telemetry.count("devices_ingested")
+        return device
+        
+    def _ingest_host_data(self, host_data):
+        """Create or update the device described by scanner host data"""
         try:
             # Check if this is a status update rather than a device
             if "status_update" in host_data:
@@ -1689,6 +2276,13 @@ class NetworkScannerPlugin(PluginInterface):
                         existing_device = device
                         break
             
+            # Keep a compact record of the host for the scan history
+            if self._current_job and device_data.get("scan_source") in ("nmap", "connect"):
+                self._scan_records.append(host_record(device_data))
+                
+            # Record scan state used by incremental rescans
+            self._record_scan_state(device_data, existing_device)
+            
             if existing_device:
                 # Update existing device (one property at a time to prevent race conditions)
                 for key, value in device_data.items():
@@ -1720,6 +2314,7 @@ class NetworkScannerPlugin(PluginInterface):
                 return existing_device
             else:
                 # Create a new device
+                device_data.setdefault("alias", f"Device at {device_data['ip_address']}")
                 new_device = self.device_manager.create_device(
                     device_type="scanned",
                     **device_data
@@ -1741,10 +2336,64 @@ class NetworkScannerPlugin(PluginInterface):
             self.log_message(f"Error adding/updating device: {e}")
             return None
             
+    def _record_scan_state(self, device_data, existing_device):
+        """
+        Add incremental scan state to the data of a found device
+        
+        Probe results only carry liveness information, so for known devices
+        they are reduced to the probe properties to keep the deep scan data
+        intact. New or changed hosts are remembered for the deep stage.
+        """
+        if device_data.get("scan_source") == "ping":
+            return
+            
+        # Neighbor table entries only prove liveness, and candidates not even that
+        if device_data.get("scan_source") == "neighbor":
+            if device_data.get("status") == "up":
+                device_data["last_seen"] = now_timestamp()
+            if existing_device:
+                for key in list(device_data.keys()):
+                    if key not in NEIGHBOR_PROPERTIES:
+                        del device_data[key]
+            return
+            
+        job = self._current_job
+        stage = job.options.get("stage") if job else None
+        timestamp = now_timestamp()
+        device_data["last_seen"] = timestamp
+        
+        if stage != STAGE_PROBE:
+            device_data["last_scanned"] = timestamp
+            device_data["port_fingerprints"] = port_fingerprints(device_data)
+            return
+            
+        # Only probes set the liveness fingerprint: deep scans measure other
+        # ports (or none) and report unanswered ports differently, so their
+        # fingerprints would never match the next probe
+        device_data["liveness_fingerprint"] = liveness_fingerprint(device_data)
+        planner = IncrementalPlanner()
+        if planner.needs_deep_scan(existing_device, device_data["liveness_fingerprint"]):
+            job.options.setdefault("changed_hosts", []).append(device_data["ip_address"])
+            
+        if existing_device:
+            for key in list(device_data.keys()):
+                if key not in PROBE_PROPERTIES:
+                    del device_data[key]
+                    
     def _on_scan_complete(self, results):
         """Handle scan completion"""
+        # Tag the results with the job that produced them
+        if self._current_job:
+            results["job_id"] = self._current_job.id
+            
         # Store the results
         self._scan_results = results
+        if self._scan_telemetry:
+            with self._scan_telemetry.phase("persistence"):
+                self._record_scan_history(results)
+        else:
+            self._record_scan_history(results)
+        self._record_scan_metrics(results)
         
         # Update UI
         if hasattr(self, "scan_button"):
@@ -1763,6 +2412,15 @@ class NetworkScannerPlugin(PluginInterface):
         scan_time = round(results["scan_time"], 1)
         self.log_message(f"Scan complete: Found {results['devices_found']} devices in {scan_time} seconds")
         
+        # Log the probe rates chosen by the rate controller
+        rate_control = results.get("rate_control") or {}
+        if rate_control.get("subnets"):
+            self.log_message(f"Probe rate: concurrency {rate_control['concurrency']} "
+                             f"(peak {rate_control['peak_concurrency']}, {rate_control['decreases']} decrease(s)) "
+                             f"over {len(rate_control['subnets'])} subnet(s)")
+        elif rate_control.get("nmap_timing"):
+            self.log_message(f"nmap RTT timeouts seeded from earlier scans: {rate_control['nmap_timing']}")
+        
         # Clean up
         self._is_scanning = False
         
@@ -1790,6 +2448,145 @@ class NetworkScannerPlugin(PluginInterface):
         # Emit the scan completed signal
         self.scan_completed.emit(results)
         
+        # Continue with the next queued job
+        self._finish_current_job(JOB_COMPLETED, results)
+        
+    def _record_scan_history(self, results):
+        """Persist the hosts found by the current job in the scan history"""
+        job = self._current_job
+        records = self._scan_records
+        self._scan_records = []
+        
+        if not job or not self._scan_history or not self.settings["scan_history"]["value"]:
+            return
+            
+        # The incremental probe only covers part of the hosts and ports
+        if job.options.get("stage") == STAGE_PROBE:
+            return
+            
+        try:
+            results["history_id"] = self._scan_history.record_scan(
+                records,
+                scan_type=job.scan_type,
+                targets=job.targets,
+                timestamp=results.get("timestamp"),
+                scan_id=job.id
+            )
+        except Exception as e:
+            logger.error(f"Error recording scan history: {e}", exc_info=True)
+            
+    def harvest_neighbors(self, network_range=None, source=None):
+        """
+        Add hosts from the system ARP/NDP neighbor tables without probing
+        
+        Hosts with stale neighbor entries are added as candidates without a
+        status, so they are still probed by scans.
+        
+        Args:
+            network_range: Optional target string or list restricting the harvested hosts
+            source: Optional file with neighbor table contents to read instead of the system tables
+            
+        Returns:
+            list: IP addresses of the harvested hosts proven live
+        """
+        try:
+            entries = read_neighbor_table(source)
+        except OSError as e:
+            logger.error(f"Error reading neighbor table: {e}")
+            self.log_message(f"Error reading neighbor table: {e}")
+            return []
+            
+        if network_range:
+            entries = filter_entries(entries, normalize_targets(network_range))
+            
+        for entry in entries:
+            self._on_device_found(neighbor_host_data(entry))
+            
+        live_hosts = [entry["ip_address"] for entry in entries if is_live(entry)]
+        if entries:
+            self.log_message(f"Neighbor table: {len(live_hosts)} live host(s) and "
+                             f"{len(entries) - len(live_hosts)} candidate(s) found without probing")
+            
+        return live_hosts
+        
+    def _record_scan_metrics(self, results):
+        """Combine worker and ingestion telemetry into the scan metrics record"""
+        telemetry = self._scan_telemetry
+        self._scan_telemetry = None
+        if telemetry is None:
+            return
+            
+        telemetry.merge(results.get("metrics") or {})
+        job = self._current_job
+        record = telemetry.to_dict(
+            timestamp=results.get("timestamp", datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            plugin_version=self.version,
+            job_id=job.id if job else None,
+            scan_type=results.get("scan_type", ""),
+            engine=results.get("engine", job.engine if job else "ping"),
+            target_count=results.get("target_count", 1),
+            devices_found=results.get("devices_found", 0)
+        )
+        results["metrics"] = record
+        
+        summary = format_metrics_summary(record)
+        logger.info(f"Scan metrics: {summary}")
+        if hasattr(self, "metrics_label") and self.metrics_label:
+            self.metrics_label.setText(summary)
+            
+        if self._metrics_path and self.settings["record_metrics"]["value"]:
+            try:
+                append_metrics_record(self._metrics_path, record)
+            except OSError as e:
+                logger.warning(f"Could not write scan metrics: {e}")
+                
+    def get_scan_metrics(self, limit=None):
+        """
+        Get recorded scan metrics
+        
+        Args:
+            limit: Only return the most recent records
+            
+        Returns:
+            list: Metrics records, oldest first
+        """
+        if not self._metrics_path:
+            return []
+        return read_metrics_records(self._metrics_path, limit)
+        
+    def get_scan_history(self):
+        """
+        Get the scan history store
+        
+        Returns:
+            ScanHistory: The store, or None if scan history is not available
+        """
+        return self._scan_history
+        
+    def diff_scans(self, old_scan_id=None, new_scan_id=None):
+        """
+        Compare two stored scans
+        
+        Without arguments the most recent scan is compared with the scan
+        before it of the same targets and scan type.
+        
+        Args:
+            old_scan_id: ID of the earlier scan
+            new_scan_id: ID of the later scan
+            
+        Returns:
+            dict: New and disappeared hosts, opened and closed ports, OS, service
+                  and status changes, or None if the scans are not available
+        """
+        if not self._scan_history:
+            return None
+            
+        scans = self._scan_history.comparable_scans(old_scan_id, new_scan_id)
+        if not scans:
+            return None
+            
+        return self._scan_history.diff(*scans)
+        
     def _on_scan_error(self, error_message):
         """Handle scan errors"""
         # Update UI
@@ -1814,6 +2611,9 @@ class NetworkScannerPlugin(PluginInterface):
             
         # Emit the scan error signal
         self.scan_error.emit(error_message) 
+        
+        # Continue with the next queued job
+        self._finish_current_job(JOB_FAILED, error=error_message)
 
     @safe_action_wrapper
     def on_scan_action(self):
@@ -2324,7 +3124,7 @@ class NetworkScannerPlugin(PluginInterface):
                 self.main_window,
                 "Confirm Device Rescan",
                 f"Do you want to rescan {len(device_ips)} selected devices?\n\n"
-                f"This will perform individual scans for each device.",
+                f"All devices will be scanned together in a single scan job.",
                 QMessageBox.Yes | QMessageBox.No
             )
             
@@ -2332,11 +3132,8 @@ class NetworkScannerPlugin(PluginInterface):
                 # Get scan type from settings
                 scan_type = self.settings["scan_type"]["value"]
                 
-                # Scan each device
-                for ip in device_ips:
-                    self.scan_network(ip, scan_type)
-                    # Sleep briefly between scans to avoid resource contention
-                    time.sleep(0.5)
+                # Scan all devices with one job (queued if a scan is running)
+                self.scan_devices(devices, scan_type, name=f"{len(device_ips)} selected devices")
                     
     @safe_action_wrapper
     def _on_scan_network_action(self, device_or_devices):
@@ -2452,6 +3249,28 @@ class NetworkScannerPlugin(PluginInterface):
             return True
         return False
 
+    def _detect_nmap(self):
+        """
+        Check if python-nmap and the nmap executable are available
+        
+        Returns:
+            tuple: (available, error message)
+        """
+        if not HAS_NMAP:
+            return False, "The python-nmap module is not available. Please install it using 'pip install python-nmap'."
+            
+        try:
+            # Try to create a scanner to verify nmap is installed
+            nmap.PortScanner()
+            logger.debug("Nmap Python module initialized successfully")
+        except Exception as e:
+            return False, f"Failed to initialize nmap: {e}."
+            
+        if not self._check_nmap_executable():
+            return False, "The nmap executable was not found in the system PATH."
+            
+        return True, ""
+        
     def _check_nmap_executable(self):
         """Check if the nmap executable is available in the system PATH"""
         import subprocess
@@ -3498,11 +4317,16 @@ class NetworkScannerPlugin(PluginInterface):
                 device_found = Signal(dict)  # device data
                 scan_complete = Signal(dict)  # scan results
                 
-                def __init__(self, ip_list, network_range):
+                def __init__(self, ip_list, network_range, rate_controller):
                     super().__init__()
                     self.ip_list = ip_list
                     self.network_range = network_range
+                    self.rate_controller = rate_controller
                     self.should_stop = False
+                    self.probes = 0
+                    self.retries = 0
+                    self.timeouts = 0
+                    self._counter_lock = threading.Lock()
                     
                 def stop(self):
                     self.should_stop = True
@@ -3510,30 +4334,66 @@ class NetworkScannerPlugin(PluginInterface):
                 def run(self):
                     self._run_scan()
                     
-                def _ping_host(self, ip, index):
-                    if self.should_stop:
-                        return
-                        
-                    # Determine ping command based on OS
+                def _ping(self, ip):
+                    """Ping a host once and get the round-trip time in seconds
+                    
+                    Returns 0.0 for replies without a time and None without a reply
+                    """
+                    # Reply timeout follows the measured RTT of the subnet
+                    reply_timeout = self.rate_controller.timeout_for(str(ip))
                     system = platform.system().lower()
                     if system == "windows":
-                        ping_cmd = ["ping", "-n", "1", "-w", "500", str(ip)]
-                        ping_success = lambda proc: proc.returncode == 0
-                    else:  # Linux and macOS
-                        ping_cmd = ["ping", "-c", "1", "-W", "1", str(ip)]
-                        ping_success = lambda proc: proc.returncode == 0
+                        ping_cmd = ["ping", "-n", "1", "-w", str(max(1, int(reply_timeout * 1000))), str(ip)]
+                    elif system == "darwin":  # -W takes milliseconds on macOS
+                        ping_cmd = ["ping", "-c", "1", "-W", str(max(1, int(reply_timeout * 1000))), str(ip)]
+                    else:  # -W only takes whole seconds on Linux, the process deadline enforces sub-second timeouts
+                        ping_cmd = ["ping", "-c", "1", "-W", str(max(1, math.ceil(reply_timeout))), str(ip)]
                         
+                    with self._counter_lock:
+                        self.probes += 1
                     try:
-                        # Execute ping command
                         proc = subprocess.run(
                             ping_cmd, 
                             stdout=subprocess.PIPE, 
                             stderr=subprocess.PIPE,
-                            timeout=1
+                            # Leave time for starting the ping process itself
+                            timeout=reply_timeout + PING_STARTUP_TIME
                         )
+                    except subprocess.TimeoutExpired:
+                        proc = None
                         
+                    if proc is None or proc.returncode != 0:
+                        with self._counter_lock:
+                            self.timeouts += 1
+                        return None
+                    rtt_match = re.search(r"time[=<]\s*([\d.]+)\s*ms", proc.stdout.decode(errors="replace"))
+                    return float(rtt_match.group(1)) / 1000.0 if rtt_match else 0.0
+                    
+                def _ping_host(self, ip, index):
+                    if self.should_stop:
+                        return
+                        
+                    try:
+                        rtt = self._ping(ip)
+                        lost = False
+                        if rtt is None:
+                            self.rate_controller.record_timeout(str(ip))
+                            # Retry hosts in subnets that answer: a reply to the retry
+                            # means the first probe was lost, which is the congestion
+                            # signal that makes the controller back off
+                            if self.rate_controller.subnet_answered(str(ip)) and not self.should_stop:
+                                with self._counter_lock:
+                                    self.retries += 1
+                                rtt = self._ping(ip)
+                                lost = rtt is not None
+                                
                         # Check result
-                        if ping_success(proc):
+                        if rtt is not None:
+                            if rtt:
+                                self.rate_controller.record_response(str(ip), rtt)
+                            if lost:
+                                self.rate_controller.record_loss(str(ip))
+                                
                             # Log success
                             self.status_updated.emit(f"Host {ip} is up")
                             
@@ -3573,7 +4433,6 @@ class NetworkScannerPlugin(PluginInterface):
                     start_time = time.time()
                     alive_hosts = []
                     threads = []
-                    max_concurrent = min(50, len(self.ip_list))  # Limit concurrent threads
                     
                     try:
                         for i, ip in enumerate(self.ip_list):
@@ -3586,8 +4445,8 @@ class NetworkScannerPlugin(PluginInterface):
                             threads.append(t)
                             t.start()
                             
-                            # Limit concurrent threads
-                            while len([t for t in threads if t.is_alive()]) >= max_concurrent:
+                            # Limit concurrent threads (adapted to the measured RTT)
+                            while len([t for t in threads if t.is_alive()]) >= self.rate_controller.concurrency:
                                 time.sleep(0.01)
                                 
                             # Update status periodically
@@ -3610,6 +4469,16 @@ class NetworkScannerPlugin(PluginInterface):
                             "scan_type": "quick_ping",
                             "total_hosts": len(self.ip_list),
                             "devices_found": len(alive_hosts),
+                            "rate_control": self.rate_controller.metrics(),
+                            "metrics": {
+                                "phases": {"probing": scan_time},
+                                "counters": {
+                                    "hosts_scanned": len(self.ip_list),
+                                    "probes": self.probes,
+                                    "retries": self.retries,
+                                    "timeouts": self.timeouts
+                                }
+                            },
                             "scan_time": scan_time,
                             "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                         }
@@ -3689,7 +4558,10 @@ class NetworkScannerPlugin(PluginInterface):
             
             # Create worker thread
             self._ping_scan_thread = QThread()
-            self._ping_scan_worker = PingScanWorker(ip_list, network_range)
+            self._scan_telemetry = ScanTelemetry()
+            self._ping_scan_worker = PingScanWorker(
+                ip_list, network_range, self._create_rate_controller(min(50, len(ip_list)), 1.0)
+            )
             self._ping_scan_worker.moveToThread(self._ping_scan_thread)
             
             # Connect worker signals
@@ -3725,6 +4597,7 @@ class NetworkScannerPlugin(PluginInterface):
         """Handle ping scan completion in a thread-safe way"""
         # Store the results
         self._scan_results = results
+        self._record_scan_metrics(results)
         
         # Update UI
         if hasattr(self, "scan_button"):
@@ -3749,6 +4622,10 @@ class NetworkScannerPlugin(PluginInterface):
             
         # Emit the scan completed signal
         self.scan_completed.emit(results)
+        
+        # Run any scan jobs queued while the ping scan was active
+        if self._job_queue.pending_count():
+            QTimer.singleShot(0, self._start_next_job)
             
     def stop_ping_scan(self):
         """Stop the ping scan if it's running"""
@@ -3758,6 +4635,14 @@ class NetworkScannerPlugin(PluginInterface):
             return True
         return False
 
+    @safe_action_wrapper
+    def on_neighbors_button_clicked(self):
+        """Handle neighbors button click"""
+        network_range = self.network_range_edit.text().strip() or None
+        hosts = self.harvest_neighbors(network_range)
+        if not hosts:
+            self.log_message("Neighbor table: no matching hosts proven live")
+            
     @safe_action_wrapper
     def on_quick_ping_button_clicked(self):
         """Handle quick ping button click"""
@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Built-in TCP connect scanner for the Network Scanner plugin
+
+An nmap-free scan engine based on asyncio. Every port is probed with a
+plain TCP connect, so no raw sockets, elevated privileges or external
+binaries are needed. Optionally the first bytes sent by the service are
+read to derive a service hint.
+
+A host counts as up when at least one probed port accepted or actively
+refused the connection. Results use the same host data shape as the nmap
+engine (``open_tcp_ports``, ``tcp_services``, ``tcp_port_details``,
+``open_ports``, ``services``).
+"""
+
+import re
+import time
+import socket
+import asyncio
+import datetime
+from loguru import logger
+
+from plugins.network_scanner.utils.scan_jobs import target_networks
+from plugins.network_scanner.utils.rate_control import RateController, AdaptiveLimiter
+
+
+# Ports probed when nothing else is requested (mirrors the nmap engine default)
+DEFAULT_PORTS = [22, 23, 80, 443, 8080]
+
+# Extra ports used to find live hosts when the scan is a discovery scan
+DISCOVERY_PORTS = [21, 22, 23, 25, 53, 80, 135, 139, 443, 445, 3389, 8080]
+
+# Ports of the "service" profile
+SERVICE_PORTS = [21, 22, 23, 25, 53, 80, 110, 111, 135, 139, 143, 443, 445,
+                 993, 995, 1723, 3306, 3389, 5900, 8080]
+
+# Ports that only answer after a request
+HTTP_PORTS = (80, 8000, 8008, 8080, 8888)
+
+# Largest range a single target may expand to
+MAX_TARGET_ADDRESSES = 65536
+
+
+def parse_ports(spec):
+    """Parse a port specification such as "22,80,1000-1010"
+
+    Args:
+        spec (str): Port list with optional ranges
+
+    Returns:
+        list: Sorted unique port numbers
+    """
+    ports = set()
+    for part in str(spec).replace(" ", "").split(","):
+        if not part:
+            continue
+        # nmap protocol prefixes such as T:80
+        if ":" in part:
+            part = part.split(":", 1)[1]
+        try:
+            if "-" in part:
+                start, end = part.split("-", 1)
+                ports.update(range(int(start or 1), int(end or 65535) + 1))
+            else:
+                ports.add(int(part))
+        except ValueError:
+            logger.warning(f"Ignoring invalid port specification: {part}")
+    return sorted(port for port in ports if 0 < port < 65536)
+
+
+def ports_from_arguments(arguments):
+    """Extract the port list from nmap style arguments
+
+    Returns:
+        list: Ports, or an empty list if no -p option is present
+    """
+    match = re.search(r"-p\s*([0-9TU:,\- ]+?)(?=\s+-|\s*$)", arguments or "")
+    return parse_ports(match.group(1)) if match else []
+
+
+def expand_targets(targets, exclude=None):
+    """Expand scan targets into individual hosts
+
+    Args:
+        targets (list): Normalized scan targets
+        exclude (list, optional): Addresses to leave out
+
+    Returns:
+        list: Host addresses (hostnames are passed through unchanged)
+    """
+    excluded = set(exclude or [])
+    hosts = []
+    seen = set()
+
+    for target in targets:
+        networks = target_networks([target])
+        if not networks:
+            # Hostname
+            if target not in excluded and target not in seen:
+                seen.add(target)
+                hosts.append(target)
+            continue
+
+        for network in networks:
+            if network.num_addresses > MAX_TARGET_ADDRESSES:
+                logger.warning(f"Skipping {network}: more than {MAX_TARGET_ADDRESSES} addresses")
+                continue
+            # Single addresses and point-to-point links have no network/broadcast address
+            addresses = network.hosts() if network.num_addresses > 2 else iter(network)
+            for address in addresses:
+                ip = str(address)
+                if ip not in excluded and ip not in seen:
+                    seen.add(ip)
+                    hosts.append(ip)
+    return hosts
+
+
+def service_hint(port, banner):
+    """Derive a service name and product from a banner
+
+    Args:
+        port (int): Port number
+        banner (str): First bytes sent by the service
+
+    Returns:
+        tuple: (service name, product)
+    """
+    banner = (banner or "").strip()
+    first_line = banner.splitlines()[0] if banner else ""
+
+    if first_line.startswith("SSH-"):
+        parts = first_line.split("-", 2)
+        return "ssh", parts[2] if len(parts) > 2 else ""
+    if first_line.startswith("HTTP/"):
+        server = re.search(r"^Server:\s*(.+)$", banner, re.MULTILINE | re.IGNORECASE)
+        return ("https" if port == 443 else "http"), server.group(1).strip() if server else ""
+    if first_line.startswith("220"):
+        name = "smtp" if "SMTP" in first_line.upper() else "ftp"
+        return name, first_line[3:].strip(" -")
+    if first_line.startswith("+OK"):
+        return "pop3", first_line[3:].strip()
+    if first_line.startswith("* OK"):
+        return "imap", first_line[4:].strip()
+
+    try:
+        return socket.getservbyport(port, "tcp"), ""
+    except (OSError, OverflowError):
+        return "unknown", ""
+
+
+class ConnectScanner:
+    """asyncio TCP connect scanner"""
+
+    def __init__(self, concurrency=256, timeout=1.0, host_timeout=30.0,
+                 banner_timeout=0.5, grab_banners=True, host_parallelism=32, rate_controller=None,
+                 max_retries=1):
+        """Initialize the scanner
+
+        Args:
+            concurrency (int): Maximum number of simultaneous connection attempts
+            timeout (float): Connect timeout per port in seconds
+            host_timeout (float): Time budget per host in seconds
+            banner_timeout (float): Time to wait for a banner in seconds
+            grab_banners (bool): Read banners for service hints
+            host_parallelism (int): Number of hosts scanned at the same time
+            rate_controller (RateController, optional): Adapts concurrency and timeouts
+                during the scan; without it both stay fixed
+            max_retries (int): Retries of timed out probes on hosts that answered before
+        """
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.rate_controller = rate_controller or RateController(
+            initial_concurrency=self.concurrency, min_concurrency=self.concurrency,
+            max_concurrency=self.concurrency, initial_timeout=timeout,
+            min_timeout=timeout, max_timeout=timeout)
+        self.host_timeout = host_timeout
+        self.banner_timeout = banner_timeout
+        self.grab_banners = grab_banners
+        self.host_parallelism = max(1, int(host_parallelism))
+        self.max_retries = max(0, int(max_retries))
+
+        # Statistics of the last scan
+        self.retries = 0
+        self.probes = 0
+        self.timeouts = 0
+        self.parse_time = 0.0
+
+    async def probe_port(self, host, port, limiter):
+        """Probe a single TCP port
+
+        Returns:
+            tuple: (state, banner) with state "open", "closed" or "filtered"
+        """
+        controller = self.rate_controller
+        async with limiter:
+            loop = asyncio.get_running_loop()
+            attempts = 1 + (self.max_retries if controller.is_responsive(host) else 0)
+            for attempt in range(attempts):
+                self.probes += 1
+                started = loop.time()
+                try:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(host, port), controller.timeout_for(host))
+                except ConnectionRefusedError:
+                    # A reset is an answer too and gives an RTT sample
+                    controller.record_response(host, loop.time() - started)
+                    if attempt:
+                        controller.record_loss(host)
+                    return "closed", ""
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    controller.record_timeout(host)
+                    if attempt + 1 < attempts:
+                        self.retries += 1
+                    continue
+                except OSError:
+                    return "filtered", ""
+                break
+            else:
+                return "filtered", ""
+
+            controller.record_response(host, loop.time() - started)
+            if attempt:
+                controller.record_loss(host)
+
+            banner = ""
+            try:
+                if self.grab_banners:
+                    banner = await self._read_banner(reader, writer, host, port)
+            finally:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except (OSError, ConnectionError):
+                    pass
+            return "open", banner
+
+    async def _read_banner(self, reader, writer, host, port):
+        """Read the first bytes a service sends, nudging HTTP servers"""
+        try:
+            data = await asyncio.wait_for(reader.read(512), self.banner_timeout)
+        except asyncio.TimeoutError:
+            data = b""
+        except (OSError, ConnectionError):
+            return ""
+
+        # HTTP servers wait for a request before sending anything
+        if not data and port in HTTP_PORTS:
+            try:
+                writer.write(f"HEAD / HTTP/1.0\r\nHost: {host}\r\n\r\n".encode("ascii"))
+                await writer.drain()
+                data = await asyncio.wait_for(reader.read(512), self.banner_timeout)
+            except (asyncio.TimeoutError, OSError, ConnectionError):
+                return ""
+
+        return data.decode("utf-8", errors="replace").strip()
+
+    async def scan_host(self, host, ports, limiter, assume_up=False):
+        """Scan all ports of a host
+
+        Args:
+            host (str): Address or hostname
+            ports (list): Ports to probe
+            limiter (AdaptiveLimiter): Shared connection limit
+            assume_up (bool): Report the host even if no port answered
+
+        Returns:
+            dict: Host data, or None if the host did not answer
+        """
+        tasks = [asyncio.ensure_future(self.probe_port(host, port, limiter)) for port in ports]
+        try:
+            states = await asyncio.wait_for(asyncio.gather(*tasks), self.host_timeout)
+        except asyncio.TimeoutError:
+            logger.debug(f"Host timeout reached for {host}")
+            states = [task.result() if task.done() and not task.cancelled() else ("filtered", "")
+                      for task in tasks]
+
+        answered = any(state != "filtered" for state, _banner in states)
+        if not answered and not assume_up:
+            return None
+
+        parse_started = time.perf_counter()
+        host_data = self.host_data(host, ports, states, "syn-ack" if answered else "user-set")
+        self.parse_time += time.perf_counter() - parse_started
+        return host_data
+
+    def host_data(self, host, ports, states, reason):
+        """Build host data in the shape produced by the nmap engine"""
+        open_ports = []
+        services = {}
+        details = {}
+
+        for port, (state, banner) in zip(ports, states):
+            name, product = service_hint(port, banner) if state == "open" else ("", "")
+            details[port] = {
+                "port": port,
+                "state": state,
+                "reason": {"open": "syn-ack", "closed": "conn-refused"}.get(state, "no-response"),
+                "name": name,
+                "product": product,
+                "version": "",
+                "extrainfo": "",
+                "banner": banner,
+                "conf": "3",
+                "cpe": ""
+            }
+            if state == "open":
+                open_ports.append(port)
+                services[port] = f"{name} ({product})" if product else name
+
+        host_data = {
+            "ip_address": host,
+            "scan_source": "connect",
+            "status": "up",
+            "status_reason": reason,
+            "last_scan_time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "tags": ["scanned", "connect"],
+            "alias": f"Device at {host}"
+        }
+        # Only report ports that answered to keep the data comparable with nmap results
+        answered = {port: data for port, data in details.items() if data["state"] != "filtered"}
+        if open_ports:
+            host_data["open_tcp_ports"] = open_ports
+            host_data["open_ports"] = list(open_ports)
+            host_data["tcp_services"] = services
+            host_data["services"] = dict(services)
+        if answered:
+            host_data["tcp_port_details"] = answered
+        return host_data
+
+    async def scan(self, hosts, ports, on_host=None, on_progress=None, should_stop=None, assume_up=False):
+        """Scan a list of hosts
+
+        Args:
+            hosts (list): Host addresses (see expand_targets)
+            ports (list): Ports to probe on every host
+            on_host (callable, optional): Called with the host data of each live host
+            on_progress (callable, optional): Called with (hosts done, total hosts)
+            should_stop (callable, optional): Returns True when the scan should be aborted
+            assume_up (bool): Report hosts even if no port answered
+
+        Returns:
+            dict: Summary with total_hosts, devices_found, stopped, probes,
+                  retries, timeouts, parse_time and the rate_control metrics
+        """
+        limiter = AdaptiveLimiter(self.rate_controller)
+        queue = asyncio.Queue()
+        for host in hosts:
+            queue.put_nowait(host)
+
+        summary = {"total_hosts": len(hosts), "devices_found": 0, "stopped": False}
+        self.retries = 0
+        self.probes = 0
+        self.timeouts = 0
+        self.parse_time = 0.0
+        done = 0
+
+        async def worker():
+            nonlocal done
+            while not queue.empty():
+                if should_stop and should_stop():
+                    summary["stopped"] = True
+                    return
+                host = queue.get_nowait()
+                try:
+                    host_data = await self.scan_host(host, ports, limiter, assume_up)
+                except Exception as e:
+                    logger.warning(f"Error scanning {host}: {e}")
+                    host_data = None
+                done += 1
+                if host_data:
+                    summary["devices_found"] += 1
+                    if on_host:
+                        on_host(host_data)
+                if on_progress:
+                    on_progress(done, len(hosts))
+
+        workers = [worker() for _ in range(min(self.host_parallelism, max(1, len(hosts))))]
+        await asyncio.gather(*workers)
+        summary["rate_control"] = self.rate_controller.metrics()
+        summary["retries"] = self.retries
+        summary["probes"] = self.probes
+        summary["timeouts"] = self.timeouts
+        summary["parse_time"] = self.parse_time
+        return summary
+
+    def run(self, hosts, ports, **kwargs):
+        """Run a scan on a new event loop (for use from worker threads)
+
+        Returns:
+            dict: See scan()
+        """
+        return asyncio.run(self.scan(hosts, ports, **kwargs))
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Incremental rescan support for the Network Scanner plugin
+
+Incremental scans avoid re-probing the whole inventory on every run:
+
+1. Hosts seen within the freshness window are skipped entirely.
+2. All other addresses get a cheap probe (host discovery plus a handful of
+   TCP ports, no OS or version detection) that yields a liveness
+   fingerprint per host.
+3. Only hosts that are new or whose liveness fingerprint changed get the
+   deep scan of the requested profile.
+
+Scan state is kept on the devices themselves so it is persisted with the
+workspace:
+
+- ``last_seen``: last time the host answered any scan
+- ``last_scanned``: last time the host got a full (deep) scan
+- ``liveness_fingerprint``: digest of the probe port states
+- ``port_fingerprints``: per-port digest of state and service information
+"""
+
+import hashlib
+import datetime
+import ipaddress
+from loguru import logger
+
+from plugins.network_scanner.utils.scan_jobs import target_networks
+
+
+# Timestamp format used for scan state properties
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# TCP ports probed by the cheap liveness check
+PROBE_PORTS = [21, 22, 23, 80, 443, 445, 3389, 8080]
+
+# Scan type label used for the cheap probe stage
+PROBE_SCAN_TYPE = "incremental_probe"
+
+# Incremental job stages
+STAGE_PROBE = "probe"
+STAGE_DEEP = "deep"
+
+# Properties an incremental probe is allowed to update on a known device.
+# Everything else comes from deep scans and must not be overwritten by the
+# partial probe results.
+PROBE_PROPERTIES = ("status", "status_reason", "last_seen", "liveness_fingerprint")
+
+
+def now_timestamp():
+    """Get the current time formatted for scan state properties"""
+    return datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(value):
+    """Parse a scan state timestamp
+
+    Returns:
+        datetime.datetime: Parsed timestamp, or None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def probe_arguments(ports=None):
+    """Build the nmap arguments for the cheap probe stage
+
+    Args:
+        ports (list, optional): TCP ports to probe (defaults to PROBE_PORTS)
+
+    Returns:
+        str: nmap arguments
+    """
+    ports = ports or PROBE_PORTS
+    return f"-p {','.join(str(port) for port in ports)} -T4 --max-retries 1"
+
+
+def _port_details(host_data):
+    """Get TCP port details from host data with integer keys"""
+    details = {}
+    for port, port_data in (host_data.get("tcp_port_details") or {}).items():
+        try:
+            details[int(port)] = port_data
+        except (TypeError, ValueError):
+            continue
+    return details
+
+
+def liveness_fingerprint(host_data, ports=None):
+    """Compute the liveness fingerprint of a host from probe results
+
+    Only probe results are fingerprinted: deep scans cover other ports and
+    report unanswered ports differently, so their fingerprints would not be
+    comparable with the next probe.
+
+    Args:
+        host_data (dict): Host data emitted by the scanner
+        ports (list, optional): Probe ports (defaults to PROBE_PORTS)
+
+    Returns:
+        str: Hex digest of the probe port states
+    """
+    ports = ports or PROBE_PORTS
+    details = _port_details(host_data)
+    open_ports = set(host_data.get("open_tcp_ports") or [])
+
+    states = []
+    for port in sorted(ports):
+        if port in details:
+            state = details[port].get("state", "unknown")
+        else:
+            state = "open" if port in open_ports else "closed"
+        states.append(f"{port}:{state}")
+
+    return hashlib.sha1(";".join(states).encode("utf-8")).hexdigest()[:16]
+
+
+def port_fingerprints(host_data):
+    """Compute per-port fingerprints from scan results
+
+    Args:
+        host_data (dict): Host data emitted by the scanner
+
+    Returns:
+        dict: {port (str): digest of state and service information}
+    """
+    fingerprints = {}
+    for port, port_data in _port_details(host_data).items():
+        signature = "|".join(str(port_data.get(key, "")) for key in
+                             ("state", "name", "product", "version", "extrainfo"))
+        fingerprints[str(port)] = hashlib.sha1(signature.encode("utf-8")).hexdigest()[:12]
+    return fingerprints
+
+
+class IncrementalPlanner:
+    """Decides which hosts an incremental scan can skip"""
+
+    def __init__(self, freshness_window=3600):
+        """Initialize the planner
+
+        Args:
+            freshness_window (int): Seconds during which a seen host is not probed again
+        """
+        self.freshness_window = freshness_window
+
+    def is_fresh(self, device, now=None):
+        """Check if a device was seen and fully scanned within the freshness window"""
+        now = now or datetime.datetime.now()
+        last_seen = parse_timestamp(device.get_property("last_seen"))
+        last_scanned = parse_timestamp(device.get_property("last_scanned"))
+
+        if not last_seen or not last_scanned:
+            return False
+
+        return (now - last_seen).total_seconds() < self.freshness_window
+
+    def fresh_hosts(self, targets, devices, now=None):
+        """Get the addresses of fresh devices inside the scan targets
+
+        Args:
+            targets (list): Normalized scan targets
+            devices (list): Known devices
+
+        Returns:
+            list: IP addresses that can be skipped
+        """
+        networks = target_networks(targets)
+        if not networks:
+            return []
+
+        fresh = []
+        for device in devices:
+            ip_text = device.get_property("ip_address", "")
+            if not ip_text or not self.is_fresh(device, now):
+                continue
+            try:
+                ip = ipaddress.ip_address(ip_text)
+            except ValueError:
+                continue
+            if any(ip.version == network.version and ip in network for network in networks):
+                fresh.append(ip_text)
+
+        logger.debug(f"Incremental plan: {len(fresh)} fresh hosts inside {len(targets)} targets")
+        return fresh
+
+    def needs_deep_scan(self, device, new_fingerprint):
+        """Check if a probed host needs a deep scan
+
+        Args:
+            device: Existing device, or None for a newly discovered host
+            new_fingerprint (str): Liveness fingerprint from the probe
+
+        Returns:
+            bool: True if the host is new, was never deep scanned or changed
+        """
+        if device is None:
+            return True
+        if not device.get_property("last_scanned"):
+            return True
+        return device.get_property("liveness_fingerprint") != new_fingerprint
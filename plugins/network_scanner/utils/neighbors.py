@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Passive neighbor table discovery for the Network Scanner plugin
+
+The kernel keeps IP to MAC mappings for hosts on directly attached subnets
+in its ARP (IPv4) and NDP (IPv6) neighbor tables. Reading those tables
+discovers hosts without sending a single probe.
+
+Only entries the kernel has confirmed recently (REACHABLE), static entries
+(PERMANENT) and complete /proc/net/arp entries prove that a host is live.
+Cached entries that may have gone stale (STALE, DELAY, PROBE, NOARP and
+the dynamic entries of ``arp -a``) are reported as candidates, which still
+have to be probed.
+
+Supported sources:
+
+- ``ip neigh show`` output (Linux, IPv4 and IPv6)
+- ``/proc/net/arp`` (Linux, IPv4)
+- ``arp -a`` output (Windows and macOS)
+- Any file containing one of the formats above, for testing
+"""
+
+import re
+import sys
+import shutil
+import datetime
+import ipaddress
+import subprocess
+from loguru import logger
+
+from plugins.network_scanner.utils.scan_jobs import target_networks
+
+
+PROC_ARP_PATH = "/proc/net/arp"
+
+# Entry states that prove a host is live (COMPLETE: ATF_COM entries of /proc/net/arp)
+LIVE_STATES = ("REACHABLE", "PERMANENT", "COMPLETE")
+
+# Entry states with a usable mapping that may be out of date (CACHED: dynamic arp -a entries)
+CANDIDATE_STATES = ("STALE", "DELAY", "PROBE", "NOARP", "CACHED")
+
+# ATF_COM flag in /proc/net/arp: entry is complete
+ATF_COM = 0x2
+
+# Properties a neighbor table entry is allowed to update on a known device
+NEIGHBOR_PROPERTIES = ("mac_address", "status", "status_reason", "neighbor_interface",
+                       "neighbor_state", "last_seen")
+
+_EMPTY_MACS = ("00:00:00:00:00:00", "ff:ff:ff:ff:ff:ff")
+
+_MAC_RE = re.compile(r"([0-9a-fA-F]{1,2}[:-]){5}[0-9a-fA-F]{1,2}")
+
+
+def normalize_mac(mac):
+    """Normalize a MAC address to lower case, colon separated notation"""
+    parts = re.split(r"[:-]", mac.strip())
+    return ":".join(part.zfill(2) for part in parts).lower()
+
+
+def _entry(ip, mac, interface="", state=""):
+    """Create a neighbor entry, or None if the mapping is not usable"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    if address.is_multicast or address.is_unspecified:
+        return None
+
+    mac = normalize_mac(mac) if mac else ""
+    if not mac or mac in _EMPTY_MACS:
+        return None
+
+    return {"ip_address": ip, "mac_address": mac, "interface": interface, "state": state}
+
+
+def parse_proc_arp(text):
+    """Parse the contents of /proc/net/arp
+
+    Args:
+        text (str): File contents
+
+    Returns:
+        list: Neighbor entries with ip_address, mac_address, interface and state
+    """
+    entries = []
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 6:
+            continue
+        ip, _hw_type, flags, mac, _mask, interface = fields[:6]
+        try:
+            if not int(flags, 16) & ATF_COM:
+                continue
+        except ValueError:
+            continue
+        entry = _entry(ip, mac, interface, "COMPLETE")
+        if entry:
+            entries.append(entry)
+    return entries
+
+
+def parse_ip_neigh(text):
+    """Parse the output of ``ip neigh show``
+
+    Args:
+        text (str): Command output
+
+    Returns:
+        list: Neighbor entries with ip_address, mac_address, interface and state
+    """
+    entries = []
+    for line in text.splitlines():
+        fields = line.split()
+        if not fields or "lladdr" not in fields:
+            continue
+
+        state = fields[-1].upper()
+        if state not in LIVE_STATES and state not in CANDIDATE_STATES:
+            continue
+
+        interface = fields[fields.index("dev") + 1] if "dev" in fields[:-1] else ""
+        mac = fields[fields.index("lladdr") + 1] if fields.index("lladdr") + 1 < len(fields) else ""
+        entry = _entry(fields[0], mac, interface, state)
+        if entry:
+            entries.append(entry)
+    return entries
+
+
+def parse_arp_a(text):
+    """Parse the output of ``arp -a`` on Windows or macOS
+
+    Args:
+        text (str): Command output
+
+    Returns:
+        list: Neighbor entries with ip_address, mac_address, interface and state
+    """
+    entries = []
+    interface = ""
+    for line in text.splitlines():
+        line = line.strip()
+        if line.lower().startswith("interface:"):
+            # Windows section header: "Interface: 192.168.1.10 --- 0xb"
+            interface = line.split()[1] if len(line.split()) > 1 else ""
+            continue
+
+        mac_match = _MAC_RE.search(line)
+        if not mac_match:
+            continue
+
+        # Only static entries are known to be current, dynamic ones are cached
+        state = "PERMANENT" if re.search(r"\b(?:permanent|static)\b", line, re.IGNORECASE) else "CACHED"
+
+        # macOS: "host (192.168.1.1) at aa:bb:cc:dd:ee:ff on en0 ifscope [ethernet]"
+        ip_match = re.search(r"\((\d{1,3}(?:\.\d{1,3}){3})\)", line)
+        if ip_match:
+            on_match = re.search(r"\son\s+(\S+)", line)
+            entry = _entry(ip_match.group(1), mac_match.group(0),
+                           on_match.group(1) if on_match else "", state)
+        else:
+            # Windows: "192.168.1.1   aa-bb-cc-dd-ee-ff   dynamic"
+            entry = _entry(line.split()[0], mac_match.group(0), interface, state)
+        if entry:
+            entries.append(entry)
+    return entries
+
+
+def parse_neighbor_table(text):
+    """Parse neighbor table text in any of the supported formats"""
+    if text.lstrip().startswith("IP address"):
+        return parse_proc_arp(text)
+    if "lladdr" in text:
+        return parse_ip_neigh(text)
+    return parse_arp_a(text)
+
+
+def _run(command):
+    """Run a command and return its output, or None on failure"""
+    if not shutil.which(command[0]):
+        return None
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"Could not run {' '.join(command)}: {e}")
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+
+def read_neighbor_table(source=None):
+    """Read the system neighbor tables
+
+    Args:
+        source (str, optional): File to read instead of the system tables
+
+    Returns:
+        list: Neighbor entries, de-duplicated by IP address
+    """
+    entries = []
+    if source:
+        with open(source, "r", encoding="utf-8", errors="replace") as f:
+            entries = parse_neighbor_table(f.read())
+    elif sys.platform.startswith("linux"):
+        output = _run(["ip", "neigh", "show"])
+        if output is not None:
+            entries = parse_ip_neigh(output)
+        else:
+            try:
+                with open(PROC_ARP_PATH, "r") as f:
+                    entries = parse_proc_arp(f.read())
+            except OSError as e:
+                logger.debug(f"Could not read {PROC_ARP_PATH}: {e}")
+    else:
+        output = _run(["arp", "-a"])
+        if output is not None:
+            entries = parse_arp_a(output)
+
+    unique = {}
+    for entry in entries:
+        unique.setdefault(entry["ip_address"], entry)
+
+    logger.debug(f"Read {len(unique)} neighbor table entries")
+    return list(unique.values())
+
+
+def filter_entries(entries, targets):
+    """Keep the entries inside the given scan targets
+
+    Args:
+        entries (list): Neighbor entries
+        targets (list): Normalized scan targets (addresses, networks or ranges)
+
+    Returns:
+        list: Matching entries
+    """
+    networks = target_networks(targets)
+
+    matched = []
+    for entry in entries:
+        ip = ipaddress.ip_address(entry["ip_address"])
+        if any(ip.version == network.version and ip in network for network in networks):
+            matched.append(entry)
+    return matched
+
+
+def is_live(entry):
+    """Check if a neighbor entry proves that its host is live"""
+    return entry.get("state", "") in LIVE_STATES
+
+
+def neighbor_host_data(entry):
+    """Convert a neighbor entry into scanner host data
+
+    Candidate entries carry no status, as their host may be gone.
+
+    Args:
+        entry (dict): Neighbor entry
+
+    Returns:
+        dict: Host data for the device ingestion path
+    """
+    host_data = {
+        "ip_address": entry["ip_address"],
+        "mac_address": entry["mac_address"],
+        "neighbor_interface": entry.get("interface", ""),
+        "neighbor_state": entry.get("state", ""),
+        "scan_source": "neighbor",
+        "last_scan_time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "tags": ["scanned", "neighbor"]
+    }
+    if is_live(entry):
+        host_data["status"] = "up"
+        host_data["status_reason"] = "neighbor-table"
+    return host_data
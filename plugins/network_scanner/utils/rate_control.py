@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Adaptive probe rate control for the Network Scanner plugin
+
+Scan engines report the outcome of every probe to a RateController, which
+keeps round-trip time and loss estimates per subnet and adapts the scan
+to the path:
+
+- Probe timeouts follow the smoothed RTT of the subnet (srtt + 4 * rttvar,
+  as in TCP retransmission timers) and back off after losses.
+- Concurrency grows additively while probes are answered (one extra slot
+  per window of answered probes) and is halved when the loss rate goes
+  above a threshold (AIMD).
+
+Silent addresses and filtered ports are normal while scanning and say
+nothing about congestion, so a timeout only counts as loss when a retry
+of the same probe is answered.
+
+Subnet estimates can be shared between scans so that later scans of the
+same networks start with good timeouts, and nmap scans can be seeded with
+matching RTT timeout options.
+"""
+
+import time
+import asyncio
+import threading
+import ipaddress
+from loguru import logger
+
+from plugins.network_scanner.utils.scan_jobs import target_networks
+
+
+# Prefix lengths used to group hosts into subnets for RTT estimates
+IPV4_PREFIX = 24
+IPV6_PREFIX = 64
+
+# Weight of a new sample in the loss rate average
+LOSS_ALPHA = 0.1
+
+
+def subnet_key(host):
+    """Get the subnet a host belongs to for rate estimates
+
+    Args:
+        host (str): Host address
+
+    Returns:
+        str: Subnet in CIDR notation, or the host itself for hostnames
+    """
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return str(host)
+    prefix = IPV4_PREFIX if address.version == 4 else IPV6_PREFIX
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+class SubnetStats:
+    """Round-trip time and loss estimates of a subnet"""
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.loss_rate = 0.0
+        self.backoff = 1.0
+        self.responses = 0
+        self.timeouts = 0
+        self.losses = 0
+
+    def add_rtt(self, rtt):
+        """Add a round-trip time sample in seconds"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.responses += 1
+        self.loss_rate *= (1 - LOSS_ALPHA)
+        self.backoff = 1.0
+
+    def add_loss(self, max_backoff):
+        """Record a probe that a responsive host did not answer"""
+        self.losses += 1
+        self.loss_rate = self.loss_rate * (1 - LOSS_ALPHA) + LOSS_ALPHA
+        self.backoff = min(self.backoff * 2, max_backoff)
+
+    def to_dict(self, timeout):
+        """Convert the estimates to a dictionary for scan metrics"""
+        return {
+            "srtt_ms": round(self.srtt * 1000, 2) if self.srtt is not None else None,
+            "rttvar_ms": round(self.rttvar * 1000, 2) if self.rttvar is not None else None,
+            "timeout_ms": round(timeout * 1000, 1),
+            "loss_rate": round(self.loss_rate, 4),
+            "responses": self.responses,
+            "timeouts": self.timeouts,
+            "losses": self.losses
+        }
+
+
+class RateController:
+    """AIMD concurrency and RTT based timeout control"""
+
+    def __init__(self, initial_concurrency=64, min_concurrency=4, max_concurrency=1024,
+                 initial_timeout=1.0, min_timeout=0.05, max_timeout=5.0,
+                 loss_threshold=0.1, subnet_stats=None):
+        """Initialize the controller
+
+        Passing equal minimum and maximum values disables adaptation of
+        that parameter.
+
+        Args:
+            initial_concurrency (int): Concurrency at the start of the scan
+            min_concurrency (int): Lowest concurrency after decreases
+            max_concurrency (int): Highest concurrency after increases
+            initial_timeout (float): Probe timeout in seconds for subnets without estimates
+            min_timeout (float): Lowest probe timeout in seconds
+            max_timeout (float): Highest probe timeout in seconds
+            loss_threshold (float): Loss rate above which concurrency is halved
+            subnet_stats (dict, optional): Shared {subnet: SubnetStats} from earlier scans
+        """
+        self.min_concurrency = max(1, int(min_concurrency))
+        self.max_concurrency = max(self.min_concurrency, int(max_concurrency))
+        self._concurrency = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max(min_timeout, max_timeout)
+        self.loss_threshold = loss_threshold
+        self.subnets = subnet_stats if subnet_stats is not None else {}
+
+        # Counters of shared estimates at the start of this scan, and the
+        # subnets this scan probed, so metrics only cover this scan
+        self._baseline = {key: (stats.responses, stats.timeouts, stats.losses)
+                          for key, stats in self.subnets.items()}
+        self._probed = set()
+
+        self._lock = threading.Lock()
+        self._last_decrease = 0.0
+        self._responsive_hosts = set()
+        self._increases = 0
+        self._decreases = 0
+        self._peak_concurrency = int(self._concurrency)
+        self._low_concurrency = int(self._concurrency)
+
+    @property
+    def concurrency(self):
+        """Current number of probes allowed in flight"""
+        return int(self._concurrency)
+
+    def _stats(self, host):
+        """Get the estimates of the subnet of a host (lock must be held)"""
+        key = subnet_key(host)
+        self._probed.add(key)
+        stats = self.subnets.get(key)
+        if stats is None:
+            stats = self.subnets[key] = SubnetStats()
+        return stats
+
+    def _timeout(self, stats):
+        """Compute the probe timeout from subnet estimates"""
+        if stats is None or stats.srtt is None:
+            timeout = self.initial_timeout
+        else:
+            timeout = stats.srtt + 4 * stats.rttvar
+        return min(max(timeout * (stats.backoff if stats else 1.0), self.min_timeout), self.max_timeout)
+
+    def timeout_for(self, host):
+        """Get the probe timeout for a host in seconds"""
+        with self._lock:
+            return self._timeout(self.subnets.get(subnet_key(host)))
+
+    def record_response(self, host, rtt):
+        """Record an answered probe
+
+        Args:
+            host (str): Probed host
+            rtt (float): Round-trip time in seconds
+        """
+        with self._lock:
+            self._stats(host).add_rtt(rtt)
+            self._responsive_hosts.add(host)
+
+            # Additive increase: one extra slot per window of answered probes
+            if self._concurrency < self.max_concurrency:
+                previous = int(self._concurrency)
+                self._concurrency = min(self._concurrency + 1.0 / max(self._concurrency, 1.0),
+                                        float(self.max_concurrency))
+                if int(self._concurrency) > previous:
+                    self._increases += 1
+                    self._peak_concurrency = max(self._peak_concurrency, int(self._concurrency))
+
+    def is_responsive(self, host):
+        """Check if a host has answered any probe during this scan"""
+        with self._lock:
+            return host in self._responsive_hosts
+
+    def subnet_answered(self, host):
+        """Check if any host in the subnet of a host has answered a probe"""
+        with self._lock:
+            stats = self.subnets.get(subnet_key(host))
+            return bool(stats and stats.responses)
+
+    def record_timeout(self, host):
+        """Record an unanswered probe
+
+        Timeouts alone are not treated as loss: silent addresses and
+        filtered ports are normal while scanning.
+
+        Args:
+            host (str): Probed host
+        """
+        with self._lock:
+            self._stats(host).timeouts += 1
+
+    def record_loss(self, host):
+        """Record a lost probe (a timeout that was answered when retried)
+
+        Args:
+            host (str): Probed host
+        """
+        with self._lock:
+            stats = self._stats(host)
+            stats.add_loss(self.max_timeout / max(self.min_timeout, 0.001))
+
+            # Multiplicative decrease, at most once per round trip
+            now = time.monotonic()
+            if (stats.loss_rate > self.loss_threshold and self._concurrency > self.min_concurrency
+                    and now - self._last_decrease > (stats.srtt or self.initial_timeout)):
+                self._concurrency = max(self._concurrency / 2, float(self.min_concurrency))
+                self._last_decrease = now
+                self._decreases += 1
+                self._low_concurrency = min(self._low_concurrency, int(self._concurrency))
+                logger.debug(f"Loss rate {stats.loss_rate:.2f} on {subnet_key(host)}, "
+                             f"concurrency reduced to {int(self._concurrency)}")
+
+    def nmap_timing_arguments(self, targets):
+        """Build nmap RTT options from the estimates of the target subnets
+
+        Args:
+            targets (list): Normalized scan targets
+
+        Returns:
+            str: nmap options, or an empty string without estimates
+        """
+        networks = target_networks(targets)
+        with self._lock:
+            timeouts = []
+            for key, stats in self.subnets.items():
+                if stats.srtt is None:
+                    continue
+                try:
+                    subnet = ipaddress.ip_network(key)
+                except ValueError:
+                    continue
+                if any(subnet.version == network.version and subnet.overlaps(network) for network in networks):
+                    timeouts.append(self._timeout(stats))
+
+        if not timeouts:
+            return ""
+
+        initial_ms = max(10, int(max(timeouts) * 1000))
+        max_ms = max(initial_ms, int(min(max(timeouts) * 4, self.max_timeout) * 1000))
+        return f"--initial-rtt-timeout {initial_ms}ms --max-rtt-timeout {max_ms}ms"
+
+    def metrics(self):
+        """Get the chosen rates and estimates for scan metrics
+
+        Subnets and their response, timeout and loss counts only cover the
+        probes of this controller, also when the estimates are shared.
+        """
+        with self._lock:
+            subnets = {}
+            for key in self._probed:
+                stats = self.subnets[key]
+                responses, timeouts, losses = self._baseline.get(key, (0, 0, 0))
+                subnet = stats.to_dict(self._timeout(stats))
+                subnet.update({"responses": stats.responses - responses,
+                               "timeouts": stats.timeouts - timeouts,
+                               "losses": stats.losses - losses})
+                if subnet["responses"] or subnet["timeouts"]:
+                    subnets[key] = subnet
+            return {
+                "concurrency": int(self._concurrency),
+                "peak_concurrency": self._peak_concurrency,
+                "low_concurrency": self._low_concurrency,
+                "increases": self._increases,
+                "decreases": self._decreases,
+                "subnets": subnets
+            }
+
+
+class AdaptiveLimiter:
+    """asyncio concurrency limit that follows a RateController"""
+
+    def __init__(self, controller):
+        """Initialize the limiter (must be created inside the event loop)"""
+        self.controller = controller
+        self._active = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self.controller.concurrency)
+            self._active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
@@ -0,0 +1,555 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Scan history store for the Network Scanner plugin
+
+Every completed scan is persisted as a compact, column oriented snapshot so
+that changes between scans can be answered after device properties have
+been overwritten by later scans.
+
+Layout of the history directory::
+
+    index.jsonl            one summary line per scan (append only)
+    <scan_id>.json.gz      columnar snapshot of a single scan
+
+A snapshot stores one column per attribute (host, status, open ports,
+service hash, OS). Open ports are encoded as a bitmap over the sorted list
+of ports seen anywhere in that scan, which keeps snapshots small and makes
+port comparisons between hosts and scans cheap.
+
+Trend queries over many scans only read the index, or stream snapshots one
+at a time, so the full history is never loaded into memory.
+"""
+
+import os
+import gzip
+import json
+import uuid
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+from loguru import logger
+
+
+SNAPSHOT_VERSION = 1
+
+# Timestamp format used in the index and snapshots
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+INDEX_FILE = "index.jsonl"
+
+
+def service_hash(host_data):
+    """Compute a short digest of the services running on a host
+
+    Args:
+        host_data (dict): Host data emitted by the scanner
+
+    Returns:
+        str: Hex digest, or an empty string if no services are known
+    """
+    services = host_data.get("services") or {}
+    if not services:
+        return ""
+    signature = ";".join(f"{port}={services[port]}" for port in sorted(services, key=lambda p: int(p)))
+    return hashlib.sha1(signature.encode("utf-8")).hexdigest()[:12]
+
+
+def host_record(host_data):
+    """Reduce scanner host data to the fields kept in the scan history
+
+    Args:
+        host_data (dict): Host data emitted by the scanner
+
+    Returns:
+        dict: Record with ip, status, ports, services and os
+    """
+    return {
+        "ip": host_data.get("ip_address", ""),
+        "status": host_data.get("status", "up"),
+        "ports": sorted(int(port) for port in (host_data.get("open_ports") or [])),
+        "services": service_hash(host_data),
+        "os": host_data.get("os", "")
+    }
+
+
+def _parse_timestamp(value):
+    """Parse an index timestamp, returning None for invalid values"""
+    if isinstance(value, datetime.datetime):
+        return value
+    try:
+        return datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+class ScanSnapshot:
+    """Columnar snapshot of the hosts found by a single scan"""
+
+    def __init__(self, scan_id, timestamp, scan_type="", targets=None, port_index=None,
+                 hosts=None, status=None, ports=None, services=None, os_names=None):
+        """Initialize the snapshot from its columns"""
+        self.id = scan_id
+        self.timestamp = timestamp
+        self.scan_type = scan_type
+        self.targets = list(targets or [])
+        self.port_index = list(port_index or [])
+        self.hosts = list(hosts or [])
+        self.status = list(status or [])
+        self.ports = list(ports or [])  # int bitmaps over port_index
+        self.services = list(services or [])
+        self.os = list(os_names or [])
+        self._rows = {ip: row for row, ip in enumerate(self.hosts)}
+
+    @classmethod
+    def from_records(cls, scan_id, timestamp, records, scan_type="", targets=None):
+        """Build a snapshot from host records
+
+        Args:
+            scan_id (str): Scan ID
+            timestamp (str): Scan timestamp
+            records (list): Records created by host_record()
+            scan_type (str): Scan profile that produced the records
+            targets (list, optional): Scan targets
+
+        Returns:
+            ScanSnapshot: The snapshot
+        """
+        # Later records for the same host replace earlier ones
+        by_host = OrderedDict()
+        for record in records:
+            if record.get("ip"):
+                by_host[record["ip"]] = record
+
+        port_index = sorted({port for record in by_host.values() for port in record["ports"]})
+        positions = {port: bit for bit, port in enumerate(port_index)}
+
+        bitmaps = []
+        for record in by_host.values():
+            bitmap = 0
+            for port in record["ports"]:
+                bitmap |= 1 << positions[port]
+            bitmaps.append(bitmap)
+
+        return cls(
+            scan_id, timestamp, scan_type, targets, port_index,
+            hosts=list(by_host.keys()),
+            status=[record["status"] for record in by_host.values()],
+            ports=bitmaps,
+            services=[record["services"] for record in by_host.values()],
+            os_names=[record["os"] for record in by_host.values()]
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a snapshot from its serialized form"""
+        return cls(
+            data["id"], data["timestamp"], data.get("scan_type", ""), data.get("targets"),
+            data.get("port_index"), data.get("hosts"), data.get("status"),
+            [int(bitmap, 16) for bitmap in data.get("ports", [])],
+            data.get("services"), data.get("os")
+        )
+
+    def to_dict(self):
+        """Serialize the snapshot"""
+        return {
+            "version": SNAPSHOT_VERSION,
+            "id": self.id,
+            "timestamp": self.timestamp,
+            "scan_type": self.scan_type,
+            "targets": self.targets,
+            "port_index": self.port_index,
+            "hosts": self.hosts,
+            "status": self.status,
+            "ports": [format(bitmap, "x") for bitmap in self.ports],
+            "services": self.services,
+            "os": self.os
+        }
+
+    def __contains__(self, ip):
+        return ip in self._rows
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def row(self, ip):
+        """Get the row number of a host, or None if it was not found"""
+        return self._rows.get(ip)
+
+    def open_ports(self, ip):
+        """Get the open ports of a host
+
+        Returns:
+            list: Sorted open ports, empty if the host is not in the snapshot
+        """
+        row = self._rows.get(ip)
+        if row is None:
+            return []
+        return self._decode(self.ports[row])
+
+    def has_port(self, ip, port):
+        """Check if a port was open on a host"""
+        row = self._rows.get(ip)
+        if row is None:
+            return False
+        try:
+            bit = self.port_index.index(port)
+        except ValueError:
+            return False
+        return bool(self.ports[row] >> bit & 1)
+
+    def hosts_with_port(self, port):
+        """Get the hosts that had a port open"""
+        try:
+            bit = self.port_index.index(port)
+        except ValueError:
+            return []
+        mask = 1 << bit
+        return [ip for ip, bitmap in zip(self.hosts, self.ports) if bitmap & mask]
+
+    def open_port_count(self):
+        """Get the total number of open ports over all hosts"""
+        return sum(bin(bitmap).count("1") for bitmap in self.ports)
+
+    def _decode(self, bitmap):
+        """Convert a port bitmap back into a list of ports"""
+        ports = []
+        bit = 0
+        while bitmap:
+            if bitmap & 1:
+                ports.append(self.port_index[bit])
+            bitmap >>= 1
+            bit += 1
+        return ports
+
+
+def diff_snapshots(old, new):
+    """Compute the differences between two scan snapshots
+
+    Args:
+        old (ScanSnapshot): Earlier scan
+        new (ScanSnapshot): Later scan
+
+    Returns:
+        dict: Differences with new_hosts, disappeared_hosts, opened_ports,
+              closed_ports, os_changes, service_changes and status_changes
+    """
+    diff = {
+        "old_scan": old.id,
+        "new_scan": new.id,
+        "new_hosts": [ip for ip in new.hosts if ip not in old],
+        "disappeared_hosts": [ip for ip in old.hosts if ip not in new],
+        "opened_ports": {},
+        "closed_ports": {},
+        "os_changes": {},
+        "service_changes": [],
+        "status_changes": {}
+    }
+
+    # Bitmaps can be compared directly when both scans saw the same ports
+    same_index = old.port_index == new.port_index
+
+    for new_row, ip in enumerate(new.hosts):
+        old_row = old.row(ip)
+        if old_row is None:
+            continue
+
+        old_bitmap = old.ports[old_row]
+        new_bitmap = new.ports[new_row]
+        if not (same_index and old_bitmap == new_bitmap):
+            old_ports = set(old._decode(old_bitmap))
+            new_ports = set(new._decode(new_bitmap))
+            if new_ports - old_ports:
+                diff["opened_ports"][ip] = sorted(new_ports - old_ports)
+            if old_ports - new_ports:
+                diff["closed_ports"][ip] = sorted(old_ports - new_ports)
+
+        if old.os[old_row] != new.os[new_row] and (old.os[old_row] or new.os[new_row]):
+            diff["os_changes"][ip] = {"old": old.os[old_row], "new": new.os[new_row]}
+
+        if old.services[old_row] != new.services[new_row]:
+            diff["service_changes"].append(ip)
+
+        if old.status[old_row] != new.status[new_row]:
+            diff["status_changes"][ip] = {"old": old.status[old_row], "new": new.status[new_row]}
+
+    return diff
+
+
+class ScanHistory:
+    """Persistent store of scan snapshots"""
+
+    def __init__(self, directory, cache_size=8):
+        """Initialize the store
+
+        Args:
+            directory (str): Directory holding the index and snapshots
+            cache_size (int): Number of decoded snapshots kept in memory
+        """
+        self.directory = str(directory)
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def index_path(self):
+        """Path of the scan index file"""
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _snapshot_path(self, scan_id):
+        """Get the file path of a snapshot"""
+        return os.path.join(self.directory, f"{scan_id}.json.gz")
+
+    def record_scan(self, records, scan_type="", targets=None, timestamp=None, scan_id=None):
+        """Persist the results of a scan
+
+        Args:
+            records (list): Host records created by host_record()
+            scan_type (str): Scan profile used
+            targets (list, optional): Scan targets
+            timestamp (str, optional): Scan timestamp (defaults to now)
+            scan_id (str, optional): Scan ID (generated if not given)
+
+        Returns:
+            str: The scan ID
+        """
+        scan_id = scan_id or str(uuid.uuid4())
+        timestamp = timestamp or datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+        snapshot = ScanSnapshot.from_records(scan_id, timestamp, records, scan_type, targets)
+
+        entry = {
+            "id": scan_id,
+            "timestamp": timestamp,
+            "scan_type": scan_type,
+            "targets": list(targets or []),
+            "host_count": len(snapshot),
+            "open_port_count": snapshot.open_port_count()
+        }
+
+        with self._lock:
+            with gzip.open(self._snapshot_path(scan_id), "wt", encoding="utf-8") as f:
+                json.dump(snapshot.to_dict(), f, separators=(",", ":"))
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._remember(snapshot)
+
+        logger.debug(f"Recorded scan {scan_id} with {len(snapshot)} hosts in scan history")
+        return scan_id
+
+    def iter_scans(self, since=None, until=None, scan_type=None):
+        """Iterate over index entries in recording order
+
+        Args:
+            since (datetime or str, optional): Only scans at or after this time
+            until (datetime or str, optional): Only scans at or before this time
+            scan_type (str, optional): Only scans of this profile
+
+        Yields:
+            dict: Index entry with id, timestamp, scan_type, targets, host_count and open_port_count
+        """
+        since = _parse_timestamp(since) if since else None
+        until = _parse_timestamp(until) if until else None
+
+        if not os.path.exists(self.index_path):
+            return
+
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping corrupt scan history index line in {self.index_path}")
+                    continue
+
+                if scan_type and entry.get("scan_type") != scan_type:
+                    continue
+                if since or until:
+                    timestamp = _parse_timestamp(entry.get("timestamp"))
+                    if timestamp is None:
+                        continue
+                    if since and timestamp < since:
+                        continue
+                    if until and timestamp > until:
+                        continue
+                yield entry
+
+    def list_scans(self, since=None, until=None, scan_type=None):
+        """Get index entries of stored scans (see iter_scans)"""
+        return list(self.iter_scans(since, until, scan_type))
+
+    def latest_scans(self, count=2, scan_type=None):
+        """Get the IDs of the most recent scans, oldest first"""
+        latest = []
+        for entry in self.iter_scans(scan_type=scan_type):
+            latest.append(entry["id"])
+            if len(latest) > count:
+                latest.pop(0)
+        return latest
+
+    def comparable_scans(self, old_scan_id=None, new_scan_id=None):
+        """Pick two scans of the same targets and scan profile to compare
+
+        Scans of other targets or profiles are skipped, as comparing them
+        would report every host outside their overlap as new or gone.
+
+        Args:
+            old_scan_id (str, optional): Earlier scan; defaults to the scan
+                before the later one with the same targets and profile
+            new_scan_id (str, optional): Later scan; defaults to the latest
+                scan (after the earlier one, if given) with the same targets
+                and profile
+
+        Returns:
+            tuple: (old scan ID, new scan ID), or None if there is no such pair
+        """
+        entries = list(self.iter_scans())
+        positions = {entry["id"]: position for position, entry in enumerate(entries)}
+
+        def key(entry):
+            return entry.get("scan_type", ""), frozenset(entry.get("targets") or [])
+
+        if old_scan_id and new_scan_id:
+            return old_scan_id, new_scan_id
+
+        if old_scan_id:
+            if old_scan_id not in positions:
+                return None
+            old = entries[positions[old_scan_id]]
+            later = [entry for entry in entries[positions[old_scan_id] + 1:] if key(entry) == key(old)]
+            return (old_scan_id, later[-1]["id"]) if later else None
+
+        if new_scan_id:
+            if new_scan_id not in positions:
+                return None
+            end = positions[new_scan_id]
+        elif entries:
+            end = len(entries) - 1
+        else:
+            return None
+        new = entries[end]
+        earlier = [entry for entry in entries[:end] if key(entry) == key(new)]
+        return (earlier[-1]["id"], new["id"]) if earlier else None
+
+    def load_snapshot(self, scan_id):
+        """Load a snapshot
+
+        Args:
+            scan_id (str): Scan ID
+
+        Returns:
+            ScanSnapshot: The snapshot, or None if it does not exist
+        """
+        with self._lock:
+            if scan_id in self._cache:
+                self._cache.move_to_end(scan_id)
+                return self._cache[scan_id]
+
+        path = self._snapshot_path(scan_id)
+        if not os.path.exists(path):
+            logger.warning(f"Scan snapshot {scan_id} not found")
+            return None
+
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                snapshot = ScanSnapshot.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error loading scan snapshot {scan_id}: {e}")
+            return None
+
+        with self._lock:
+            self._remember(snapshot)
+        return snapshot
+
+    def _remember(self, snapshot):
+        """Add a snapshot to the LRU cache (lock must be held)"""
+        self._cache[snapshot.id] = snapshot
+        self._cache.move_to_end(snapshot.id)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def diff(self, old_scan_id, new_scan_id):
+        """Compute the differences between two stored scans
+
+        Returns:
+            dict: See diff_snapshots(), or None if a scan is missing
+        """
+        old = self.load_snapshot(old_scan_id)
+        new = self.load_snapshot(new_scan_id)
+        if old is None or new is None:
+            return None
+        return diff_snapshots(old, new)
+
+    def trend(self, since=None, until=None, scan_type=None):
+        """Get host and open port counts per scan
+
+        Only the index is read, so this is cheap for any number of scans.
+
+        Returns:
+            list: Dictionaries with id, timestamp, host_count and open_port_count
+        """
+        return [
+            {
+                "id": entry["id"],
+                "timestamp": entry["timestamp"],
+                "host_count": entry.get("host_count", 0),
+                "open_port_count": entry.get("open_port_count", 0)
+            }
+            for entry in self.iter_scans(since, until, scan_type)
+        ]
+
+    def port_trend(self, port, since=None, until=None, scan_type=None):
+        """Get the hosts with a port open in each scan
+
+        Snapshots are streamed one at a time and not kept in the cache.
+
+        Yields:
+            dict: id, timestamp and hosts with the port open
+        """
+        for entry in self.iter_scans(since, until, scan_type):
+            snapshot = self._stream_snapshot(entry["id"])
+            if snapshot is not None:
+                yield {"id": entry["id"], "timestamp": entry["timestamp"],
+                       "hosts": snapshot.hosts_with_port(port)}
+
+    def host_history(self, ip, since=None, until=None, scan_type=None):
+        """Get the state of a host in each stored scan that covered it
+
+        Snapshots are streamed one at a time and not kept in the cache.
+
+        Yields:
+            dict: id, timestamp, status, open ports, service hash and OS
+        """
+        for entry in self.iter_scans(since, until, scan_type):
+            snapshot = self._stream_snapshot(entry["id"])
+            if snapshot is None:
+                continue
+            row = snapshot.row(ip)
+            if row is None:
+                continue
+            yield {
+                "id": entry["id"],
+                "timestamp": entry["timestamp"],
+                "status": snapshot.status[row],
+                "ports": snapshot.open_ports(ip),
+                "services": snapshot.services[row],
+                "os": snapshot.os[row]
+            }
+
+    def _stream_snapshot(self, scan_id):
+        """Load a snapshot without adding it to the cache"""
+        with self._lock:
+            if scan_id in self._cache:
+                return self._cache[scan_id]
+
+        try:
+            with gzip.open(self._snapshot_path(scan_id), "rt", encoding="utf-8") as f:
+                return ScanSnapshot.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Skipping unreadable scan snapshot {scan_id}: {e}")
+            return None
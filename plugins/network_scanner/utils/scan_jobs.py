@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Scan job model and job queue for the Network Scanner plugin
+
+A scan job describes one unit of scanning work: an arbitrary list of
+targets (single addresses, CIDR networks or address ranges) that is run
+as a single scanner invocation. Jobs are queued so that scan requests
+made while another scan is running are executed afterwards instead of
+being dropped.
+"""
+
+import os
+import uuid
+import datetime
+import tempfile
+import ipaddress
+import threading
+from collections import deque
+from loguru import logger
+
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+
+def _expand_range(target):
+    """Convert a full address range (a.b.c.d-e.f.g.h) into CIDR blocks
+
+    nmap only understands octet ranges such as 10.0.0.1-254, so ranges
+    spanning full addresses are summarized into the covering networks.
+
+    Args:
+        target (str): Range in "start-end" notation
+
+    Returns:
+        list: List of target strings, or [target] if it is not a full range
+    """
+    start_text, end_text = [part.strip() for part in target.split("-", 1)]
+
+    # Octet ranges (10.0.0.1-254) are understood by nmap as they are
+    if "." not in end_text and ":" not in end_text:
+        return [target]
+
+    try:
+        start = ipaddress.ip_address(start_text)
+        end = ipaddress.ip_address(end_text)
+        return [str(network) for network in ipaddress.summarize_address_range(start, end)]
+    except (ValueError, TypeError) as e:
+        logger.debug(f"Could not summarize range {target}: {e}")
+        return [target]
+
+
+def normalize_targets(targets):
+    """Normalize a list of scan targets
+
+    Accepts strings containing one or more targets separated by commas or
+    whitespace, strips duplicates while preserving order and converts full
+    address ranges into CIDR notation.
+
+    Args:
+        targets: A target string or an iterable of target strings
+
+    Returns:
+        list: Normalized list of target strings
+    """
+    if isinstance(targets, str):
+        targets = [targets]
+
+    normalized = []
+    seen = set()
+
+    for entry in targets or []:
+        if not entry:
+            continue
+
+        for target in str(entry).replace(",", " ").split():
+            expanded = _expand_range(target) if "-" in target else [target]
+            for item in expanded:
+                if item not in seen:
+                    seen.add(item)
+                    normalized.append(item)
+
+    return normalized
+
+
+def count_target_addresses(targets):
+    """Estimate the number of addresses covered by a list of targets
+
+    Args:
+        targets (list): Normalized target strings
+
+    Returns:
+        int: Estimated number of addresses
+    """
+    total = 0
+    for target in targets:
+        try:
+            if "/" in target:
+                total += ipaddress.ip_network(target, strict=False).num_addresses
+            elif "-" in target:
+                # Octet range such as 10.0.0.1-254
+                start_text, end_text = target.rsplit("-", 1)
+                first_octet = int(start_text.rsplit(".", 1)[1])
+                total += max(1, int(end_text) - first_octet + 1)
+            else:
+                total += 1
+        except (ValueError, IndexError):
+            total += 1
+    return total
+
+
+def target_networks(targets):
+    """Convert scan targets into address networks for membership tests
+
+    Hostnames cannot be matched against addresses and are skipped.
+
+    Args:
+        targets (list): Normalized target strings
+
+    Returns:
+        list: ipaddress network objects covering the targets
+    """
+    networks = []
+    for target in targets:
+        try:
+            if "-" in target:
+                # Octet range such as 10.0.0.1-254
+                start_text, end_text = target.rsplit("-", 1)
+                start = ipaddress.ip_address(start_text)
+                end = ipaddress.ip_address(f"{start_text.rsplit('.', 1)[0]}.{end_text}")
+                networks.extend(ipaddress.summarize_address_range(start, end))
+            else:
+                networks.append(ipaddress.ip_network(target, strict=False))
+        except (ValueError, TypeError):
+            continue
+    return networks
+
+
+def write_target_file(targets):
+    """Write targets to a temporary file suitable for nmap's -iL option
+
+    Args:
+        targets (list): Target strings
+
+    Returns:
+        str: Path to the temporary file (caller must delete it)
+    """
+    fd, path = tempfile.mkstemp(prefix="networks_scan_", suffix=".txt")
+    with os.fdopen(fd, "w") as f:
+        f.write("\n".join(targets))
+        f.write("\n")
+    return path
+
+
+class ScanJob:
+    """A single queued or running scan over a list of targets"""
+
+    def __init__(self, targets, scan_type="quick", name=None, engine="auto", options=None):
+        """Initialize the scan job
+
+        Args:
+            targets: Target string or list of target strings
+            scan_type (str): Scan profile to use
+            name (str, optional): Display name for the job
+            engine (str): Scanner engine to run the job with ("auto", "nmap" or "connect")
+            options (dict, optional): Engine specific options
+        """
+        self.id = str(uuid.uuid4())
+        self.targets = normalize_targets(targets)
+        self.scan_type = scan_type
+        self.engine = engine
+        self.options = options or {}
+        self.name = name or self.describe_targets()
+
+        self.status = JOB_QUEUED
+        self.progress_current = 0
+        self.progress_total = 0
+        self.created = datetime.datetime.now()
+        self.started = None
+        self.finished = None
+        self.results = {}
+        self.error = None
+
+    @property
+    def network_range(self):
+        """Target description compatible with the single-range scan API"""
+        return " ".join(self.targets)
+
+    @property
+    def address_count(self):
+        """Estimated number of addresses covered by this job"""
+        return count_target_addresses(self.targets)
+
+    def describe_targets(self):
+        """Get a short human readable description of the targets"""
+        if not self.targets:
+            return "(no targets)"
+        if len(self.targets) <= 3:
+            return ", ".join(self.targets)
+        return f"{self.targets[0]}, {self.targets[1]} and {len(self.targets) - 2} more targets"
+
+    def is_finished(self):
+        """Check if the job has reached a final state"""
+        return self.status in FINISHED_STATES
+
+    def mark_running(self):
+        """Mark the job as running"""
+        self.status = JOB_RUNNING
+        self.started = datetime.datetime.now()
+
+    def mark_finished(self, status, results=None, error=None):
+        """Mark the job as finished
+
+        Args:
+            status (str): Final job state
+            results (dict, optional): Scan results
+            error (str, optional): Error message
+        """
+        self.status = status
+        self.finished = datetime.datetime.now()
+        if results is not None:
+            self.results = results
+        if error:
+            self.error = error
+
+    def update_progress(self, current, total):
+        """Update job progress"""
+        self.progress_current = current
+        self.progress_total = total
+
+    def to_dict(self):
+        """Convert the job to a dictionary"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "targets": list(self.targets),
+            "scan_type": self.scan_type,
+            "engine": self.engine,
+            "status": self.status,
+            "progress_current": self.progress_current,
+            "progress_total": self.progress_total,
+            "created": self.created.strftime("%Y-%m-%d %H:%M:%S"),
+            "started": self.started.strftime("%Y-%m-%d %H:%M:%S") if self.started else None,
+            "finished": self.finished.strftime("%Y-%m-%d %H:%M:%S") if self.finished else None,
+            "error": self.error
+        }
+
+
+class ScanJobQueue:
+    """Thread-safe FIFO queue of scan jobs with a bounded history"""
+
+    def __init__(self, history_size=50):
+        """Initialize the queue
+
+        Args:
+            history_size (int): Number of finished jobs to keep for inspection
+        """
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._jobs = {}  # job_id -> ScanJob (pending, running and recent jobs)
+        self._history = deque()
+        self._history_size = history_size
+
+    def submit(self, job):
+        """Add a job to the end of the queue
+
+        Returns:
+            str: The job ID
+        """
+        with self._lock:
+            self._pending.append(job)
+            self._jobs[job.id] = job
+        logger.debug(f"Queued scan job {job.id}: {job.name}")
+        return job.id
+
+    def next_job(self):
+        """Pop the next pending job
+
+        Returns:
+            ScanJob: The next job, or None if the queue is empty
+        """
+        with self._lock:
+            while self._pending:
+                job = self._pending.popleft()
+                if job.status == JOB_QUEUED:
+                    return job
+        return None
+
+    def cancel(self, job_id):
+        """Cancel a pending job
+
+        Running jobs are not affected; the caller has to stop the scanner.
+
+        Returns:
+            bool: True if a pending job was cancelled
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job.status != JOB_QUEUED:
+                return False
+            try:
+                self._pending.remove(job)
+            except ValueError:
+                pass
+            job.mark_finished(JOB_CANCELLED)
+            self._remember(job)
+        logger.debug(f"Cancelled queued scan job {job_id}")
+        return True
+
+    def cancel_all(self):
+        """Cancel all pending jobs
+
+        Returns:
+            list: The cancelled jobs
+        """
+        with self._lock:
+            cancelled = [job for job in self._pending if job.status == JOB_QUEUED]
+            self._pending.clear()
+            for job in cancelled:
+                job.mark_finished(JOB_CANCELLED)
+                self._remember(job)
+        return cancelled
+
+    def finish(self, job, status, results=None, error=None):
+        """Record that a job has finished"""
+        with self._lock:
+            job.mark_finished(status, results, error)
+            self._remember(job)
+
+    def _remember(self, job):
+        """Keep a finished job in the bounded history (lock must be held)"""
+        self._history.append(job)
+        while len(self._history) > self._history_size:
+            old_job = self._history.popleft()
+            self._jobs.pop(old_job.id, None)
+
+    def get_job(self, job_id):
+        """Get a job by ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_jobs(self):
+        """Get all known jobs ordered by creation time"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created)
+
+    def pending_count(self):
+        """Get the number of jobs waiting to run"""
+        with self._lock:
+            return len(self._pending)
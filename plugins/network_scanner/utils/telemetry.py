@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Scan performance telemetry for the Network Scanner plugin
+
+Each scan records how long it spent in every phase and how much work it
+did, so scan performance can be compared across plugin versions, engines
+and scan profiles.
+
+Phases:
+
+- ``expansion``: turning targets into scanner input (host lists, target files)
+- ``probing``: waiting for the scan engine
+- ``parsing``: converting engine output into host data
+- ``ingestion``: adding or updating devices
+- ``persistence``: writing the scan history
+
+Records are appended as JSON lines to a metrics file.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from loguru import logger
+
+
+PHASES = ("expansion", "probing", "parsing", "ingestion", "persistence")
+
+
+class ScanTelemetry:
+    """Phase timings and counters of a single scan"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {phase: 0.0 for phase in PHASES}
+        self.counters = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block of code as part of a phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name, seconds):
+        """Add time to a phase"""
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        """Increment a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_counter(self, name, value):
+        """Set a counter to a value"""
+        with self._lock:
+            self.counters[name] = value
+
+    def merge(self, metrics):
+        """Merge phase times and counters reported by a scan worker
+
+        Args:
+            metrics (dict): Dictionary with "phases" and "counters"
+        """
+        for name, seconds in (metrics.get("phases") or {}).items():
+            self.add_time(name, seconds)
+        for name, value in (metrics.get("counters") or {}).items():
+            if value is not None:
+                self.count(name, value)
+
+    def export(self):
+        """Get the raw phase times and counters (for passing between threads)"""
+        with self._lock:
+            return {"phases": dict(self.phases), "counters": dict(self.counters)}
+
+    def to_dict(self, **info):
+        """Build the metrics record
+
+        Args:
+            **info: Descriptive fields (scan type, engine, version, ...)
+
+        Returns:
+            dict: Record with info, phases, counters and rates
+        """
+        with self._lock:
+            phases = {name: round(seconds, 4) for name, seconds in self.phases.items()}
+            counters = dict(self.counters)
+
+        total = time.perf_counter() - self._started
+        probing = self.phases.get("probing", 0.0)
+        hosts = counters.get("hosts_scanned", 0)
+        probes = counters.get("probes")
+
+        record = dict(info)
+        record.update({
+            "total_time": round(total, 4),
+            "phases": phases,
+            "counters": counters,
+            "hosts_per_sec": round(hosts / total, 2) if total > 0 else None,
+            "probes_per_sec": round(probes / probing, 2) if probes and probing > 0 else None
+        })
+        return record
+
+
+def append_metrics_record(path, record):
+    """Append a metrics record to a JSON lines file
+
+    Args:
+        path (str): Metrics file
+        record (dict): Metrics record
+    """
+    directory = os.path.dirname(str(path))
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def read_metrics_records(path, limit=None):
+    """Read metrics records
+
+    Args:
+        path (str): Metrics file
+        limit (int, optional): Only return the most recent records
+
+    Returns:
+        list: Metrics records, oldest first
+    """
+    if not os.path.exists(path):
+        return []
+
+    records = deque(maxlen=limit) if limit else []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping corrupt metrics line in {path}")
+    return list(records)
+
+
+def format_metrics_summary(record):
+    """Format a short one-line summary of a metrics record for display"""
+    phases = record.get("phases", {})
+    parts = [f"{record.get('total_time', 0):.1f}s total"]
+    for phase in PHASES:
+        if phases.get(phase):
+            parts.append(f"{phase} {phases[phase]:.2f}s")
+    if record.get("hosts_per_sec") is not None:
+        parts.append(f"{record['hosts_per_sec']} hosts/s")
+    if record.get("probes_per_sec") is not None:
+        parts.append(f"{record['probes_per_sec']} probes/s")
+    counters = record.get("counters", {})
+    for name in ("retries", "timeouts"):
+        if counters.get(name):
+            parts.append(f"{counters[name]} {name}")
+    return ", ".join(parts)
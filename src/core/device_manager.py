@@ -192,6 +192,7 @@ class DeviceManager(QObject):
     device_added = Signal(object)
     device_removed = Signal(object)
     device_changed = Signal(object)
+    devices_changed = Signal(list)
     group_added = Signal(object)
     group_removed = Signal(object)
     group_changed = Signal(object)
@@ -530,6 +531,47 @@ class DeviceManager(QObject):
         
         return True
     
+    def update_devices(self, updates):
+        """
+        Update the properties of many devices at once
+        
+        Properties are applied without emitting the signals of the individual
+        devices; a single devices_changed signal is emitted for all devices
+        that changed instead, so views refresh once per batch rather than
+        once per device.
+        
+        Args:
+            updates: Dictionary of device ID -> {property: value}
+            
+        Returns:
+            list: Devices whose properties changed
+        """
+        changed = []
+        for device_id, properties in updates.items():
+            device = self.devices.get(device_id)
+            if not device:
+                continue
+                
+            # Only apply values that differ from the current ones
+            current = device.get_properties()
+            properties = {key: value for key, value in properties.items()
+                          if key != "id" and current.get(key) != value}
+            if not properties:
+                continue
+                
+            device.blockSignals(True)
+            try:
+                device.update_properties(properties)
+            finally:
+                device.blockSignals(False)
+            changed.append(device)
+            
+        if changed:
+            logger.debug(f"Updated properties of {len(changed)} devices")
+            self.devices_changed.emit(changed)
+            
+        return changed
+    
     def get_device(self, device_id):
         """Get a device by ID"""
         return self.devices.get(device_id)
@@ -117,6 +117,7 @@ class DeviceTableModel(QAbstractTableModel):
         self.device_manager.device_added.connect(self.on_device_added)
         self.device_manager.device_removed.connect(self.on_device_removed)
         self.device_manager.device_changed.connect(self.on_device_changed)
+        self.device_manager.devices_changed.connect(self.on_devices_changed)
         self.device_manager.group_added.connect(self.on_model_changed)
         self.device_manager.group_removed.connect(self.on_model_changed)
         
@@ -396,6 +397,26 @@ class DeviceTableModel(QAbstractTableModel):
                 left_index = self.index(row, 0)
                 right_index = self.index(row, self.columnCount() - 1)
                 self.dataChanged.emit(left_index, right_index)
+                
+    @Slot(list)
+    def on_devices_changed(self, devices):
+        """Handle many devices changing at once"""
+        rows = {device.id: row for row, device in enumerate(self._devices)}
+        changed_rows = [rows[device.id] for device in devices if device.id in rows]
+        if not changed_rows:
+            return
+            
+        # Refresh the caches once for the whole batch
+        self._update_device_groups()
+        old_custom_props = set(self._custom_prop_keys)
+        self._discover_custom_properties()
+        
+        if old_custom_props != set(self._custom_prop_keys):
+            self.layoutChanged.emit()
+        else:
+            left_index = self.index(min(changed_rows), 0)
+            right_index = self.index(max(changed_rows), self.columnCount() - 1)
+            self.dataChanged.emit(left_index, right_index)
             
     @Slot()
     def on_model_changed(self):
@@ -118,6 +118,7 @@ class DeviceTreeModel(QAbstractItemModel):
         self.device_manager.device_added.connect(self.on_device_added)
         self.device_manager.device_removed.connect(self.on_device_removed)
         self.device_manager.device_changed.connect(self.on_device_changed)
+        self.device_manager.devices_changed.connect(self.on_devices_changed)
         self.device_manager.group_added.connect(self.on_group_added)
         self.device_manager.group_removed.connect(self.on_group_removed)
         self.device_manager.group_changed.connect(self.on_group_changed)
@@ -285,20 +286,32 @@ class DeviceTreeModel(QAbstractItemModel):
         # Find the device in the tree and update just that item
         # instead of rebuilding the entire tree
         self._update_device_display(device)
+        
+    @Slot(list)
+    def on_devices_changed(self, devices):
+        """Handle many devices changing at once"""
+        # Update all changed devices in a single pass over the tree
+        self._update_devices_in_item(self.root_item, {device.id: device for device in devices})
 
     def _update_device_display(self, device):
         """Update a device's display in the tree without resetting the model"""
         # This method updates a device's display name without resetting the model
         
         # Find all instances of the device in the tree (it could be in multiple groups)
-        self._update_device_in_item(self.root_item, device)
+        self._update_devices_in_item(self.root_item, {device.id: device})
 
-    def _update_device_in_item(self, item, device):
-        """Update a device within a tree item and its children recursively"""
+    def _update_devices_in_item(self, item, devices):
+        """Update devices within a tree item and its children recursively
+        
+        Args:
+            item: Tree item to search
+            devices: Dictionary of device ID -> device to update
+        """
         # Check all children of this item
         for child in item.child_items:
-            # If this child is the device we're looking for
-            if child.device and child.device.id == device.id:
+            # If this child is one of the devices we're looking for
+            if child.device and child.device.id in devices:
+                device = devices[child.device.id]
                 # Update the display name in the data array
                 display_name = device.get_property("alias", "") or device.get_property("hostname", "") or device.get_property("ip_address", "") or "Unnamed Device"
                 child.item_data[0] = display_name
@@ -313,7 +326,7 @@ class DeviceTreeModel(QAbstractItemModel):
                 
             # Recursively check this child's children if it's a group
             if child.group:
-                self._update_device_in_item(child, device)
+                self._update_devices_in_item(child, devices)
         
     @Slot(object)
     def on_group_added(self, group):
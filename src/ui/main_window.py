@@ -1815,6 +1815,7 @@ class MainWindow(QMainWindow):
         self.device_manager.device_added.connect(self._on_workspace_changed)
         self.device_manager.device_removed.connect(self._on_workspace_changed)
         self.device_manager.device_changed.connect(self._on_workspace_changed)
+        self.device_manager.devices_changed.connect(self._on_workspace_changed)
         self.device_manager.group_added.connect(self._on_workspace_changed)
         self.device_manager.group_removed.connect(self._on_workspace_changed)
         